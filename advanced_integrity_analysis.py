@@ -4,9 +4,47 @@ Incluye: plagio conceptual, desviaciones metodológicas,
 mala conducta científica, fabricación de datos, falacias
 """
 
-from typing import Dict, List, Tuple
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from bisect import bisect_left
+from collections import Counter
 from datetime import datetime
-import json
+import base64
+import hashlib
+import os
+
+import numpy as np
+
+from escaneo_multipatron import AutómataPalabrasClave, Coincidencia
+from documento_preprocesado import (
+    DocumentoAgregado,
+    DocumentoPreprocesado,
+    DocumentoRevisión,
+    es_palabra,
+    ventanas_texto,
+)
+from indice_minhash import (
+    LONGITUD_SHINGLE,
+    combinar_firmas,
+    firma_minhash,
+    firma_minhash_tramos,
+    índice_minhash,
+)
+from indice_winnowing import LONGITUD_KGRAMA, huellas_documento, índice_winnowing
+from indice_tfidf import índice_tfidf
+from indice_referencias import extraer_referencias, índice_referencias
+from modelo_ngramas import combinar_estadísticas_ngramas, modelo_ngramas
+from forense_numerica import analizar_números, concatenar_números, extraer_números
+from planificador_detectores import planificador
+from registro_detectores import Detector, registro_detectores
+from historial_revisiones import historial_revisiones
+from paquetes_reglas import PaqueteReglas, paquetes_reglas
+from perfil_estilometrico import (
+    MÁXIMA_LONGITUD_ORACIÓN,
+    combinar_estadísticas,
+    estadísticas_estilo,
+    perfiles_estilo,
+    rasgos_estilo,
+)
 
 
 class AnálisisIntegridad:
@@ -125,42 +163,114 @@ class AnálisisIntegridad:
         }
     }
     
+    # Palabras clave por detector: detector -> {indicador: frases}
+    PALABRAS_CLAVE = {
+        "plagio_conceptual": {
+            "paréntesis": ("(",),
+            "corchete": ("[",),
+            "según": ("según",),
+        },
+        "desviaciones_metodologicas": {
+            "método": ("método", "métodos"),
+            "muestra": ("muestra", "muestras"),
+        },
+        "mala_conducta": {
+            "datos_simulados": (
+                "simulado", "simulada", "simulados", "simuladas",
+                "asumido", "asumida", "asumidos", "asumidas",
+            ),
+            "conflicto": ("conflicto", "conflictos"),
+        },
+        "falacias": {
+            "falsa_causalidad": ("por lo tanto", "causa", "causó"),
+            "generalización_excesiva": ("siempre", "nunca", "todos", "nadie"),
+            "apelación_autoridad": ("el experto dice", "según expertos"),
+        },
+    }
+    
     @staticmethod
     def analizar_integridad_completa(
-        documento: Dict,
-        rol: str = "Estudiante"
+        documento,
+        rol: str = "Estudiante",
+        usuario: Optional[str] = None,
+        plazos: Optional[Dict[str, float]] = None,
+        paralelo: Optional[bool] = None,
+        detectores: Optional[Iterable[str]] = None,
+        perfil: Optional[str] = None,
+        reglas: Optional[PaqueteReglas] = None
     ) -> Dict:
         """
         Análisis completo de integridad académica/científica
         
+        Solo se ejecutan los detectores seleccionados (por nombre o por
+        perfil, ver registro_detectores) y solo se archivan en los índices
+        los artefactos que esos detectores calcularon.
+        
+        Todos los detectores usan el mismo paquete de reglas, resuelto una
+        vez por análisis (ver paquetes_reglas).
+        
         Args:
-            documento: Dict con contenido y metadatos
+            documento: Dict con contenido y metadatos, o DocumentoPreprocesado
             rol: Rol del autor
+            usuario: Autor del envío (por defecto, el de los metadatos)
+            plazos: segundos por detector (reemplaza el plazo registrado)
+            paralelo: ejecutar los detectores en paralelo (por defecto, EJECUCIÓN_PARALELA)
+            detectores: nombres de los detectores a ejecutar (por defecto, el perfil)
+            perfil: perfil registrado, p. ej. "triaje" o "completo" (por defecto, todos)
+            reglas: paquete de reglas (por defecto, el de la institución del documento)
         
         Returns:
             Dict con análisis detallado
+        
+        Raises:
+            ValueError: si se pide un detector, perfil o institución desconocidos
         """
         
+        # Preprocesamiento único compartido por todos los detectores
+        doc = DocumentoPreprocesado.desde(documento)
+        usuario = usuario or doc.get("usuario")
+        if reglas is not None:
+            doc.artefacto("reglas", lambda _: reglas)
+        reglas = AnálisisIntegridad.reglas(doc)
+        
+        plan = registro_detectores.plan(detectores, perfil)
+        resultados_detectores, ejecución = planificador.ejecutar(
+            registro_detectores.tareas(
+                plan,
+                doc,
+                contexto={"usuario": usuario},
+                plazos=plazos or {},
+                resultado_truncado=RESULTADO_TRUNCADO,
+                documento_para_proceso=AnálisisIntegridad._documento_para_proceso
+            ),
+            paralelo=EJECUCIÓN_PARALELA if paralelo is None else paralelo
+        )
+        registro_detectores.registrar_tiempos(ejecución)
+        
         resultados = {
             "timestamp": datetime.now().isoformat(),
             "rol": rol,
-            "plagio_conceptual": AnálisisIntegridad._evaluar_plagio_conceptual(documento),
-            "desviaciones_metodologicas": AnálisisIntegridad._evaluar_desviaciones(documento),
-            "mala_conducta": AnálisisIntegridad._evaluar_mala_conducta(documento),
-            "falacias": AnálisisIntegridad._evaluar_falacias(documento),
+            "version_reglas": reglas.versión,
+            **{nombre: resultados_detectores[nombre] for nombre in plan.nombres},
+            "ejecucion_detectores": ejecución,
             "score_general": 0,
             "nivel_riesgo": "BAJO"
         }
         
         # Calcular score general
         scores = [
-            resultados["plagio_conceptual"]["score"],
-            resultados["desviaciones_metodologicas"]["score"],
-            resultados["mala_conducta"]["score"],
-            resultados["falacias"]["score"]
+            resultados[d.nombre]["score"] for d in plan.detectores if d.agregación == "promedio"
         ]
+        if scores:
+            resultados["score_general"] = sum(scores) / len(scores)
         
-        resultados["score_general"] = sum(scores) / len(scores)
+        # La evidencia directa (p. ej. pasajes copiados) no se diluye en el promedio
+        for d in plan.detectores:
+            if d.agregación == "máximo":
+                resultados["score_general"] = max(
+                    resultados["score_general"],
+                    resultados[d.nombre]["score"]
+                )
         
         # Determinar nivel de riesgo
         if resultados["score_general"] >= 70:
@@ -175,133 +285,979 @@ class AnálisisIntegridad:
         # Agregar recomendaciones
         resultados["recomendaciones"] = AnálisisIntegridad._generar_recomendaciones(resultados)
         
+        # Archivar lo calculado para comparar con envíos futuros
+        AnálisisIntegridad._archivar(doc, usuario)
+        
         return resultados
     
     @staticmethod
-    def _evaluar_plagio_conceptual(documento: Dict) -> Dict:
+    def archivar_envío(
+        documento,
+        usuario: Optional[str] = None,
+        detectores: Optional[Iterable[str]] = None,
+        perfil: Optional[str] = None
+    ) -> DocumentoPreprocesado:
+        """
+        Archiva un envío cuyo análisis se sirvió desde la caché.
+        
+        Calcula solo los artefactos que el análisis completo habría
+        archivado con la misma selección de detectores e incorpora el
+        documento al perfil de estilo del autor, sin ejecutar detectores.
+        
+        Args:
+            documento: Dict con contenido y metadatos, o DocumentoPreprocesado
+            usuario: Autor del envío (por defecto, el de los metadatos)
+            detectores: nombres de los detectores seleccionados
+            perfil: perfil registrado de la selección
+        
+        Returns:
+            el documento preprocesado
+        """
+        doc = DocumentoPreprocesado.desde(documento)
+        usuario = usuario or doc.get("usuario")
+        plan = registro_detectores.plan(detectores, perfil)
+        
+        consumidos = {a for d in plan.detectores for a in d.artefactos}
+        for artefacto in ("firma_minhash", "huellas_winnowing", "frecuencias_palabras"):
+            if artefacto not in consumidos:
+                continue
+            if artefacto == "huellas_winnowing" and not AnálisisIntegridad._admite_huellas(doc):
+                continue
+            registro_detectores.calcular_artefacto(doc, artefacto)
+        
+        if "estilo_autoria" in plan.nombres:
+            perfiles_estilo.evaluar_y_actualizar(
+                usuario, doc.documento_hash, AnálisisIntegridad.rasgos_estilo(doc)
+            )
+        
+        AnálisisIntegridad._archivar(doc, usuario)
+        return doc
+    
+    @staticmethod
+    def _archivar(doc: DocumentoPreprocesado, usuario: Optional[str]):
+        """Agrega a los índices de similitud los artefactos ya calculados."""
+        if doc.tiene_artefacto("firma_minhash"):
+            índice_minhash.agregar(
+                doc.documento_hash,
+                AnálisisIntegridad.firma_documento(doc),
+                usuario
+            )
+        if doc.tiene_artefacto("huellas_winnowing") and AnálisisIntegridad._admite_huellas(doc):
+            índice_winnowing.agregar(
+                doc.documento_hash,
+                AnálisisIntegridad.huellas_documento(doc),
+                AnálisisIntegridad._inicios_párrafos(doc),
+                usuario
+            )
+        if doc.tiene_artefacto("frecuencias_palabras"):
+            índice_tfidf.agregar(
+                doc.documento_hash,
+                AnálisisIntegridad.frecuencias_palabras(doc),
+                usuario
+            )
+    
+    @staticmethod
+    def _documento_para_proceso(
+        doc: DocumentoPreprocesado,
+        artefactos: Iterable[str]
+    ) -> Optional[DocumentoPreprocesado]:
+        """
+        Documento a enviar a un detector en modo "proceso".
+        
+        Lleva el documento original y los artefactos declarados que ya se
+        calcularon; los documentos agregados no conservan el original y se
+        ejecutan en un hilo (None).
+        """
+        if isinstance(doc, DocumentoAgregado):
+            return None
+        
+        copia = DocumentoPreprocesado(doc.documento)
+        for nombre in artefactos:
+            if doc.tiene_artefacto(nombre):
+                valor = registro_detectores.calcular_artefacto(doc, nombre)
+                copia.artefacto(nombre, lambda _, valor=valor: valor)
+        return copia
+    
+    @staticmethod
+    def analizar_integridad_streaming(
+        fragmentos: Iterable[str],
+        documento: Optional[Dict] = None,
+        rol: str = "Estudiante",
+        reglas: Optional[PaqueteReglas] = None
+    ) -> Dict:
+        """
+        Análisis completo con memoria acotada para documentos muy grandes.
+        
+        Args:
+            fragmentos: contenido del documento en trozos
+            documento: metadatos del documento (sin contenido)
+            rol: Rol del autor
+            reglas: paquete de reglas (por defecto, el de la institución)
+        
+        Returns:
+            Dict con análisis detallado
+        """
+        doc = AnálisisIntegridad.preprocesar_por_ventanas(fragmentos, documento, reglas=reglas)
+        return AnálisisIntegridad.analizar_integridad_completa(doc, rol)
+    
+    @staticmethod
+    def preprocesar_por_ventanas(
+        fragmentos: Iterable[str],
+        documento: Optional[Dict] = None,
+        tamaño_ventana: int = None,
+        solapamiento: int = None,
+        reglas: Optional[PaqueteReglas] = None
+    ) -> DocumentoAgregado:
+        """
+        Escanea un flujo de texto por ventanas solapadas y fusiona el estado.
+        
+        Cada coincidencia pertenece a la ventana donde empieza, excluyendo
+        la mitad del solapamiento en cada borde interior; así ninguna se
+        cuenta dos veces ni se toma de una palabra cortada por la ventana.
+        
+        Args:
+            fragmentos: contenido del documento en trozos
+            documento: metadatos del documento (sin contenido)
+            tamaño_ventana: caracteres por ventana
+            solapamiento: caracteres compartidos entre ventanas
+            reglas: paquete de reglas (por defecto, el de la institución)
+        
+        Returns:
+            DocumentoAgregado listo para los detectores
+        """
+        reglas = reglas or paquetes_reglas.obtener((documento or {}).get("institucion"))
+        tamaño_ventana = tamaño_ventana or TAMAÑO_VENTANA
+        solapamiento = solapamiento if solapamiento is not None else SOLAPAMIENTO_VENTANA
+        margen = solapamiento // 2
+        
+        palabras_clave: Dict[Hashable, List[Coincidencia]] = {}
+        patrones = {
+            nombre: {"spans": [], "truncado": False}
+            for nombre in reglas.patrones_mala_conducta
+        }
+        firma = None
+        frecuencias = Counter()
+        estilo = None
+        ngramas = None
+        referencias = []
+        números = []
+        hasher = hashlib.sha256()
+        longitud = num_tokens = num_ventanas = 0
+        
+        for inicio, texto, es_última in ventanas_texto(
+            fragmentos, tamaño_ventana, solapamiento
+        ):
+            num_ventanas += 1
+            longitud = inicio + len(texto)
+            
+            # Región propia de la ventana, en posiciones locales
+            desde = margen if inicio else 0
+            hasta = len(texto) if es_última else len(texto) - margen
+            
+            hasher.update(texto[desde:hasta].encode("utf-8"))
+            
+            ventana = DocumentoPreprocesado({"contenido": texto})
+            spans = ventana.spans_tokens
+            primero = bisect_left(spans, (desde, -1))
+            último = bisect_left(spans, (hasta, -1))
+            num_tokens += último - primero
+            
+            # Shingles que empiezan en la región propia de la ventana
+            palabras = [t for t in ventana.tokens[primero:último] if es_palabra(t)]
+            frecuencias.update(palabras)
+            estilo = combinar_estadísticas(estilo, estadísticas_estilo(
+                ventana.tokens[primero:último],
+                ventana.spans_palabras,
+                [o for o in ventana.oraciones if desde <= o[0] < hasta]
+            ))
+            
+            propias = slice(
+                bisect_left(ventana.spans_palabras, (desde, -1)),
+                bisect_left(ventana.spans_palabras, (hasta, -1))
+            )
+            ngramas = combinar_estadísticas_ngramas(ngramas, modelo_ngramas.estadísticas(
+                ventana.palabras[propias],
+                ventana.spans_palabras[propias],
+                ventana.oraciones
+            ))
+            
+            for referencia in extraer_referencias(ventana.contenido):
+                a, b = referencia["span"]
+                if desde <= a < hasta and len(referencias) < MÁXIMO_REFERENCIAS:
+                    referencias.append(dict(referencia, span=(inicio + a, inicio + b)))
+            
+            extraídos = extraer_números(ventana.contenido)
+            propios = (extraídos["inicios"] >= desde) & (extraídos["inicios"] < hasta)
+            extraídos = {clave: valores[propios] for clave, valores in extraídos.items()}
+            extraídos["inicios"] += inicio
+            números.append(extraídos)
+            siguientes = (t for t in ventana.tokens[último:] if es_palabra(t))
+            palabras.extend(t for t, _ in zip(siguientes, range(LONGITUD_SHINGLE - 1)))
+            firma = combinar_firmas(firma, firma_minhash(palabras))
+            
+            for c in reglas.escáner_palabras_clave.buscar_tokens(ventana.tokens, spans):
+                if not desde <= c.inicio < hasta:
+                    continue
+                lista = palabras_clave.setdefault(c.etiqueta, [])
+                if len(lista) < MÁXIMO_COINCIDENCIAS_PATRÓN:
+                    lista.append(c._replace(inicio=inicio + c.inicio, fin=inicio + c.fin))
+            
+            for nombre, resultado in reglas.escáner_mala_conducta.buscar(ventana.contenido).items():
+                acumulado = patrones[nombre]
+                acumulado["truncado"] = acumulado["truncado"] or resultado["truncado"]
+                for a, b in resultado["spans"]:
+                    if not desde <= a < hasta:
+                        continue
+                    if len(acumulado["spans"]) >= MÁXIMO_COINCIDENCIAS_PATRÓN:
+                        acumulado["truncado"] = True
+                        break
+                    acumulado["spans"].append((inicio + a, inicio + b))
+        
+        return DocumentoAgregado(
+            documento or {},
+            longitud=longitud,
+            num_tokens=num_tokens,
+            num_ventanas=num_ventanas,
+            artefactos={
+                "palabras_clave": palabras_clave,
+                "patrones_mala_conducta": patrones,
+                "firma_minhash": firma,
+                "frecuencias_palabras": frecuencias,
+                "estadisticas_estilo": estilo,
+                "estadisticas_ngramas": ngramas,
+                "referencias": referencias,
+                "numeros": concatenar_números(números),
+                "reglas": reglas,
+            },
+            documento_hash=hasher.hexdigest()
+        )
+    
+    @staticmethod
+    def preprocesar_revisión(
+        documento: Dict,
+        linaje: str,
+        reglas: Optional[PaqueteReglas] = None,
+        usuario: Optional[str] = None
+    ) -> DocumentoRevisión:
+        """
+        Preprocesa una nueva versión de un documento reutilizando sus párrafos.
+        
+        Solo se escanean los párrafos cuyo contenido no aparece en el
+        historial; los demás artefactos se leen del historial y todos se
+        fusionan con sus posiciones en la nueva versión. Los puntajes del
+        documento se recalculan después sobre el resultado fusionado.
+        
+        Las coincidencias que cruzan el límite entre dos párrafos no se
+        detectan (salvo los shingles de MinHash, que se reconstruyen a partir
+        de los bordes de cada párrafo), y las huellas de winnowing se
+        seleccionan dentro de cada párrafo.
+        
+        Los artefactos de cada párrafo se guardan por versión del paquete de
+        reglas: cambiar las reglas de la institución obliga a reescanear.
+        
+        El linaje y los párrafos reutilizables son los del usuario: el mismo
+        linaje de otro usuario no se lee ni se extiende.
+        
+        Args:
+            documento: Dict con contenido y metadatos
+            linaje: identificador del documento a lo largo de sus versiones
+            reglas: paquete de reglas (por defecto, el de la institución)
+            usuario: dueño del linaje (por defecto, el de los metadatos)
+        
+        Returns:
+            DocumentoRevisión listo para los detectores
+        """
+        reglas = reglas or paquetes_reglas.obtener(documento.get("institucion"))
+        completo = DocumentoPreprocesado(documento)
+        párrafos = completo.párrafos
+        hashes = [
+            hashlib.sha256(completo.contenido[a:b].encode("utf-8")).hexdigest()
+            for a, b in párrafos
+        ]
+        
+        usuario = usuario or documento.get("usuario")
+        conocidos = historial_revisiones.artefactos(hashes, reglas.versión, usuario)
+        nuevos = {}
+        for (a, b), párrafo_hash in zip(párrafos, hashes):
+            if párrafo_hash not in conocidos and párrafo_hash not in nuevos:
+                nuevos[párrafo_hash] = AnálisisIntegridad._artefactos_párrafo(
+                    completo.contenido[a:b], reglas
+                )
+        
+        anteriores = [v["documento_hash"] for v in historial_revisiones.versiones(linaje, usuario)]
+        versión = historial_revisiones.registrar_versión(
+            linaje, completo.documento_hash, hashes, nuevos, reglas.versión, usuario
+        )
+        
+        por_párrafo = [
+            (inicio, conocidos.get(h) or nuevos[h])
+            for (inicio, _), h in zip(párrafos, hashes)
+        ]
+        metadatos = {k: v for k, v in documento.items() if k != "contenido"}
+        metadatos["versiones_previas"] = [
+            h for h in anteriores if h != completo.documento_hash
+        ]
+        
+        return DocumentoRevisión(
+            metadatos,
+            longitud=completo.longitud,
+            num_tokens=sum(p["num_tokens"] for _, p in por_párrafo),
+            párrafos=párrafos,
+            artefactos=dict(
+                AnálisisIntegridad._fusionar_párrafos(por_párrafo, reglas),
+                reglas=reglas,
+                # Depende del modelo compilado, no de las reglas: no se guarda
+                # por párrafo y se calcula sobre la versión completa
+                estadisticas_ngramas=AnálisisIntegridad.estadísticas_ngramas(completo)
+            ),
+            documento_hash=completo.documento_hash,
+            linaje=linaje,
+            versión=versión,
+            párrafos_reutilizados=sum(1 for h in hashes if h in conocidos)
+        )
+    
+    @staticmethod
+    def _artefactos_párrafo(texto: str, reglas: PaqueteReglas) -> Dict:
+        """
+        Artefactos de un párrafo aislado, serializables en JSON.
+        
+        Las posiciones son relativas al inicio del párrafo.
+        """
+        párrafo = DocumentoPreprocesado({"contenido": texto})
+        palabras = párrafo.palabras
+        borde = LONGITUD_SHINGLE - 1
+        
+        # Firmas y huellas solo con k-gramas completos dentro del párrafo
+        firma = firma_minhash(palabras) if len(palabras) >= LONGITUD_SHINGLE else None
+        huellas = (
+            huellas_documento(palabras, párrafo.spans_palabras)
+            if len(palabras) >= LONGITUD_KGRAMA else None
+        )
+        estilo = estadísticas_estilo(párrafo.tokens, párrafo.spans_palabras, párrafo.oraciones)
+        longitudes = estilo["histograma_oraciones"].nonzero()[0]
+        
+        return {
+            "num_tokens": párrafo.num_tokens,
+            "num_palabras": len(palabras),
+            "palabras_clave": [
+                [list(c.etiqueta), c.patrón, c.inicio, c.fin]
+                for c in reglas.escáner_palabras_clave.buscar_tokens(
+                    párrafo.tokens, párrafo.spans_tokens
+                )
+            ],
+            "patrones": {
+                nombre: {"spans": [list(s) for s in r["spans"]], "truncado": r["truncado"]}
+                for nombre, r in reglas.escáner_mala_conducta.buscar(texto).items()
+            },
+            "frecuencias": dict(Counter(palabras)),
+            "signos": dict(estilo["signos"]),
+            "oraciones": [
+                longitudes.tolist(),
+                estilo["histograma_oraciones"][longitudes].tolist()
+            ],
+            "referencias": [
+                dict(r, span=list(r["span"])) for r in extraer_referencias(texto)
+            ],
+            "numeros": {clave: v.tolist() for clave, v in extraer_números(texto).items()},
+            "firma": _a_base64(firma) if firma is not None else None,
+            "huellas": {clave: _a_base64(v) for clave, v in huellas.items()} if huellas else None,
+            "cabeza": palabras[:borde],
+            "cola": palabras[-borde:] if borde else [],
+        }
+    
+    @staticmethod
+    def _fusionar_párrafos(por_párrafo: List[Tuple[int, Dict]], reglas: PaqueteReglas) -> Dict:
+        """
+        Fusiona los artefactos de los párrafos en los del documento.
+        
+        Args:
+            por_párrafo: (posición inicial, artefactos) de cada párrafo en orden
+            reglas: paquete de reglas con que se escanearon
+        
+        Returns:
+            artefactos con las mismas claves que preprocesar_por_ventanas
+        """
+        palabras_clave: Dict[Hashable, List[Coincidencia]] = {}
+        patrones = {
+            nombre: {"spans": [], "truncado": False}
+            for nombre in reglas.patrones_mala_conducta
+        }
+        frecuencias = Counter()
+        signos = Counter()
+        histograma = np.zeros(MÁXIMA_LONGITUD_ORACIÓN + 1, dtype=np.int64)
+        referencias = []
+        números = {clave: [] for clave in extraer_números("")}
+        firmas = []
+        huellas = {"hashes": [], "inicios": [], "fines": []}
+        tipos_huellas = {"hashes": np.uint64, "inicios": np.int64, "fines": np.int64}
+        
+        for inicio, p in por_párrafo:
+            for etiqueta, patrón, a, b in p["palabras_clave"]:
+                lista = palabras_clave.setdefault(tuple(etiqueta), [])
+                if len(lista) < MÁXIMO_COINCIDENCIAS_PATRÓN:
+                    lista.append(Coincidencia(tuple(etiqueta), patrón, inicio + a, inicio + b))
+            
+            for nombre, resultado in p["patrones"].items():
+                acumulado = patrones.get(nombre)
+                if acumulado is None:
+                    continue
+                acumulado["truncado"] = acumulado["truncado"] or resultado["truncado"]
+                for a, b in resultado["spans"]:
+                    if len(acumulado["spans"]) >= MÁXIMO_COINCIDENCIAS_PATRÓN:
+                        acumulado["truncado"] = True
+                        break
+                    acumulado["spans"].append((inicio + a, inicio + b))
+            
+            frecuencias.update(p["frecuencias"])
+            signos.update(p["signos"])
+            # Listas vacías (párrafo sin oraciones) se leerían como float
+            histograma[np.asarray(p["oraciones"][0], dtype=np.int64)] += np.asarray(
+                p["oraciones"][1], dtype=np.int64
+            )
+            
+            for referencia in p["referencias"]:
+                if len(referencias) >= MÁXIMO_REFERENCIAS:
+                    break
+                a, b = referencia["span"]
+                referencias.append(dict(referencia, span=(inicio + a, inicio + b)))
+            
+            for clave, valores in p["numeros"].items():
+                números[clave].extend(
+                    [inicio + v for v in valores] if clave == "inicios" else valores
+                )
+            
+            if p["firma"] is not None:
+                firmas.append(_de_base64(p["firma"], np.uint32))
+            if p["huellas"]:
+                for clave, tipo in tipos_huellas.items():
+                    valores = _de_base64(p["huellas"][clave], tipo)
+                    huellas[clave].append(valores if clave == "hashes" else valores + inicio)
+        
+        firma = combinar_firmas(
+            np.min(firmas, axis=0) if firmas else None,
+            AnálisisIntegridad._firma_entre_párrafos([p for _, p in por_párrafo])
+        )
+        
+        vacíos = extraer_números("")
+        return {
+            "palabras_clave": palabras_clave,
+            "patrones_mala_conducta": patrones,
+            "firma_minhash": firma,
+            "frecuencias_palabras": frecuencias,
+            "estadisticas_estilo": {"signos": signos, "histograma_oraciones": histograma},
+            "referencias": referencias,
+            "numeros": {
+                clave: np.array(valores, dtype=vacíos[clave].dtype)
+                for clave, valores in números.items()
+            },
+            "huellas_winnowing": {
+                clave: np.concatenate(partes) for clave, partes in huellas.items()
+            } if huellas["hashes"] else None,
+        }
+    
+    @staticmethod
+    def _firma_entre_párrafos(párrafos: List[Dict]) -> Optional[np.ndarray]:
+        """
+        Firma MinHash de los shingles que cruzan un límite de párrafo.
+        
+        Con las últimas k-1 palabras antes de cada límite y las primeras k-1
+        después, todo shingle del tramo cruza el límite; la unión con los
+        shingles internos de cada párrafo es la del documento completo.
+        """
+        borde = LONGITUD_SHINGLE - 1
+        cabezas = [p["cabeza"] for p in párrafos]
+        if sum(p["num_palabras"] for p in párrafos) < LONGITUD_SHINGLE:
+            # Documento con menos de k palabras: un único shingle corto
+            return firma_minhash([palabra for c in cabezas for palabra in c])
+        
+        tramos = []
+        cola: List[str] = []
+        for i, p in enumerate(párrafos):
+            if i and cola:
+                siguiente: List[str] = []
+                for cabeza in cabezas[i:]:
+                    siguiente.extend(cabeza)
+                    if len(siguiente) >= borde:
+                        break
+                tramos.append(cola + siguiente[:borde])
+            cola = (cola + p["cola"])[-borde:]
+        
+        return firma_minhash_tramos(tramos)
+    
+    @staticmethod
+    def escanear_palabras_clave(
+        doc: DocumentoPreprocesado
+    ) -> Dict[Hashable, List[Coincidencia]]:
+        """
+        Localiza todas las palabras clave de los detectores en una pasada.
+        
+        El resultado queda en caché en el documento, así que solo el primer
+        detector que lo solicita paga el escaneo.
+        
+        Args:
+            doc: documento preprocesado
+        
+        Returns:
+            coincidencias agrupadas por (detector, indicador)
+        """
+        escáner = AnálisisIntegridad.reglas(doc).escáner_palabras_clave
+        return doc.artefacto(
+            "palabras_clave",
+            lambda d: AutómataPalabrasClave.agrupar(escáner.buscar_tokens(d.tokens, d.spans_tokens))
+        )
+    
+    @staticmethod
+    def reglas(doc: DocumentoPreprocesado) -> PaqueteReglas:
+        """Paquete de reglas de la institución del documento (fijo durante el análisis)."""
+        return doc.artefacto("reglas", lambda d: paquetes_reglas.obtener(d.get("institucion")))
+    
+    @staticmethod
+    def firma_documento(doc: DocumentoPreprocesado):
+        """Firma MinHash del documento (en caché en el documento)."""
+        return doc.artefacto("firma_minhash", lambda d: firma_minhash(d.palabras))
+    
+    @staticmethod
+    def frecuencias_palabras(doc: DocumentoPreprocesado) -> Counter:
+        """Frecuencia de cada palabra normalizada (en caché en el documento)."""
+        return doc.artefacto("frecuencias_palabras", lambda d: Counter(d.palabras))
+    
+    @staticmethod
+    def rasgos_estilo(doc: DocumentoPreprocesado):
+        """Vector de rasgos estilométricos (en caché en el documento)."""
+        estadísticas = doc.artefacto(
+            "estadisticas_estilo",
+            lambda d: estadísticas_estilo(d.tokens, d.spans_palabras, d.oraciones)
+        )
+        if estadísticas is None:
+            return None
+        return doc.artefacto(
+            "rasgos_estilo",
+            lambda d: rasgos_estilo(AnálisisIntegridad.frecuencias_palabras(d), estadísticas)
+        )
+    
+    @staticmethod
+    def estadísticas_ngramas(doc: DocumentoPreprocesado) -> Optional[Dict]:
+        """Sorpresa del modelo local de n-gramas (en caché en el documento)."""
+        return doc.artefacto(
+            "estadisticas_ngramas",
+            lambda d: modelo_ngramas.estadísticas(d.palabras, d.spans_palabras, d.oraciones)
+        )
+    
+    @staticmethod
+    def patrones_mala_conducta(doc: DocumentoPreprocesado) -> Dict[str, Dict]:
+        """Spans de los patrones de mala conducta (en caché en el documento)."""
+        escáner = AnálisisIntegridad.reglas(doc).escáner_mala_conducta
+        return doc.artefacto("patrones_mala_conducta", lambda d: escáner.buscar(d.contenido))
+    
+    @staticmethod
+    def números_documento(doc: DocumentoPreprocesado) -> Dict[str, np.ndarray]:
+        """Números del documento para la forense numérica (en caché en el documento)."""
+        return doc.artefacto("numeros", lambda d: extraer_números(d.contenido))
+    
+    @staticmethod
+    def referencias_documento(doc: DocumentoPreprocesado) -> List[Dict]:
+        """DOIs y citas autor-año del documento (en caché en el documento)."""
+        return doc.artefacto("referencias", lambda d: extraer_referencias(d.contenido))
+    
+    @staticmethod
+    def verificar_referencias(doc: DocumentoPreprocesado) -> Dict:
+        """
+        Verifica las referencias contra el volcado local (sin red).
+        
+        Automatiza la evidencia `referencias_raras` del modelo de reglas.
+        """
+        referencias = AnálisisIntegridad.referencias_documento(doc)
+        primera_aparición = {}
+        for referencia in referencias:
+            primera_aparición.setdefault(referencia["clave"], referencia)
+        claves = list(primera_aparición)
+        
+        encontradas = índice_referencias.verificar(claves)
+        resultado = {
+            "disponible": encontradas is not None,
+            "total": len(claves),
+            "dois": sum(1 for r in primera_aparición.values() if r["tipo"] == "doi"),
+            "citas": sum(1 for r in primera_aparición.values() if r["tipo"] == "cita"),
+            "verificadas": 0,
+            "no_encontradas": [],
+            "proporción_no_encontradas": 0.0,
+            "referencias_raras": 0,
+            "hallazgos": [],
+            "evidencia": {}
+        }
+        if encontradas is None or not claves:
+            return resultado
+        
+        faltantes = [primera_aparición[c] for c, ok in zip(claves, encontradas.tolist()) if not ok]
+        proporción = len(faltantes) / len(claves)
+        resultado.update({
+            "verificadas": len(claves) - len(faltantes),
+            "no_encontradas": [
+                {"tipo": r["tipo"], "texto": r["texto"], "span": list(r["span"])}
+                for r in faltantes[:MÁXIMO_REFERENCIAS_REPORTADAS]
+            ],
+            "proporción_no_encontradas": round(proporción, 3),
+            "evidencia": {
+                "no_encontradas": [list(r["span"]) for r in faltantes[:MÁXIMO_EVIDENCIAS]]
+            },
+        })
+        
+        if (
+            len(claves) >= MÍNIMO_REFERENCIAS_VERIFICABLES
+            and proporción > PROPORCIÓN_REFERENCIAS_RARAS
+        ):
+            resultado["referencias_raras"] = 1
+            resultado["hallazgos"].append(
+                f"{len(faltantes)} de {len(claves)} referencias no aparecen en el catálogo local"
+            )
+        
+        return resultado
+    
+    @staticmethod
+    def _evaluar_uso_ia(doc: DocumentoPreprocesado) -> Dict:
+        """
+        Perplejidad y explosividad según el modelo local de n-gramas.
+        
+        Señal barata de texto generado por IA: `requiere_llm` indica si
+        conviene confirmar con la consulta al LLM.
+        """
+        return modelo_ngramas.evaluar(AnálisisIntegridad.estadísticas_ngramas(doc))
+    
+    @staticmethod
+    def _evaluar_estilo(doc: DocumentoPreprocesado, usuario: Optional[str]) -> Dict:
+        """
+        Compara el estilo del documento con el perfil previo del autor.
+        
+        Automatiza la evidencia `estilo_diferente` del modelo de reglas;
+        el documento se incorpora al perfil después de compararlo.
+        """
+        resultado = perfiles_estilo.evaluar_y_actualizar(
+            usuario,
+            doc.documento_hash,
+            AnálisisIntegridad.rasgos_estilo(doc)
+        )
+        
+        hallazgos = []
+        if resultado["estilo_diferente"]:
+            hallazgos.append(
+                f"Estilo distinto al de los {resultado['documentos_perfil']} envíos previos "
+                f"del autor (distancia {resultado['distancia']:.1f})"
+            )
+        
+        resultado["hallazgos"] = hallazgos
+        return resultado
+    
+    @staticmethod
+    def _evaluar_plagio_conceptual(doc: DocumentoPreprocesado, usuario: Optional[str] = None) -> Dict:
         """Evalúa plagio conceptual"""
         score = 0
         hallazgos = []
+        coincidencias = AnálisisIntegridad.escanear_palabras_clave(doc)
+        
+        # Comparar con envíos previos (LSH, sin comparación por pares);
+        # las versiones anteriores del mismo autor no cuentan
+        excluidos = AnálisisIntegridad._excluidos(doc)
+        similares = índice_minhash.consultar(
+            AnálisisIntegridad.firma_documento(doc),
+            k=SIMILARES_TOP_K,
+            excluir=excluidos,
+            usuario=usuario
+        )
+        if similares:
+            máxima = similares[0]["similitud"]
+            if máxima >= 0.8:
+                score += 40
+                hallazgos.append(
+                    f"Contenido casi idéntico a un envío previo (similitud {máxima:.0%})"
+                )
+            elif máxima >= 0.5:
+                score += 20
+                hallazgos.append(
+                    f"Alta similitud con un envío previo (similitud {máxima:.0%})"
+                )
         
-        # Simular análisis de plagio
-        texto = documento.get("contenido", "").lower()
+        # Casos temáticamente cercanos del archivo (TF-IDF, detecta paráfrasis
+        # que ya no comparten shingles literales)
+        similares_tematicos = índice_tfidf.consultar(
+            AnálisisIntegridad.frecuencias_palabras(doc),
+            k=SIMILARES_TOP_K,
+            excluir=excluidos,
+            umbral=UMBRAL_SIMILITUD_TEMÁTICA,
+            usuario=usuario
+        )
+        if similares_tematicos and not similares:
+            máxima = similares_tematicos[0]["similitud"]
+            if máxima >= 0.9:
+                score += 15
+                hallazgos.append(
+                    f"Vocabulario casi idéntico a un caso previo sin coincidencia literal "
+                    f"(posible paráfrasis, similitud {máxima:.0%})"
+                )
         
         # Analizar atribuciones
-        if "(" not in texto or "[" not in texto:
+        if (
+            ("plagio_conceptual", "paréntesis") not in coincidencias
+            or ("plagio_conceptual", "corchete") not in coincidencias
+        ):
             score += 15
             hallazgos.append("Pocas referencias/atribuciones detectadas")
         
         # Analizar repetición de fuentes
-        ref_count = texto.count("según")
-        if ref_count < 5 and len(texto) > 1000:
+        ref_count = len(coincidencias.get(("plagio_conceptual", "según"), []))
+        if ref_count < 5 and doc.longitud > 1000:
             score += 10
             hallazgos.append("Referencias limitadas para el tamaño del documento")
         
         return {
             "score": min(score, 100),
             "hallazgos": hallazgos,
-            "detalles": {k: v for k, v in AnálisisIntegridad.PLAGIO_CONCEPTUAL.items()}
+            "similares": similares,
+            "similares_tematicos": similares_tematicos
+        }
+    
+    @staticmethod
+    def huellas_documento(doc: DocumentoPreprocesado):
+        """Huellas de winnowing del documento (en caché en el documento)."""
+        return doc.artefacto(
+            "huellas_winnowing",
+            lambda d: huellas_documento(d.palabras, d.spans_palabras)
+        )
+    
+    @staticmethod
+    def _inicios_párrafos(doc: DocumentoPreprocesado) -> List[int]:
+        """Posición inicial de cada párrafo (al menos uno)."""
+        return [inicio for inicio, _ in doc.párrafos] or [0]
+    
+    @staticmethod
+    def _admite_huellas(doc: DocumentoPreprocesado) -> bool:
+        """Indica si el documento tiene (o puede calcular) huellas con posiciones."""
+        return not isinstance(doc, DocumentoAgregado) or doc.tiene_artefacto("huellas_winnowing")
+    
+    @staticmethod
+    def _excluidos(doc: DocumentoPreprocesado) -> set:
+        """Hashes del propio documento y de sus versiones anteriores (del mismo autor)."""
+        return {doc.documento_hash, *doc.get("versiones_previas", ())}
+    
+    @staticmethod
+    def _evaluar_solapamiento_pasajes(doc: DocumentoPreprocesado, usuario: Optional[str] = None) -> Dict:
+        """Localiza pasajes compartidos con envíos previos (winnowing)"""
+        if not AnálisisIntegridad._admite_huellas(doc):
+            # El modo streaming no conserva las posiciones de cada huella
+            return {
+                "score": 0,
+                "hallazgos": [],
+                "disponible": False,
+                "coincidencias": [],
+                "evidencia": {}
+            }
+        
+        score = 0
+        hallazgos = []
+        evidencia = {}
+        
+        coincidencias = índice_winnowing.consultar(
+            AnálisisIntegridad.huellas_documento(doc),
+            AnálisisIntegridad._inicios_párrafos(doc),
+            k=SIMILARES_TOP_K,
+            excluir=AnálisisIntegridad._excluidos(doc),
+            usuario=usuario
+        )
+        
+        if coincidencias:
+            principal = coincidencias[0]
+            score = int(principal["cobertura"] * 100)
+            párrafos = {p["párrafo"] for p in principal["pasajes"]}
+            hallazgos.append(
+                f"{len(párrafos)} párrafo(s) coinciden con un envío previo "
+                f"({principal['cobertura']:.0%} del documento)"
+            )
+            evidencia["pasajes"] = [p["span"] for p in principal["pasajes"]][:MÁXIMO_EVIDENCIAS]
+        
+        return {
+            "score": min(score, 100),
+            "hallazgos": hallazgos,
+            "disponible": True,
+            "coincidencias": coincidencias,
+            "evidencia": evidencia
         }
     
     @staticmethod
-    def _evaluar_desviaciones(documento: Dict) -> Dict:
+    def _evaluar_desviaciones(doc: DocumentoPreprocesado) -> Dict:
         """Evalúa desviaciones metodológicas"""
         score = 0
         hallazgos = []
+        coincidencias = AnálisisIntegridad.escanear_palabras_clave(doc)
         
         # Verificar si es investigación
-        if documento.get("tipo_documento") == "investigación":
+        if doc.tipo_documento == "investigación":
             # Verificar descripción de método
-            if "método" not in documento.get("contenido", "").lower():
+            if ("desviaciones_metodologicas", "método") not in coincidencias:
                 score += 25
                 hallazgos.append("No describe el método utilizado")
             
             # Verificar muestra
-            if "muestra" not in documento.get("contenido", "").lower():
+            if ("desviaciones_metodologicas", "muestra") not in coincidencias:
                 score += 15
                 hallazgos.append("Tamaño/descripción de muestra no clara")
         
         return {
             "score": min(score, 100),
-            "hallazgos": hallazgos,
-            "detalles": {k: v for k, v in AnálisisIntegridad.DESVIACIONES_METODOLOGICAS.items()}
+            "hallazgos": hallazgos
         }
     
     @staticmethod
-    def _evaluar_mala_conducta(documento: Dict) -> Dict:
+    def _evaluar_mala_conducta(doc: DocumentoPreprocesado) -> Dict:
         """Evalúa mala conducta científica"""
         score = 0
         hallazgos = []
-        
-        contenido = documento.get("contenido", "").lower()
+        evidencia = {}
+        coincidencias = AnálisisIntegridad.escanear_palabras_clave(doc)
         
         # Verificar fabricación de datos
-        if "simulado" in contenido or "asumido" in contenido:
+        if ("mala_conducta", "datos_simulados") in coincidencias:
             score += 10
             hallazgos.append("Posible uso de datos simulados sin indicación clara")
+            evidencia["datos_simulados"] = AnálisisIntegridad._spans_evidencia(
+                coincidencias[("mala_conducta", "datos_simulados")]
+            )
         
         # Verificar omisión de conflictos de interés
-        if "conflicto" not in contenido and documento.get("rol") == "investigador":
+        if (
+            ("mala_conducta", "conflicto") not in coincidencias
+            and doc.rol == "investigador"
+        ):
             score += 15
             hallazgos.append("No declara posibles conflictos de interés")
         
+        # Patrones textuales de mala conducta (una sola pasada con límite)
+        reglas = AnálisisIntegridad.reglas(doc)
+        patrones = AnálisisIntegridad.patrones_mala_conducta(doc)
+        detalle_patrones = {}
+        for nombre, resultado in patrones.items():
+            if not resultado["spans"]:
+                continue
+            
+            patrón = reglas.patrones_mala_conducta[nombre]
+            cantidad = len(resultado["spans"])
+            score += int(patrón["indicador"] * 10)
+            hallazgos.append(
+                f"{patrón['riesgo']} ({cantidad}{'+' if resultado['truncado'] else ''} coincidencias)"
+            )
+            detalle_patrones[nombre] = {
+                "riesgo": patrón["riesgo"],
+                "indicador": patrón["indicador"],
+                "coincidencias": cantidad,
+                "truncado": resultado["truncado"],
+            }
+            evidencia[nombre] = [list(span) for span in resultado["spans"][:MÁXIMO_EVIDENCIAS]]
+        
+        # Forense numérica de los indicadores de fabricación
+        forense = analizar_números(AnálisisIntegridad.números_documento(doc))
+        indicadores = reglas.tablas["mala_conducta"].get(
+            "fabricación", AnálisisIntegridad.MALA_CONDUCTA["fabricación"]
+        )["indicadores"]
+        if forense["benford"]["aplicable"] and not forense["benford"]["conforme"]:
+            score += 10
+            hallazgos.append(
+                f"{indicadores[0]}: primer dígito no conforme con Benford "
+                f"(MAD {forense['benford']['mad']:.3f})"
+            )
+        if forense["dígito_terminal"]["aplicable"] and not forense["dígito_terminal"]["uniforme"]:
+            score += 15
+            hallazgos.append(
+                f"{indicadores[1]}: último dígito no uniforme "
+                f"(p = {forense['dígito_terminal']['valor_p']:.2g})"
+            )
+        inconsistentes = forense["grim"]["total_inconsistentes"]
+        if inconsistentes:
+            score += min(10 * inconsistentes, 30)
+            hallazgos.append(
+                f"{indicadores[2]}: {inconsistentes} medias incompatibles con su "
+                f"tamaño de muestra (GRIM, si los datos son enteros)"
+            )
+        
         return {
             "score": min(score, 100),
             "hallazgos": hallazgos,
-            "detalles": {k: v for k, v in AnálisisIntegridad.MALA_CONDUCTA.items()}
+            "patrones": detalle_patrones,
+            "forense_numerica": forense,
+            "evidencia": evidencia
         }
     
     @staticmethod
-    def _evaluar_falacias(documento: Dict) -> Dict:
+    def _evaluar_falacias(doc: DocumentoPreprocesado) -> Dict:
         """Evalúa falacias argumentativas"""
         score = 0
         hallazgos = []
-        
-        contenido = documento.get("contenido", "").lower()
+        evidencia = {}
+        reglas = AnálisisIntegridad.reglas(doc)
+        coincidencias = AnálisisIntegridad.escanear_palabras_clave(doc)
         
         # Detectar patrones de falacias
-        falacias_detectadas = {
-            "falsa_causalidad": ("por lo tanto", "causa", "causó"),
-            "generalización_excesiva": ("siempre", "nunca", "todos", "nadie"),
-            "apelación_autoridad": ("el experto dice", "según expertos"),
-        }
-        
-        for falacia, palabras_clave in falacias_detectadas.items():
-            if any(palabra in contenido for palabra in palabras_clave):
+        for falacia in reglas.palabras_clave["falacias"]:
+            if ("falacias", falacia) in coincidencias:
                 score += 10
                 hallazgos.append(f"Posible falacia: {falacia}")
+                evidencia[falacia] = AnálisisIntegridad._spans_evidencia(
+                    coincidencias[("falacias", falacia)]
+                )
         
         return {
             "score": min(score, 100),
             "hallazgos": hallazgos,
-            "detalles": {k: v for k, v in AnálisisIntegridad.FALACIAS.items()}
+            "evidencia": evidencia
         }
     
+    @staticmethod
+    def _spans_evidencia(coincidencias: List[Coincidencia]) -> List[List[int]]:
+        """Posiciones [inicio, fin] de las primeras coincidencias de un hallazgo."""
+        return [[c.inicio, c.fin] for c in coincidencias[:MÁXIMO_EVIDENCIAS]]
+    
     @staticmethod
     def _generar_recomendaciones(resultados: Dict) -> List[str]:
         """Genera recomendaciones basadas en análisis"""
         recomendaciones = []
         
-        if resultados["plagio_conceptual"]["score"] > 30:
+        if resultados.get("plagio_conceptual", {}).get("score", 0) > 30:
             recomendaciones.append(
                 "Revisar atribuciones y referencias. Asegurar todas las ideas se citan correctamente."
             )
         
-        if resultados["desviaciones_metodologicas"]["score"] > 30:
+        if resultados.get("desviaciones_metodologicas", {}).get("score", 0) > 30:
             recomendaciones.append(
                 "Describir claramente el método, muestra y procedimientos utilizados."
             )
         
-        if resultados["mala_conducta"]["score"] > 20:
+        if resultados.get("mala_conducta", {}).get("score", 0) > 20:
             recomendaciones.append(
                 "Declarar todos los conflictos de interés y fuentes de financiamiento."
             )
         
-        if resultados["falacias"]["score"] > 20:
+        if resultados.get("falacias", {}).get("score", 0) > 20:
             recomendaciones.append(
                 "Revisar la lógica de argumentos. Distinguir entre correlación y causalidad."
             )
         
+        if resultados.get("solapamiento_pasajes", {}).get("score", 0) > 20:
+            recomendaciones.append(
+                "Comparar los párrafos señalados con los envíos previos coincidentes."
+            )
+        
+        if resultados.get("estilo_autoria", {}).get("estilo_diferente"):
+            recomendaciones.append(
+                "Verificar la autoría: el estilo difiere del historial del autor."
+            )
+        
+        if resultados.get("uso_ia", {}).get("hallazgos"):
+            recomendaciones.append(
+                "Confirmar el posible uso de IA con la revisión del LLM y una defensa oral."
+            )
+        
+        if resultados.get("referencias", {}).get("referencias_raras"):
+            recomendaciones.append(
+                "Comprobar manualmente las referencias que no aparecen en el catálogo."
+            )
+        
         if resultados["nivel_riesgo"] in ["CRÍTICO", "ALTO"]:
             recomendaciones.append(
                 "Se recomienda revisión por supervisor/comité académico."
@@ -310,35 +1266,58 @@ class AnálisisIntegridad:
         return recomendaciones
 
 
+def _a_base64(arreglo: np.ndarray) -> str:
+    """Arreglo NumPy como texto compacto para los artefactos en JSON."""
+    return base64.b64encode(arreglo.tobytes()).decode("ascii")
+
+
+def _de_base64(texto: str, tipo) -> np.ndarray:
+    """Inverso de _a_base64."""
+    return np.frombuffer(base64.b64decode(texto), dtype=tipo)
+
+
 class AnálisisConMetadatos:
     """Análisis con metadatos completos"""
     
     @staticmethod
     def crear_análisis_completo(
-        contenido: Dict,
+        contenido,
         usuario: str,
         version_modelo: str = "2.1",
         temperatura: float = 0.7,
-        prompts_usados: List[str] = None
+        prompts_usados: List[str] = None,
+        detectores: Optional[Iterable[str]] = None,
+        perfil: Optional[str] = None,
+        reglas: Optional[PaqueteReglas] = None
     ) -> Dict:
         """
         Crea análisis con todos los metadatos
         
         Args:
-            contenido: Contenido a analizar
+            contenido: Contenido a analizar (Dict o DocumentoPreprocesado)
             usuario: Usuario que realiza análisis
             version_modelo: Versión del modelo
             temperatura: Temperatura de generación
             prompts_usados: Lista de prompts utilizados
+            detectores: detectores a ejecutar (por defecto, el perfil)
+            perfil: perfil de detectores (por defecto, todos)
+            reglas: paquete de reglas (por defecto, el de la institución)
         
         Returns:
-            Análisis completo con metadatos
+            Análisis completo con metadatos; los resultados de detectores
+            no ejecutados quedan en None
         """
         
         if prompts_usados is None:
             prompts_usados = []
         
-        analisis = AnálisisIntegridad.analizar_integridad_completa(contenido)
+        doc = DocumentoPreprocesado.desde(contenido)
+        analisis = AnálisisIntegridad.analizar_integridad_completa(
+            doc, usuario=usuario, detectores=detectores, perfil=perfil, reglas=reglas
+        )
+        
+        def campo(detector: str, clave: str):
+            return analisis[detector][clave] if detector in analisis else None
         
         # Agregar metadatos
         analisis_completo = {
@@ -348,6 +1327,8 @@ class AnálisisConMetadatos:
                 "version_modelo": version_modelo,
                 "temperatura": temperatura,
                 "prompts_usados": prompts_usados,
+                "documento": doc.resumen(),
+                "detectores": analisis["ejecucion_detectores"],
                 "ajustes": {
                     "temperatura": temperatura,
                     "top_p": 0.9,
@@ -356,10 +1337,14 @@ class AnálisisConMetadatos:
             },
             "análisis": analisis,
             "resultados": {
-                "score_plagio_conceptual": analisis["plagio_conceptual"]["score"],
-                "score_desviaciones": analisis["desviaciones_metodologicas"]["score"],
-                "score_mala_conducta": analisis["mala_conducta"]["score"],
-                "score_falacias": analisis["falacias"]["score"],
+                "score_plagio_conceptual": campo("plagio_conceptual", "score"),
+                "score_desviaciones": campo("desviaciones_metodologicas", "score"),
+                "score_mala_conducta": campo("mala_conducta", "score"),
+                "score_falacias": campo("falacias", "score"),
+                "score_solapamiento_pasajes": campo("solapamiento_pasajes", "score"),
+                "estilo_diferente": campo("estilo_autoria", "estilo_diferente"),
+                "referencias_raras": campo("referencias", "referencias_raras"),
+                "score_uso_ia": campo("uso_ia", "score"),
                 "score_general": analisis["score_general"],
                 "nivel_riesgo": analisis["nivel_riesgo"]
             }
@@ -386,3 +1371,195 @@ PATRONES_MALA_CONDUCTA = {
         "indicador": 0.5
     }
 }
+
+# Envíos previos similares reportados por el detector de plagio
+SIMILARES_TOP_K = 5
+
+# Similitud coseno TF-IDF mínima para reportar un caso temáticamente cercano
+UMBRAL_SIMILITUD_TEMÁTICA = 0.3
+
+# Máximo de coincidencias registradas por patrón de mala conducta
+MÁXIMO_COINCIDENCIAS_PATRÓN = 50
+
+# Posiciones conservadas por hallazgo para la explicación bajo demanda
+# (ver explicacion_hallazgos)
+MÁXIMO_EVIDENCIAS = 20
+
+# Verificación de referencias: mínimo de referencias para juzgar, proporción
+# no encontrada que marca referencias_raras y máximo listado en el reporte
+MÍNIMO_REFERENCIAS_VERIFICABLES = 5
+PROPORCIÓN_REFERENCIAS_RARAS = 0.3
+MÁXIMO_REFERENCIAS_REPORTADAS = 20
+
+# Ejecutar los detectores en paralelo (ver planificador_detectores)
+EJECUCIÓN_PARALELA = True
+
+# Resultado de un detector que no terminó dentro de su plazo
+RESULTADO_TRUNCADO = {
+    "score": 0,
+    "hallazgos": ["Detector sin completar dentro del plazo; resultado parcial"],
+}
+
+# Modo streaming: referencias conservadas como máximo
+MÁXIMO_REFERENCIAS = 50_000
+
+# Modo streaming: caracteres por ventana y solapamiento entre ventanas.
+# La mitad del solapamiento debe superar la frase o patrón más largo.
+TAMAÑO_VENTANA = 256 * 1024
+SOLAPAMIENTO_VENTANA = 4 * 1024
+
+# Paquete de reglas base: vocabularios y tablas por defecto, que cada
+# institución puede redefinir (ver paquetes_reglas). Los umbrales no son
+# configurables pero forman parte de la versión.
+_PAQUETE_BASE = paquetes_reglas.registrar_base(
+    {
+        "palabras_clave": AnálisisIntegridad.PALABRAS_CLAVE,
+        "patrones_mala_conducta": PATRONES_MALA_CONDUCTA,
+        "plagio_conceptual": AnálisisIntegridad.PLAGIO_CONCEPTUAL,
+        "desviaciones_metodologicas": AnálisisIntegridad.DESVIACIONES_METODOLOGICAS,
+        "mala_conducta": AnálisisIntegridad.MALA_CONDUCTA,
+        "falacias": AnálisisIntegridad.FALACIAS,
+        "umbrales": {
+            "similitud_temática": UMBRAL_SIMILITUD_TEMÁTICA,
+            "mínimo_referencias_verificables": MÍNIMO_REFERENCIAS_VERIFICABLES,
+            "proporción_referencias_raras": PROPORCIÓN_REFERENCIAS_RARAS,
+        },
+    },
+    máximo_por_patrón=MÁXIMO_COINCIDENCIAS_PATRÓN
+)
+
+# Versión del paquete base: forma parte de la clave de caché de resultados
+VERSIÓN_REGLAS = _PAQUETE_BASE.versión
+
+
+# Registro de artefactos y detectores. Modo "hilo" para los que esperan E/S
+# (índices en SQLite o memoria mapeada), "proceso" para los que ocupan CPU
+# con el GIL tomado; plazo en segundos antes del resultado truncado.
+for _nombre, _constructor in (
+    ("reglas", AnálisisIntegridad.reglas),
+    ("palabras_clave", AnálisisIntegridad.escanear_palabras_clave),
+    ("frecuencias_palabras", AnálisisIntegridad.frecuencias_palabras),
+    ("firma_minhash", AnálisisIntegridad.firma_documento),
+    ("huellas_winnowing", AnálisisIntegridad.huellas_documento),
+    ("patrones_mala_conducta", AnálisisIntegridad.patrones_mala_conducta),
+    ("numeros", AnálisisIntegridad.números_documento),
+    ("referencias", AnálisisIntegridad.referencias_documento),
+    ("rasgos_estilo", AnálisisIntegridad.rasgos_estilo),
+    ("estadisticas_ngramas", AnálisisIntegridad.estadísticas_ngramas),
+):
+    registro_detectores.registrar_artefacto(_nombre, _constructor)
+
+_ESQUEMA_BASE = {"score": int, "hallazgos": list}
+
+registro_detectores.registrar(Detector(
+    nombre="plagio_conceptual",
+    función=AnálisisIntegridad._evaluar_plagio_conceptual,
+    artefactos=("reglas", "palabras_clave", "firma_minhash", "frecuencias_palabras"),
+    costo="alto",
+    esquema=dict(_ESQUEMA_BASE, similares=list, similares_tematicos=list),
+    agregación="promedio",
+    parámetros=("usuario",),
+    plazo=10.0,
+))
+registro_detectores.registrar(Detector(
+    nombre="desviaciones_metodologicas",
+    función=AnálisisIntegridad._evaluar_desviaciones,
+    artefactos=("reglas", "palabras_clave"),
+    costo="bajo",
+    esquema=_ESQUEMA_BASE,
+    agregación="promedio",
+    plazo=5.0,
+))
+registro_detectores.registrar(Detector(
+    nombre="mala_conducta",
+    función=AnálisisIntegridad._evaluar_mala_conducta,
+    artefactos=("reglas", "palabras_clave", "patrones_mala_conducta", "numeros"),
+    costo="medio",
+    esquema=dict(_ESQUEMA_BASE, patrones=dict, forense_numerica=dict, evidencia=dict),
+    agregación="promedio",
+    modo="proceso" if (os.cpu_count() or 1) > 1 else "hilo",
+    plazo=10.0,
+))
+registro_detectores.registrar(Detector(
+    nombre="falacias",
+    función=AnálisisIntegridad._evaluar_falacias,
+    artefactos=("reglas", "palabras_clave"),
+    costo="bajo",
+    esquema=dict(_ESQUEMA_BASE, evidencia=dict),
+    agregación="promedio",
+    plazo=5.0,
+))
+registro_detectores.registrar(Detector(
+    nombre="solapamiento_pasajes",
+    función=AnálisisIntegridad._evaluar_solapamiento_pasajes,
+    artefactos=("huellas_winnowing",),
+    costo="alto",
+    esquema=dict(_ESQUEMA_BASE, disponible=bool, coincidencias=list, evidencia=dict),
+    agregación="máximo",
+    parámetros=("usuario",),
+    plazo=10.0,
+))
+registro_detectores.registrar(Detector(
+    nombre="estilo_autoria",
+    función=AnálisisIntegridad._evaluar_estilo,
+    artefactos=("frecuencias_palabras", "rasgos_estilo"),
+    costo="alto",
+    esquema={
+        "disponible": bool,
+        "distancia": float,
+        "estilo_diferente": int,
+        "rasgos_atípicos": list,
+        "documentos_perfil": int,
+        "hallazgos": list,
+    },
+    parámetros=("usuario",),
+    plazo=5.0,
+    resultado_truncado={"disponible": False, "estilo_diferente": 0},
+))
+registro_detectores.registrar(Detector(
+    nombre="referencias",
+    función=AnálisisIntegridad.verificar_referencias,
+    artefactos=("referencias",),
+    costo="medio",
+    esquema={
+        "disponible": bool,
+        "total": int,
+        "dois": int,
+        "citas": int,
+        "verificadas": int,
+        "no_encontradas": list,
+        "proporción_no_encontradas": float,
+        "referencias_raras": int,
+        "hallazgos": list,
+        "evidencia": dict,
+    },
+    plazo=5.0,
+    resultado_truncado={"disponible": False, "referencias_raras": 0},
+))
+
+registro_detectores.registrar(Detector(
+    nombre="uso_ia",
+    función=AnálisisIntegridad._evaluar_uso_ia,
+    artefactos=("estadisticas_ngramas",),
+    costo="bajo",
+    esquema={
+        "disponible": bool,
+        "palabras": int,
+        "perplejidad": float,
+        "explosividad": float,
+        "proporción_desconocidas": float,
+        "score": int,
+        "requiere_llm": bool,
+        "hallazgos": list,
+    },
+    plazo=2.0,
+    resultado_truncado={"disponible": False, "requiere_llm": True},
+))
+
+# Triaje para cribado masivo: sin consultas a los índices de envíos previos
+# ni actualización de perfiles de estilo
+registro_detectores.registrar_perfil(
+    "triaje",
+    [n for n in registro_detectores.nombres if registro_detectores.obtener(n).costo != "alto"]
+)
+registro_detectores.registrar_perfil("completo")
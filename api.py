@@ -139,6 +139,7 @@ def analyze():
             'num_evidencias': num_evidencias,
             'texto_length': len(texto),
             'sentimiento': 'neutral',
+            'version_modelo': resultado['version_modelo'],
             'json_data': {
                 'titulo': metadata.get('titulo', 'Sin título'),
                 'autor': metadata.get('autor', 'Anónimo'),
@@ -164,6 +165,7 @@ def analyze():
             'metadata': {
                 'text_length': len(texto),
                 'num_evidencias': num_evidencias,
+                'version_modelo': resultado['version_modelo'],
                 'analyzed_at': datetime.now().isoformat()
             }
         }), 201
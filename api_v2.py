@@ -13,10 +13,19 @@ import traceback
 import jwt
 from functools import wraps
 from typing import Dict, Tuple
-
-from improved_analysis_model import analyze_with_improved_model
+import numpy as np
+
+from improved_analysis_model import (
+    analyze_with_improved_model,
+    apply_configuration_changes,
+    configuration_from_dict,
+    model_registry,
+)
 from database import CentinelaDatabase
 from institutional_metrics import InstitucionalMetrics
+from advanced_integrity_analysis import AnálisisIntegridad
+from documento_preprocesado import DocumentoPreprocesado
+from perfil_estilometrico import perfiles_estilo
 
 # ============================================================
 # CONFIGURACIÓN
@@ -249,6 +258,9 @@ def analyze():
             tipo_producto:
               type: string
               example: Ensayo
+            contenido:
+              type: string
+              description: "Texto del trabajo; si se envía, estilo_diferente y referencias_raras no indicados se calculan automáticamente"
             evidencias:
               type: object
               properties:
@@ -294,6 +306,22 @@ def analyze():
         }
         evidencias_default.update(evidencias)
         
+        # Evidencias automáticas a partir del texto
+        estilometria = referencias = None
+        contenido = data.get('contenido')
+        doc = DocumentoPreprocesado({'contenido': contenido}) if contenido else None
+        if doc and 'estilo_diferente' not in evidencias:
+            estilometria = perfiles_estilo.evaluar_y_actualizar(
+                request.user.get('username', 'anónimo'),
+                doc.documento_hash,
+                AnálisisIntegridad.rasgos_estilo(doc)
+            )
+            evidencias_default['estilo_diferente'] = estilometria['estilo_diferente']
+        if doc and 'referencias_raras' not in evidencias:
+            referencias = AnálisisIntegridad.verificar_referencias(doc)
+            if referencias['disponible']:
+                evidencias_default['referencias_raras'] = referencias['referencias_raras']
+        
         num_evidencias = sum(1 for v in evidencias_default.values() if v > 0)
         
         # Ejecutar análisis
@@ -317,7 +345,11 @@ def analyze():
             'confianza': resultado['confidence'],
             'timestamp': datetime.now().isoformat(),
             'num_evidencias': num_evidencias,
-            'usuario': request.user.get('username', 'anónimo')
+            'usuario': request.user.get('username', 'anónimo'),
+            'version_modelo': resultado['version_modelo'],
+            'json_data': {
+                'evidencias': evidencias_default
+            }
         }
         
         db.guardar_caso(case_data)
@@ -329,7 +361,10 @@ def analyze():
                 'overall_score': resultado['overall_score'],
                 'overall_level': resultado['overall_level'],
                 'confidence': resultado['confidence'],
-                'recommendations': resultado.get('recommendations', [])
+                'recommendations': resultado.get('recommendations', []),
+                'stylometry': estilometria,
+                'references': referencias,
+                'version_modelo': resultado['version_modelo']
             }
         }), 201
         
@@ -467,14 +502,11 @@ def batch_analyze():
                 'code': 'INVALID_REQUEST'
             }), 400
         
-        resultados = []
+        resultados = [None] * len(casos)
+        lote = []
         
-        for caso in casos:
+        for i, caso in enumerate(casos):
             try:
-                rol = caso.get('rol', 'Estudiante')
-                tipo_producto = caso.get('tipo_producto', 'Ensayo')
-                evidencias = caso.get('evidencias', {})
-                
                 evidencias_default = {
                     'estilo_diferente': 0,
                     'defensa_debil': 0,
@@ -484,31 +516,72 @@ def batch_analyze():
                     'datos_inconsistentes': 0,
                     'imagenes_sospechosas': 0
                 }
-                evidencias_default.update(evidencias)
+                evidencias_default.update(caso.get('evidencias', {}))
+                rol = caso.get('rol', 'Estudiante')
+                tipo_producto = caso.get('tipo_producto', 'Ensayo')
                 
-                resultado = analyze_with_improved_model(
-                    evidencias=evidencias_default,
-                    rol=rol,
-                    tipo_producto=tipo_producto,
-                    num_evidencias_marked=sum(1 for v in evidencias_default.values() if v > 0)
-                )
+                lote.append((
+                    i,
+                    evidencias_default,
+                    rol,
+                    tipo_producto,
+                    sum(1 for v in evidencias_default.values() if v > 0)
+                ))
+            
+            except Exception as e:
+                resultados[i] = {
+                    'status': 'error',
+                    'error': str(e)
+                }
+        
+        # Todos los casos válidos se puntúan juntos (ver score_batch); los
+        # que tienen evidencias no numéricas, o rol o tipo de producto que no
+        # son texto, pasan por el análisis individual con su mismo resultado
+        # (o error) por caso. Todo el lote usa la misma versión del modelo
+        modelo = model_registry.active()
+        evidencia, validos = modelo.pack_evidence([evidencias for _, evidencias, _, _, _ in lote])
+        validos &= np.array(
+            [isinstance(rol, str) and isinstance(tipo, str) for _, _, rol, tipo, _ in lote],
+            dtype=bool
+        )
+        puntajes = modelo.score_batch(
+            evidencia[validos],
+            [rol for (_, _, rol, _, _), v in zip(lote, validos) if v],
+            [tipo for (_, _, _, tipo, _), v in zip(lote, validos) if v],
+            [marcadas for (_, _, _, _, marcadas), v in zip(lote, validos) if v]
+        )
+        puntajes_caso = zip(puntajes['overall_score'].tolist(), puntajes['overall_level'].tolist())
+        
+        for (i, evidencias, rol, tipo_producto, marcadas), valido in zip(lote, validos.tolist()):
+            try:
+                if valido:
+                    score, level = next(puntajes_caso)
+                else:
+                    resultado = modelo.analyze(
+                        evidencias=evidencias,
+                        rol=rol,
+                        tipo_producto=tipo_producto,
+                        num_evidencias_marked=marcadas
+                    )
+                    score, level = resultado['overall_score'], resultado['overall_level']
                 
-                resultados.append({
+                resultados[i] = {
                     'status': 'success',
-                    'score': resultado['overall_score'],
-                    'level': resultado['overall_level']
-                })
+                    'score': score,
+                    'level': level
+                }
             
             except Exception as e:
-                resultados.append({
+                resultados[i] = {
                     'status': 'error',
                     'error': str(e)
-                })
+                }
         
         return jsonify({
             'status': 'success',
             'total': len(casos),
             'procesados': len([r for r in resultados if r['status'] == 'success']),
+            'version_modelo': modelo.label,
             'resultados': resultados
         }), 200
     
@@ -519,6 +592,170 @@ def batch_analyze():
         }), 500
 
 
+# ============================================================
+# RUTAS DE CONFIGURACIÓN DEL MODELO
+# ============================================================
+
+@app.route('/api/model/configurations', methods=['GET'])
+@token_required
+def list_model_configurations():
+    """
+    Versión activa del modelo y versiones guardadas
+    ---
+    security:
+      - Bearer: []
+    parameters:
+      - name: nombre
+        in: query
+        type: string
+    responses:
+      200:
+        description: Versión activa y versiones guardadas
+    """
+    try:
+        return jsonify({
+            'status': 'success',
+            'modelo': model_registry.describe(),
+            'versiones': db.listar_configuraciones_modelo(request.args.get('nombre'))
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'code': 'QUERY_ERROR'
+        }), 500
+
+
+@app.route('/api/model/configurations', methods=['POST'])
+@token_required
+def save_model_configuration():
+    """
+    Guardar una nueva versión de una configuración del modelo (admin)
+    ---
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            nombre:
+              type: string
+              example: comite-2026
+            configuracion:
+              type: object
+              description: "Configuración completa (dimension_weights, role_risk_factors, product_risk_factors, risk_thresholds)"
+            cambios:
+              type: object
+              description: "Cambios sobre la última versión del nombre (o la activa si es nuevo)"
+            descripcion:
+              type: string
+            activar:
+              type: boolean
+              default: false
+    responses:
+      201:
+        description: Versión guardada
+      400:
+        description: Configuración inválida
+      403:
+        description: Solo administrador
+    """
+    if request.user.get('username') != 'admin':
+        return jsonify({
+            'error': 'Solo el administrador puede modificar el modelo',
+            'code': 'FORBIDDEN'
+        }), 403
+
+    data = request.get_json() or {}
+    nombre = data.get('nombre')
+    if not nombre or not isinstance(nombre, str):
+        return jsonify({
+            'error': 'Nombre de configuración requerido',
+            'code': 'INVALID_REQUEST'
+        }), 400
+
+    try:
+        if 'configuracion' in data:
+            configuracion = configuration_from_dict(data['configuracion'])
+        else:
+            anterior = model_registry.get(nombre) or model_registry.active()
+            configuracion = apply_configuration_changes(anterior.configuration, data.get('cambios') or {})
+
+        modelo = model_registry.save(
+            nombre, configuracion, data.get('descripcion'), activate=bool(data.get('activar'))
+        )
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({
+            'error': f'Configuración inválida: {e}',
+            'code': 'INVALID_CONFIGURATION'
+        }), 400
+
+    return jsonify({
+        'status': 'success',
+        'configuracion': modelo.describe(),
+        'activa': model_registry.active().label
+    }), 201
+
+
+@app.route('/api/model/activate', methods=['POST'])
+@token_required
+def activate_model_configuration():
+    """
+    Activar una versión guardada del modelo en todos los procesos (admin)
+    ---
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            nombre:
+              type: string
+              description: "null vuelve a la configuración integrada"
+            version:
+              type: integer
+              description: "Por defecto, la última del nombre"
+    responses:
+      200:
+        description: Versión activada
+      403:
+        description: Solo administrador
+      404:
+        description: Versión inexistente
+    """
+    if request.user.get('username') != 'admin':
+        return jsonify({
+            'error': 'Solo el administrador puede modificar el modelo',
+            'code': 'FORBIDDEN'
+        }), 403
+
+    data = request.get_json() or {}
+    try:
+        version = data.get('version')
+        modelo = model_registry.activate(data.get('nombre'), int(version) if version is not None else None)
+    except LookupError as e:
+        return jsonify({
+            'error': str(e),
+            'code': 'NOT_FOUND'
+        }), 404
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'error': str(e),
+            'code': 'INVALID_CONFIGURATION'
+        }), 400
+
+    return jsonify({
+        'status': 'success',
+        'activa': modelo.label
+    }), 200
+
+
 # ============================================================
 # RUTAS DE MÉTRICAS
 # ============================================================
@@ -631,6 +868,11 @@ def info():
                 'GET /api/case/<id>': 'Obtener caso',
                 'GET /api/cases': 'Listar casos'
             },
+            'model': {
+                'GET /api/model/configurations': 'Versión activa y versiones guardadas',
+                'POST /api/model/configurations': 'Guardar versión (admin)',
+                'POST /api/model/activate': 'Activar versión (admin)'
+            },
             'metrics': {
                 'GET /api/metrics/institutional': 'Métricas agregadas',
                 'GET /api/metrics/temporal': 'Evolución temporal'
@@ -9,16 +9,27 @@ from flasgger import Swagger
 from datetime import datetime, timedelta
 import uuid
 import json
+import codecs
 import hashlib
+import math
 import time
 from functools import wraps
-from typing import Dict, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 
-from improved_analysis_model import analyze_with_improved_model
+from improved_analysis_model import analyze_with_improved_model, model_registry
 from database import CentinelaDatabase
 from institutional_metrics import InstitucionalMetrics
 from advanced_integrity_analysis import AnálisisIntegridad, AnálisisConMetadatos
+from registro_detectores import registro_detectores
+from paquetes_reglas import paquetes_reglas
+from documento_preprocesado import DocumentoPreprocesado
+from indice_tfidf import índice_tfidf
 from auditoria_sistema import auditoria
+from cache_resultados import cache_resultados
+from historial_revisiones import historial_revisiones
+from explicacion_hallazgos import explicar, textos_reporte
+from deteccion_colusion import DetecciónColusión, UMBRAL_JACCARD
+from indice_figuras import AnálisisFiguras
 
 import jwt
 
@@ -45,6 +56,13 @@ swagger = Swagger(app, template={
 db = CentinelaDatabase()
 metrics = InstitucionalMetrics()
 
+# Cuerpos de texto plano se analizan en modo streaming (memoria acotada)
+TIPOS_CUERPO_STREAMING = ('text/plain', 'application/octet-stream')
+TAMAÑO_BLOQUE_LECTURA = 64 * 1024
+
+# Documentos admitidos como máximo en una cohorte (modo "cohorte" del lote)
+MÁXIMO_DOCUMENTOS_COHORTE = 5000
+
 # Usuarios de demostración
 DEMO_USERS = {
     "admin": "admin123",
@@ -95,6 +113,160 @@ def token_required(f):
     return decorated
 
 
+# ============================================================
+# LECTURA DE CUERPOS EN STREAMING
+# ============================================================
+
+def es_cuerpo_streaming() -> bool:
+    """Indica si la solicitud envía el documento como texto plano en streaming"""
+    return request.mimetype in TIPOS_CUERPO_STREAMING
+
+
+def leer_fragmentos(flujo, hasher) -> Iterator[str]:
+    """
+    Lee el cuerpo de la solicitud por bloques y lo decodifica como UTF-8.
+    
+    Acepta cuerpos con Content-Length o Transfer-Encoding: chunked y
+    actualiza el hash del documento a medida que llegan los bytes.
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    
+    while True:
+        bloque = flujo.read(TAMAÑO_BLOQUE_LECTURA)
+        if not bloque:
+            break
+        hasher.update(bloque)
+        texto = decodificador.decode(bloque)
+        if texto:
+            yield texto
+    
+    cola = decodificador.decode(b'', final=True)
+    if cola:
+        yield cola
+
+
+# ============================================================
+# SELECCIÓN DE DETECTORES
+# ============================================================
+
+def selección_detectores(
+    data,
+    perfil_por_defecto: Optional[str] = None
+) -> Tuple[Optional[List[str]], Optional[str], List[str]]:
+    """
+    Detectores pedidos en la solicitud (lista JSON o nombres separados por
+    comas) o, si no hay, el perfil pedido o el perfil por defecto.
+    
+    Returns:
+        (detectores, perfil, nombres resueltos)
+    
+    Raises:
+        ValueError: si algún detector o el perfil no existen
+    """
+    detectores = data.get('detectores')
+    if isinstance(detectores, str):
+        detectores = [d.strip() for d in detectores.split(',') if d.strip()]
+    detectores = list(detectores) if detectores else None
+    perfil = None if detectores else data.get('perfil', perfil_por_defecto)
+    return detectores, perfil, registro_detectores.seleccionar(detectores, perfil)
+
+
+def análisis_truncado(análisis: Dict) -> bool:
+    """
+    Indica si algún detector agotó su plazo y devolvió un resultado parcial.
+    
+    Esos análisis no se guardan en la caché: la clave depende solo del
+    contenido y los parámetros, y un reenvío debe volver a intentarlo.
+    """
+    ejecución = análisis.get('ejecucion_detectores')
+    if ejecución is None:
+        ejecución = análisis.get('análisis', {}).get('ejecucion_detectores', {})
+    return any(registro.get('truncado') for registro in ejecución.values())
+
+
+# ============================================================
+# PROYECCIÓN DE RESPUESTAS
+# ============================================================
+
+# Campos de cada detector que se conservan en modo compacto
+CAMPOS_COMPACTOS_DETECTOR = (
+    'score', 'hallazgos', 'truncado', 'disponible', 'estilo_diferente', 'referencias_raras',
+    'requiere_llm'
+)
+
+# Secciones omitidas en modo compacto (duplican o detallan el análisis)
+SECCIONES_NO_COMPACTAS = ('hallazgos_detallados',)
+
+
+def proyección_solicitada() -> Tuple[Optional[List[str]], bool]:
+    """
+    Proyección pedida en la query string: `fields` (rutas separadas por
+    comas, p. ej. `resultados,análisis.score_general`) y `compact=1`.
+    
+    Returns:
+        (rutas o None, compacto)
+    """
+    campos = request.args.get('fields')
+    compacto = request.args.get('compact', '').lower() in ('1', 'true', 'si', 'sí')
+    rutas = [c.strip() for c in campos.split(',') if c.strip()] if campos else None
+    return rutas, compacto
+
+
+def compactar_análisis(análisis: Dict) -> Dict:
+    """Análisis con solo puntajes y hallazgos por detector, sin tiempos de ejecución."""
+    return {
+        clave: (
+            {campo: valor[campo] for campo in CAMPOS_COMPACTOS_DETECTOR if campo in valor}
+            if isinstance(valor, dict) and 'hallazgos' in valor else valor
+        )
+        for clave, valor in análisis.items()
+        if clave != 'ejecucion_detectores'
+    }
+
+
+def proyectar(respuesta: Dict, rutas: List[str]) -> Dict:
+    """Subconjunto de la respuesta con las rutas pedidas (las inexistentes se ignoran)."""
+    resultado: Dict = {}
+    for ruta in rutas:
+        partes = ruta.split('.')
+        valor = respuesta
+        for parte in partes:
+            if not isinstance(valor, dict) or parte not in valor:
+                break
+            valor = valor[parte]
+        else:
+            destino = resultado
+            for parte in partes[:-1]:
+                destino = destino.setdefault(parte, {})
+            destino[partes[-1]] = valor
+    return resultado
+
+
+def proyectar_respuesta(
+    respuesta: Dict,
+    rutas: Optional[List[str]],
+    compacto: bool
+) -> Dict:
+    """
+    Aplica la proyección pedida sin modificar la respuesta original
+    (puede ser un objeto compartido de la caché).
+    """
+    if compacto:
+        respuesta = {
+            clave: compactar_análisis(valor) if clave == 'análisis' else valor
+            for clave, valor in respuesta.items()
+            if clave not in SECCIONES_NO_COMPACTAS
+        }
+        if isinstance(respuesta.get('metadatos'), dict):
+            respuesta['metadatos'] = {
+                clave: valor for clave, valor in respuesta['metadatos'].items()
+                if clave != 'detectores'
+            }
+    if rutas:
+        respuesta = proyectar(respuesta, rutas)
+    return respuesta
+
+
 # ============================================================
 # ENDPOINTS DE AUTENTICACIÓN
 # ============================================================
@@ -200,8 +372,23 @@ def register():
 def analyze():
     """
     Analizar documento
+    
+    Con Content-Type text/plain el cuerpo es el documento mismo y se
+    procesa en streaming; los demás parámetros van en la query string.
+    Con `linaje` (solo cuerpo JSON) el envío se trata como una nueva
+    versión del mismo documento y solo se escanean los párrafos cambiados.
     ---
     parameters:
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: rutas a devolver separadas por comas (p. ej. resultados,análisis.score_general)
+      - name: compact
+        in: query
+        type: string
+        required: false
+        description: 1 para devolver solo puntajes y hallazgos por detector
       - name: body
         in: body
         required: true
@@ -209,6 +396,17 @@ def analyze():
           properties:
             contenido:
               type: string
+            linaje:
+              type: string
+            detectores:
+              type: array
+              description: detectores a ejecutar (por defecto, todos)
+            perfil:
+              type: string
+              description: triaje o completo
+            institucion:
+              type: string
+              description: paquete de reglas de la institución (por defecto, el base)
             tipo_documento:
               type: string
             rol:
@@ -221,30 +419,94 @@ def analyze():
       200:
         description: Análisis completo con metadatos
     """
-    data = request.json
-    contenido = data.get('contenido')
+    start_time = time.time()
+    
+    if es_cuerpo_streaming():
+        data = request.args
+        hasher = hashlib.sha256()
+        contenido = leer_fragmentos(request.stream, hasher)
+    else:
+        data = request.json
+        contenido = data.get('contenido')
+        hasher = None
+    
     tipo_documento = data.get('tipo_documento', 'general')
     rol = data.get('rol', 'Estudiante')
-    temperatura = data.get('temperatura', 0.7)
-    prompts_usados = data.get('prompts', [])
-    
-    start_time = time.time()
+    linaje = data.get('linaje') if hasher is None else None
+    prompts_usados = data.get('prompts', []) if hasher is None else data.getlist('prompts')
     
     if not contenido:
         return jsonify({'error': 'Contenido faltante'}), 400
     
     try:
-        # Análisis completo con metadatos
-        analisis = AnálisisConMetadatos.crear_análisis_completo(
-            contenido={'contenido': contenido, 'tipo_documento': tipo_documento},
-            usuario=request.user_id,
-            version_modelo='2.2',
-            temperatura=temperatura,
-            prompts_usados=prompts_usados
+        temperatura = float(data.get('temperatura', 0.7))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'temperatura debe ser un número'}), 400
+    if not math.isfinite(temperatura):
+        return jsonify({'error': 'temperatura debe ser un número finito'}), 400
+    
+    try:
+        detectores, perfil, seleccionados = selección_detectores(data)
+        reglas = paquetes_reglas.obtener(data.get('institucion'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Versión activa del modelo (también forma parte de la clave de caché)
+    versión_modelo = model_registry.active().label
+    
+    try:
+        if hasher is None:
+            documento = {'contenido': contenido, 'tipo_documento': tipo_documento}
+            doc_hash = hashlib.sha256(contenido.encode()).hexdigest()
+        else:
+            documento = AnálisisIntegridad.preprocesar_por_ventanas(
+                contenido, {'tipo_documento': tipo_documento}, reglas=reglas
+            )
+            if not documento.longitud:
+                return jsonify({'error': 'Contenido faltante'}), 400
+            doc_hash = hasher.hexdigest()
+        
+        # Un documento ya analizado por el mismo usuario con los mismos
+        # parámetros y la misma versión de las reglas no se reanaliza
+        clave_cache = cache_resultados.clave(
+            doc_hash, rol, tipo_documento, versión_modelo, reglas.versión, linaje, seleccionados,
+            usuario=request.user_id
         )
+        en_cache = cache_resultados.obtener(clave_cache)
         
-        # Guardar en BD
-        doc_hash = hashlib.sha256(contenido.encode()).hexdigest()
+        if en_cache is None:
+            if linaje:
+                documento = AnálisisIntegridad.preprocesar_revisión(
+                    documento, linaje, reglas, usuario=request.user_id
+                )
+            
+            # Análisis completo con metadatos
+            analisis = AnálisisConMetadatos.crear_análisis_completo(
+                contenido=documento,
+                usuario=request.user_id,
+                version_modelo=versión_modelo,
+                temperatura=temperatura,
+                prompts_usados=prompts_usados,
+                detectores=detectores,
+                perfil=perfil,
+                reglas=reglas
+            )
+            if not análisis_truncado(analisis):
+                cache_resultados.guardar(clave_cache, analisis)
+            analisis = dict(analisis, metadatos=dict(analisis['metadatos'], cache=False))
+        else:
+            # El envío se archiva igual para compararlo con los futuros
+            AnálisisIntegridad.archivar_envío(
+                documento, request.user_id, detectores=detectores, perfil=perfil
+            )
+            analisis = dict(en_cache, metadatos=dict(
+                en_cache['metadatos'],
+                fecha=datetime.now().isoformat(),
+                usuario=request.user_id,
+                temperatura=temperatura,
+                prompts_usados=prompts_usados,
+                cache=True
+            ))
         
         # Registrar en auditoría
         duracion = int((time.time() - start_time) * 1000)
@@ -252,7 +514,7 @@ def analyze():
             usuario=request.user_id,
             tipo_documento=tipo_documento,
             rol_autor=rol,
-            version_modelo='2.2',
+            version_modelo=versión_modelo,
             temperatura=temperatura,
             score_general=analisis['análisis']['score_general'],
             nivel_riesgo=analisis['análisis']['nivel_riesgo'],
@@ -269,7 +531,7 @@ def analyze():
             duracion_ms=duracion
         )
         
-        return jsonify(analisis), 200
+        return jsonify(proyectar_respuesta(analisis, *proyección_solicitada())), 200
     
     except Exception as e:
         auditoria.crear_alerta(
@@ -288,8 +550,26 @@ def reporte_integridad():
     Análisis avanzado de integridad científica
     Detecta: plagio conceptual, desviaciones metodológicas, 
     mala conducta científica, fabricación de datos, falacias
+    
+    Con Content-Type text/plain el cuerpo es el documento mismo y se
+    procesa en streaming; el rol va en la query string. Con `linaje`
+    (solo cuerpo JSON) solo se escanean los párrafos cambiados.
+    
+    Los hallazgos llevan solo la posición de su evidencia; las oraciones
+    resaltadas se piden aparte en `metadatos.explicacion` (no disponible
+    en modo streaming, que no conserva el texto).
     ---
     parameters:
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: rutas a devolver separadas por comas (p. ej. resultados,análisis.score_general)
+      - name: compact
+        in: query
+        type: string
+        required: false
+        description: 1 para devolver solo puntajes y hallazgos por detector
       - name: body
         in: body
         required: true
@@ -297,35 +577,102 @@ def reporte_integridad():
           properties:
             contenido:
               type: string
+            linaje:
+              type: string
+            detectores:
+              type: array
+              description: detectores a ejecutar (por defecto, todos)
+            perfil:
+              type: string
+              description: triaje o completo
+            institucion:
+              type: string
+              description: paquete de reglas de la institución (por defecto, el base)
             rol:
               type: string
     responses:
       200:
         description: Reporte completo de integridad
     """
-    data = request.json
-    contenido = data.get('contenido')
+    if es_cuerpo_streaming():
+        data = request.args
+        hasher = hashlib.sha256()
+        contenido = leer_fragmentos(request.stream, hasher)
+    else:
+        data = request.json
+        contenido = data.get('contenido')
+        hasher = None
+    
     rol = data.get('rol', 'Investigador')
+    linaje = data.get('linaje') if hasher is None else None
     
     if not contenido:
         return jsonify({'error': 'Contenido faltante'}), 400
     
+    try:
+        detectores, perfil, seleccionados = selección_detectores(data)
+        reglas = paquetes_reglas.obtener(data.get('institucion'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    versión_modelo = f"{model_registry.active().label}-integrity"
     start_time = time.time()
     
     try:
-        documento = {
-            'contenido': contenido,
+        metadatos_documento = {
             'tipo_documento': 'investigación',
             'rol': rol
         }
         
-        # Análisis de integridad completo
-        análisis = AnálisisIntegridad.analizar_integridad_completa(documento, rol)
+        if hasher is None:
+            documento = dict(metadatos_documento, contenido=contenido)
+            doc_hash = hashlib.sha256(contenido.encode()).hexdigest()
+        else:
+            documento = AnálisisIntegridad.preprocesar_por_ventanas(
+                contenido, metadatos_documento, reglas=reglas
+            )
+            if not documento.longitud:
+                return jsonify({'error': 'Contenido faltante'}), 400
+            doc_hash = hasher.hexdigest()
+        
+        # Un documento ya analizado por el mismo usuario con los mismos
+        # parámetros y la misma versión de las reglas no se reanaliza
+        clave_cache = cache_resultados.clave(
+            doc_hash, rol, 'investigación', versión_modelo, reglas.versión, linaje, seleccionados,
+            usuario=request.user_id
+        )
+        análisis = cache_resultados.obtener(clave_cache)
+        desde_cache = análisis is not None
+        
+        if not desde_cache:
+            if linaje:
+                documento = AnálisisIntegridad.preprocesar_revisión(
+                    documento, linaje, reglas, usuario=request.user_id
+                )
+            
+            # Análisis de integridad completo
+            análisis = AnálisisIntegridad.analizar_integridad_completa(
+                documento, rol, usuario=request.user_id,
+                detectores=detectores, perfil=perfil, reglas=reglas
+            )
+            if not análisis_truncado(análisis):
+                cache_resultados.guardar(clave_cache, análisis)
+        else:
+            # El envío se archiva igual para compararlo con los futuros
+            AnálisisIntegridad.archivar_envío(
+                documento, request.user_id, detectores=detectores, perfil=perfil
+            )
+        
+        # Texto para la explicación bajo demanda (el streaming no lo conserva;
+        # la explicación lee el análisis de la caché)
+        explicación = None
+        if hasher is None and (desde_cache or not análisis_truncado(análisis)):
+            textos_reporte.guardar(clave_cache, contenido, data.get('institucion'), request.user_id)
+            explicación = f'/api/reporte-integridad/{clave_cache}/explicacion'
         
         duracion = int((time.time() - start_time) * 1000)
         
         # Registrar en auditoría
-        doc_hash = hashlib.sha256(contenido.encode()).hexdigest()
         
         if análisis['nivel_riesgo'] in ['CRÍTICO', 'ALTO']:
             auditoria.crear_alerta(
@@ -339,7 +686,7 @@ def reporte_integridad():
             usuario=request.user_id,
             tipo_documento='investigación',
             rol_autor=rol,
-            version_modelo='2.2-integrity',
+            version_modelo=versión_modelo,
             temperatura=0.8,
             score_general=análisis['score_general'],
             nivel_riesgo=análisis['nivel_riesgo'],
@@ -355,21 +702,26 @@ def reporte_integridad():
             duracion_ms=duracion
         )
         
-        return jsonify({
+        return jsonify(proyectar_respuesta({
             'metadatos': {
                 'fecha': datetime.now().isoformat(),
                 'usuario': request.user_id,
-                'version_modelo': '2.2-integrity',
-                'duracion_ms': duracion
+                'version_modelo': versión_modelo,
+                'duracion_ms': duracion,
+                'detectores': análisis['ejecucion_detectores'],
+                'cache': desde_cache,
+                'reporte_id': clave_cache,
+                'explicacion': explicación
             },
             'análisis': análisis,
             'hallazgos_detallados': {
-                'plagio_conceptual': análisis['plagio_conceptual'],
-                'desviaciones_metodologicas': análisis['desviaciones_metodologicas'],
-                'mala_conducta': análisis['mala_conducta'],
-                'falacias': análisis['falacias']
+                'plagio_conceptual': análisis.get('plagio_conceptual'),
+                'desviaciones_metodologicas': análisis.get('desviaciones_metodologicas'),
+                'mala_conducta': análisis.get('mala_conducta'),
+                'falacias': análisis.get('falacias'),
+                'solapamiento_pasajes': análisis.get('solapamiento_pasajes')
             }
-        }), 200
+        }, *proyección_solicitada())), 200
     
     except Exception as e:
         auditoria.crear_alerta(
@@ -381,13 +733,206 @@ def reporte_integridad():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/reporte-integridad/<reporte_id>/explicacion', methods=['GET'])
+@token_required
+def explicacion_reporte(reporte_id):
+    """
+    Evidencia de los hallazgos de un reporte, resaltada por oración
+    ---
+    parameters:
+      - name: reporte_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Por detector, oraciones con la evidencia resaltada y tabla de reglas
+      403:
+        description: El reporte pertenece a otro usuario
+      404:
+        description: Reporte o texto ya no disponibles (volver a enviar el documento)
+    """
+    texto = textos_reporte.obtener(reporte_id)
+    if texto is None:
+        return jsonify({'error': 'Reporte no disponible; vuelva a enviar el documento'}), 404
+    
+    contenido, institución, dueño = texto
+    if dueño != request.user_id and request.user_id != 'admin':
+        auditoria.crear_alerta(
+            "MEDIO",
+            "acceso_no_autorizado",
+            f"Intento de acceso a la explicación del reporte {reporte_id}",
+            request.user_id
+        )
+        return jsonify({'error': 'No autorizado'}), 403
+    
+    análisis = cache_resultados.obtener(reporte_id)
+    if análisis is None:
+        return jsonify({'error': 'Reporte no disponible; vuelva a enviar el documento'}), 404
+    
+    try:
+        reglas = paquetes_reglas.obtener(institución)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'reporte_id': reporte_id,
+        **explicar(análisis, contenido, reglas)
+    }), 200
+
+
+@app.route('/api/similares', methods=['POST'])
+@token_required
+def similares():
+    """
+    Casos del archivo más similares a uno o varios textos (coseno TF-IDF)
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          properties:
+            contenido:
+              type: string
+            contenidos:
+              type: array
+              items:
+                type: string
+            k:
+              type: integer
+            umbral:
+              type: number
+    responses:
+      200:
+        description: Casos similares por texto consultado
+    """
+    data = request.json or {}
+    contenidos = data.get('contenidos') or ([data['contenido']] if data.get('contenido') else [])
+    
+    if not contenidos:
+        return jsonify({'error': 'Contenido faltante'}), 400
+    
+    start_time = time.time()
+    
+    try:
+        k = int(data.get('k', 10))
+        umbral = float(data.get('umbral', 0.0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'k y umbral deben ser numéricos'}), 400
+    if k < 1:
+        return jsonify({'error': 'k debe ser un entero positivo'}), 400
+    k = min(k, 100)
+    
+    try:
+        docs = [DocumentoPreprocesado({'contenido': c}) for c in contenidos]
+        resultados = índice_tfidf.consultar_lote(
+            [AnálisisIntegridad.frecuencias_palabras(doc) for doc in docs],
+            k=k,
+            excluir=[[doc.documento_hash] for doc in docs],
+            umbral=umbral,
+            usuario=request.user_id
+        )
+        
+        duracion = int((time.time() - start_time) * 1000)
+        
+        auditoria.registrar_actividad(
+            request.user_id, "búsqueda_similares", "/api/similares", "POST",
+            estado="exitosa",
+            resultado=f"{len(contenidos)} consultas",
+            duracion_ms=duracion
+        )
+        
+        return jsonify({
+            'consultas': [
+                {'documento_hash': doc.documento_hash, 'similares': similares_doc}
+                for doc, similares_doc in zip(docs, resultados)
+            ],
+            'duracion_ms': duracion
+        }), 200
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/figuras', methods=['POST'])
+@token_required
+def figuras():
+    """
+    Figuras de un PDF repetidas en el documento o reutilizadas de envíos previos
+    ---
+    consumes:
+      - application/pdf
+      - multipart/form-data
+    parameters:
+      - name: archivo
+        in: formData
+        type: file
+        required: false
+      - name: archivar
+        in: query
+        type: boolean
+        required: false
+    responses:
+      200:
+        description: Figuras analizadas y coincidencias por hash perceptual
+      400:
+        description: PDF faltante o ilegible
+      503:
+        description: Extracción de imágenes no disponible (PyPDF2 / Pillow)
+    """
+    if not AnálisisFiguras.disponible():
+        return jsonify({'error': 'Extracción de imágenes no disponible (PyPDF2 / Pillow)'}), 503
+    
+    archivo = request.files.get('archivo')
+    datos = archivo.read() if archivo is not None else request.get_data()
+    if not datos:
+        return jsonify({'error': 'PDF faltante'}), 400
+    
+    start_time = time.time()
+    
+    try:
+        resultado = AnálisisFiguras.analizar_pdf(
+            datos,
+            usuario=request.user_id,
+            archivar=request.args.get('archivar', '1') not in ('0', 'false')
+        )
+    except Exception as e:
+        return jsonify({'error': f'PDF ilegible: {e}'}), 400
+    
+    duracion = int((time.time() - start_time) * 1000)
+    
+    auditoria.registrar_actividad(
+        request.user_id, "análisis_figuras", "/api/figuras", "POST",
+        estado="exitosa",
+        resultado=f"{resultado['figuras']} figuras, sospechosas={resultado['imagenes_sospechosas']}",
+        duracion_ms=duracion
+    )
+    
+    return jsonify({**resultado, 'duracion_ms': duracion}), 200
+
+
 @app.route('/api/batch/analyze', methods=['POST'])
 @token_required
 def batch_analyze():
     """
     Analizar múltiples documentos en lote
+    
+    Con `modo: "cohorte"` los documentos son los trabajos de un curso: en
+    lugar de analizarlos uno por uno se buscan grupos que comparten
+    contenido (LSH + verificación exacta, sin comparar todos los pares).
     ---
     parameters:
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: rutas a devolver separadas por comas (p. ej. resultados,análisis.score_general)
+      - name: compact
+        in: query
+        type: string
+        required: false
+        description: 1 para devolver solo puntajes y hallazgos por detector
       - name: body
         in: body
         required: true
@@ -399,13 +944,36 @@ def batch_analyze():
                 properties:
                   contenido:
                     type: string
+                  id:
+                    type: string
+                    description: identificador del trabajo (modo cohorte)
+                  usuario:
+                    type: string
                   tipo_documento:
                     type: string
                   rol:
                     type: string
+            modo:
+              type: string
+              description: individual (por defecto) o cohorte
+            plantilla:
+              type: string
+              description: texto común entregado a la cohorte (se ignora al comparar)
+            umbral:
+              type: number
+              description: Jaccard mínimo para confirmar un par (modo cohorte)
+            detectores:
+              type: array
+              description: detectores a ejecutar en cada documento
+            perfil:
+              type: string
+              description: por defecto, completo (triaje omite los detectores de costo alto)
+            institucion:
+              type: string
+              description: paquete de reglas de la institución
     responses:
       200:
-        description: Análisis de todos los documentos
+        description: Análisis de todos los documentos; los metadatos indican el perfil efectivo y los detectores omitidos
     """
     data = request.json
     documentos = data.get('documentos', [])
@@ -413,8 +981,19 @@ def batch_analyze():
     if not documentos:
         return jsonify({'error': 'No hay documentos para analizar'}), 400
     
+    if data.get('modo') == 'cohorte':
+        return analizar_cohorte(data, documentos)
+    
+    try:
+        detectores, perfil, seleccionados = selección_detectores(data, 'completo')
+        reglas = paquetes_reglas.obtener(data.get('institucion'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rutas, compacto = proyección_solicitada()
     start_time = time.time()
     resultados = []
+    versión_modelo = model_registry.active().label
     
     try:
         for i, doc in enumerate(documentos):
@@ -432,17 +1011,20 @@ def batch_analyze():
             análisis = AnálisisConMetadatos.crear_análisis_completo(
                 contenido={'contenido': contenido, 'tipo_documento': tipo_documento},
                 usuario=request.user_id,
-                version_modelo='2.2',
+                version_modelo=versión_modelo,
                 temperatura=0.7,
-                prompts_usados=[]
+                prompts_usados=[],
+                detectores=detectores,
+                perfil=perfil,
+                reglas=reglas
             )
             
-            resultados.append({
+            resultados.append(proyectar_respuesta({
                 'índice': i,
                 'análisis': análisis['análisis'],
                 'score_general': análisis['resultados']['score_general'],
                 'nivel_riesgo': análisis['resultados']['nivel_riesgo']
-            })
+            }, rutas, compacto))
         
         duracion = int((time.time() - start_time) * 1000)
         
@@ -459,7 +1041,12 @@ def batch_analyze():
                 'fecha': datetime.now().isoformat(),
                 'usuario': request.user_id,
                 'documentos_procesados': len(documentos),
-                'duracion_ms': duracion
+                'duracion_ms': duracion,
+                'perfil': perfil,
+                'detectores_omitidos': [
+                    nombre for nombre in registro_detectores.nombres
+                    if nombre not in seleccionados
+                ]
             },
             'resultados': resultados
         }), 200
@@ -468,6 +1055,53 @@ def batch_analyze():
         return jsonify({'error': str(e)}), 500
 
 
+def analizar_cohorte(data: Dict, documentos: List[Dict]):
+    """Modo cohorte de /api/batch/analyze: grupos de trabajos con contenido compartido."""
+    if len(documentos) > MÁXIMO_DOCUMENTOS_COHORTE:
+        return jsonify({
+            'error': f'Máximo {MÁXIMO_DOCUMENTOS_COHORTE} documentos por cohorte'
+        }), 400
+    try:
+        umbral = float(data.get('umbral', UMBRAL_JACCARD))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Umbral inválido'}), 400
+    
+    start_time = time.time()
+    
+    try:
+        cohorte = DetecciónColusión.analizar_cohorte(
+            documentos,
+            plantilla=data.get('plantilla'),
+            umbral=umbral
+        )
+        duracion = int((time.time() - start_time) * 1000)
+        
+        auditoria.registrar_actividad(
+            request.user_id, "análisis_cohorte", "/api/batch/analyze", "POST",
+            estado="exitosa",
+            detalles={
+                'documentos_procesados': len(documentos),
+                'grupos': len(cohorte['grupos'])
+            },
+            resultado=f"{len(cohorte['grupos'])} grupos con contenido compartido",
+            duracion_ms=duracion
+        )
+        
+        return jsonify({
+            'metadatos': {
+                'fecha': datetime.now().isoformat(),
+                'usuario': request.user_id,
+                'modo': 'cohorte',
+                'documentos_procesados': len(documentos),
+                'duracion_ms': duracion
+            },
+            'cohorte': cohorte
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ============================================================
 # ENDPOINTS DE AUDITORÍA Y LOG
 # ============================================================
@@ -642,6 +1276,126 @@ def auditoría_alertas():
 # ENDPOINTS DE INFORMACIÓN Y DOCUMENTACIÓN
 # ============================================================
 
+@app.route('/api/revisiones/<linaje>', methods=['GET'])
+@token_required
+def revisiones(linaje):
+    """
+    Versiones analizadas de un documento
+    ---
+    parameters:
+      - name: linaje
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Versiones con sus párrafos reutilizados
+      404:
+        description: El usuario no tiene un linaje con ese identificador
+    """
+    versiones = historial_revisiones.versiones(linaje, request.user_id)
+    if not versiones:
+        return jsonify({'error': 'Linaje no encontrado'}), 404
+    
+    return jsonify({
+        'linaje': linaje,
+        'versiones': versiones
+    }), 200
+
+
+@app.route('/api/cache/estadisticas', methods=['GET'])
+@token_required
+def estadisticas_cache():
+    """
+    Aciertos, fallos y ocupación de la caché de resultados
+    ---
+    responses:
+      200:
+        description: Contadores del proceso y tamaño de ambos niveles
+    """
+    return jsonify(cache_resultados.estadísticas()), 200
+
+
+@app.route('/api/detectores', methods=['GET'])
+@token_required
+def listar_detectores():
+    """
+    Detectores registrados, perfiles y duración de cada uno
+    ---
+    responses:
+      200:
+        description: Declaraciones, perfiles e histogramas de duración por detector
+    """
+    return jsonify({
+        **registro_detectores.describir(),
+        'histogramas': registro_detectores.histogramas()
+    }), 200
+
+
+@app.route('/api/reglas', methods=['GET'])
+@token_required
+def reglas_vigentes():
+    """
+    Versiones de los paquetes de reglas cargados
+    ---
+    parameters:
+      - name: institucion
+        in: query
+        type: string
+        required: false
+    responses:
+      200:
+        description: Versión base y paquete vigente de cada institución
+      400:
+        description: Institución inválida
+    """
+    institución = request.args.get('institucion')
+    if institución:
+        try:
+            paquetes_reglas.obtener(institución)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(paquetes_reglas.describir()), 200
+
+
+@app.route('/api/catalogo-patrones', methods=['GET'])
+@token_required
+def catalogo_patrones():
+    """
+    Vocabularios, patrones y tablas de reglas de una institución
+    
+    Contenido estático por versión del paquete de reglas: se sirve con
+    ETag para que los clientes lo guarden y lo revaliden (304).
+    ---
+    parameters:
+      - name: institucion
+        in: query
+        type: string
+        required: false
+    responses:
+      200:
+        description: Catálogo del paquete de reglas vigente
+      304:
+        description: El catálogo no cambió desde el ETag indicado
+      400:
+        description: Institución inválida
+    """
+    try:
+        reglas = paquetes_reglas.obtener(request.args.get('institucion'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    respuesta = jsonify({
+        'version': reglas.versión,
+        'palabras_clave': reglas.palabras_clave,
+        'patrones_mala_conducta': reglas.patrones_mala_conducta,
+        'tablas': reglas.tablas
+    })
+    respuesta.set_etag(reglas.versión)
+    respuesta.headers['Cache-Control'] = 'private, max-age=60'
+    return respuesta.make_conditional(request)
+
+
 @app.route('/api/info', methods=['GET'])
 def info():
     """
@@ -661,9 +1415,19 @@ def info():
             'Análisis de falacias argumentativas',
             'Auditoría completa de actividades',
             'Autenticación JWT',
-            'Procesamiento en lote'
+            'Procesamiento en lote',
+            'Búsqueda de casos similares (TF-IDF)',
+            'Caché de resultados por contenido',
+            'Reanálisis incremental de revisiones por párrafo',
+            'Selección de detectores por perfil (triaje, completo)',
+            'Paquetes de reglas por institución con recarga en caliente',
+            'Explicación de hallazgos por oración bajo demanda',
+            'Respuestas compactas y proyección de campos (?compact=1, ?fields=)',
+            'Detección de colusión en cohortes completas (LSH)',
+            'Figuras duplicadas o reutilizadas en PDF (hash perceptual)',
+            'Perplejidad local (n-gramas) como filtro previo a la consulta al LLM'
         ],
-        'endpoints': 15
+        'endpoints': 23
     }), 200
 
 
@@ -9,6 +9,9 @@ from fpdf import FPDF
 from openai import OpenAI
 import requests
 
+from indice_figuras import AnálisisFiguras
+from modelo_ngramas import modelo_ngramas
+
 # ============================================================
 # CONFIGURACIÓN OPENAI
 # ============================================================
@@ -400,6 +403,28 @@ Devuelve EXCLUSIVAMENTE un JSON válido con esta estructura:
     return data
 
 
+def local_ngram_result(uso_ia: dict) -> dict:
+    """Resultado sin consultar al LLM cuando el filtro local no lo requiere."""
+    return {
+        "sentiment_label": "no evaluado",
+        "sentiment_score": 0,
+        "overall_risk_level": "bajo",
+        "overall_risk_score": 0,
+        "gpt_red_flags": [],
+        "mitigation_actions": [],
+        "kpis": [],
+        "insights": [
+            f"Perplejidad local {uso_ia['perplejidad']:.1f}, "
+            f"explosividad {uso_ia['explosividad']:.3f} "
+            f"({uso_ia['palabras']} palabras)."
+        ],
+        "short_narrative": (
+            "El modelo local de n-gramas no encontró señales de texto generado por IA "
+            f"(puntaje {uso_ia['score']}/100), por lo que no se consultó al LLM."
+        ),
+    }
+
+
 # ============================================================
 # CONFIG GENERAL DE STREAMLIT
 # ============================================================
@@ -523,6 +548,11 @@ with tabs[0]:
             ),
         }
 
+        forzar_llm = st.checkbox(
+            "Consultar siempre al LLM (aunque el filtro local no detecte señales de IA)",
+            value=False,
+        )
+
         submitted = st.form_submit_button("🔎 Analizar caso con IA")
 
     if submitted:
@@ -532,12 +562,28 @@ with tabs[0]:
             )
         else:
             with st.spinner("Analizando caso con reglas + IA, por favor espera..."):
+                # Figuras del PDF: repetidas o reutilizadas de envíos previos
+                figuras = None
+                if uploaded is not None and uploaded.name.lower().endswith(".pdf"):
+                    try:
+                        figuras = AnálisisFiguras.analizar_pdf(uploaded.getvalue())
+                    except Exception:
+                        figuras = None
+                    if figuras:
+                        evidencias["imagenes_sospechosas"] = max(
+                            evidencias["imagenes_sospechosas"], figuras["imagenes_sospechosas"]
+                        )
+
                 # Reglas (matriz de riesgo)
                 risk_df = build_risk_matrix(evidencias)
                 base_score = risk_score_from_matrix(risk_df)
 
-                # IA (OpenAI)
-                gpt_result = call_gpt_analysis(texto_final, rol, tipo_producto, evidencias)
+                # Filtro local (n-gramas): el LLM solo se consulta si hace falta
+                uso_ia = modelo_ngramas.evaluar_texto(texto_final)
+                if uso_ia["requiere_llm"] or forzar_llm:
+                    gpt_result = call_gpt_analysis(texto_final, rol, tipo_producto, evidencias)
+                else:
+                    gpt_result = local_ngram_result(uso_ia)
 
                 overall_score = max(base_score, gpt_result.get("overall_risk_score", 0))
                 level = overall_level(overall_score)
@@ -583,10 +629,35 @@ with tabs[0]:
             st.success(f"Análisis completado. Nivel de riesgo global: **{level}**.")
 
             # ----- KPIs rápidos -----
-            col_a, col_b, col_c = st.columns(3)
+            col_a, col_b, col_c, col_d = st.columns(4)
             col_a.metric("Riesgo global (0–100)", overall_score)
             col_b.metric("Sentimiento (IA)", gpt_result.get("sentiment_label", "N/A"))
             col_c.metric("Evidencias marcadas", sum(evidencias.values()))
+            col_d.metric(
+                "Señal de IA (modelo local)",
+                uso_ia["score"] if uso_ia["disponible"] else "N/A",
+            )
+            for h in uso_ia["hallazgos"]:
+                st.caption(h)
+
+            # ----- Figuras del PDF -----
+            if figuras and figuras["disponible"] and figuras["figuras"]:
+                st.markdown("### Figuras del documento")
+                if figuras["hallazgos"]:
+                    for h in figuras["hallazgos"]:
+                        st.warning(h)
+                    for r in figuras["reutilizadas"]:
+                        st.markdown(
+                            f"- Figura de la página {r['pagina']}: coincide con "
+                            f"{len(r['coincidencias'])} envío(s) previo(s)"
+                            + (" (en espejo)" if r["transformacion"] == "espejo" else "")
+                        )
+                    for r in figuras["repetidas"]:
+                        st.markdown(
+                            f"- Figura de la página {r['pagina']} repetida en la página {r['pagina_repetida']}"
+                        )
+                else:
+                    st.info(f"{figuras['figuras']} figura(s) analizadas sin coincidencias.")
 
             # ----- Matriz de riesgo -----
             st.markdown("### Matriz de riesgo por dimensión")
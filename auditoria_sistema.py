@@ -57,11 +57,44 @@ class SistemaAuditoria:
                 score_general REAL,
                 nivel_riesgo TEXT,
                 recomendaciones TEXT,
-                documento_hash TEXT UNIQUE,
+                documento_hash TEXT,
                 duracion_ms INTEGER
             )
         """)
         
+        # Un mismo documento puede analizarse varias veces: las bases creadas
+        # con documento_hash UNIQUE se migran a un índice no único
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'análisis_realizados'"
+        )
+        if "documento_hash TEXT UNIQUE" in cursor.fetchone()[0]:
+            cursor.execute("ALTER TABLE análisis_realizados RENAME TO análisis_realizados_anterior")
+            cursor.execute("""
+                CREATE TABLE análisis_realizados (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    usuario TEXT NOT NULL,
+                    tipo_documento TEXT,
+                    rol_autor TEXT,
+                    version_modelo TEXT,
+                    temperatura REAL,
+                    score_general REAL,
+                    nivel_riesgo TEXT,
+                    recomendaciones TEXT,
+                    documento_hash TEXT,
+                    duracion_ms INTEGER
+                )
+            """)
+            cursor.execute(
+                "INSERT INTO análisis_realizados SELECT * FROM análisis_realizados_anterior"
+            )
+            cursor.execute("DROP TABLE análisis_realizados_anterior")
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_análisis_documento_hash
+            ON análisis_realizados (documento_hash)
+        """)
+        
         # Tabla de cambios sensibles
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS cambios_sensibles (
@@ -148,6 +181,9 @@ class SistemaAuditoria:
         
         return analisis_id
     
+    # Alias con tilde, coherente con obtener_análisis_usuario
+    registrar_análisis = registrar_analisis
+    
     def registrar_actividad(
         self,
         usuario: str,
@@ -0,0 +1,247 @@
+"""
+Caché de Resultados de Análisis
+
+Caché en dos niveles direccionada por contenido: un LRU en memoria del
+proceso y una tabla SQLite compartida por todos los workers. La clave
+combina el hash del documento con los parámetros que cambian el
+resultado (rol, tipo de documento, versión del modelo y de las reglas,
+y el usuario: el estilo y los envíos excluidos dependen del autor).
+Ambos niveles desalojan por tamaño (bytes serializados) y se llevan
+contadores de aciertos y fallos.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class CacheResultados:
+    """LRU en memoria respaldado por SQLite."""
+
+    DB_PATH = Path(".centinela_data/cache_resultados.db")
+
+    # Límites de tamaño (bytes de JSON serializado)
+    MÁXIMO_BYTES_MEMORIA = 64 * 1024 * 1024
+    MÁXIMO_BYTES_DISCO = 512 * 1024 * 1024
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        máximo_bytes_memoria: Optional[int] = None,
+        máximo_bytes_disco: Optional[int] = None
+    ):
+        """Inicializa la caché"""
+        self.db_path = Path(db_path) if db_path else self.DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.máximo_bytes_memoria = máximo_bytes_memoria or self.MÁXIMO_BYTES_MEMORIA
+        self.máximo_bytes_disco = máximo_bytes_disco or self.MÁXIMO_BYTES_DISCO
+        self._crear_tablas()
+
+        self._lock = threading.Lock()
+        self._memoria: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes_memoria = 0
+        self._contadores = {
+            "aciertos_memoria": 0,
+            "aciertos_disco": 0,
+            "fallos": 0,
+            "escrituras": 0,
+            "desalojos_memoria": 0,
+            "desalojos_disco": 0,
+        }
+
+    def _crear_tablas(self):
+        """Crea la tabla de resultados si no existe"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                clave TEXT PRIMARY KEY,
+                valor BLOB NOT NULL,
+                tamaño INTEGER NOT NULL,
+                ultimo_acceso REAL NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_resultados_acceso ON resultados (ultimo_acceso)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def clave(
+        documento_hash: str,
+        rol: str,
+        tipo_documento: str,
+        version_modelo: str,
+        version_reglas: str,
+        linaje: Optional[str] = None,
+        detectores: Optional[Iterable[str]] = None,
+        usuario: Optional[str] = None
+    ) -> str:
+        """
+        Clave de caché de un análisis.
+
+        El linaje cambia los envíos excluidos de la comparación y la
+        selección de detectores cambia las secciones del resultado. El
+        usuario cambia el perfil de estilo comparado y qué envíos previos
+        cuentan como propios.
+        """
+        partes = (documento_hash, rol, tipo_documento, version_modelo, version_reglas)
+        partes += ("usuario=" + (usuario or ""),)
+        if linaje:
+            partes += ("linaje=" + linaje,)
+        if detectores is not None:
+            partes += ("detectores=" + ",".join(sorted(detectores)),)
+        return hashlib.sha256("\x1f".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        """
+        Busca un resultado, primero en memoria y luego en disco.
+
+        El objeto devuelto es compartido: no debe modificarse.
+
+        Returns:
+            resultado en caché o None
+        """
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                self._memoria.move_to_end(clave)
+                self._contadores["aciertos_memoria"] += 1
+                return entrada[0]
+
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT valor FROM resultados WHERE clave = ?", (clave,))
+            fila = cursor.fetchone()
+            if fila is not None:
+                cursor.execute(
+                    "UPDATE resultados SET ultimo_acceso = ? WHERE clave = ?",
+                    (time.time(), clave)
+                )
+                conn.commit()
+        finally:
+            conn.close()
+
+        if fila is None:
+            with self._lock:
+                self._contadores["fallos"] += 1
+            return None
+
+        serializado = zlib.decompress(fila[0])
+        valor = json.loads(serializado)
+        with self._lock:
+            self._contadores["aciertos_disco"] += 1
+            self._guardar_en_memoria(clave, valor, len(serializado))
+        return valor
+
+    def guardar(self, clave: str, valor: Any):
+        """Guarda un resultado en ambos niveles."""
+        serializado = json.dumps(valor, ensure_ascii=False).encode("utf-8")
+        comprimido = zlib.compress(serializado)
+
+        with self._lock:
+            self._contadores["escrituras"] += 1
+            self._guardar_en_memoria(clave, valor, len(serializado))
+
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO resultados (clave, valor, tamaño, ultimo_acceso)
+                VALUES (?, ?, ?, ?)
+            """, (clave, comprimido, len(comprimido), time.time()))
+
+            cursor.execute("SELECT COALESCE(SUM(tamaño), 0) FROM resultados")
+            exceso = cursor.fetchone()[0] - self.máximo_bytes_disco
+            if exceso > 0:
+                desalojados = self._desalojar_disco(cursor, exceso)
+                with self._lock:
+                    self._contadores["desalojos_disco"] += desalojados
+
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _guardar_en_memoria(self, clave: str, valor: Any, tamaño: int):
+        if tamaño > self.máximo_bytes_memoria:
+            return
+        anterior = self._memoria.pop(clave, None)
+        if anterior is not None:
+            self._bytes_memoria -= anterior[1]
+
+        self._memoria[clave] = (valor, tamaño)
+        self._bytes_memoria += tamaño
+
+        while self._bytes_memoria > self.máximo_bytes_memoria:
+            _, (_, tamaño_desalojado) = self._memoria.popitem(last=False)
+            self._bytes_memoria -= tamaño_desalojado
+            self._contadores["desalojos_memoria"] += 1
+
+    @staticmethod
+    def _desalojar_disco(cursor: sqlite3.Cursor, exceso: int) -> int:
+        """Borra las entradas menos usadas hasta liberar `exceso` bytes."""
+        cursor.execute("SELECT clave, tamaño FROM resultados ORDER BY ultimo_acceso")
+        claves = []
+        liberado = 0
+        for clave, tamaño in cursor:
+            if liberado >= exceso:
+                break
+            claves.append((clave,))
+            liberado += tamaño
+        cursor.executemany("DELETE FROM resultados WHERE clave = ?", claves)
+        return len(claves)
+
+    def invalidar(self):
+        """Vacía ambos niveles."""
+        with self._lock:
+            self._memoria.clear()
+            self._bytes_memoria = 0
+
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            conn.execute("DELETE FROM resultados")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def estadísticas(self) -> Dict:
+        """Contadores de este proceso y ocupación de ambos niveles."""
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(tamaño), 0) FROM resultados")
+            entradas_disco, bytes_disco = cursor.fetchone()
+        finally:
+            conn.close()
+
+        with self._lock:
+            contadores = dict(self._contadores)
+            entradas_memoria = len(self._memoria)
+            bytes_memoria = self._bytes_memoria
+
+        consultas = contadores["aciertos_memoria"] + contadores["aciertos_disco"] + contadores["fallos"]
+        return {
+            **contadores,
+            "tasa_aciertos": round(
+                (contadores["aciertos_memoria"] + contadores["aciertos_disco"]) / consultas, 4
+            ) if consultas else 0.0,
+            "entradas_memoria": entradas_memoria,
+            "bytes_memoria": bytes_memoria,
+            "entradas_disco": entradas_disco,
+            "bytes_disco": bytes_disco,
+        }
+
+
+# Instancia global de la caché
+cache_resultados = CacheResultados()
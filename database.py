@@ -102,6 +102,22 @@ class CentinelaDatabase:
             )
         """)
         
+        # Configuraciones del modelo mejorado, versionadas por nombre; como
+        # mucho una está activa (la usan todos los procesos)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS configuraciones_modelo (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                configuracion TEXT NOT NULL,
+                huella TEXT NOT NULL,
+                descripcion TEXT,
+                activa INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (nombre, version)
+            )
+        """)
+        
         conn.commit()
         conn.close()
     
@@ -198,6 +214,56 @@ class CentinelaDatabase:
         finally:
             conn.close()
     
+    def guardar_casos_lote(self, casos: List[Dict]) -> int:
+        """
+        Guarda muchos casos en una sola transacción.
+    
+        A diferencia de guardar_caso no registra red flags, recomendaciones
+        ni KPIs. Un caso_id existente se actualiza como en guardar_caso, de
+        modo que repetir un lote no duplica casos.
+    
+        Args:
+            casos: diccionarios con los mismos campos que en guardar_caso
+                (caso_id obligatorio)
+    
+        Returns:
+            número de casos escritos
+        """
+        conn = sqlite3.connect(str(self.db_file))
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO casos (
+                        caso_id, timestamp, rol, tipo_producto, riesgo_score,
+                        nivel_riesgo, confianza, sentimiento, num_evidencias,
+                        texto_length, json_data
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(caso_id) DO UPDATE SET
+                        timestamp = excluded.timestamp,
+                        riesgo_score = excluded.riesgo_score,
+                        nivel_riesgo = excluded.nivel_riesgo,
+                        confianza = excluded.confianza,
+                        json_data = excluded.json_data
+                """, [
+                    (
+                        caso_data["caso_id"],
+                        caso_data.get("timestamp", datetime.now().isoformat()),
+                        caso_data.get("rol"),
+                        caso_data.get("tipo_producto"),
+                        caso_data.get("riesgo_score", 0),
+                        caso_data.get("nivel_riesgo", "DESCONOCIDO"),
+                        caso_data.get("confianza", 0.0),
+                        caso_data.get("sentimiento"),
+                        caso_data.get("num_evidencias", 0),
+                        caso_data.get("texto_length", 0),
+                        json.dumps(caso_data, ensure_ascii=False),
+                    )
+                    for caso_data in casos
+                ])
+            return len(casos)
+        finally:
+            conn.close()
+    
     def obtener_caso(self, caso_id: str) -> Optional[Dict]:
         """Obtiene un caso específico de la base de datos."""
         conn = sqlite3.connect(str(self.db_file))
@@ -318,6 +384,141 @@ class CentinelaDatabase:
             "fecha_reporte": datetime.now().isoformat(),
         }
 
+    
+    def guardar_configuracion_modelo(
+        self,
+        nombre: str,
+        configuracion: Dict,
+        huella: str,
+        descripcion: Optional[str] = None
+    ) -> int:
+        """
+        Guarda una nueva versión de una configuración del modelo.
+        
+        Args:
+            nombre: nombre de la configuración
+            configuracion: pesos, factores y umbrales (serializables)
+            huella: hash del contenido
+            descripcion: motivo del cambio
+        
+        Returns:
+            número de versión asignado (1 para la primera)
+        """
+        conn = sqlite3.connect(str(self.db_file), isolation_level=None)
+        try:
+            # Reserva de escritura: dos procesos no obtienen la misma versión
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) + 1 FROM configuraciones_modelo WHERE nombre = ?",
+                (nombre,)
+            ).fetchone()[0]
+            conn.execute("""
+                INSERT INTO configuraciones_modelo (nombre, version, configuracion, huella, descripcion)
+                VALUES (?, ?, ?, ?, ?)
+            """, (nombre, version, json.dumps(configuracion, ensure_ascii=False), huella, descripcion))
+            conn.execute("COMMIT")
+            return version
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    def obtener_configuracion_modelo(self, nombre: str, version: Optional[int] = None) -> Optional[Dict]:
+        """Una versión de una configuración (la última si no se indica)."""
+        conn = sqlite3.connect(str(self.db_file))
+        conn.row_factory = sqlite3.Row
+        
+        query = "SELECT * FROM configuraciones_modelo WHERE nombre = ?"
+        params = [nombre]
+        if version is not None:
+            query += " AND version = ?"
+            params.append(version)
+        query += " ORDER BY version DESC LIMIT 1"
+        
+        row = conn.execute(query, params).fetchone()
+        conn.close()
+        return self._fila_configuracion(row) if row else None
+    
+    def configuracion_modelo_activa(self) -> Optional[Dict]:
+        """Configuración activa, o None si se usa la integrada en el código."""
+        conn = sqlite3.connect(str(self.db_file))
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM configuraciones_modelo WHERE activa = 1").fetchone()
+        conn.close()
+        return self._fila_configuracion(row) if row else None
+    
+    def activar_configuracion_modelo(self, nombre: Optional[str], version: Optional[int] = None) -> bool:
+        """
+        Activa una versión (y desactiva la anterior) en una sola transacción.
+        
+        Args:
+            nombre: configuración a activar; None vuelve a la integrada
+            version: versión a activar
+        
+        Returns:
+            False si la versión no existe (no se cambia nada)
+        """
+        conn = sqlite3.connect(str(self.db_file), isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE configuraciones_modelo SET activa = 0 WHERE activa = 1")
+            if nombre is not None:
+                cursor = conn.execute(
+                    "UPDATE configuraciones_modelo SET activa = 1 WHERE nombre = ? AND version = ?",
+                    (nombre, version)
+                )
+                if cursor.rowcount == 0:
+                    conn.execute("ROLLBACK")
+                    return False
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    def listar_configuraciones_modelo(self, nombre: Optional[str] = None) -> List[Dict]:
+        """Versiones guardadas (sin el contenido), de la más reciente a la más antigua."""
+        conn = sqlite3.connect(str(self.db_file))
+        cursor = conn.cursor()
+        
+        query = "SELECT nombre, version, huella, descripcion, activa, created_at FROM configuraciones_modelo"
+        params = []
+        if nombre:
+            query += " WHERE nombre = ?"
+            params.append(nombre)
+        query += " ORDER BY nombre, version DESC"
+        
+        cursor.execute(query, params)
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                "nombre": row[0],
+                "version": row[1],
+                "huella": row[2],
+                "descripcion": row[3],
+                "activa": bool(row[4]),
+                "created_at": row[5],
+            }
+            for row in results
+        ]
+    
+    @staticmethod
+    def _fila_configuracion(row: sqlite3.Row) -> Dict:
+        return {
+            "nombre": row["nombre"],
+            "version": row["version"],
+            "configuracion": json.loads(row["configuracion"]),
+            "huella": row["huella"],
+            "descripcion": row["descripcion"],
+            "activa": bool(row["activa"]),
+            "created_at": row["created_at"],
+        }
+
 
 # Instancia global
 db = CentinelaDatabase()
@@ -0,0 +1,273 @@
+"""
+Detección de Colusión en una Cohorte
+
+Compara todos los trabajos de un curso entre sí sin recorrer los n²
+pares: cada documento obtiene sus shingles y su firma MinHash, las bandas
+LSH proponen pares candidatos, y solo esos pares se verifican con la
+intersección exacta de shingles (en el pool de procesos). Los pares
+confirmados se agrupan en componentes conexas: grupos de estudiantes que
+comparten contenido.
+
+Los shingles presentes en gran parte de la cohorte (enunciado, plantilla
+o bibliografía común) y los de la plantilla entregada por el docente se
+descartan antes de firmar, para que no unan a toda la clase.
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from documento_preprocesado import DocumentoPreprocesado
+from indice_minhash import NUM_PERMUTACIONES, firma_shingles, hashes_shingles
+from planificador_detectores import planificador
+
+
+# Bandas LSH de la cohorte: 42 bandas x 3 filas (umbral ~0.28). Más
+# sensibles que las del índice de envíos previos, que prioriza precisión.
+FILAS_POR_BANDA = 3
+NUM_BANDAS = NUM_PERMUTACIONES // FILAS_POR_BANDA
+
+# Similitud estimada por las firmas por debajo de la cual un candidato
+# ni siquiera se verifica
+UMBRAL_CANDIDATO = 0.15
+
+# Un par se confirma con Jaccard exacto >= UMBRAL_JACCARD o si el
+# documento menor está contenido en el otro en >= UMBRAL_CONTENCIÓN
+UMBRAL_JACCARD = 0.3
+UMBRAL_CONTENCIÓN = 0.6
+
+# Shingles comunes: presentes en más de esta fracción de la cohorte (y en
+# al menos MÍNIMO_DOCUMENTOS_COMÚN documentos)
+FRACCIÓN_COMÚN = 0.5
+MÍNIMO_DOCUMENTOS_COMÚN = 5
+
+# Cubetas LSH más grandes se enlazan en estrella y no par a par
+MÁXIMA_CUBETA_COMPLETA = 50
+
+# Documentos por lote enviado a otro proceso y pares por lote de verificación
+DOCUMENTOS_POR_LOTE = 100
+PARES_POR_LOTE = 5000
+
+# Pares reportados como máximo por grupo
+MÁXIMO_PARES_GRUPO = 50
+
+
+def _shingles_lote(textos: List[str]) -> List[np.ndarray]:
+    """Shingles únicos de cada texto (se ejecuta en el pool de procesos)."""
+    return [
+        hashes_shingles(DocumentoPreprocesado({"contenido": texto}).palabras)
+        for texto in textos
+    ]
+
+
+def _firmas_lote(conjuntos: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+    """Firma MinHash de cada conjunto de shingles (en el pool de procesos)."""
+    return [firma_shingles(shingles) for shingles in conjuntos]
+
+
+def _verificar_lote(
+    pares: np.ndarray,
+    shingles: Dict[int, np.ndarray]
+) -> List[Tuple[int, int, int]]:
+    """Shingles compartidos por cada par (en el pool de procesos)."""
+    return [
+        (a, b, np.intersect1d(shingles[a], shingles[b], assume_unique=True).size)
+        for a, b in pares.tolist()
+    ]
+
+
+class DetecciónColusión:
+    """Grupos de trabajos con contenido compartido dentro de una cohorte."""
+
+    @staticmethod
+    def analizar_cohorte(
+        documentos: Sequence[Dict],
+        plantilla: Optional[str] = None,
+        umbral: float = UMBRAL_JACCARD,
+        paralelo: bool = True
+    ) -> Dict:
+        """
+        Detecta grupos de documentos que comparten contenido.
+
+        Args:
+            documentos: Dicts con "contenido" y, opcionalmente, "id" y "usuario"
+            plantilla: texto entregado a toda la cohorte (se ignora al comparar)
+            umbral: Jaccard exacto mínimo para confirmar un par
+            paralelo: usar el pool de procesos del planificador
+
+        Returns:
+            Dict con los grupos (componentes conexas), sus pares confirmados
+            y las cifras de cada etapa
+        """
+        tiempos = {}
+        inicio = time.perf_counter()
+        n = len(documentos)
+
+        def lotes(valores: list, tamaño: int) -> List[Tuple]:
+            return [(valores[i:i + tamaño],) for i in range(0, len(valores), tamaño)]
+
+        def aplanar(resultados: List[list]) -> list:
+            return [valor for lote in resultados for valor in lote]
+
+        shingles = aplanar(planificador.repartir(
+            _shingles_lote,
+            lotes([d.get("contenido") or "" for d in documentos], DOCUMENTOS_POR_LOTE),
+            paralelo
+        ))
+        tiempos["shingles"] = time.perf_counter() - inicio
+
+        # Contenido común a la cohorte y plantilla del docente
+        comunes = DetecciónColusión._shingles_comunes(shingles)
+        if plantilla:
+            comunes = np.union1d(comunes, _shingles_lote([plantilla])[0])
+        if comunes.size:
+            shingles = [s[~np.isin(s, comunes, assume_unique=True)] for s in shingles]
+
+        firmas = aplanar(planificador.repartir(_firmas_lote, lotes(shingles, DOCUMENTOS_POR_LOTE), paralelo))
+        tiempos["firmas"] = time.perf_counter() - inicio - sum(tiempos.values())
+
+        con_firma = np.array([i for i, f in enumerate(firmas) if f is not None], dtype=np.int64)
+        candidatos = DetecciónColusión._candidatos_lsh(
+            np.array([firmas[i] for i in con_firma], dtype=np.uint32).reshape(-1, NUM_PERMUTACIONES)
+        )
+        candidatos = con_firma[candidatos]
+        tiempos["candidatos"] = time.perf_counter() - inicio - sum(tiempos.values())
+
+        # Verificación exacta, repartida por lotes con solo los shingles necesarios
+        verificados = aplanar(planificador.repartir(
+            _verificar_lote,
+            [
+                (lote, {i: shingles[i] for i in np.unique(lote).tolist()})
+                for lote in (
+                    candidatos[i:i + PARES_POR_LOTE]
+                    for i in range(0, len(candidatos), PARES_POR_LOTE)
+                )
+            ],
+            paralelo
+        ))
+        pares = []
+        for a, b, compartidos in verificados:
+            tamaño_a, tamaño_b = shingles[a].size, shingles[b].size
+            jaccard = compartidos / (tamaño_a + tamaño_b - compartidos)
+            contención = compartidos / min(tamaño_a, tamaño_b)
+            if jaccard >= umbral or contención >= UMBRAL_CONTENCIÓN:
+                pares.append({
+                    "a": a,
+                    "b": b,
+                    "jaccard": round(jaccard, 3),
+                    "contención": round(contención, 3),
+                    "shingles_compartidos": compartidos,
+                })
+        tiempos["verificacion"] = time.perf_counter() - inicio - sum(tiempos.values())
+
+        grupos = DetecciónColusión._agrupar(pares, documentos)
+
+        return {
+            "documentos": n,
+            "sin_texto": [i for i in range(n) if firmas[i] is None],
+            "shingles_comunes": int(comunes.size),
+            "candidatos": int(len(candidatos)),
+            "pares_confirmados": len(pares),
+            "grupos": grupos,
+            "duracion_ms": {
+                etapa: round(segundos * 1000, 1) for etapa, segundos in tiempos.items()
+            },
+        }
+
+    @staticmethod
+    def _shingles_comunes(shingles: List[np.ndarray]) -> np.ndarray:
+        """Shingles presentes en una fracción grande de la cohorte."""
+        if not shingles:
+            return np.empty(0, dtype=np.uint64)
+        valores, documentos = np.unique(np.concatenate(shingles), return_counts=True)
+        mínimo = max(MÍNIMO_DOCUMENTOS_COMÚN, FRACCIÓN_COMÚN * len(shingles))
+        return valores[documentos > mínimo]
+
+    @staticmethod
+    def _candidatos_lsh(firmas: np.ndarray) -> np.ndarray:
+        """
+        Pares (i, j) con i < j que comparten alguna banda y cuya similitud
+        estimada alcanza UMBRAL_CANDIDATO.
+
+        Args:
+            firmas: matriz (n, NUM_PERMUTACIONES) de firmas
+
+        Returns:
+            matriz (m, 2) de índices de fila
+        """
+        n = len(firmas)
+        if n < 2:
+            return np.empty((0, 2), dtype=np.int64)
+
+        códigos = []
+        for banda in range(NUM_BANDAS):
+            filas = np.ascontiguousarray(
+                firmas[:, banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA]
+            )
+            _, cubeta = np.unique(
+                filas.view(f"V{filas.itemsize * FILAS_POR_BANDA}"), return_inverse=True
+            )
+            orden = np.argsort(cubeta.ravel(), kind="stable")
+            tamaños = np.bincount(cubeta.ravel())
+            límites = np.concatenate([[0], np.cumsum(tamaños)])
+            for c in np.flatnonzero(tamaños > 1).tolist():
+                miembros = orden[límites[c]:límites[c + 1]]
+                if len(miembros) <= MÁXIMA_CUBETA_COMPLETA:
+                    i, j = np.triu_indices(len(miembros), k=1)
+                    códigos.append(miembros[i] * n + miembros[j])
+                else:
+                    # Estrella: basta para unir la componente si el centro es similar
+                    códigos.append(miembros[0] * n + miembros[1:])
+
+        if not códigos:
+            return np.empty((0, 2), dtype=np.int64)
+
+        códigos = np.unique(np.concatenate(códigos))
+        pares = np.stack([códigos // n, códigos % n], axis=1)
+        estimada = (firmas[pares[:, 0]] == firmas[pares[:, 1]]).mean(axis=1)
+        return pares[estimada >= UMBRAL_CANDIDATO]
+
+    @staticmethod
+    def _agrupar(pares: List[Dict], documentos: Sequence[Dict]) -> List[Dict]:
+        """Componentes conexas de los pares confirmados, de mayor a menor."""
+        padre: Dict[int, int] = {}
+
+        def raíz(x: int) -> int:
+            padre.setdefault(x, x)
+            while padre[x] != x:
+                padre[x] = padre[padre[x]]
+                x = padre[x]
+            return x
+
+        for par in pares:
+            a, b = raíz(par["a"]), raíz(par["b"])
+            if a != b:
+                padre[max(a, b)] = min(a, b)
+
+        componentes: Dict[int, Dict] = {}
+        for par in sorted(pares, key=lambda p: p["jaccard"], reverse=True):
+            grupo = componentes.setdefault(raíz(par["a"]), {"miembros": set(), "pares": []})
+            grupo["miembros"].update((par["a"], par["b"]))
+            grupo["pares"].append(par)
+
+        grupos = []
+        for grupo in componentes.values():
+            miembros = sorted(grupo["miembros"])
+            grupos.append({
+                "tamaño": len(miembros),
+                "miembros": [
+                    {
+                        "índice": i,
+                        "id": documentos[i].get("id", i),
+                        "usuario": documentos[i].get("usuario"),
+                    }
+                    for i in miembros
+                ],
+                "similitud_máxima": grupo["pares"][0]["jaccard"],
+                "pares": grupo["pares"][:MÁXIMO_PARES_GRUPO],
+                "pares_truncados": len(grupo["pares"]) > MÁXIMO_PARES_GRUPO,
+            })
+
+        grupos.sort(key=lambda g: (g["tamaño"], g["similitud_máxima"]), reverse=True)
+        return grupos
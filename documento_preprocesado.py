@@ -0,0 +1,336 @@
+"""
+Preprocesamiento Compartido de Documentos
+
+Normaliza una única vez el contenido de un documento (Unicode, acentos,
+minúsculas), lo tokeniza y calcula sus oraciones y párrafos. Todos los
+detectores de integridad consumen el mismo objeto, de modo que agregar
+detectores no multiplica el costo de preprocesamiento.
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from escaneo_multipatron import tokenizar
+
+
+PATRÓN_ORACIÓN = re.compile(r"[^.!?\n]+(?:[.!?]+|$)", re.MULTILINE)
+PATRÓN_PÁRRAFO = re.compile(r"\S(?:.|\n(?![ \t]*\n))*", re.MULTILINE)
+
+
+class _TablaPliegue(dict):
+    """
+    Tabla para str.translate que pasa a minúsculas y elimina acentos.
+
+    Cada carácter se pliega a exactamente un carácter, por lo que las
+    posiciones del texto normalizado coinciden con las del original.
+    Las entradas se calculan la primera vez que aparece cada carácter.
+    """
+
+    def __missing__(self, código: int) -> str:
+        original = chr(código)
+        base = "".join(
+            c for c in unicodedata.normalize("NFD", original)
+            if not unicodedata.combining(c)
+        )
+        if len(base) != 1:
+            base = original
+
+        plegado = base.lower()
+        if len(plegado) != 1:
+            plegado = base
+
+        self[código] = plegado
+        return plegado
+
+
+_TABLA_PLIEGUE = _TablaPliegue()
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Normaliza texto para comparación: NFC, minúsculas y sin acentos.
+
+    Args:
+        texto: texto original
+
+    Returns:
+        texto normalizado con la misma longitud que su forma NFC
+    """
+    return unicodedata.normalize("NFC", texto).translate(_TABLA_PLIEGUE)
+
+
+def es_palabra(token: str) -> bool:
+    """Indica si un token es una palabra (y no un signo de puntuación)."""
+    return len(token) > 1 or token.isalnum() or token == "_"
+
+
+def _spans(patrón: re.Pattern, texto: str) -> List[Tuple[int, int]]:
+    """Spans de un patrón sin espacios en blanco en los extremos."""
+    spans = []
+    for m in patrón.finditer(texto):
+        inicio, fin = m.span()
+        while inicio < fin and texto[inicio].isspace():
+            inicio += 1
+        while fin > inicio and texto[fin - 1].isspace():
+            fin -= 1
+        if inicio < fin:
+            spans.append((inicio, fin))
+    return spans
+
+
+class DocumentoPreprocesado:
+    """
+    Documento normalizado una sola vez por solicitud.
+
+    Los artefactos (texto normalizado, tokens, oraciones, párrafos) se
+    calculan de forma perezosa y se conservan en caché. Las posiciones
+    de todos ellos se refieren a `contenido` (forma NFC del original).
+    """
+
+    def __init__(self, documento: Dict):
+        """
+        Args:
+            documento: Dict con contenido y metadatos
+        """
+        self.documento = documento
+        self.contenido = unicodedata.normalize("NFC", documento.get("contenido") or "")
+        self.tipo_documento = documento.get("tipo_documento")
+        self.rol = documento.get("rol")
+        self._artefactos: Dict[str, Any] = {}
+
+    @classmethod
+    def desde(cls, documento) -> "DocumentoPreprocesado":
+        """Devuelve el documento preprocesado, creándolo si hace falta."""
+        if isinstance(documento, cls):
+            return documento
+        return cls(documento)
+
+    def get(self, clave: str, defecto: Any = None) -> Any:
+        """Acceso a los metadatos originales del documento."""
+        return self.documento.get(clave, defecto)
+
+    @property
+    def longitud(self) -> int:
+        """Número de caracteres del contenido."""
+        return len(self.contenido)
+
+    @cached_property
+    def texto_normalizado(self) -> str:
+        """Contenido en minúsculas y sin acentos."""
+        return self.contenido.translate(_TABLA_PLIEGUE)
+
+    @cached_property
+    def _tokenización(self) -> Tuple[List[str], List[Tuple[int, int]]]:
+        return tokenizar(self.texto_normalizado)
+
+    @property
+    def tokens(self) -> List[str]:
+        """Tokens normalizados (palabras y puntuación)."""
+        return self._tokenización[0]
+
+    @property
+    def spans_tokens(self) -> List[Tuple[int, int]]:
+        """Posición (inicio, fin) de cada token."""
+        return self._tokenización[1]
+
+    @property
+    def num_tokens(self) -> int:
+        """Número total de tokens."""
+        return len(self.tokens)
+
+    @cached_property
+    def _palabras(self) -> Tuple[List[str], List[Tuple[int, int]]]:
+        pares = [(t, s) for t, s in zip(self.tokens, self.spans_tokens) if es_palabra(t)]
+        return [t for t, _ in pares], [s for _, s in pares]
+
+    @property
+    def palabras(self) -> List[str]:
+        """Tokens que son palabras, sin signos de puntuación."""
+        return self._palabras[0]
+
+    @property
+    def spans_palabras(self) -> List[Tuple[int, int]]:
+        """Posición (inicio, fin) de cada palabra."""
+        return self._palabras[1]
+
+    @cached_property
+    def documento_hash(self) -> str:
+        """SHA-256 del contenido (o el hash provisto en los metadatos)."""
+        return (
+            self.documento.get("documento_hash")
+            or hashlib.sha256(self.contenido.encode("utf-8")).hexdigest()
+        )
+
+    @cached_property
+    def conteo_tokens(self) -> Counter:
+        """Frecuencia de cada token."""
+        return Counter(self.tokens)
+
+    @cached_property
+    def oraciones(self) -> List[Tuple[int, int]]:
+        """Spans de las oraciones del documento."""
+        return _spans(PATRÓN_ORACIÓN, self.contenido)
+
+    @cached_property
+    def párrafos(self) -> List[Tuple[int, int]]:
+        """Spans de los párrafos (separados por líneas en blanco)."""
+        return _spans(PATRÓN_PÁRRAFO, self.contenido)
+
+    def artefacto(self, nombre: str, constructor: Callable[["DocumentoPreprocesado"], Any]) -> Any:
+        """
+        Obtiene un artefacto derivado, calculándolo solo la primera vez.
+
+        Args:
+            nombre: clave del artefacto
+            constructor: función que lo calcula a partir del documento
+
+        Returns:
+            artefacto en caché
+        """
+        if nombre not in self._artefactos:
+            self._artefactos[nombre] = constructor(self)
+        return self._artefactos[nombre]
+
+    def tiene_artefacto(self, nombre: str) -> bool:
+        """Indica si el artefacto ya está calculado (o fue provisto)."""
+        return nombre in self._artefactos
+
+    def resumen(self) -> Dict:
+        """Estadísticas básicas del documento."""
+        return {
+            "longitud": self.longitud,
+            "num_tokens": self.num_tokens,
+            "num_oraciones": len(self.oraciones),
+            "num_párrafos": len(self.párrafos),
+        }
+
+
+def ventanas_texto(
+    fragmentos: Iterable[str],
+    tamaño: int,
+    solapamiento: int
+) -> Iterator[Tuple[int, str, bool]]:
+    """
+    Agrupa un flujo de fragmentos en ventanas solapadas de tamaño fijo.
+
+    Solo se mantiene en memoria la ventana actual más el último fragmento
+    leído, sin importar la longitud total del documento.
+
+    Args:
+        fragmentos: texto en trozos de cualquier tamaño
+        tamaño: caracteres por ventana
+        solapamiento: caracteres compartidos entre ventanas consecutivas
+
+    Yields:
+        tuplas (posición_inicial, texto_ventana, es_última)
+    """
+    if not 0 <= solapamiento < tamaño:
+        raise ValueError("El solapamiento debe ser menor que el tamaño de ventana")
+
+    búfer = ""
+    posición = 0
+    for fragmento in fragmentos:
+        búfer += unicodedata.normalize("NFC", fragmento)
+        while len(búfer) > tamaño:
+            yield posición, búfer[:tamaño], False
+            búfer = búfer[tamaño - solapamiento:]
+            posición += tamaño - solapamiento
+
+    yield posición, búfer, True
+
+
+class DocumentoAgregado(DocumentoPreprocesado):
+    """
+    Documento procesado por ventanas sin conservar el texto completo.
+
+    Expone los mismos artefactos que consumen los detectores (palabras
+    clave, patrones) ya fusionados entre ventanas, junto con los conteos
+    globales del documento.
+    """
+
+    def __init__(
+        self,
+        documento: Dict,
+        longitud: int,
+        num_tokens: int,
+        num_ventanas: int,
+        artefactos: Dict[str, Any],
+        documento_hash: str = None
+    ):
+        super().__init__({k: v for k, v in documento.items() if k != "contenido"})
+        if documento_hash and not self.documento.get("documento_hash"):
+            self.documento_hash = documento_hash
+        self._longitud = longitud
+        self._num_tokens = num_tokens
+        self.num_ventanas = num_ventanas
+        self._artefactos.update(artefactos)
+
+    @property
+    def longitud(self) -> int:
+        """Número de caracteres del documento completo."""
+        return self._longitud
+
+    @property
+    def num_tokens(self) -> int:
+        """Número de tokens del documento completo."""
+        return self._num_tokens
+
+    def resumen(self) -> Dict:
+        """Estadísticas básicas del documento."""
+        return {
+            "longitud": self.longitud,
+            "num_tokens": self.num_tokens,
+            "modo": "streaming",
+            "num_ventanas": self.num_ventanas,
+        }
+
+
+class DocumentoRevisión(DocumentoAgregado):
+    """
+    Revisión de un documento reconstruida a partir de sus párrafos.
+
+    Los artefactos de los párrafos que no cambiaron respecto de versiones
+    anteriores del mismo linaje se reutilizan; solo los párrafos nuevos
+    se escanean. Conserva los spans de los párrafos para ubicar pasajes.
+    """
+
+    def __init__(
+        self,
+        documento: Dict,
+        longitud: int,
+        num_tokens: int,
+        párrafos: List[Tuple[int, int]],
+        artefactos: Dict[str, Any],
+        documento_hash: str,
+        linaje: str,
+        versión: int,
+        párrafos_reutilizados: int
+    ):
+        super().__init__(
+            documento,
+            longitud=longitud,
+            num_tokens=num_tokens,
+            num_ventanas=0,
+            artefactos=artefactos,
+            documento_hash=documento_hash
+        )
+        self.párrafos = párrafos
+        self.linaje = linaje
+        self.versión = versión
+        self.párrafos_reutilizados = párrafos_reutilizados
+
+    def resumen(self) -> Dict:
+        """Estadísticas básicas del documento."""
+        return {
+            "longitud": self.longitud,
+            "num_tokens": self.num_tokens,
+            "num_párrafos": len(self.párrafos),
+            "modo": "revisión",
+            "linaje": self.linaje,
+            "versión": self.versión,
+            "párrafos_reutilizados": self.párrafos_reutilizados,
+        }
@@ -0,0 +1,252 @@
+"""
+Motor de Escaneo Multipatrón para Centinela Digital
+
+Autómata estilo Aho-Corasick que localiza en una sola pasada todas las
+palabras clave de los detectores de integridad. Opera a nivel de token
+(palabras y signos de puntuación), de modo que cada coincidencia respeta
+los límites de palabra y conserva su posición en el texto original.
+"""
+
+import re
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Sequence, Tuple
+
+
+# Un token es una palabra o un signo de puntuación aislado
+PATRÓN_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class Coincidencia(NamedTuple):
+    """Coincidencia de una palabra clave dentro del texto."""
+    etiqueta: Hashable
+    patrón: str
+    inicio: int
+    fin: int
+
+
+def tokenizar(texto: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Divide el texto en tokens conservando sus posiciones.
+
+    Args:
+        texto: texto ya normalizado (en minúsculas)
+
+    Returns:
+        tupla (tokens, spans) con un span (inicio, fin) por token
+    """
+    tokens = []
+    spans = []
+    for m in PATRÓN_TOKEN.finditer(texto):
+        tokens.append(m.group())
+        spans.append(m.span())
+    return tokens, spans
+
+
+class AutómataPalabrasClave:
+    """
+    Autómata Aho-Corasick sobre tokens.
+
+    Se construye una única vez con todas las frases de todos los detectores
+    y recorre cada documento una sola vez, independientemente del número
+    de palabras clave registradas.
+    """
+
+    def __init__(self, patrones: Dict[Hashable, Iterable[str]]):
+        """
+        Construye el autómata.
+
+        Args:
+            patrones: etiqueta -> frases que la activan (en minúsculas)
+        """
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallo: List[int] = [0]
+        self._salidas: List[List[Tuple[Hashable, str, int]]] = [[]]
+        self.longitud_máxima = 1
+
+        for etiqueta, frases in patrones.items():
+            for frase in frases:
+                self._insertar(etiqueta, frase)
+
+        self._construir_fallos()
+
+    def _insertar(self, etiqueta: Hashable, frase: str):
+        """Agrega una frase al trie de tokens."""
+        tokens, _ = tokenizar(frase.lower())
+        if not tokens:
+            return
+
+        estado = 0
+        for token in tokens:
+            siguiente = self._transiciones[estado].get(token)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones.append({})
+                self._fallo.append(0)
+                self._salidas.append([])
+                self._transiciones[estado][token] = siguiente
+            estado = siguiente
+
+        self._salidas[estado].append((etiqueta, frase, len(tokens)))
+        self.longitud_máxima = max(self.longitud_máxima, len(tokens))
+
+    def _construir_fallos(self):
+        """Calcula los enlaces de fallo por recorrido en anchura."""
+        cola = deque()
+        for siguiente in self._transiciones[0].values():
+            cola.append(siguiente)
+
+        while cola:
+            estado = cola.popleft()
+            for token, siguiente in self._transiciones[estado].items():
+                cola.append(siguiente)
+
+                fallo = self._fallo[estado]
+                while fallo and token not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                self._fallo[siguiente] = self._transiciones[fallo].get(token, 0)
+
+                # Heredar salidas del sufijo más largo
+                self._salidas[siguiente] = (
+                    self._salidas[siguiente] + self._salidas[self._fallo[siguiente]]
+                )
+
+    def buscar_tokens(
+        self,
+        tokens: Sequence[str],
+        spans: Sequence[Tuple[int, int]]
+    ) -> List[Coincidencia]:
+        """
+        Recorre una secuencia de tokens ya calculada.
+
+        Args:
+            tokens: tokens del documento
+            spans: posición (inicio, fin) de cada token
+
+        Returns:
+            lista de coincidencias en orden de aparición
+        """
+        transiciones = self._transiciones
+        fallo = self._fallo
+        salidas = self._salidas
+
+        coincidencias = []
+        estado = 0
+
+        for i, token in enumerate(tokens):
+            siguiente = transiciones[estado].get(token)
+            while siguiente is None and estado:
+                estado = fallo[estado]
+                siguiente = transiciones[estado].get(token)
+            estado = siguiente or 0
+
+            for etiqueta, frase, longitud in salidas[estado]:
+                coincidencias.append(Coincidencia(
+                    etiqueta,
+                    frase,
+                    spans[i - longitud + 1][0],
+                    spans[i][1]
+                ))
+
+        return coincidencias
+
+    def buscar(self, texto: str) -> List[Coincidencia]:
+        """
+        Busca todas las palabras clave en un texto.
+
+        Args:
+            texto: texto en minúsculas
+
+        Returns:
+            lista de coincidencias en orden de aparición
+        """
+        tokens, spans = tokenizar(texto)
+        return self.buscar_tokens(tokens, spans)
+
+    @staticmethod
+    def agrupar(coincidencias: Iterable[Coincidencia]) -> Dict[Hashable, List[Coincidencia]]:
+        """Agrupa coincidencias por etiqueta."""
+        agrupadas: Dict[Hashable, List[Coincidencia]] = {}
+        for c in coincidencias:
+            agrupadas.setdefault(c.etiqueta, []).append(c)
+        return agrupadas
+
+
+class EscánerRegex:
+    """
+    Escáner de expresiones regulares compiladas en una sola alternancia.
+
+    Recorre el texto con `finditer` una sola vez y limita el número de
+    coincidencias registradas por patrón. Cuando un patrón encuentra una
+    coincidencia más allá de su límite se marca como truncado, se retira de
+    la alternancia y el recorrido continúa desde esa posición, por lo que
+    un documento lleno de coincidencias de un patrón no penaliza la
+    latencia ni el tamaño de la respuesta.
+    """
+
+    def __init__(
+        self,
+        patrones: Dict[str, str],
+        máximo_por_patrón: int = 50,
+        flags: int = re.IGNORECASE
+    ):
+        """
+        Args:
+            patrones: nombre -> expresión regular
+            máximo_por_patrón: coincidencias registradas por patrón
+            flags: banderas de compilación
+        """
+        self._nombres = list(patrones)
+        self._expresiones = [patrones[n] for n in self._nombres]
+        self._flags = flags
+        self._compiladas: Dict[frozenset, re.Pattern] = {}
+        self.máximo_por_patrón = máximo_por_patrón
+
+        # Alternancia completa, compilada por adelantado
+        self._compilar(frozenset(range(len(self._nombres))))
+
+    def _compilar(self, activos: frozenset) -> re.Pattern:
+        """Alternancia de los patrones activos (en caché por subconjunto)."""
+        compilada = self._compiladas.get(activos)
+        if compilada is None:
+            compilada = re.compile(
+                "|".join(
+                    f"(?P<p{i}>{self._expresiones[i]})" for i in sorted(activos)
+                ),
+                self._flags
+            )
+            self._compiladas[activos] = compilada
+        return compilada
+
+    def buscar(self, texto: str) -> Dict[str, Dict]:
+        """
+        Escanea el texto con todos los patrones a la vez.
+
+        Args:
+            texto: texto a analizar
+
+        Returns:
+            nombre -> {"spans": [(inicio, fin), ...], "truncado": bool}
+        """
+        resultados = {n: {"spans": [], "truncado": False} for n in self._nombres}
+        activos = frozenset(range(len(self._nombres)))
+        posición = 0
+
+        while activos:
+            agotado = None
+            for m in self._compilar(activos).finditer(texto, posición):
+                índice = int(m.lastgroup[1:])
+                resultado = resultados[self._nombres[índice]]
+                if len(resultado["spans"]) >= self.máximo_por_patrón:
+                    # Hay al menos una coincidencia más allá del límite; el
+                    # recorrido sigue desde ella con los demás patrones
+                    resultado["truncado"] = True
+                    agotado = índice
+                    posición = m.start()
+                    break
+                resultado["spans"].append(m.span())
+
+            if agotado is None:
+                break
+            activos = activos - {agotado}
+
+        return resultados
@@ -0,0 +1,241 @@
+"""
+Explicación de Hallazgos bajo Demanda
+
+Durante el análisis los detectores solo registran la posición de su
+evidencia (`evidencia`: indicador -> [[inicio, fin], ...]). El texto del
+documento se guarda aparte, comprimido y por identificador de reporte, y
+la explicación (oraciones con la evidencia resaltada y las tablas de
+reglas correspondientes) se arma solo cuando un revisor la pide.
+"""
+
+import sqlite3
+import zlib
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from documento_preprocesado import DocumentoPreprocesado
+from paquetes_reglas import PaqueteReglas
+
+# Tabla de reglas que documenta cada detector
+TABLA_DETECTOR = {
+    "plagio_conceptual": "plagio_conceptual",
+    "desviaciones_metodologicas": "desviaciones_metodologicas",
+    "mala_conducta": "mala_conducta",
+    "falacias": "falacias",
+}
+
+# Oraciones mostradas como máximo por indicador
+MÁXIMO_ORACIONES = 10
+
+# Caracteres de una oración mostrados como máximo alrededor de la evidencia
+MÁXIMO_CARACTERES_ORACIÓN = 600
+
+# Marcas de resaltado
+APERTURA, CIERRE = "«", "»"
+
+
+class TextosReporte:
+    """Texto de los documentos analizados, por identificador de reporte."""
+
+    DB_PATH = Path(".centinela_data/explicaciones.db")
+
+    # Textos conservados como máximo (se desalojan los más antiguos)
+    MÁXIMO_TEXTOS = 10_000
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Inicializa el almacén"""
+        self.db_path = Path(db_path) if db_path else self.DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._crear_tablas()
+
+    def _crear_tablas(self):
+        """Crea la tabla de textos si no existe"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS textos_reporte (
+                reporte_id TEXT PRIMARY KEY,
+                contenido BLOB NOT NULL,
+                institucion TEXT,
+                usuario TEXT,
+                timestamp TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute("PRAGMA table_info(textos_reporte)")
+        if "usuario" not in {fila[1] for fila in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE textos_reporte ADD COLUMN usuario TEXT")
+
+        conn.commit()
+        conn.close()
+
+    def guardar(
+        self,
+        reporte_id: str,
+        contenido: str,
+        institución: Optional[str] = None,
+        usuario: Optional[str] = None
+    ):
+        """
+        Guarda el texto de un reporte (no hace nada si ya existe).
+
+        Args:
+            reporte_id: identificador del reporte
+            contenido: texto analizado
+            institución: institución cuyas reglas se aplicaron
+            usuario: dueño del reporte (único autorizado a ver el texto)
+        """
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR IGNORE INTO textos_reporte
+                (reporte_id, contenido, institucion, usuario, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                reporte_id,
+                zlib.compress(contenido.encode("utf-8")),
+                institución,
+                usuario,
+                datetime.now().isoformat()
+            ))
+            if cursor.rowcount:
+                cursor.execute("""
+                    DELETE FROM textos_reporte WHERE reporte_id IN (
+                        SELECT reporte_id FROM textos_reporte
+                        ORDER BY timestamp DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.MÁXIMO_TEXTOS,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def obtener(self, reporte_id: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        Texto, institución y dueño de un reporte.
+
+        Returns:
+            (contenido, institución, usuario) o None si no se conserva
+        """
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT contenido, institucion, usuario FROM textos_reporte WHERE reporte_id = ?",
+                (reporte_id,)
+            )
+            fila = cursor.fetchone()
+        finally:
+            conn.close()
+
+        if fila is None:
+            return None
+        return zlib.decompress(fila[0]).decode("utf-8"), fila[1], fila[2]
+
+
+def explicar(análisis: Dict, contenido: str, reglas: PaqueteReglas) -> Dict:
+    """
+    Explicación de los hallazgos de un análisis de integridad.
+
+    Args:
+        análisis: resultado de analizar_integridad_completa
+        contenido: texto analizado
+        reglas: paquete de reglas de la institución
+
+    Returns:
+        por detector: score, hallazgos, evidencia por oración y tabla de reglas
+    """
+    doc = DocumentoPreprocesado({"contenido": contenido})
+    oraciones = doc.oraciones
+    inicios = [inicio for inicio, _ in oraciones]
+
+    detectores = {}
+    for nombre, resultado in análisis.items():
+        if not isinstance(resultado, dict) or "hallazgos" not in resultado:
+            continue
+
+        explicación = {
+            "score": resultado.get("score"),
+            "hallazgos": resultado["hallazgos"],
+            "evidencia": [
+                {
+                    "indicador": indicador,
+                    "coincidencias": len(spans),
+                    "oraciones": _oraciones_resaltadas(doc.contenido, oraciones, inicios, spans),
+                }
+                for indicador, spans in resultado.get("evidencia", {}).items()
+            ],
+        }
+        tabla = TABLA_DETECTOR.get(nombre)
+        if tabla is not None:
+            explicación["reglas"] = reglas.tablas[tabla]
+        detectores[nombre] = explicación
+
+    return {
+        "version_reglas": análisis.get("version_reglas"),
+        "reglas_vigentes": reglas.versión,
+        "score_general": análisis.get("score_general"),
+        "nivel_riesgo": análisis.get("nivel_riesgo"),
+        "detectores": detectores,
+    }
+
+
+def _oraciones_resaltadas(
+    contenido: str,
+    oraciones: List[Tuple[int, int]],
+    inicios: List[int],
+    spans: List[List[int]]
+) -> List[Dict]:
+    """Agrupa los spans por oración y resalta cada uno dentro de su oración."""
+    por_oración: Dict[int, List[Tuple[int, int]]] = {}
+    for inicio, fin in sorted(tuple(s) for s in spans):
+        índice = bisect_right(inicios, inicio) - 1
+        if índice < 0 or inicio >= oraciones[índice][1]:
+            # Fuera de toda oración (p. ej. un signo suelto): span aislado
+            índice = -1 - inicio
+        if índice not in por_oración and len(por_oración) >= MÁXIMO_ORACIONES:
+            break
+        por_oración.setdefault(índice, []).append((inicio, fin))
+
+    resultado = []
+    for índice, marcas in por_oración.items():
+        if índice >= 0:
+            a, b = oraciones[índice]
+            # Los pasajes pueden cruzar oraciones: se extiende la ventana
+            b = max(b, max(fin for _, fin in marcas))
+        else:
+            a, b = marcas[0]
+        a, b = _recortar(a, b, marcas)
+
+        partes = []
+        cursor = a
+        for inicio, fin in marcas:
+            inicio, fin = max(inicio, cursor), min(fin, b)
+            if fin <= inicio:
+                continue
+            partes.append(contenido[cursor:inicio])
+            partes.append(APERTURA + contenido[inicio:fin] + CIERRE)
+            cursor = fin
+        partes.append(contenido[cursor:b])
+
+        resultado.append({
+            "span": [a, b],
+            "texto": "".join(partes),
+        })
+    return resultado
+
+
+def _recortar(a: int, b: int, marcas: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """Limita la ventana mostrada alrededor de la primera marca."""
+    if b - a <= MÁXIMO_CARACTERES_ORACIÓN:
+        return a, b
+    centro = marcas[0][0]
+    a = max(a, centro - MÁXIMO_CARACTERES_ORACIÓN // 2)
+    return a, min(b, a + MÁXIMO_CARACTERES_ORACIÓN)
+
+
+# Instancia global del almacén de textos
+textos_reporte = TextosReporte()
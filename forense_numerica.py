@@ -0,0 +1,281 @@
+"""
+Forense Numérica de Datos Reportados
+
+Extrae todos los números de un texto en una sola pasada de expresión
+regular hacia arreglos NumPy y aplica, vectorizadas sobre todos los
+valores a la vez, tres pruebas clásicas de fabricación de datos:
+
+- Benford: distribución del primer dígito significativo.
+- Dígito terminal: uniformidad del último dígito de valores con al
+  menos tres cifras significativas.
+- GRIM: consistencia entre una media reportada y el tamaño de muestra
+  cuando los datos originales son enteros (p. ej., escalas Likert).
+
+El costo es lineal en la cantidad de números del documento.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Número con etiqueta opcional de media o tamaño de muestra
+PATRÓN_NÚMERO = re.compile(
+    r"(?:\b(?P<etiqueta>M|media|mean|promedio|n|N)\s*=\s*)?"
+    r"(?<![\w.,])(?P<número>-?\d+(?:[.,]\d+)?)(?![\w]|[.,]\d)"
+)
+
+_ETIQUETAS_MEDIA = {"M", "media", "mean", "promedio"}
+_ETIQUETAS_MUESTRA = {"n", "N"}
+
+# Proporciones esperadas del primer dígito según Benford
+PROPORCIÓN_BENFORD = np.log10(1 + 1 / np.arange(1, 10))
+
+# Mínimos de valores para que cada prueba sea informativa
+MÍNIMO_BENFORD = 100
+MÍNIMO_DÍGITO_TERMINAL = 100
+
+# Órdenes de magnitud que deben abarcar los datos para aplicar Benford
+MÍNIMO_ÓRDENES_BENFORD = 2
+
+# MAD de primer dígito a partir del cual no hay conformidad (Nigrini)
+MAD_NO_CONFORMIDAD = 0.015
+
+# Significancia de la prueba de dígito terminal
+ALFA_DÍGITO_TERMINAL = 0.001
+
+# Distancia máxima (caracteres) entre una media y su tamaño de muestra
+DISTANCIA_GRIM = 300
+
+# Medias inconsistentes listadas como máximo en el resultado
+MÁXIMO_INCONSISTENCIAS_REPORTADAS = 20
+
+
+def extraer_números(texto: str) -> Dict[str, np.ndarray]:
+    """
+    Extrae todos los números del texto en una sola pasada.
+
+    Los enteros de cuatro cifras entre 1600 y 2099 se tratan como años y
+    no participan en las pruebas de dígitos.
+
+    Args:
+        texto: contenido del documento
+
+    Returns:
+        arreglos paralelos: inicios, valores, primer_dígito, último_dígito,
+        cifras (significativas), decimales y etiqueta (0 = ninguna,
+        1 = media, 2 = tamaño de muestra)
+    """
+    inicios, crudos, etiquetas = [], [], []
+    for m in PATRÓN_NÚMERO.finditer(texto):
+        inicios.append(m.start("número"))
+        crudos.append(m.group("número"))
+        etiqueta = m.group("etiqueta")
+        etiquetas.append(
+            1 if etiqueta in _ETIQUETAS_MEDIA else 2 if etiqueta in _ETIQUETAS_MUESTRA else 0
+        )
+
+    if not crudos:
+        return _números_vacíos()
+
+    normalizados = [c.replace(",", ".") for c in crudos]
+    dígitos = [c.lstrip("-").replace(".", "").replace(",", "") for c in crudos]
+    significativos = [d.lstrip("0") for d in dígitos]
+
+    return {
+        "inicios": np.array(inicios, dtype=np.int64),
+        "valores": np.array(normalizados, dtype=np.float64),
+        "primer_dígito": np.array(
+            [int(s[0]) if s else 0 for s in significativos], dtype=np.int8
+        ),
+        "último_dígito": np.array([int(d[-1]) for d in dígitos], dtype=np.int8),
+        "cifras": np.array([len(s) for s in significativos], dtype=np.int16),
+        "decimales": np.array(
+            [len(n) - n.index(".") - 1 if "." in n else 0 for n in normalizados], dtype=np.int8
+        ),
+        "etiqueta": np.array(etiquetas, dtype=np.int8),
+    }
+
+
+def _números_vacíos() -> Dict[str, np.ndarray]:
+    return {
+        "inicios": np.empty(0, dtype=np.int64),
+        "valores": np.empty(0, dtype=np.float64),
+        "primer_dígito": np.empty(0, dtype=np.int8),
+        "último_dígito": np.empty(0, dtype=np.int8),
+        "cifras": np.empty(0, dtype=np.int16),
+        "decimales": np.empty(0, dtype=np.int8),
+        "etiqueta": np.empty(0, dtype=np.int8),
+    }
+
+
+def concatenar_números(partes: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Une los números extraídos de varios tramos consecutivos."""
+    if not partes:
+        return _números_vacíos()
+    return {clave: np.concatenate([p[clave] for p in partes]) for clave in partes[0]}
+
+
+def _valor_p_chi2(estadístico: float, grados: int) -> float:
+    """Cola superior de chi-cuadrado (aproximación de Wilson-Hilferty)."""
+    if estadístico <= 0:
+        return 1.0
+    k = float(grados)
+    z = ((estadístico / k) ** (1 / 3) - (1 - 2 / (9 * k))) / math.sqrt(2 / (9 * k))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _es_año(números: Dict[str, np.ndarray]) -> np.ndarray:
+    valores = números["valores"]
+    return (
+        (números["decimales"] == 0)
+        & (números["cifras"] == 4)
+        & (valores >= 1600) & (valores < 2100)
+    )
+
+
+def prueba_benford(números: Dict[str, np.ndarray]) -> Dict:
+    """
+    Conformidad del primer dígito con la ley de Benford.
+
+    Returns:
+        {"aplicable", "valores", "mad", "chi2", "valor_p", "conforme"}
+    """
+    válidos = (números["primer_dígito"] > 0) & ~_es_año(números)
+    primeros = números["primer_dígito"][válidos]
+    magnitudes = np.log10(np.abs(números["valores"][válidos]))
+
+    resultado = {"aplicable": False, "valores": int(primeros.size)}
+    if (
+        primeros.size < MÍNIMO_BENFORD
+        or magnitudes.max() - magnitudes.min() < MÍNIMO_ÓRDENES_BENFORD
+    ):
+        return resultado
+
+    observadas = np.bincount(primeros, minlength=10)[1:] / primeros.size
+    mad = float(np.mean(np.abs(observadas - PROPORCIÓN_BENFORD)))
+    chi2 = float(primeros.size * np.sum((observadas - PROPORCIÓN_BENFORD) ** 2 / PROPORCIÓN_BENFORD))
+
+    resultado.update({
+        "aplicable": True,
+        "mad": round(mad, 4),
+        "chi2": round(chi2, 2),
+        "valor_p": round(_valor_p_chi2(chi2, 8), 6),
+        "conforme": mad <= MAD_NO_CONFORMIDAD,
+        "distribución": [round(float(p), 4) for p in observadas],
+    })
+    return resultado
+
+
+def prueba_dígito_terminal(números: Dict[str, np.ndarray]) -> Dict:
+    """
+    Uniformidad del último dígito en valores con tres o más cifras.
+
+    Returns:
+        {"aplicable", "valores", "chi2", "valor_p", "uniforme"}
+    """
+    válidos = (números["cifras"] >= 3) & ~_es_año(números)
+    últimos = números["último_dígito"][válidos]
+
+    resultado = {"aplicable": False, "valores": int(últimos.size)}
+    if últimos.size < MÍNIMO_DÍGITO_TERMINAL:
+        return resultado
+
+    conteos = np.bincount(últimos, minlength=10)
+    esperado = últimos.size / 10
+    chi2 = float(np.sum((conteos - esperado) ** 2) / esperado)
+    valor_p = _valor_p_chi2(chi2, 9)
+
+    resultado.update({
+        "aplicable": True,
+        "chi2": round(chi2, 2),
+        "valor_p": round(valor_p, 6),
+        "uniforme": valor_p >= ALFA_DÍGITO_TERMINAL,
+        "conteos": conteos.tolist(),
+    })
+    return resultado
+
+
+def prueba_grim(números: Dict[str, np.ndarray]) -> Dict:
+    """
+    GRIM: ¿puede la media reportada salir de n valores enteros?
+
+    Cada media se empareja con el tamaño de muestra etiquetado más
+    cercano (a menos de DISTANCIA_GRIM caracteres). Solo se evalúan
+    medias con n < 10^decimales, donde la prueba es informativa.
+
+    Returns:
+        {"evaluadas", "total_inconsistentes", "inconsistentes": [{"media", "n", "inicio"}]}
+    """
+    es_media = números["etiqueta"] == 1
+    es_muestra = (números["etiqueta"] == 2) & (números["decimales"] == 0)
+
+    inicios_muestra = números["inicios"][es_muestra]
+    tamaños = números["valores"][es_muestra]
+    inicios_media = números["inicios"][es_media]
+    medias = números["valores"][es_media]
+    decimales = números["decimales"][es_media].astype(np.int64)
+
+    if not inicios_muestra.size or not inicios_media.size:
+        return {"evaluadas": 0, "total_inconsistentes": 0, "inconsistentes": []}
+
+    # Tamaño de muestra más cercano a cada media (antes o después)
+    siguiente = np.clip(np.searchsorted(inicios_muestra, inicios_media), 0, inicios_muestra.size - 1)
+    anterior = np.clip(siguiente - 1, 0, inicios_muestra.size - 1)
+    distancia_siguiente = np.abs(inicios_muestra[siguiente] - inicios_media)
+    distancia_anterior = np.abs(inicios_muestra[anterior] - inicios_media)
+    cercano = np.where(distancia_anterior <= distancia_siguiente, anterior, siguiente)
+    distancia = np.minimum(distancia_anterior, distancia_siguiente)
+    n = tamaños[cercano]
+
+    evaluables = (
+        (distancia <= DISTANCIA_GRIM)
+        & (decimales > 0)
+        & (n > 0)
+        & (n < 10.0 ** decimales)
+    )
+    medias, n, decimales = medias[evaluables], n[evaluables], decimales[evaluables]
+    inicios_media = inicios_media[evaluables]
+
+    escala = 10.0 ** decimales
+    objetivo = np.round(medias * escala)
+    total = np.round(medias * n)
+
+    # Se acepta redondeo al par o hacia arriba en los empates
+    consistente = np.zeros(medias.size, dtype=bool)
+    for delta in (-1, 0, 1):
+        candidata = (total + delta) / n * escala
+        consistente |= (np.round(candidata) == objetivo) | (np.floor(candidata + 0.5) == objetivo)
+
+    inconsistentes = np.flatnonzero(~consistente)
+    return {
+        "evaluadas": int(medias.size),
+        "total_inconsistentes": int(inconsistentes.size),
+        "inconsistentes": [
+            {
+                "media": float(medias[i]),
+                "n": int(n[i]),
+                "inicio": int(inicios_media[i]),
+            }
+            for i in inconsistentes[:MÁXIMO_INCONSISTENCIAS_REPORTADAS]
+        ],
+    }
+
+
+def analizar_números(números: Optional[Dict[str, np.ndarray]]) -> Dict:
+    """
+    Ejecuta las tres pruebas sobre los números extraídos.
+
+    Returns:
+        {"números", "benford", "dígito_terminal", "grim"}
+    """
+    if números is None:
+        números = _números_vacíos()
+    return {
+        "números": int(números["valores"].size),
+        "benford": prueba_benford(números),
+        "dígito_terminal": prueba_dígito_terminal(números),
+        "grim": prueba_grim(números),
+    }
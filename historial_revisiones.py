@@ -0,0 +1,233 @@
+"""
+Historial de Revisiones de Documentos
+
+Conserva, para cada linaje de un documento (v1, v2, v3 de la misma
+tesis), la secuencia de hashes de sus párrafos, y para cada párrafo los
+artefactos que extrajeron los detectores. Los artefactos se direccionan
+por contenido (hash del párrafo + versión de las reglas), de modo que una
+revisión solo paga el escaneo de los párrafos nuevos o modificados.
+
+Linajes y artefactos pertenecen al usuario que los envió: el mismo
+identificador de linaje de otro usuario es un linaje distinto, y un
+usuario no reutiliza (ni puede sondear) los párrafos de otro.
+"""
+
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+class HistorialRevisiones:
+    """Linajes de documentos y artefactos por párrafo en SQLite."""
+
+    DB_PATH = Path(".centinela_data/revisiones.db")
+
+    # Tamaño de lote para consultas IN (límite de variables de SQLite)
+    LOTE_CONSULTA = 900
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Inicializa el historial"""
+        self.db_path = Path(db_path) if db_path else self.DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._crear_tablas()
+
+    def _crear_tablas(self):
+        """Crea las tablas de versiones y párrafos si no existen"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+
+        # Esquema anterior, sin usuario: sus filas quedan sin dueño ('')
+        anteriores = []
+        for tabla in ("versiones_linaje", "artefactos_parrafo"):
+            cursor.execute(f"PRAGMA table_info({tabla})")
+            columnas = [fila[1] for fila in cursor.fetchall()]
+            if columnas and "usuario" not in columnas:
+                cursor.execute(f"ALTER TABLE {tabla} RENAME TO {tabla}_anterior")
+                anteriores.append(tabla)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS versiones_linaje (
+                usuario TEXT NOT NULL DEFAULT '',
+                linaje TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                documento_hash TEXT NOT NULL,
+                parrafos TEXT NOT NULL,
+                parrafos_reutilizados INTEGER NOT NULL,
+                timestamp TEXT NOT NULL,
+                PRIMARY KEY (usuario, linaje, version)
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS artefactos_parrafo (
+                usuario TEXT NOT NULL DEFAULT '',
+                parrafo_hash TEXT NOT NULL,
+                version_reglas TEXT NOT NULL,
+                artefactos BLOB NOT NULL,
+                PRIMARY KEY (usuario, parrafo_hash, version_reglas)
+            )
+        """)
+
+        if "versiones_linaje" in anteriores:
+            cursor.execute("""
+                INSERT INTO versiones_linaje
+                (linaje, version, documento_hash, parrafos, parrafos_reutilizados, timestamp)
+                SELECT linaje, version, documento_hash, parrafos, parrafos_reutilizados, timestamp
+                FROM versiones_linaje_anterior
+            """)
+            cursor.execute("DROP TABLE versiones_linaje_anterior")
+        if "artefactos_parrafo" in anteriores:
+            cursor.execute("""
+                INSERT INTO artefactos_parrafo (parrafo_hash, version_reglas, artefactos)
+                SELECT parrafo_hash, version_reglas, artefactos FROM artefactos_parrafo_anterior
+            """)
+            cursor.execute("DROP TABLE artefactos_parrafo_anterior")
+
+        conn.commit()
+        conn.close()
+
+    def artefactos(
+        self,
+        hashes: Iterable[str],
+        version_reglas: str,
+        usuario: Optional[str] = None
+    ) -> Dict[str, Dict]:
+        """
+        Artefactos ya calculados de los párrafos dados.
+
+        Args:
+            hashes: hashes de párrafo
+            version_reglas: versión de las reglas con que se calcularon
+            usuario: dueño de los párrafos
+
+        Returns:
+            hash -> artefactos (solo los párrafos conocidos)
+        """
+        buscados = list(set(hashes))
+        encontrados = {}
+
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            for i in range(0, len(buscados), self.LOTE_CONSULTA):
+                lote = buscados[i:i + self.LOTE_CONSULTA]
+                cursor.execute(f"""
+                    SELECT parrafo_hash, artefactos FROM artefactos_parrafo
+                    WHERE usuario = ? AND version_reglas = ?
+                    AND parrafo_hash IN ({','.join('?' * len(lote))})
+                """, (usuario or "", version_reglas, *lote))
+                for parrafo_hash, blob in cursor.fetchall():
+                    encontrados[parrafo_hash] = json.loads(zlib.decompress(blob))
+        finally:
+            conn.close()
+
+        return encontrados
+
+    def registrar_versión(
+        self,
+        linaje: str,
+        documento_hash: str,
+        hashes_párrafos: List[str],
+        nuevos: Dict[str, Dict],
+        version_reglas: str,
+        usuario: Optional[str] = None
+    ) -> int:
+        """
+        Guarda los artefactos de los párrafos nuevos y la versión del linaje.
+
+        Reenviar el mismo contenido que la última versión no crea otra.
+
+        Args:
+            linaje: identificador del documento a lo largo de sus versiones
+            documento_hash: hash del contenido completo
+            hashes_párrafos: hash de cada párrafo, en orden
+            nuevos: artefactos de los párrafos recién escaneados
+            version_reglas: versión de las reglas con que se calcularon
+            usuario: dueño del linaje
+
+        Returns:
+            número de versión (desde 1)
+        """
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            cursor.executemany("""
+                INSERT OR IGNORE INTO artefactos_parrafo
+                (usuario, parrafo_hash, version_reglas, artefactos)
+                VALUES (?, ?, ?, ?)
+            """, [
+                (usuario or "", parrafo_hash, version_reglas, zlib.compress(json.dumps(artefactos).encode("utf-8"), 1))
+                for parrafo_hash, artefactos in nuevos.items()
+            ])
+
+            cursor.execute("""
+                SELECT version, documento_hash FROM versiones_linaje
+                WHERE usuario = ? AND linaje = ? ORDER BY version DESC LIMIT 1
+            """, (usuario or "", linaje))
+            última = cursor.fetchone()
+
+            if última and última[1] == documento_hash:
+                versión = última[0]
+            else:
+                versión = última[0] + 1 if última else 1
+                cursor.execute("""
+                    INSERT INTO versiones_linaje
+                    (usuario, linaje, version, documento_hash, parrafos, parrafos_reutilizados, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    usuario or "",
+                    linaje,
+                    versión,
+                    documento_hash,
+                    json.dumps(hashes_párrafos),
+                    sum(1 for h in hashes_párrafos if h not in nuevos),
+                    datetime.now().isoformat()
+                ))
+
+            conn.commit()
+            return versión
+        finally:
+            conn.close()
+
+    def versiones(self, linaje: str, usuario: Optional[str] = None) -> List[Dict]:
+        """
+        Versiones registradas de un linaje, de la más antigua a la última.
+
+        Args:
+            linaje: identificador del documento a lo largo de sus versiones
+            usuario: dueño del linaje (los de otros usuarios no se ven)
+
+        Returns:
+            lista de {"version", "documento_hash", "num_parrafos",
+            "parrafos_reutilizados", "timestamp"}
+        """
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT version, documento_hash, parrafos, parrafos_reutilizados, timestamp
+                FROM versiones_linaje WHERE usuario = ? AND linaje = ? ORDER BY version
+            """, (usuario or "", linaje))
+            filas = cursor.fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                "version": versión,
+                "documento_hash": documento_hash,
+                "num_parrafos": len(json.loads(párrafos)),
+                "parrafos_reutilizados": reutilizados,
+                "timestamp": timestamp,
+            }
+            for versión, documento_hash, párrafos, reutilizados, timestamp in filas
+        ]
+
+
+# Instancia global del historial
+historial_revisiones = HistorialRevisiones()
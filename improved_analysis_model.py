@@ -8,8 +8,24 @@ Incluye:
 - Análisis de patrones
 """
 
-from typing import Dict, List, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import copy
+import hashlib
 import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from database import CentinelaDatabase, db
+
+
+logger = logging.getLogger(__name__)
 
 
 # ============================================================
@@ -63,23 +79,215 @@ RISK_THRESHOLDS = {
 }
 
 
+class ModelConfiguration(NamedTuple):
+    """Pesos, factores contextuales y umbrales con los que se puntúa."""
+    dimension_weights: Dict[str, Dict[str, float]]
+    role_risk_factors: Dict[str, float]
+    product_risk_factors: Dict[str, float]
+    risk_thresholds: Dict[str, Tuple[int, int]]
+
+
+class _Matrices(NamedTuple):
+    """Forma matricial de DIMENSION_WEIGHTS (columnas en orden de declaración)."""
+    dimensions: Tuple[str, ...]
+    indicators: Tuple[str, ...]
+    weight_matrix: np.ndarray
+    max_weights: np.ndarray
+
+
+class _ModelTables(NamedTuple):
+    """
+    Configuración vigente en forma matricial y tabla de resultados.
+    
+    La tabla tiene una fila por combinación (evidencias binarias, rol,
+    tipo de producto, clase de boost de confianza); los roles y tipos de
+    producto desconocidos ocupan la última posición (factor 1.0).
+    """
+    configuration: ModelConfiguration
+    matrices: _Matrices
+    roles: Dict[str, int]
+    products: Dict[str, int]
+    scores: np.ndarray
+    levels: np.ndarray
+    confidence: np.ndarray
+    dimension_scores: np.ndarray
+    critical: np.ndarray
+    critical_lists: Tuple[Tuple[str, ...], ...]
+    recommendations: np.ndarray
+    recommendation_lists: Tuple[Tuple[str, ...], ...]
+
+
+# Clases de boost de confianza: 0, 1, 2 y 3 o más evidencias marcadas
+# (min(n * 0.1, 0.3) es igual para todo n >= 3)
+BOOST_CLASSES = 4
+
+# Indicadores admitidos en una configuración (la tabla tiene 2^n filas por
+# combinación de rol, producto y boost)
+MAX_INDICATORS = 12
+
+# Dimensiones admitidas (se precalcula una lista de críticas por subconjunto)
+MAX_DIMENSIONS = 12
+
+# Filas de la tabla de resultados: 2^indicadores x (roles + 1) x
+# (productos + 1) x BOOST_CLASSES. Compilar 2^18 filas toma ~1 s
+MAX_TABLE_ROWS = 1 << 18
+
+_LEVELS = ("BAJO", "MEDIO", "ALTO")
+_BINARY_TYPES = (int, bool, float)
+
+
+def current_configuration() -> ModelConfiguration:
+    """Configuración integrada (los diccionarios globales del módulo, sin copiar)."""
+    return ModelConfiguration(DIMENSION_WEIGHTS, ROLE_RISK_FACTORS, PRODUCT_RISK_FACTORS, RISK_THRESHOLDS)
+
+
+def base_fingerprint() -> Tuple:
+    """
+    Instantánea barata de la configuración integrada, para comparar por igualdad.
+    
+    Cuesta unos microsegundos (sin serializar ni hashear), por lo que se
+    puede comparar en cada análisis.
+    """
+    return (
+        tuple((dimension, tuple(weights.items())) for dimension, weights in DIMENSION_WEIGHTS.items()),
+        tuple(ROLE_RISK_FACTORS.items()),
+        tuple(PRODUCT_RISK_FACTORS.items()),
+        tuple(RISK_THRESHOLDS.items()),
+    )
+
+
+def configuration_digest(configuration: ModelConfiguration) -> str:
+    """Hash del contenido de una configuración, en orden (12 caracteres)."""
+    return hashlib.sha256(json.dumps(
+        configuration._asdict(), ensure_ascii=False
+    ).encode("utf-8")).hexdigest()[:12]
+
+
+def validate_configuration(configuration: ModelConfiguration) -> None:
+    """
+    Comprueba que una configuración se pueda compilar.
+    
+    Raises:
+        ValueError: si los pesos, factores o umbrales no son válidos
+    """
+    def number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    
+    weights = configuration.dimension_weights
+    if not isinstance(weights, dict) or not weights:
+        raise ValueError("dimension_weights debe tener al menos una dimensión")
+    for dimension, indicators in weights.items():
+        if not isinstance(indicators, dict) or not indicators:
+            raise ValueError(f"La dimensión {dimension} no tiene indicadores")
+        if not all(number(w) and w >= 0 for w in indicators.values()) or sum(indicators.values()) <= 0:
+            raise ValueError(f"Los pesos de {dimension} deben ser no negativos y sumar más que 0")
+    num_indicators = len({i for indicators in weights.values() for i in indicators})
+    if num_indicators > MAX_INDICATORS:
+        raise ValueError(f"Como máximo {MAX_INDICATORS} indicadores")
+    if len(weights) > MAX_DIMENSIONS:
+        raise ValueError(f"Como máximo {MAX_DIMENSIONS} dimensiones")
+    
+    for field in ("role_risk_factors", "product_risk_factors"):
+        factors = getattr(configuration, field)
+        if not isinstance(factors, dict) or not all(number(f) and f >= 0 for f in factors.values()):
+            raise ValueError(f"{field} debe asociar cada clave a un factor no negativo")
+    
+    rows = (
+        2 ** num_indicators
+        * (len(configuration.role_risk_factors) + 1)
+        * (len(configuration.product_risk_factors) + 1)
+        * BOOST_CLASSES
+    )
+    if rows > MAX_TABLE_ROWS:
+        raise ValueError(
+            f"La tabla de resultados tendría {rows} filas (máximo {MAX_TABLE_ROWS}); "
+            "reduzca indicadores, roles o tipos de producto"
+        )
+    
+    thresholds = configuration.risk_thresholds
+    if not isinstance(thresholds, dict) or set(thresholds) != set(_LEVELS):
+        raise ValueError(f"risk_thresholds debe definir exactamente los niveles {_LEVELS}")
+    for level, bounds in thresholds.items():
+        if len(bounds) != 2 or not all(number(b) for b in bounds) or bounds[0] > bounds[1]:
+            raise ValueError(f"Umbral inválido para {level}: {bounds}")
+
+
+def configuration_from_dict(data: Dict) -> ModelConfiguration:
+    """
+    Configuración a partir de su forma serializada (ver ModelConfiguration).
+    
+    Raises:
+        ValueError: si faltan secciones o la configuración no es válida
+    """
+    if not isinstance(data, dict):
+        raise ValueError("La configuración debe ser un objeto")
+    missing = [field for field in ModelConfiguration._fields if field not in data]
+    if missing:
+        raise ValueError(f"Secciones faltantes: {', '.join(missing)}")
+    configuration = ModelConfiguration(
+        copy.deepcopy(data["dimension_weights"]),
+        dict(data["role_risk_factors"]),
+        dict(data["product_risk_factors"]),
+        {level: tuple(bounds) for level, bounds in data["risk_thresholds"].items()},
+    )
+    validate_configuration(configuration)
+    return configuration
+
+
+def apply_configuration_changes(configuration: ModelConfiguration, changes: Dict) -> ModelConfiguration:
+    """
+    Copia de una configuración con cambios parciales.
+    
+    Args:
+        configuration: configuración de partida (no se modifica)
+        changes: dict con cualquiera de las secciones de ModelConfiguration;
+            los pesos se combinan por dimensión y el resto por clave, p. ej.
+            {"dimension_weights": {"presentacion": {"imagenes_sospechosas": 1.5}},
+             "risk_thresholds": {"MEDIO": [30, 60], "ALTO": [60, 100]}}
+    
+    Returns:
+        nueva configuración
+    
+    Raises:
+        ValueError: si hay secciones desconocidas o el resultado no es válido
+    """
+    unknown = set(changes) - set(ModelConfiguration._fields)
+    if unknown:
+        raise ValueError(f"Secciones de configuración desconocidas: {sorted(unknown)}")
+    
+    result = copy.deepcopy(configuration)
+    for dimension, weights in changes.get("dimension_weights", {}).items():
+        result.dimension_weights.setdefault(dimension, {}).update(weights)
+    result.role_risk_factors.update(changes.get("role_risk_factors", {}))
+    result.product_risk_factors.update(changes.get("product_risk_factors", {}))
+    result.risk_thresholds.update(
+        (level, tuple(bounds)) for level, bounds in changes.get("risk_thresholds", {}).items()
+    )
+    validate_configuration(result)
+    return result
+
+
 # ============================================================
 # FUNCIONES DE ANÁLISIS MEJORADAS
 # ============================================================
 
-def calculate_dimension_scores(evidencias: Dict[str, int]) -> Dict[str, float]:
+def calculate_dimension_scores(
+    evidencias: Dict[str, int],
+    dimension_weights: Optional[Dict[str, Dict[str, float]]] = None
+) -> Dict[str, float]:
     """
     Calcula puntuación normalizada (0-1) para cada dimensión.
     
     Args:
         evidencias: diccionario con valores binarios (0/1)
+        dimension_weights: pesos a usar (por defecto, DIMENSION_WEIGHTS)
     
     Returns:
         diccionario con puntuaciones por dimensión
     """
     scores = {}
     
-    for dimension, indicators in DIMENSION_WEIGHTS.items():
+    for dimension, indicators in (dimension_weights or DIMENSION_WEIGHTS).items():
         dimension_score = 0.0
         for indicator, weight in indicators.items():
             if indicator in evidencias:
@@ -95,7 +303,9 @@ def calculate_dimension_scores(evidencias: Dict[str, int]) -> Dict[str, float]:
 def apply_contextual_factors(
     base_scores: Dict[str, float],
     rol: str,
-    tipo_producto: str
+    tipo_producto: str,
+    role_risk_factors: Optional[Dict[str, float]] = None,
+    product_risk_factors: Optional[Dict[str, float]] = None
 ) -> Dict[str, float]:
     """
     Aplica factores contextuales según rol y tipo de producto.
@@ -104,14 +314,16 @@ def apply_contextual_factors(
         base_scores: scores iniciales por dimensión
         rol: rol de quien entrega el trabajo
         tipo_producto: tipo de producto académico
+        role_risk_factors: factores por rol (por defecto, ROLE_RISK_FACTORS)
+        product_risk_factors: factores por producto (por defecto, PRODUCT_RISK_FACTORS)
     
     Returns:
         scores ajustados por contexto
     """
     adjusted_scores = {}
     
-    role_factor = ROLE_RISK_FACTORS.get(rol, 1.0)
-    product_factor = PRODUCT_RISK_FACTORS.get(tipo_producto, 1.0)
+    role_factor = (role_risk_factors or ROLE_RISK_FACTORS).get(rol, 1.0)
+    product_factor = (product_risk_factors or PRODUCT_RISK_FACTORS).get(tipo_producto, 1.0)
     
     for dimension, score in base_scores.items():
         # Aplicar factores acumulativos pero capped a 1.0
@@ -123,7 +335,8 @@ def apply_contextual_factors(
 
 def calculate_overall_risk(
     adjusted_scores: Dict[str, float],
-    confidence_boost: float = 0.0
+    confidence_boost: float = 0.0,
+    risk_thresholds: Optional[Dict[str, Tuple[int, int]]] = None
 ) -> Tuple[int, str, float]:
     """
     Calcula riesgo global (0-100), nivel y confianza.
@@ -131,10 +344,13 @@ def calculate_overall_risk(
     Args:
         adjusted_scores: scores ajustados por dimensión
         confidence_boost: incremento de confianza (0-1)
+        risk_thresholds: umbrales por nivel (por defecto, RISK_THRESHOLDS)
     
     Returns:
         tupla (score_global, nivel_riesgo, confianza)
     """
+    thresholds = risk_thresholds or RISK_THRESHOLDS
+    
     # Promedio ponderado de dimensiones
     overall = sum(adjusted_scores.values()) / len(adjusted_scores) if adjusted_scores else 0.0
     
@@ -143,11 +359,11 @@ def calculate_overall_risk(
     
     # Determinar nivel
     level = "BAJO"
-    for level_name, (min_val, max_val) in RISK_THRESHOLDS.items():
+    for level_name, (min_val, max_val) in thresholds.items():
         if min_val <= score_0_100 < max_val:
             level = level_name
             break
-    if score_0_100 >= 67:
+    if score_0_100 >= thresholds["ALTO"][0]:
         level = "ALTO"
     
     # Confianza basada en consistencia de evidencias
@@ -175,20 +391,35 @@ def analyze_with_improved_model(
     Returns:
         diccionario completo con análisis
     """
+    return model_registry.active().analyze(evidencias, rol, tipo_producto, num_evidencias_marked)
+
+
+def _analyze_scalar(
+    configuration: ModelConfiguration,
+    evidencias: Dict[str, int],
+    rol: str,
+    tipo_producto: str,
+    num_evidencias_marked: Optional[int]
+) -> Dict:
+    """Análisis paso a paso (entradas que no están en la tabla de resultados)."""
     # Paso 1: Calcular scores por dimensión
-    dimension_scores = calculate_dimension_scores(evidencias)
+    dimension_scores = calculate_dimension_scores(evidencias, configuration.dimension_weights)
     
     # Paso 2: Aplicar factores contextuales
     adjusted_scores = apply_contextual_factors(
         dimension_scores,
         rol,
-        tipo_producto
+        tipo_producto,
+        configuration.role_risk_factors,
+        configuration.product_risk_factors
     )
     
     # Paso 3: Calcular riesgo global
     # Boost de confianza si hay muchas evidencias marcadas
     confidence_boost = min(num_evidencias_marked * 0.1, 0.3) if num_evidencias_marked else 0.0
-    score, level, confidence = calculate_overall_risk(adjusted_scores, confidence_boost)
+    score, level, confidence = calculate_overall_risk(
+        adjusted_scores, confidence_boost, configuration.risk_thresholds
+    )
     
     # Paso 4: Identificar dimensiones críticas
     critical_dimensions = [
@@ -214,12 +445,343 @@ def analyze_with_improved_model(
         "contexto": {
             "rol": rol,
             "tipo_producto": tipo_producto,
-            "role_factor": ROLE_RISK_FACTORS.get(rol, 1.0),
-            "product_factor": PRODUCT_RISK_FACTORS.get(tipo_producto, 1.0),
+            "role_factor": configuration.role_risk_factors.get(rol, 1.0),
+            "product_factor": configuration.product_risk_factors.get(tipo_producto, 1.0),
         },
     }
 
 
+# ============================================================
+# ANÁLISIS EN LOTE (VECTORIZADO)
+# ============================================================
+
+def pack_evidence(
+    evidencias_list: Sequence[Dict],
+    configuration: Optional[ModelConfiguration] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Empaqueta las evidencias de N casos en una matriz (N x indicadores).
+    
+    Los indicadores ausentes valen 0. Un caso es válido si todos sus
+    indicadores son números finitos; los demás deben analizarse con
+    analyze_with_improved_model (que informa el error).
+    
+    Args:
+        evidencias_list: diccionario de evidencias de cada caso
+        configuration: configuración cuyos indicadores forman las columnas
+            (por defecto, la de la versión activa)
+    
+    Returns:
+        tupla (matriz float64, máscara de casos válidos)
+    """
+    if configuration is None:
+        return model_registry.active().pack_evidence(evidencias_list)
+    return _pack_evidence(_matrices(configuration.dimension_weights).indicators, evidencias_list)
+
+
+def _pack_evidence(indicators: Tuple[str, ...], evidencias_list: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    try:
+        rows = [[evidencias.get(indicator, 0) for indicator in indicators] for evidencias in evidencias_list]
+    except AttributeError:
+        rows = None
+    
+    # Camino rápido: todos los valores son números (bool, int, float)
+    if rows is not None:
+        matrix = np.array(rows).reshape(len(rows), len(indicators))
+        if matrix.dtype.kind in "biuf":
+            matrix = matrix.astype(np.float64)
+            return matrix, np.isfinite(matrix).all(axis=1)
+    
+    matrix = np.zeros((len(evidencias_list), len(indicators)))
+    valid = np.ones(len(evidencias_list), dtype=bool)
+    for i, evidencias in enumerate(evidencias_list):
+        try:
+            row = [evidencias.get(indicator, 0) for indicator in indicators]
+            if all(
+                isinstance(v, (int, float)) and math.isfinite(v) for v in row
+            ):
+                matrix[i] = row
+                continue
+        except (AttributeError, OverflowError):
+            pass
+        valid[i] = False
+    return matrix, valid
+
+
+def score_batch(
+    evidence: np.ndarray,
+    roles: Sequence[str],
+    tipos_producto: Sequence[str],
+    num_evidencias_marked: Optional[Sequence[int]] = None,
+    configuration: Optional[ModelConfiguration] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Scores, niveles y confianza de N casos en un solo paso vectorizado.
+    
+    Repite las operaciones de calculate_dimension_scores,
+    apply_contextual_factors y calculate_overall_risk en el mismo orden,
+    por lo que los resultados son idénticos a los del análisis individual.
+    
+    Args:
+        evidence: matriz (N x indicadores) de pack_evidence
+        roles: rol de cada caso
+        tipos_producto: tipo de producto de cada caso
+        num_evidencias_marked: evidencias marcadas por caso (boost de confianza)
+        configuration: configuración con la que puntuar (por defecto, la
+            de la versión activa); evidence debe venir de pack_evidence con
+            la misma
+    
+    Returns:
+        diccionario con "dimension_scores" y "critical" (N x dimensiones),
+        "overall_score", "overall_level", "confidence", "role_factors" y
+        "product_factors"
+    """
+    if configuration is None:
+        return model_registry.active().score_batch(evidence, roles, tipos_producto, num_evidencias_marked)
+    return _score_configuration(
+        _matrices(configuration.dimension_weights), configuration,
+        evidence, roles, tipos_producto, num_evidencias_marked
+    )
+
+
+def _score_configuration(
+    matrices: _Matrices,
+    configuration: ModelConfiguration,
+    evidence: np.ndarray,
+    roles: Sequence[str],
+    tipos_producto: Sequence[str],
+    num_evidencias_marked: Optional[Sequence[int]]
+) -> Dict[str, np.ndarray]:
+    n = len(evidence)
+    return _score(
+        matrices,
+        configuration.risk_thresholds,
+        evidence,
+        np.fromiter((configuration.role_risk_factors.get(r, 1.0) for r in roles), float, n),
+        np.fromiter((configuration.product_risk_factors.get(p, 1.0) for p in tipos_producto), float, n),
+        np.zeros(n) if num_evidencias_marked is None
+        else np.fromiter((m or 0 for m in num_evidencias_marked), float, n)
+    )
+
+
+def _score(
+    matrices: _Matrices,
+    thresholds: Dict[str, Tuple[int, int]],
+    evidence: np.ndarray,
+    role_factors: np.ndarray,
+    product_factors: np.ndarray,
+    marked: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Núcleo de score_batch con los factores ya resueltos."""
+    n = len(evidence)
+    
+    # Suma por dimensión en el orden de los indicadores (los pesos de las
+    # demás dimensiones son 0 y no alteran la suma)
+    dimension_scores = np.zeros((n, len(matrices.dimensions)))
+    for j in range(len(matrices.indicators)):
+        dimension_scores += evidence[:, j:j + 1] * matrices.weight_matrix[j]
+    dimension_scores /= matrices.max_weights
+    
+    adjusted = np.minimum(dimension_scores * role_factors[:, None] * product_factors[:, None], 1.0)
+    
+    overall = adjusted[:, 0].copy()
+    for d in range(1, len(matrices.dimensions)):
+        overall += adjusted[:, d]
+    overall /= len(matrices.dimensions)
+    score = (overall * 100).astype(np.int64)
+    
+    level = np.zeros(n, dtype=np.int64)
+    assigned = np.zeros(n, dtype=bool)
+    for level_name, (min_val, max_val) in thresholds.items():
+        match = ~assigned & (min_val <= score) & (score < max_val)
+        level[match] = _LEVELS.index(level_name)
+        assigned |= match
+    level[score >= thresholds["ALTO"][0]] = _LEVELS.index("ALTO")
+    
+    confidence_boost = np.minimum(marked * 0.1, 0.3)
+    consistency = 1.0 - (adjusted.max(axis=1) - adjusted.min(axis=1))
+    confidence = np.minimum(consistency + confidence_boost, 1.0)
+    
+    return {
+        "dimension_scores": adjusted,
+        "overall_score": score,
+        "overall_level": np.array(_LEVELS, dtype=object)[level],
+        "confidence": confidence,
+        "critical": adjusted > 0.6,
+        "role_factors": role_factors,
+        "product_factors": product_factors,
+    }
+
+
+def _matrices(dimension_weights: Dict[str, Dict[str, float]]) -> _Matrices:
+    """Matriz (indicadores x dimensiones) de pesos y peso máximo por dimensión."""
+    dimensions = tuple(dimension_weights)
+    indicators = tuple(dict.fromkeys(
+        indicator for weights in dimension_weights.values() for indicator in weights
+    ))
+    return _Matrices(
+        dimensions,
+        indicators,
+        np.array([
+            [dimension_weights[dimension].get(indicator, 0.0) for dimension in dimensions]
+            for indicator in indicators
+        ]).reshape(len(indicators), len(dimensions)),
+        np.array([sum(dimension_weights[d].values()) for d in dimensions]),
+    )
+
+
+def _build_model_tables(configuration: ModelConfiguration) -> _ModelTables:
+    """
+    Precalcula el resultado de todas las entradas binarias posibles.
+    
+    Los valores se guardan ya redondeados como en analyze_with_improved_model;
+    las recomendaciones, como índice en la lista de recomendaciones distintas.
+    """
+    matrices = _matrices(configuration.dimension_weights)
+    dimensions, indicators = matrices.dimensions, matrices.indicators
+    
+    # Filas en orden (evidencias, rol, producto, boost): índice mixto
+    roles = list(configuration.role_risk_factors.values()) + [1.0]
+    products = list(configuration.product_risk_factors.values()) + [1.0]
+    grid = np.indices(
+        (2 ** len(indicators), len(roles), len(products), BOOST_CLASSES)
+    ).reshape(4, -1)
+    evidence = ((grid[0][:, None] >> np.arange(len(indicators))) & 1).astype(np.float64)
+    batch = _score(
+        matrices,
+        configuration.risk_thresholds,
+        evidence,
+        np.array(roles)[grid[1]],
+        np.array(products)[grid[2]],
+        grid[3].astype(np.float64)
+    )
+    
+    scores = batch["overall_score"]
+    critical = batch["critical"] @ (1 << np.arange(len(dimensions)))
+    recommendation_lists: Dict[Tuple[str, ...], int] = {}
+    recommendations = np.empty(len(scores), dtype=np.int16)
+    critical_lists = tuple(
+        tuple(d for j, d in enumerate(dimensions) if mask >> j & 1)
+        for mask in range(2 ** len(dimensions))
+    )
+    for i, (level, mask, score) in enumerate(zip(
+        batch["overall_level"].tolist(), critical.tolist(), scores.tolist()
+    )):
+        key = _cached_recommendations(critical_lists[mask], score < 20, level)
+        recommendations[i] = recommendation_lists.setdefault(key, len(recommendation_lists))
+    
+    return _ModelTables(
+        configuration=copy.deepcopy(configuration),
+        matrices=matrices,
+        roles={rol: i for i, rol in enumerate(configuration.role_risk_factors)},
+        products={producto: i for i, producto in enumerate(configuration.product_risk_factors)},
+        scores=scores.astype(np.int16),
+        levels=np.array([_LEVELS.index(l) for l in batch["overall_level"]], dtype=np.int8),
+        confidence=np.array([round(c, 3) for c in batch["confidence"].tolist()]),
+        dimension_scores=np.array(
+            [[round(v, 3) for v in row] for row in batch["dimension_scores"].tolist()]
+        ).reshape(-1, len(dimensions)),
+        critical=critical.astype(np.uint8 if len(dimensions) <= 8 else np.uint64),
+        critical_lists=critical_lists,
+        recommendations=recommendations,
+        recommendation_lists=tuple(recommendation_lists),
+    )
+
+
+def _lookup_index(
+    tables: _ModelTables,
+    evidencias: Dict[str, int],
+    rol: str,
+    tipo_producto: str,
+    num_evidencias_marked: Optional[int]
+) -> Optional[int]:
+    """
+    Fila de la tabla de resultados para una entrada, si está precalculada.
+    
+    Returns:
+        índice de la fila, o None si alguna evidencia no es 0/1 o el número
+        de evidencias marcadas no es un entero no negativo
+    """
+    if num_evidencias_marked is None:
+        boost_class = 0
+    elif num_evidencias_marked.__class__ is int and num_evidencias_marked >= 0:
+        boost_class = min(num_evidencias_marked, BOOST_CLASSES - 1)
+    else:
+        return None
+    
+    try:
+        values = [evidencias.get(indicator, 0) for indicator in tables.matrices.indicators]
+        role = tables.roles.get(rol, len(tables.roles))
+        product = tables.products.get(tipo_producto, len(tables.products))
+    except (AttributeError, TypeError):
+        return None
+    
+    bits = 0
+    for j, value in enumerate(values):
+        if value.__class__ not in _BINARY_TYPES:
+            return None
+        if value == 1:
+            bits |= 1 << j
+        elif value != 0:
+            return None
+    
+    return (
+        ((bits * (len(tables.roles) + 1) + role) * (len(tables.products) + 1) + product)
+        * BOOST_CLASSES + boost_class
+    )
+
+
+def _lookup_result(tables: _ModelTables, index: int, rol: str, tipo_producto: str) -> Dict:
+    """Resultado de analyze_with_improved_model a partir de la tabla."""
+    return {
+        "dimension_scores": dict(zip(tables.matrices.dimensions, tables.dimension_scores[index].tolist())),
+        "overall_score": tables.scores.item(index),
+        "overall_level": _LEVELS[tables.levels.item(index)],
+        "confidence": tables.confidence.item(index),
+        "critical_dimensions": list(tables.critical_lists[tables.critical.item(index)]),
+        "recommendations": list(tables.recommendation_lists[tables.recommendations.item(index)]),
+        "contexto": {
+            "rol": rol,
+            "tipo_producto": tipo_producto,
+            "role_factor": tables.configuration.role_risk_factors.get(rol, 1.0),
+            "product_factor": tables.configuration.product_risk_factors.get(tipo_producto, 1.0),
+        },
+    }
+
+
+@lru_cache(maxsize=256)
+def _cached_recommendations(critical_dims: Tuple[str, ...], low_score: bool, nivel_riesgo: str) -> Tuple[str, ...]:
+    # Las recomendaciones solo dependen del nivel, las dimensiones críticas
+    # y de si el score es menor que 20
+    return tuple(_generate_recommendations({}, list(critical_dims), 0 if low_score else 20, nivel_riesgo))
+
+
+def analyze_batch_with_improved_model(
+    evidencias_list: Sequence[Dict[str, int]],
+    roles: Sequence[str],
+    tipos_producto: Sequence[str],
+    num_evidencias_marked: Optional[Sequence[int]] = None
+) -> List[Dict]:
+    """
+    Análisis de N casos con resultados idénticos a analyze_with_improved_model.
+    
+    Args:
+        evidencias_list: diccionario de evidencias de cada caso
+        roles: rol de cada caso
+        tipos_producto: tipo de producto de cada caso
+        num_evidencias_marked: evidencias marcadas por caso
+    
+    Returns:
+        lista con el análisis de cada caso, en el mismo orden
+    
+    Raises:
+        TypeError: si algún caso tiene evidencias no numéricas
+    """
+    return model_registry.active().analyze_batch(
+        evidencias_list, roles, tipos_producto, num_evidencias_marked
+    )
+
+
 def _generate_recommendations(
     adjusted_scores: Dict[str, float],
     critical_dims: List[str],
@@ -259,6 +821,343 @@ def _generate_recommendations(
     return recommendations
 
 
+# ============================================================
+# CONFIGURACIONES VERSIONADAS
+# ============================================================
+
+class CompiledModel:
+    """
+    Una versión del modelo compilada en su tabla de resultados.
+    
+    Es inmutable: se comparte entre hilos y, al cambiar de versión, se
+    reemplaza entera, de modo que un análisis en curso (o un lote) usa una
+    sola versión de principio a fin.
+    """
+    
+    __slots__ = ("name", "version", "digest", "label", "_tables")
+    
+    def __init__(self, configuration: ModelConfiguration, name: str = "base", version: Optional[int] = None):
+        """
+        Compila una configuración.
+        
+        Args:
+            configuration: pesos, factores y umbrales (se copian)
+            name: nombre de la configuración
+            version: versión guardada; None para la integrada en el código
+        
+        Raises:
+            ValueError: si la configuración no es válida
+        """
+        validate_configuration(configuration)
+        digest = configuration_digest(configuration)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "digest", digest)
+        object.__setattr__(self, "label", f"{name}@{digest if version is None else version}")
+        object.__setattr__(self, "_tables", _build_model_tables(configuration))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledModel es inmutable")
+    
+    def __reduce__(self):
+        # Hacia otro proceso viaja la configuración; allí se vuelve a compilar
+        return CompiledModel, (self._tables.configuration, self.name, self.version)
+    
+    def __repr__(self) -> str:
+        return f"CompiledModel({self.label})"
+    
+    @property
+    def configuration(self) -> ModelConfiguration:
+        """Copia de la configuración compilada."""
+        return copy.deepcopy(self._tables.configuration)
+    
+    @property
+    def dimensions(self) -> Tuple[str, ...]:
+        """Dimensiones, en el orden de las columnas de score_batch."""
+        return self._tables.matrices.dimensions
+    
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        """Indicadores, en el orden de las columnas de pack_evidence."""
+        return self._tables.matrices.indicators
+    
+    def analyze(
+        self,
+        evidencias: Dict[str, int],
+        rol: str,
+        tipo_producto: str,
+        num_evidencias_marked: Optional[int] = None
+    ) -> Dict:
+        """Análisis completo (ver analyze_with_improved_model)."""
+        tables = self._tables
+        # Evidencias binarias: resultado precalculado (ver _build_model_tables)
+        index = _lookup_index(tables, evidencias, rol, tipo_producto, num_evidencias_marked)
+        if index is not None:
+            result = _lookup_result(tables, index, rol, tipo_producto)
+        else:
+            result = _analyze_scalar(tables.configuration, evidencias, rol, tipo_producto, num_evidencias_marked)
+        result["version_modelo"] = self.label
+        return result
+    
+    def pack_evidence(self, evidencias_list: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Matriz de evidencias con los indicadores de esta versión (ver pack_evidence)."""
+        return _pack_evidence(self._tables.matrices.indicators, evidencias_list)
+    
+    def score_batch(
+        self,
+        evidence: np.ndarray,
+        roles: Sequence[str],
+        tipos_producto: Sequence[str],
+        num_evidencias_marked: Optional[Sequence[int]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Puntuación vectorizada con esta versión (ver score_batch)."""
+        return _score_configuration(
+            self._tables.matrices, self._tables.configuration,
+            evidence, roles, tipos_producto, num_evidencias_marked
+        )
+    
+    def analyze_batch(
+        self,
+        evidencias_list: Sequence[Dict[str, int]],
+        roles: Sequence[str],
+        tipos_producto: Sequence[str],
+        num_evidencias_marked: Optional[Sequence[int]] = None
+    ) -> List[Dict]:
+        """Análisis de N casos (ver analyze_batch_with_improved_model)."""
+        evidence, valid = self.pack_evidence(evidencias_list)
+        if not valid.all():
+            raise TypeError(f"Evidencias no numéricas en el caso {int(np.argmin(valid))}")
+        dimensions = self._tables.matrices.dimensions
+        role_factors = self._tables.configuration.role_risk_factors
+        product_factors = self._tables.configuration.product_risk_factors
+        
+        batch = self.score_batch(evidence, roles, tipos_producto, num_evidencias_marked)
+        
+        results = []
+        for i, (scores, critical) in enumerate(zip(batch["dimension_scores"].tolist(), batch["critical"].tolist())):
+            score = int(batch["overall_score"][i])
+            level = batch["overall_level"][i]
+            critical_dimensions = [d for d, c in zip(dimensions, critical) if c]
+            results.append({
+                "dimension_scores": {d: round(v, 3) for d, v in zip(dimensions, scores)},
+                "overall_score": score,
+                "overall_level": level,
+                "confidence": round(float(batch["confidence"][i]), 3),
+                "critical_dimensions": critical_dimensions,
+                "recommendations": list(
+                    _cached_recommendations(tuple(critical_dimensions), score < 20, level)
+                ),
+                "contexto": {
+                    "rol": roles[i],
+                    "tipo_producto": tipos_producto[i],
+                    "role_factor": role_factors.get(roles[i], 1.0),
+                    "product_factor": product_factors.get(tipos_producto[i], 1.0),
+                },
+                "version_modelo": self.label,
+            })
+        return results
+    
+    def describe(self) -> Dict:
+        """Identificación y contenido de la versión (serializable)."""
+        return {
+            "nombre": self.name,
+            "version": self.version,
+            "huella": self.digest,
+            "version_modelo": self.label,
+            "configuracion": self._tables.configuration._asdict(),
+        }
+
+
+class ModelRegistry:
+    """
+    Configuraciones del modelo versionadas en la base de datos.
+    
+    Cada versión se compila una sola vez (CompiledModel) y queda en caché.
+    La versión activa se lee de la base de datos como mucho cada
+    check_interval segundos; cuando cambia, se reemplaza de forma atómica
+    sin reiniciar el proceso. Sin versión activa se usa la configuración
+    integrada (DIMENSION_WEIGHTS y demás globales): en cada llamada a
+    active() se compara su instantánea (base_fingerprint) con la de la
+    versión compilada, y si esos diccionarios cambiaron se recompila antes
+    de puntuar.
+    """
+    
+    # Segundos entre comprobaciones de la versión activa
+    CHECK_INTERVAL = 5.0
+    
+    # Versiones compiladas que se conservan
+    MAX_COMPILED = 16
+    
+    def __init__(self, database: Optional[CentinelaDatabase] = None, check_interval: Optional[float] = None):
+        """Inicializa el registro (la base de datos se consulta al primer uso)"""
+        self.database = database or db
+        self.check_interval = self.CHECK_INTERVAL if check_interval is None else check_interval
+        self.error: Optional[str] = None
+        self._active: Optional[CompiledModel] = None
+        self._checked = float("-inf")
+        self._base_fingerprint: Optional[Tuple] = None
+        self._compiled: "OrderedDict[Tuple, CompiledModel]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def active(self) -> CompiledModel:
+        """Versión activa del modelo."""
+        model = self._active
+        if model is not None and time.monotonic() - self._checked < self.check_interval:
+            if model.version is not None or self._base_fingerprint == base_fingerprint():
+                return model
+        return self.refresh()
+    
+    def refresh(self) -> CompiledModel:
+        """Lee la versión activa de la base de datos y la reemplaza si cambió."""
+        with self._lock:
+            model = self._active
+            # Antes de compilar: un cambio posterior se detecta en la siguiente llamada
+            fingerprint = base_fingerprint()
+            try:
+                stored = self.database.configuracion_modelo_activa()
+                self.error = None
+            except (sqlite3.Error, OSError) as e:
+                # Base de datos inaccesible: se mantiene la versión en uso
+                logger.warning("No se pudo leer la configuración activa del modelo: %s", e)
+                self.error = str(e)
+                if model is not None and model.version is not None:
+                    self._checked = time.monotonic()
+                    return model
+                stored = None
+            
+            try:
+                if stored is None:
+                    model = self._compile(current_configuration(), "base", None)
+                else:
+                    model = self._compile(
+                        configuration_from_dict(stored["configuracion"]),
+                        stored["nombre"],
+                        stored["version"]
+                    )
+            except ValueError as e:
+                # Una versión inválida no reemplaza a la que está en uso
+                logger.warning("Configuración del modelo no válida: %s", e)
+                self.error = str(e)
+                if model is None:
+                    model = self._compile(current_configuration(), "base", None)
+            
+            # Reemplazo atómico: los análisis en curso conservan su versión
+            self._active = model
+            self._base_fingerprint = fingerprint
+            self._checked = time.monotonic()
+            return model
+    
+    def get(self, name: str, version: Optional[int] = None) -> Optional[CompiledModel]:
+        """
+        Versión guardada, compilada (la última del nombre si no se indica).
+        
+        Raises:
+            ValueError: si la versión guardada no es válida
+        """
+        stored = self.database.obtener_configuracion_modelo(name, version)
+        if stored is None:
+            return None
+        with self._lock:
+            return self._compile(
+                configuration_from_dict(stored["configuracion"]), stored["nombre"], stored["version"]
+            )
+    
+    def save(
+        self,
+        name: str,
+        configuration: ModelConfiguration,
+        description: Optional[str] = None,
+        activate: bool = False
+    ) -> CompiledModel:
+        """
+        Guarda una configuración como nueva versión de name.
+        
+        Args:
+            name: nombre de la configuración
+            configuration: configuración completa
+            description: motivo del cambio
+            activate: activarla al guardarla
+        
+        Returns:
+            versión compilada
+        
+        Raises:
+            ValueError: si la configuración no es válida
+        """
+        validate_configuration(configuration)
+        version = self.database.guardar_configuracion_modelo(
+            name,
+            configuration._asdict(),
+            configuration_digest(configuration),
+            description
+        )
+        if activate:
+            return self.activate(name, version)
+        return self.get(name, version)
+    
+    def activate(self, name: Optional[str], version: Optional[int] = None) -> CompiledModel:
+        """
+        Activa una versión guardada para todos los procesos.
+        
+        El proceso actual la usa de inmediato; los demás, en su siguiente
+        comprobación (como mucho check_interval segundos después).
+        
+        Args:
+            name: configuración a activar; None vuelve a la integrada
+            version: versión (la última si no se indica)
+        
+        Raises:
+            LookupError: si la versión no existe
+            ValueError: si la versión guardada no es válida
+        """
+        if name is not None:
+            # Se compila antes de activarla: una versión inválida no llega a activarse
+            model = self.get(name, version)
+            if model is None:
+                raise LookupError(f"No existe la configuración {name}@{version or 'última'}")
+            version = model.version
+        if not self.database.activar_configuracion_modelo(name, version):
+            raise LookupError(f"No existe la configuración {name}@{version}")
+        return self.refresh()
+    
+    def _compile(self, configuration: ModelConfiguration, name: str, version: Optional[int]) -> CompiledModel:
+        """Versión compilada, reutilizada de la caché si ya existe (con el lock tomado)."""
+        key = (name, version, configuration_digest(configuration))
+        model = self._compiled.get(key)
+        if model is None:
+            model = self._compiled[key] = CompiledModel(configuration, name, version)
+            while len(self._compiled) > self.MAX_COMPILED:
+                self._compiled.popitem(last=False)
+        self._compiled.move_to_end(key)
+        return model
+    
+    def describe(self) -> Dict:
+        """Versión activa y versiones compiladas en este proceso (serializable)."""
+        model = self.active()
+        with self._lock:
+            compiled = [m.label for m in self._compiled.values()]
+        return {
+            "activa": dict(model.describe(), integrada=model.version is None),
+            "compiladas": compiled,
+            "intervalo_revision": self.check_interval,
+            "error": self.error,
+        }
+
+
+def rebuild_lookup_table() -> int:
+    """
+    Vuelve a leer la versión activa y devuelve el tamaño de su tabla.
+    
+    Los cambios en DIMENSION_WEIGHTS o en las tablas de factores se
+    detectan solos en el siguiente análisis; además relee la versión activa
+    de la base de datos sin esperar a ModelRegistry.CHECK_INTERVAL.
+    
+    Returns:
+        número de filas de la tabla de resultados
+    """
+    return len(model_registry.refresh()._tables.scores)
+
+
 # ============================================================
 # VALIDACIÓN Y COMPARACIÓN
 # ============================================================
@@ -312,6 +1211,10 @@ def validate_analysis(
     return validation
 
 
+# Instancia global del registro de versiones
+model_registry = ModelRegistry()
+
+
 if __name__ == "__main__":
     # Test rápido del modelo
     test_evidencias = {
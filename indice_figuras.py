@@ -0,0 +1,463 @@
+"""
+Índice de Figuras por Hash Perceptual
+
+Extrae las imágenes incrustadas en un PDF, calcula para cada una tres
+hashes perceptuales de 64 bits (aHash, dHash y pHash) en lote con NumPy y
+las archiva en SQLite con un índice multi-tabla: el pHash se divide en
+cuatro fragmentos de 16 bits y, por el principio del palomar, toda figura
+a distancia de Hamming <= 8 coincide en algún fragmento con a lo sumo dos
+bits de diferencia. Una consulta solo visita esas cubetas, sin recorrer
+todo el archivo. Detecta figuras reutilizadas entre envíos (también en
+espejo) y figuras repetidas dentro del mismo documento.
+"""
+
+import hashlib
+import io
+import sqlite3
+from datetime import datetime
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import PyPDF2
+except ImportError:  # Sin extracción de figuras
+    PyPDF2 = None
+
+try:
+    from PIL import Image
+except ImportError:  # PyPDF2 necesita Pillow para decodificar imágenes
+    Image = None
+
+
+# Lado de la imagen reducida para la DCT del pHash
+LADO_DCT = 32
+
+# Figuras menores (en píxeles por lado) se ignoran: íconos, viñetas, logos
+TAMAÑO_MÍNIMO = 64
+
+# Distancias de Hamming máximas (de 64 bits) para considerar dos figuras
+# la misma: pHash para el índice, dHash como confirmación
+DISTANCIA_MÁXIMA = 8
+DISTANCIA_MÁXIMA_DHASH = 12
+
+# Fragmentos del pHash en el índice y bits de diferencia sondeados en cada uno
+NUM_FRAGMENTOS = 4
+BITS_FRAGMENTO = 64 // NUM_FRAGMENTOS
+RADIO_FRAGMENTO = DISTANCIA_MÁXIMA // NUM_FRAGMENTOS
+
+# Figuras procesadas como máximo por documento
+MÁXIMO_FIGURAS = 200
+
+# Coincidencias reportadas como máximo por figura
+MÁXIMO_COINCIDENCIAS = 5
+
+
+def _matriz_dct(n: int) -> np.ndarray:
+    """Matriz de la DCT-II ortonormal de tamaño n."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matriz = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matriz[0] /= np.sqrt(2)
+    return matriz
+
+
+_DCT = _matriz_dct(LADO_DCT)
+
+# Máscaras de hasta RADIO_FRAGMENTO bits dentro de un fragmento
+_MÁSCARAS_FRAGMENTO = [0] + [
+    sum(1 << b for b in bits)
+    for radio in range(1, RADIO_FRAGMENTO + 1)
+    for bits in combinations(range(BITS_FRAGMENTO), radio)
+]
+
+
+def reducir(pixeles: np.ndarray, alto: int, ancho: int) -> np.ndarray:
+    """
+    Reduce una imagen en escala de grises promediando por áreas.
+
+    Args:
+        pixeles: matriz (alto original, ancho original), de al menos alto x ancho
+        alto, ancho: tamaño de salida
+
+    Returns:
+        matriz float64 (alto, ancho)
+    """
+    filas = np.linspace(0, pixeles.shape[0], alto + 1).astype(np.int64)
+    columnas = np.linspace(0, pixeles.shape[1], ancho + 1).astype(np.int64)
+    sumas = np.add.reduceat(
+        np.add.reduceat(pixeles.astype(np.float64), filas[:-1], axis=0),
+        columnas[:-1],
+        axis=1
+    )
+    return sumas / np.outer(np.diff(filas), np.diff(columnas))
+
+
+def _empaquetar(bits: np.ndarray) -> np.ndarray:
+    """Matriz booleana (n, 64) -> arreglo uint64 de n hashes."""
+    return np.packbits(bits.reshape(len(bits), 64), axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def hashes_perceptuales(imágenes: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    aHash, dHash y pHash de un lote de imágenes.
+
+    Args:
+        imágenes: matrices en escala de grises de al menos LADO_DCT por lado
+
+    Returns:
+        {"ahash", "dhash", "phash"}: arreglos uint64, uno por imagen
+    """
+    if not imágenes:
+        vacío = np.empty(0, dtype=np.uint64)
+        return {"ahash": vacío, "dhash": vacío, "phash": vacío}
+
+    n = len(imágenes)
+    reducidas = np.stack([reducir(p, LADO_DCT, LADO_DCT) for p in imágenes])
+
+    # aHash: 8x8 promedios contra la media de la imagen
+    bloques = reducidas.reshape(n, 8, LADO_DCT // 8, 8, LADO_DCT // 8).mean(axis=(2, 4))
+    ahash = bloques > bloques.mean(axis=(1, 2), keepdims=True)
+
+    # dHash: gradiente horizontal en 8x9
+    finas = np.stack([reducir(p, 8, 9) for p in imágenes])
+    dhash = finas[:, :, 1:] > finas[:, :, :-1]
+
+    # pHash: 8x8 coeficientes de baja frecuencia contra su mediana (sin DC)
+    coeficientes = (_DCT @ reducidas @ _DCT.T)[:, :8, :8].reshape(n, 64)
+    phash = coeficientes > np.median(coeficientes[:, 1:], axis=1, keepdims=True)
+
+    return {
+        "ahash": _empaquetar(ahash),
+        "dhash": _empaquetar(dhash),
+        "phash": _empaquetar(phash),
+    }
+
+
+def distancias_hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Distancia de Hamming entre hashes uint64 (con difusión de NumPy)."""
+    diferencia = np.bitwise_xor(a, b)
+    return np.unpackbits(
+        diferencia.astype(np.uint64)[..., None].view(np.uint8), axis=-1
+    ).sum(axis=-1)
+
+
+def _con_signo(valor: int) -> int:
+    """Entero sin signo de 64 bits como INTEGER de SQLite."""
+    return valor - (1 << 64) if valor >= 1 << 63 else valor
+
+
+def _fragmentos(phash: int) -> List[int]:
+    return [
+        (phash >> (BITS_FRAGMENTO * i)) & ((1 << BITS_FRAGMENTO) - 1)
+        for i in range(NUM_FRAGMENTOS)
+    ]
+
+
+class ÍndiceFiguras:
+    """Almacén persistente de hashes perceptuales con índice multi-tabla."""
+
+    DB_PATH = Path(".centinela_data/figuras.db")
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Inicializa el índice"""
+        self.db_path = Path(db_path) if db_path else self.DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._crear_tablas()
+
+    def _crear_tablas(self):
+        """Crea tablas de figuras y fragmentos si no existen"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS figuras (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                documento_hash TEXT NOT NULL,
+                pagina INTEGER NOT NULL,
+                posicion INTEGER NOT NULL,
+                ahash INTEGER NOT NULL,
+                dhash INTEGER NOT NULL,
+                phash INTEGER NOT NULL,
+                ancho INTEGER NOT NULL,
+                alto INTEGER NOT NULL,
+                usuario TEXT,
+                timestamp TEXT NOT NULL,
+                UNIQUE (documento_hash, posicion)
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS fragmentos_figura (
+                fragmento INTEGER NOT NULL,
+                valor INTEGER NOT NULL,
+                figura_id INTEGER NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_fragmentos_figura ON fragmentos_figura (fragmento, valor)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def agregar(
+        self,
+        documento_hash: str,
+        figuras: List[Dict],
+        hashes: Dict[str, np.ndarray],
+        usuario: Optional[str] = None
+    ) -> int:
+        """
+        Archiva las figuras de un documento (idempotente).
+
+        Args:
+            documento_hash: hash del archivo
+            figuras: {"pagina", "ancho", "alto"} de cada figura
+            hashes: resultado de hashes_perceptuales
+            usuario: autor del envío
+
+        Returns:
+            figuras nuevas archivadas
+        """
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            cursor = conn.cursor()
+            nuevas = 0
+            for posición, figura in enumerate(figuras):
+                phash = int(hashes["phash"][posición])
+                cursor.execute("""
+                    INSERT OR IGNORE INTO figuras
+                    (documento_hash, pagina, posicion, ahash, dhash, phash, ancho, alto, usuario, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    documento_hash,
+                    figura["pagina"],
+                    posición,
+                    _con_signo(int(hashes["ahash"][posición])),
+                    _con_signo(int(hashes["dhash"][posición])),
+                    _con_signo(phash),
+                    figura["ancho"],
+                    figura["alto"],
+                    usuario,
+                    datetime.now().isoformat()
+                ))
+                if cursor.rowcount:
+                    nuevas += 1
+                    cursor.executemany(
+                        "INSERT INTO fragmentos_figura (fragmento, valor, figura_id) VALUES (?, ?, ?)",
+                        [(i, valor, cursor.lastrowid) for i, valor in enumerate(_fragmentos(phash))]
+                    )
+            conn.commit()
+            return nuevas
+        finally:
+            conn.close()
+
+    def consultar(
+        self,
+        phash: int,
+        dhash: int,
+        excluir: Optional[str] = None,
+        k: int = MÁXIMO_COINCIDENCIAS
+    ) -> List[Dict]:
+        """
+        Figuras archivadas parecidas a una figura.
+
+        Args:
+            phash, dhash: hashes de la figura (enteros sin signo)
+            excluir: hash del propio documento
+            k: número máximo de resultados
+
+        Returns:
+            lista de {"documento_hash", "pagina", "posicion", "usuario",
+            "distancia", "distancia_dhash"} de menor a mayor distancia
+        """
+        condiciones = []
+        parámetros: List[int] = []
+        for i, valor in enumerate(_fragmentos(phash)):
+            vecinos = [valor ^ máscara for máscara in _MÁSCARAS_FRAGMENTO]
+            condiciones.append(f"(fragmento = ? AND valor IN ({','.join('?' * len(vecinos))}))")
+            parámetros.extend([i, *vecinos])
+
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT f.documento_hash, f.pagina, f.posicion, f.usuario, f.phash, f.dhash
+                FROM figuras f
+                WHERE f.id IN (
+                    SELECT DISTINCT figura_id FROM fragmentos_figura
+                    WHERE {' OR '.join(condiciones)}
+                )
+            """, parámetros)
+            candidatos = cursor.fetchall()
+        finally:
+            conn.close()
+
+        candidatos = [c for c in candidatos if c[0] != excluir]
+        if not candidatos:
+            return []
+
+        distancias = distancias_hamming(
+            np.array([c[4] for c in candidatos], dtype=np.int64).view(np.uint64),
+            np.uint64(phash)
+        )
+        distancias_d = distancias_hamming(
+            np.array([c[5] for c in candidatos], dtype=np.int64).view(np.uint64),
+            np.uint64(dhash)
+        )
+
+        similares = [
+            {
+                "documento_hash": documento_hash,
+                "pagina": página,
+                "posicion": posición,
+                "usuario": usuario,
+                "distancia": int(d),
+                "distancia_dhash": int(dd),
+            }
+            for (documento_hash, página, posición, usuario, _, _), d, dd
+            in zip(candidatos, distancias.tolist(), distancias_d.tolist())
+            if d <= DISTANCIA_MÁXIMA and dd <= DISTANCIA_MÁXIMA_DHASH
+        ]
+        similares.sort(key=lambda s: (s["distancia"], s["distancia_dhash"]))
+        return similares[:k]
+
+
+class AnálisisFiguras:
+    """Figuras reutilizadas o repetidas en un PDF."""
+
+    @staticmethod
+    def disponible() -> bool:
+        """Indica si están instalados PyPDF2 y Pillow."""
+        return PyPDF2 is not None and Image is not None
+
+    @staticmethod
+    def extraer_imágenes_pdf(datos: bytes) -> List[Dict]:
+        """
+        Imágenes incrustadas de un PDF, en escala de grises.
+
+        Las imágenes que no se pueden decodificar o menores que
+        TAMAÑO_MÍNIMO se omiten.
+
+        Returns:
+            lista de {"pagina", "nombre", "ancho", "alto", "pixeles"}
+        """
+        lector = PyPDF2.PdfReader(io.BytesIO(datos))
+        imágenes = []
+        for número, página in enumerate(lector.pages, start=1):
+            try:
+                incrustadas = list(página.images)
+            except Exception:
+                continue
+            for incrustada in incrustadas:
+                try:
+                    pixeles = np.asarray(Image.open(io.BytesIO(incrustada.data)).convert("L"))
+                except Exception:
+                    continue
+                alto, ancho = pixeles.shape
+                if min(alto, ancho) < TAMAÑO_MÍNIMO:
+                    continue
+                imágenes.append({
+                    "pagina": número,
+                    "nombre": incrustada.name,
+                    "ancho": ancho,
+                    "alto": alto,
+                    "pixeles": pixeles,
+                })
+                if len(imágenes) >= MÁXIMO_FIGURAS:
+                    return imágenes
+        return imágenes
+
+    @staticmethod
+    def analizar_pdf(
+        datos: bytes,
+        usuario: Optional[str] = None,
+        archivar: bool = True
+    ) -> Dict:
+        """
+        Busca figuras repetidas dentro del PDF y reutilizadas de envíos previos.
+
+        Automatiza la evidencia `imagenes_sospechosas` del modelo de reglas.
+
+        Args:
+            datos: contenido del archivo PDF
+            usuario: autor del envío
+            archivar: agregar las figuras al índice para envíos futuros
+
+        Returns:
+            Dict con las figuras analizadas, coincidencias y hallazgos
+        """
+        resultado = {
+            "disponible": AnálisisFiguras.disponible(),
+            "figuras": 0,
+            "repetidas": [],
+            "reutilizadas": [],
+            "imagenes_sospechosas": 0,
+            "hallazgos": [],
+        }
+        if not resultado["disponible"]:
+            return resultado
+
+        documento_hash = hashlib.sha256(datos).hexdigest()
+        imágenes = AnálisisFiguras.extraer_imágenes_pdf(datos)
+        resultado["figuras"] = len(imágenes)
+        if not imágenes:
+            return resultado
+
+        pixeles = [imagen["pixeles"] for imagen in imágenes]
+        hashes = hashes_perceptuales(pixeles)
+        espejo = hashes_perceptuales([np.fliplr(p) for p in pixeles])
+        figuras = [{k: v for k, v in imagen.items() if k != "pixeles"} for imagen in imágenes]
+
+        # Repetidas dentro del documento: distancias entre todos los pares
+        distancias = distancias_hamming(hashes["phash"][:, None], hashes["phash"][None, :])
+        distancias_d = distancias_hamming(hashes["dhash"][:, None], hashes["dhash"][None, :])
+        for i, j in zip(*np.triu_indices(len(figuras), k=1)):
+            if distancias[i, j] <= DISTANCIA_MÁXIMA and distancias_d[i, j] <= DISTANCIA_MÁXIMA_DHASH:
+                resultado["repetidas"].append({
+                    "figura": int(i),
+                    "pagina": figuras[i]["pagina"],
+                    "repetida_en": int(j),
+                    "pagina_repetida": figuras[j]["pagina"],
+                    "distancia": int(distancias[i, j]),
+                })
+
+        # Reutilizadas de envíos previos, tal cual o en espejo
+        for i, figura in enumerate(figuras):
+            for transformación, variante in (("ninguna", hashes), ("espejo", espejo)):
+                coincidencias = índice_figuras.consultar(
+                    int(variante["phash"][i]), int(variante["dhash"][i]), excluir=documento_hash
+                )
+                if coincidencias:
+                    resultado["reutilizadas"].append({
+                        "figura": i,
+                        "pagina": figura["pagina"],
+                        "transformacion": transformación,
+                        "coincidencias": coincidencias,
+                    })
+                    break
+
+        if resultado["repetidas"]:
+            resultado["hallazgos"].append(
+                f"{len(resultado['repetidas'])} par(es) de figuras repetidas dentro del documento"
+            )
+        if resultado["reutilizadas"]:
+            en_espejo = sum(1 for r in resultado["reutilizadas"] if r["transformacion"] == "espejo")
+            resultado["hallazgos"].append(
+                f"{len(resultado['reutilizadas'])} figura(s) coinciden con envíos previos"
+                + (f" ({en_espejo} en espejo)" if en_espejo else "")
+            )
+        resultado["imagenes_sospechosas"] = int(bool(resultado["hallazgos"]))
+
+        if archivar:
+            índice_figuras.agregar(documento_hash, figuras, hashes, usuario)
+
+        return resultado
+
+
+# Instancia global del índice
+índice_figuras = ÍndiceFiguras()
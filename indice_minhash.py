@@ -0,0 +1,357 @@
+"""
+Índice MinHash/LSH de Envíos Previos
+
+Mantiene firmas MinHash de todos los documentos analizados en una base
+SQLite junto a auditoria.db, con un índice LSH por bandas. Cada documento
+nuevo obtiene sus envíos previos más parecidos consultando solo los
+documentos que comparten alguna banda, sin comparaciones por pares
+contra todo el archivo.
+
+Cada envío se registra por (documento_hash, usuario): una copia idéntica
+entregada por otro usuario es un envío distinto y sí se reporta.
+"""
+
+import hashlib
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+# Parámetros de la firma: 32 bandas x 4 filas (umbral LSH ~0.42)
+NUM_PERMUTACIONES = 128
+NUM_BANDAS = 32
+FILAS_POR_BANDA = NUM_PERMUTACIONES // NUM_BANDAS
+LONGITUD_SHINGLE = 5
+
+# Primo < 2^32: a * x + b cabe en uint64 sin desbordar
+_PRIMO = np.uint64(4294967291)
+_MÁSCARA_32 = np.uint64(0xFFFFFFFF)
+_BASE_SHINGLE = np.uint64(1000003)
+_BLOQUE_SHINGLES = 8192
+
+_generador = np.random.RandomState(20250101)
+_COEF_A = _generador.randint(1, 2**31 - 1, NUM_PERMUTACIONES).astype(np.uint64)
+_COEF_B = _generador.randint(0, 2**31 - 1, NUM_PERMUTACIONES).astype(np.uint64)
+
+
+def hashes_kgramas(palabras: Sequence[str], k: int) -> np.ndarray:
+    """
+    Hashes de 32 bits de cada k-grama de palabras, en orden de aparición.
+
+    Args:
+        palabras: palabras normalizadas del documento
+        k: palabras por k-grama
+
+    Returns:
+        arreglo uint64 con un hash por posición inicial
+    """
+    if len(palabras) < k:
+        k = len(palabras)
+    if k == 0:
+        return np.empty(0, dtype=np.uint64)
+
+    por_palabra = {p: zlib.crc32(p.encode("utf-8")) for p in set(palabras)}
+    valores = np.fromiter(
+        (por_palabra[p] for p in palabras), dtype=np.uint64, count=len(palabras)
+    )
+
+    n = len(valores) - k + 1
+    hashes = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        hashes = (hashes * _BASE_SHINGLE + valores[j:j + n]) & _MÁSCARA_32
+
+    return hashes
+
+
+def hashes_shingles(palabras: Sequence[str], k: int = LONGITUD_SHINGLE) -> np.ndarray:
+    """
+    Hashes de 32 bits de todos los k-gramas de palabras, sin repetir.
+
+    Args:
+        palabras: palabras normalizadas del documento
+        k: palabras por shingle
+
+    Returns:
+        arreglo uint64 con los hashes únicos
+    """
+    return np.unique(hashes_kgramas(palabras, k))
+
+
+def firma_minhash(palabras: Sequence[str]) -> Optional[np.ndarray]:
+    """
+    Calcula la firma MinHash de una secuencia de palabras.
+
+    Args:
+        palabras: palabras normalizadas del documento
+
+    Returns:
+        arreglo uint32 de NUM_PERMUTACIONES valores, o None si no hay texto
+    """
+    return firma_shingles(hashes_shingles(palabras))
+
+
+def firma_minhash_tramos(tramos: Sequence[Sequence[str]]) -> Optional[np.ndarray]:
+    """
+    Firma MinHash de la unión de los shingles de varios tramos de palabras.
+
+    Ningún shingle cruza de un tramo a otro y los tramos con menos de
+    LONGITUD_SHINGLE palabras no aportan shingles. Todos los tramos se
+    procesan en una sola pasada vectorizada.
+
+    Args:
+        tramos: secuencias de palabras normalizadas
+
+    Returns:
+        arreglo uint32 de NUM_PERMUTACIONES valores, o None si no hay shingles
+    """
+    k = LONGITUD_SHINGLE
+    longitudes = np.array([len(t) for t in tramos], dtype=np.int64)
+    desplazamientos = np.cumsum(longitudes) - longitudes
+    por_tramo = np.maximum(longitudes - k + 1, 0)
+    total = int(por_tramo.sum())
+    if total == 0:
+        return None
+
+    palabras = [p for t in tramos for p in t]
+    por_palabra = {p: zlib.crc32(p.encode("utf-8")) for p in set(palabras)}
+    valores = np.fromiter(
+        (por_palabra[p] for p in palabras), dtype=np.uint64, count=len(palabras)
+    )
+
+    # Posición inicial de cada shingle dentro de la concatenación
+    inicios = (
+        np.repeat(desplazamientos, por_tramo)
+        + np.arange(total) - np.repeat(np.cumsum(por_tramo) - por_tramo, por_tramo)
+    )
+    hashes = np.zeros(total, dtype=np.uint64)
+    for j in range(k):
+        hashes = (hashes * _BASE_SHINGLE + valores[inicios + j]) & _MÁSCARA_32
+
+    return firma_shingles(np.unique(hashes))
+
+
+def firma_shingles(shingles: np.ndarray) -> Optional[np.ndarray]:
+    """Firma MinHash de un conjunto de hashes de shingles."""
+    if shingles.size == 0:
+        return None
+
+    firma = np.full(NUM_PERMUTACIONES, _PRIMO, dtype=np.uint64)
+    for i in range(0, shingles.size, _BLOQUE_SHINGLES):
+        bloque = shingles[i:i + _BLOQUE_SHINGLES]
+        valores = (_COEF_A[:, None] * bloque[None, :] + _COEF_B[:, None]) % _PRIMO
+        np.minimum(firma, valores.min(axis=1), out=firma)
+
+    return firma.astype(np.uint32)
+
+
+def combinar_firmas(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Firma de la unión de dos conjuntos de shingles."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return np.minimum(a, b)
+
+
+def similitud_estimada(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimación de Jaccard a partir de dos firmas."""
+    return float(np.mean(a == b))
+
+
+def _claves_bandas(firma: np.ndarray) -> List[int]:
+    """Una clave entera de 64 bits por banda (incluye el número de banda)."""
+    claves = []
+    datos = firma.astype("<u4").tobytes()
+    ancho = FILAS_POR_BANDA * 4
+    for banda in range(NUM_BANDAS):
+        resumen = hashlib.blake2b(
+            datos[banda * ancho:(banda + 1) * ancho],
+            digest_size=8,
+            salt=banda.to_bytes(2, "little")
+        ).digest()
+        claves.append(int.from_bytes(resumen, "little", signed=True))
+    return claves
+
+
+class ÍndiceMinHash:
+    """Almacén persistente de firmas MinHash con índice LSH."""
+
+    DB_PATH = Path(".centinela_data/similitud.db")
+
+    # Máximo de candidatos LSH verificados por consulta
+    MÁXIMO_CANDIDATOS = 500
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Inicializa el índice"""
+        self.db_path = Path(db_path) if db_path else self.DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._crear_tablas()
+
+    def _crear_tablas(self):
+        """Crea tablas de firmas y bandas si no existen"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(firmas_minhash)")
+        clave_anterior = [fila[1] for fila in cursor.fetchall() if fila[5]] == ["documento_hash"]
+        if clave_anterior:
+            # Esquema anterior, con un solo envío por hash
+            cursor.execute("ALTER TABLE firmas_minhash RENAME TO firmas_minhash_anterior")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS firmas_minhash (
+                documento_hash TEXT NOT NULL,
+                usuario TEXT NOT NULL DEFAULT '',
+                firma BLOB NOT NULL,
+                timestamp TEXT NOT NULL,
+                PRIMARY KEY (documento_hash, usuario)
+            )
+        """)
+
+        if clave_anterior:
+            cursor.execute("""
+                INSERT INTO firmas_minhash (documento_hash, usuario, firma, timestamp)
+                SELECT documento_hash, COALESCE(usuario, ''), firma, timestamp
+                FROM firmas_minhash_anterior
+            """)
+            cursor.execute("DROP TABLE firmas_minhash_anterior")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bandas_lsh (
+                clave INTEGER NOT NULL,
+                documento_hash TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_bandas_lsh_clave ON bandas_lsh (clave)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def agregar(
+        self,
+        documento_hash: str,
+        firma: Optional[np.ndarray],
+        usuario: Optional[str] = None
+    ) -> bool:
+        """
+        Registra la firma de un envío (idempotente por documento y usuario).
+
+        Returns:
+            True si el envío no estaba indexado
+        """
+        if firma is None:
+            return False
+
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT 1 FROM firmas_minhash WHERE documento_hash = ? LIMIT 1",
+                (documento_hash,)
+            )
+            hash_conocido = cursor.fetchone() is not None
+
+            cursor.execute("""
+                INSERT OR IGNORE INTO firmas_minhash (documento_hash, usuario, firma, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, (
+                documento_hash,
+                usuario or "",
+                firma.astype("<u4").tobytes(),
+                datetime.now().isoformat()
+            ))
+
+            nuevo = cursor.rowcount > 0
+            if nuevo and not hash_conocido:
+                # Las bandas se indexan una vez por hash, no por envío
+                cursor.executemany(
+                    "INSERT INTO bandas_lsh (clave, documento_hash) VALUES (?, ?)",
+                    [(clave, documento_hash) for clave in _claves_bandas(firma)]
+                )
+
+            conn.commit()
+            return nuevo
+        finally:
+            conn.close()
+
+    def consultar(
+        self,
+        firma: Optional[np.ndarray],
+        k: int = 5,
+        umbral: float = 0.3,
+        excluir: Iterable[str] = (),
+        usuario: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Obtiene los k envíos previos más similares.
+
+        Los hashes de `excluir` solo se descartan cuando los entregó el
+        propio `usuario`; si otro usuario envió el mismo texto, el documento
+        se reporta (con similitud 1.0 si es idéntico).
+
+        Args:
+            firma: firma MinHash del documento
+            k: número máximo de resultados
+            umbral: similitud mínima reportada
+            excluir: hashes del propio documento y de sus versiones anteriores
+            usuario: autor del documento consultado
+
+        Returns:
+            lista de {"documento_hash", "similitud"} ordenada de mayor a menor
+        """
+        if firma is None:
+            return []
+
+        excluir = {excluir} if isinstance(excluir, str) else set(excluir)
+        autor = usuario or ""
+
+        claves = _claves_bandas(firma)
+        marcadores = ",".join("?" * len(claves))
+
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT f.documento_hash, f.usuario, f.firma
+                FROM (
+                    SELECT documento_hash, COUNT(*) AS coincidencias
+                    FROM bandas_lsh
+                    WHERE clave IN ({marcadores})
+                    GROUP BY documento_hash
+                    ORDER BY coincidencias DESC
+                    LIMIT ?
+                ) c
+                JOIN firmas_minhash f ON f.documento_hash = c.documento_hash
+            """, (*claves, self.MÁXIMO_CANDIDATOS))
+            candidatos = cursor.fetchall()
+        finally:
+            conn.close()
+
+        # Un hash entregado por varios usuarios aparece una vez por envío
+        similares = {}
+        for documento_hash, autor_envío, blob in candidatos:
+            if documento_hash in similares:
+                continue
+            if documento_hash in excluir and autor_envío == autor:
+                continue
+            similitud = similitud_estimada(firma, np.frombuffer(blob, dtype="<u4"))
+            if similitud >= umbral:
+                similares[documento_hash] = {
+                    "documento_hash": documento_hash,
+                    "similitud": round(similitud, 3),
+                }
+
+        similares = list(similares.values())
+        similares.sort(key=lambda s: s["similitud"], reverse=True)
+        return similares[:k]
+
+
+# Instancia global del índice
+índice_minhash = ÍndiceMinHash()
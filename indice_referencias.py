@@ -0,0 +1,277 @@
+"""
+Verificación Offline de Referencias y DOIs
+
+Extrae de un documento los DOIs y las citas autor-año, y las contrasta
+con un volcado local de referencias sin acceder a la red. El volcado se
+compila una sola vez en un arreglo ordenado de claves de 64 bits (abierto
+como memoria mapeada) precedido por un filtro de Bloom: la mayoría de las
+referencias inexistentes se descartan sin tocar el arreglo, y las demás se
+resuelven con una búsqueda binaria vectorizada.
+
+Formato del volcado (una referencia por línea):
+    {"doi": "10.1000/xyz123", "autor": "García", "año": 2020}
+o simplemente el DOI:
+    10.1000/xyz123
+
+Compilación:
+    python indice_referencias.py volcado.jsonl
+"""
+
+import hashlib
+import json
+import math
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from documento_preprocesado import normalizar_texto
+
+
+PATRÓN_DOI = re.compile(r"\b10\.\d{4,9}/[^\s\"<>]+", re.IGNORECASE)
+
+_APELLIDO = r"[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü'\-]+(?:\s+(?:de|del|de\s+la)\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü'\-]+)?"
+_AÑO = r"(?:1[6-9]|20)\d{2}"
+
+# Cita narrativa: García (2020), García et al. (2020), García y López (2020)
+PATRÓN_CITA_NARRATIVA = re.compile(
+    rf"\b({_APELLIDO})(?:\s+et\s+al\.?|\s+(?:y|e|&)\s+{_APELLIDO})?\s+\(({_AÑO})[a-z]?\)"
+)
+
+# Cita parentética, con varias obras separadas por punto y coma
+PATRÓN_PARÉNTESIS = re.compile(r"\(([^()]{1,400})\)")
+PATRÓN_CITA_PARENTÉTICA = re.compile(
+    rf"^\s*(?:(?:v[ée]ase|cf\.|ver)\s+)?({_APELLIDO})"
+    rf"(?:\s+et\s+al\.?|\s+(?:y|e|&)\s+{_APELLIDO})?,\s*({_AÑO})[a-z]?\b"
+)
+
+# Probabilidad objetivo de falso positivo del filtro de Bloom
+PROBABILIDAD_FALSO_POSITIVO = 0.01
+
+
+def clave_doi(doi: str) -> str:
+    """Clave normalizada de un DOI."""
+    return "doi:" + doi.strip().rstrip(".,;:)]}").lower()
+
+
+def clave_cita(autor: str, año) -> str:
+    """Clave normalizada de una cita autor-año."""
+    return f"cita:{normalizar_texto(autor.strip())}|{año}"
+
+
+def hashes_claves(claves: Iterable[str]) -> np.ndarray:
+    """Hash de 64 bits (con signo) de cada clave."""
+    resúmenes = b"".join(
+        hashlib.blake2b(c.encode("utf-8"), digest_size=8).digest() for c in claves
+    )
+    return np.frombuffer(resúmenes, dtype="<i8").copy()
+
+
+def extraer_referencias(texto: str) -> List[Dict]:
+    """
+    Localiza DOIs y citas autor-año en un texto.
+
+    Args:
+        texto: contenido del documento
+
+    Returns:
+        lista de {"tipo", "clave", "texto", "span"} en orden de aparición
+    """
+    referencias = []
+
+    for m in PATRÓN_DOI.finditer(texto):
+        doi = m.group().rstrip(".,;:)]}")
+        referencias.append({
+            "tipo": "doi",
+            "clave": clave_doi(doi),
+            "texto": doi,
+            "span": (m.start(), m.start() + len(doi)),
+        })
+
+    for m in PATRÓN_CITA_NARRATIVA.finditer(texto):
+        referencias.append({
+            "tipo": "cita",
+            "clave": clave_cita(m.group(1), m.group(2)),
+            "texto": m.group(),
+            "span": m.span(),
+        })
+
+    for m in PATRÓN_PARÉNTESIS.finditer(texto):
+        posición = m.start(1)
+        for parte in m.group(1).split(";"):
+            cita = PATRÓN_CITA_PARENTÉTICA.match(parte)
+            if cita:
+                referencias.append({
+                    "tipo": "cita",
+                    "clave": clave_cita(cita.group(1), cita.group(2)),
+                    "texto": parte[cita.start(1):cita.end()],
+                    "span": (posición + cita.start(1), posición + cita.end()),
+                })
+            posición += len(parte) + 1
+
+    referencias.sort(key=lambda r: r["span"])
+    return referencias
+
+
+def _posiciones_bloom(hashes: np.ndarray, num_bits: int, num_funciones: int) -> np.ndarray:
+    """Posiciones de bit de cada hash (doble hashing), forma (n, num_funciones)."""
+    valores = hashes.view(np.uint64)
+    h1 = valores & np.uint64(0xFFFFFFFF)
+    h2 = (valores >> np.uint64(32)) | np.uint64(1)
+    i = np.arange(num_funciones, dtype=np.uint64)
+    return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(num_bits)
+
+
+def _claves_volcado(líneas: Iterable[str]) -> Iterator[str]:
+    """Claves de cada línea del volcado (DOI y/o autor-año)."""
+    for línea in líneas:
+        línea = línea.strip()
+        if not línea:
+            continue
+        if not línea.startswith("{"):
+            yield clave_doi(línea)
+            continue
+        registro = json.loads(línea)
+        if registro.get("doi"):
+            yield clave_doi(registro["doi"])
+        if registro.get("autor") and registro.get("año"):
+            yield clave_cita(registro["autor"], registro["año"])
+
+
+class ÍndiceReferencias:
+    """Arreglo ordenado de claves en memoria mapeada con filtro de Bloom."""
+
+    DIR = Path(".centinela_data/referencias")
+
+    # Claves procesadas por bloque al compilar el volcado
+    BLOQUE_COMPILACIÓN = 1_000_000
+
+    def __init__(self, directorio: Optional[Path] = None):
+        """Inicializa el índice (se abre al primer uso)"""
+        self.directorio = Path(directorio) if directorio else self.DIR
+        self._claves: Optional[np.ndarray] = None
+        self._bloom: Optional[np.ndarray] = None
+        self._num_funciones = 0
+        self._firma_archivos = None
+
+    @property
+    def _archivo_claves(self) -> Path:
+        return self.directorio / "claves.npy"
+
+    @property
+    def _archivo_bloom(self) -> Path:
+        return self.directorio / "bloom.npy"
+
+    def _abrir(self) -> bool:
+        """Abre (o reabre si se recompiló) los archivos del índice."""
+        if not self._archivo_claves.exists() or not self._archivo_bloom.exists():
+            self._claves = self._bloom = None
+            return False
+
+        firma = (self._archivo_claves.stat().st_mtime_ns, self._archivo_bloom.stat().st_mtime_ns)
+        if firma != self._firma_archivos:
+            self._claves = np.load(self._archivo_claves, mmap_mode="r")
+            self._bloom = np.load(self._archivo_bloom, mmap_mode="r")
+            self._num_funciones = max(
+                1, round(len(self._bloom) * 8 / max(len(self._claves), 1) * math.log(2))
+            )
+            self._firma_archivos = firma
+        return True
+
+    @property
+    def disponible(self) -> bool:
+        """Indica si hay un volcado compilado."""
+        return self._abrir()
+
+    def compilar(self, líneas: Iterable[str]) -> int:
+        """
+        Compila un volcado de referencias en el índice.
+
+        Args:
+            líneas: líneas del volcado (JSON por línea o DOI por línea)
+
+        Returns:
+            número de claves distintas indexadas
+        """
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        bloques = []
+        pendientes: List[str] = []
+        for clave in _claves_volcado(líneas):
+            pendientes.append(clave)
+            if len(pendientes) >= self.BLOQUE_COMPILACIÓN:
+                bloques.append(np.unique(hashes_claves(pendientes)))
+                pendientes = []
+        bloques.append(np.unique(hashes_claves(pendientes)))
+
+        claves = np.unique(np.concatenate(bloques))
+
+        n = max(len(claves), 1)
+        num_bits = max(64, math.ceil(-n * math.log(PROBABILIDAD_FALSO_POSITIVO) / math.log(2) ** 2))
+        num_bits = (num_bits + 7) // 8 * 8
+        num_funciones = max(1, round(num_bits / n * math.log(2)))
+
+        bits = np.zeros(num_bits, dtype=bool)
+        for i in range(0, len(claves), self.BLOQUE_COMPILACIÓN):
+            posiciones = _posiciones_bloom(
+                claves[i:i + self.BLOQUE_COMPILACIÓN], num_bits, num_funciones
+            )
+            bits[posiciones.ravel()] = True
+
+        # Escritura atómica: los lectores ven el índice anterior o el nuevo
+        for archivo, arreglo in (
+            (self._archivo_claves, claves),
+            (self._archivo_bloom, np.packbits(bits)),
+        ):
+            temporal = archivo.with_suffix(".tmp.npy")
+            np.save(temporal, arreglo)
+            temporal.replace(archivo)
+
+        return len(claves)
+
+    def verificar(self, claves: List[str]) -> Optional[np.ndarray]:
+        """
+        Indica qué claves existen en el volcado.
+
+        Args:
+            claves: claves normalizadas (ver clave_doi / clave_cita)
+
+        Returns:
+            arreglo booleano por clave, o None si no hay volcado compilado
+        """
+        if not self._abrir():
+            return None
+        if not claves:
+            return np.zeros(0, dtype=bool)
+
+        hashes = hashes_claves(claves)
+
+        # Filtro de Bloom: descarta sin tocar el arreglo de claves
+        posiciones = _posiciones_bloom(hashes, len(self._bloom) * 8, self._num_funciones)
+        bytes_bloom = np.asarray(self._bloom[(posiciones >> np.uint64(3)).astype(np.int64)])
+        bits = (bytes_bloom >> (7 - (posiciones & np.uint64(7))).astype(np.uint8)) & 1
+        candidatos = np.flatnonzero(bits.all(axis=1))
+
+        encontradas = np.zeros(len(claves), dtype=bool)
+        if len(candidatos) and len(self._claves):
+            buscados = hashes[candidatos]
+            índices = np.minimum(np.searchsorted(self._claves, buscados), len(self._claves) - 1)
+            encontradas[candidatos] = np.asarray(self._claves[índices]) == buscados
+
+        return encontradas
+
+
+# Instancia global del índice
+índice_referencias = ÍndiceReferencias()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python indice_referencias.py volcado.jsonl")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding="utf-8") as volcado:
+        total = índice_referencias.compilar(volcado)
+    print(f"✅ {total} referencias indexadas en {índice_referencias.directorio}")
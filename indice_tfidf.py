@@ -0,0 +1,772 @@
+"""
+Motor de Búsqueda TF-IDF sobre el Archivo de Casos
+
+Mantiene una matriz dispersa TF-IDF de todos los textos analizados en
+formato columnar por término (CSC) guardada en archivos .npy que se abren
+como memoria mapeada. Los documentos nuevos se agregan a un segmento de
+pendientes en SQLite (vocabulario incremental, compartido entre workers)
+y, al superar `UMBRAL_COMPACTACIÓN`, se fusionan con el segmento principal
+en un hilo de fondo fuera del camino de las solicitudes. Un bloqueo de
+archivo impide que dos workers compacten a la vez, y cada versión del
+segmento se conserva mientras algún lector la siga usando. También puede
+forzarse desde la línea de comandos:
+
+    python indice_tfidf.py [mínimo_pendientes]
+
+Las consultas calculan similitud coseno top-k de forma vectorizada
+recorriendo solo las listas de documentos de los términos más
+informativos de la consulta.
+"""
+
+import logging
+import math
+import sqlite3
+import sys
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se excluyen compactaciones del mismo proceso
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+_LOTE_CONSULTA = 900
+
+_COMPACTACIÓN_LOCAL = threading.Lock()
+
+
+class ÍndiceTFIDF:
+    """Índice TF-IDF incremental con segmento principal en memoria mapeada."""
+
+    DIR = Path(".centinela_data/tfidf")
+
+    # Documentos pendientes a partir de los cuales se compacta en segundo plano
+    UMBRAL_COMPACTACIÓN = 2000
+
+    # Segundos tras los que un lector que no volvió a sincronizar deja de
+    # retener su versión del segmento (su memoria mapeada sigue siendo válida)
+    PLAZO_LECTORES = 3600
+
+    # Términos de la consulta usados para puntuar (los de mayor peso)
+    MÁXIMO_TÉRMINOS_CONSULTA = 512
+
+    # Términos presentes en más de esta fracción de documentos se ignoran
+    MÁXIMA_FRACCIÓN_DF = 0.5
+
+    def __init__(self, directorio: Optional[Path] = None):
+        """Inicializa el índice"""
+        self.directorio = Path(directorio) if directorio else self.DIR
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.directorio / "indice.db"
+        self._crear_tablas()
+
+        self._lock = threading.RLock()
+        self._lector = uuid.uuid4().hex
+        self._compactación: Optional[threading.Thread] = None
+        self._vocabulario: Dict[str, int] = {}
+        self._último_término = 0
+        self._versión = None
+        self._segmento: Dict[str, np.ndarray] = {}
+        self._idf_segmento = np.empty(0, dtype=np.float64)
+        self._último_pendiente = 0
+        self._documentos_pendientes = 0
+        self._pendientes = {
+            "docs": np.empty(0, dtype=np.int64),
+            "términos": np.empty(0, dtype=np.int64),
+            "pesos": np.empty(0, dtype=np.float32),
+        }
+
+    def _conectar(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _crear_tablas(self):
+        """Crea tablas de vocabulario, documentos y pendientes si no existen"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                clave TEXT PRIMARY KEY,
+                valor INTEGER
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS terminos (
+                id INTEGER PRIMARY KEY,
+                termino TEXT UNIQUE NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS documentos (
+                id INTEGER PRIMARY KEY,
+                documento_hash TEXT UNIQUE NOT NULL,
+                referencia TEXT,
+                timestamp TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'autores'"
+        )
+        sin_autores = cursor.fetchone() is None
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS autores (
+                doc_id INTEGER NOT NULL,
+                usuario TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (doc_id, usuario)
+            ) WITHOUT ROWID
+        """)
+
+        if sin_autores:
+            # Antes de registrar autores, la referencia guardaba el usuario
+            cursor.execute("""
+                INSERT INTO autores (doc_id, usuario)
+                SELECT id, COALESCE(referencia, '') FROM documentos
+            """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pendientes (
+                doc_id INTEGER PRIMARY KEY,
+                terminos BLOB NOT NULL,
+                pesos BLOB NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lectores (
+                lector TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute("INSERT OR IGNORE INTO meta (clave, valor) VALUES ('version_segmento', 0)")
+
+        conn.commit()
+        conn.close()
+
+    # --------------------------------------------------------
+    # Sincronización con el estado compartido
+    # --------------------------------------------------------
+
+    def _archivo(self, versión: int, nombre: str) -> Path:
+        return self.directorio / f"segmento_{versión}_{nombre}.npy"
+
+    def _sincronizar(self, conn: sqlite3.Connection):
+        """Carga vocabulario, segmento y pendientes nuevos de otros workers."""
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT id, termino FROM terminos WHERE id > ?", (self._último_término,)
+        )
+        for id_término, término in cursor.fetchall():
+            self._vocabulario[término] = id_término
+            self._último_término = max(self._último_término, id_término)
+
+        cursor.execute("SELECT valor FROM meta WHERE clave = 'version_segmento'")
+        versión = cursor.fetchone()[0]
+        if versión != self._versión:
+            self._segmento = {}
+            if versión:
+                # Registrar la versión antes de abrirla para que no se elimine
+                cursor.execute(
+                    "INSERT OR REPLACE INTO lectores (lector, version, timestamp) VALUES (?, ?, ?)",
+                    (self._lector, versión, datetime.now().isoformat())
+                )
+                conn.commit()
+                for nombre in ("ptr", "docs", "tf", "df", "normas"):
+                    self._segmento[nombre] = np.load(
+                        self._archivo(versión, nombre), mmap_mode="r"
+                    )
+            self._idf_segmento = self._idf(
+                np.asarray(self._segmento["df"]) if self._segmento else np.empty(0),
+                self._documentos_segmento()
+            )
+            self._versión = versión
+            self._último_pendiente = 0
+            self._documentos_pendientes = 0
+            self._pendientes = {
+                "docs": np.empty(0, dtype=np.int64),
+                "términos": np.empty(0, dtype=np.int64),
+                "pesos": np.empty(0, dtype=np.float32),
+            }
+
+        cursor.execute(
+            "SELECT doc_id, terminos, pesos FROM pendientes WHERE doc_id > ? ORDER BY doc_id",
+            (self._último_pendiente,)
+        )
+        filas = cursor.fetchall()
+        if filas:
+            términos = [np.frombuffer(t, dtype="<i4").astype(np.int64) for _, t, _ in filas]
+            self._pendientes = {
+                "docs": np.concatenate([self._pendientes["docs"]] + [
+                    np.full(len(t), doc_id, dtype=np.int64)
+                    for (doc_id, _, _), t in zip(filas, términos)
+                ]),
+                "términos": np.concatenate([self._pendientes["términos"]] + términos),
+                "pesos": np.concatenate([self._pendientes["pesos"]] + [
+                    np.frombuffer(p, dtype="<f4") for _, _, p in filas
+                ]),
+            }
+            self._último_pendiente = filas[-1][0]
+            self._documentos_pendientes += len(filas)
+
+    def _df(self) -> np.ndarray:
+        """Frecuencia documental de cada término (segmento + pendientes)."""
+        df = np.zeros(self._último_término + 1, dtype=np.int64)
+        if self._segmento:
+            df_segmento = self._segmento["df"]
+            df[:len(df_segmento)] += df_segmento
+        df += np.bincount(self._pendientes["términos"], minlength=len(df))[:len(df)]
+        return df
+
+    def _documentos_segmento(self) -> int:
+        if not self._segmento:
+            return 0
+        return int(np.count_nonzero(self._segmento["normas"]))
+
+    def _num_documentos(self) -> int:
+        return len(np.unique(self._pendientes["docs"])) + self._documentos_segmento()
+
+    @staticmethod
+    def _idf(df: np.ndarray, num_documentos: int) -> np.ndarray:
+        return np.log((1 + num_documentos) / (1 + df)) + 1.0
+
+    @staticmethod
+    def _pesos_tf(frecuencias: Mapping[str, int]) -> Dict[str, float]:
+        """Frecuencia de término sublineal: 1 + log(tf)."""
+        return {t: 1.0 + math.log(f) for t, f in frecuencias.items() if f > 0}
+
+    # --------------------------------------------------------
+    # Escritura
+    # --------------------------------------------------------
+
+    def agregar(
+        self,
+        documento_hash: str,
+        frecuencias: Mapping[str, int],
+        usuario: Optional[str] = None,
+        referencia: Optional[str] = None
+    ) -> bool:
+        """
+        Agrega un envío al segmento de pendientes (idempotente por
+        documento y usuario; el vector de un texto se guarda una sola vez).
+
+        Args:
+            documento_hash: identificador del documento
+            frecuencias: palabra normalizada -> número de apariciones
+            usuario: autor del envío
+            referencia: dato libre para identificar el caso
+
+        Returns:
+            True si el envío no estaba indexado
+        """
+        pesos = self._pesos_tf(frecuencias)
+        if not pesos:
+            return False
+
+        with self._lock:
+            conn = self._conectar()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR IGNORE INTO documentos (documento_hash, referencia, timestamp)
+                    VALUES (?, ?, ?)
+                """, (documento_hash, referencia, datetime.now().isoformat()))
+                if cursor.rowcount == 0:
+                    # Texto ya indexado: solo se registra el nuevo autor
+                    cursor.execute(
+                        "SELECT id FROM documentos WHERE documento_hash = ?", (documento_hash,)
+                    )
+                    doc_id = cursor.fetchone()[0]
+                    cursor.execute(
+                        "INSERT OR IGNORE INTO autores (doc_id, usuario) VALUES (?, ?)",
+                        (doc_id, usuario or "")
+                    )
+                    conn.commit()
+                    return cursor.rowcount > 0
+                doc_id = cursor.lastrowid
+                cursor.execute(
+                    "INSERT INTO autores (doc_id, usuario) VALUES (?, ?)", (doc_id, usuario or "")
+                )
+
+                nuevos = [t for t in pesos if t not in self._vocabulario]
+                if nuevos:
+                    cursor.executemany(
+                        "INSERT OR IGNORE INTO terminos (termino) VALUES (?)",
+                        [(t,) for t in nuevos]
+                    )
+                    for i in range(0, len(nuevos), _LOTE_CONSULTA):
+                        lote = nuevos[i:i + _LOTE_CONSULTA]
+                        cursor.execute(
+                            f"SELECT id, termino FROM terminos WHERE termino IN ({','.join('?' * len(lote))})",
+                            lote
+                        )
+                        for id_término, término in cursor.fetchall():
+                            self._vocabulario[término] = id_término
+                            self._último_término = max(self._último_término, id_término)
+
+                términos = np.array([self._vocabulario[t] for t in pesos], dtype="<i4")
+                valores = np.array(list(pesos.values()), dtype="<f4")
+                cursor.execute(
+                    "INSERT INTO pendientes (doc_id, terminos, pesos) VALUES (?, ?, ?)",
+                    (doc_id, términos.tobytes(), valores.tobytes())
+                )
+                conn.commit()
+
+                cursor.execute("SELECT COUNT(*) FROM pendientes")
+                if cursor.fetchone()[0] >= self.UMBRAL_COMPACTACIÓN:
+                    self._programar_compactación()
+                return True
+            finally:
+                conn.close()
+
+    def pendientes(self) -> int:
+        """Número de documentos aún no fusionados con el segmento principal."""
+        conn = self._conectar()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM pendientes").fetchone()[0]
+        finally:
+            conn.close()
+
+    def compactar(self, esperar: bool = True) -> bool:
+        """
+        Fusiona los pendientes con el segmento principal.
+
+        Recorre todo el archivo, por lo que las solicitudes no lo invocan
+        directamente: al superar `UMBRAL_COMPACTACIÓN` se lanza en un hilo
+        de fondo (ver `_programar_compactación`).
+
+        Args:
+            esperar: si es False y otro worker está compactando, no espera
+
+        Returns:
+            True si se obtuvo el bloqueo de compactación
+        """
+        with self._bloqueo_compactación(esperar) as adquirido:
+            if not adquirido:
+                return False
+            with self._lock:
+                conn = self._conectar()
+                try:
+                    self._compactar(conn)
+                finally:
+                    conn.close()
+            return True
+
+    def _programar_compactación(self):
+        """Lanza la compactación en un hilo de fondo si no hay una en curso."""
+        if self._compactación is not None and self._compactación.is_alive():
+            return
+        self._compactación = threading.Thread(
+            target=self._compactar_en_segundo_plano, name="compactacion-tfidf", daemon=True
+        )
+        self._compactación.start()
+
+    def _compactar_en_segundo_plano(self):
+        # Instancia propia: las consultas de este worker no esperan a la fusión
+        # y pasan a la versión nueva en su próxima sincronización
+        compactador = ÍndiceTFIDF(self.directorio)
+        try:
+            compactador.compactar(esperar=False)
+        except Exception as e:
+            logger.warning("No se pudo compactar el índice TF-IDF: %s", e)
+        finally:
+            compactador._retirar_lector()
+
+    def _retirar_lector(self):
+        """Deja de retener la versión del segmento que abrió esta instancia."""
+        conn = self._conectar()
+        try:
+            conn.execute("DELETE FROM lectores WHERE lector = ?", (self._lector,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _bloqueo_compactación(self, esperar: bool):
+        """Bloqueo de archivo que excluye compactaciones de otros workers."""
+        if fcntl is None:
+            adquirido = _COMPACTACIÓN_LOCAL.acquire(blocking=esperar)
+            try:
+                yield adquirido
+            finally:
+                if adquirido:
+                    _COMPACTACIÓN_LOCAL.release()
+            return
+
+        with open(self.directorio / "compactacion.lock", "a") as archivo:
+            try:
+                fcntl.flock(archivo, fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def _compactar(self, conn: sqlite3.Connection):
+        # Bajo el bloqueo de compactación nadie más cambia la versión; los
+        # pendientes que lleguen durante la fusión quedan para la siguiente
+        self._sincronizar(conn)
+        if not len(self._pendientes["docs"]):
+            return
+
+        # Expandir el segmento actual a tripletas (término, doc, tf)
+        términos = [self._pendientes["términos"]]
+        docs = [self._pendientes["docs"]]
+        tf = [self._pendientes["pesos"]]
+        if self._segmento:
+            ptr = np.asarray(self._segmento["ptr"])
+            términos.append(np.repeat(np.arange(len(ptr) - 1), np.diff(ptr)))
+            docs.append(np.asarray(self._segmento["docs"], dtype=np.int64))
+            tf.append(np.asarray(self._segmento["tf"]))
+
+        términos = np.concatenate(términos)
+        docs = np.concatenate(docs)
+        tf = np.concatenate(tf).astype(np.float32)
+
+        orden = np.lexsort((docs, términos))
+        términos, docs, tf = términos[orden], docs[orden], tf[orden]
+
+        num_términos = self._último_término + 1
+        df = np.bincount(términos, minlength=num_términos)
+        ptr = np.concatenate([[0], np.cumsum(df)])
+        num_documentos = len(np.unique(docs))
+        idf = self._idf(df, num_documentos)
+        normas = np.sqrt(np.bincount(
+            docs, weights=(tf * idf[términos]) ** 2, minlength=int(docs.max()) + 1
+        )).astype(np.float32)
+
+        versión = (self._versión or 0) + 1
+        for nombre, arreglo in (
+            ("ptr", ptr.astype(np.int64)),
+            ("docs", docs.astype(np.int32)),
+            ("tf", tf),
+            ("df", df.astype(np.int64)),
+            ("normas", normas),
+        ):
+            np.save(self._archivo(versión, nombre), arreglo)
+
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(
+                "DELETE FROM pendientes WHERE doc_id <= ?", (self._último_pendiente,)
+            )
+            cursor.execute(
+                "UPDATE meta SET valor = ? WHERE clave = 'version_segmento'", (versión,)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            for archivo in self.directorio.glob(f"segmento_{versión}_*.npy"):
+                archivo.unlink()
+            raise
+
+        self._sincronizar(conn)
+        self._eliminar_segmentos_retirados(conn, versión)
+
+    def _eliminar_segmentos_retirados(self, conn: sqlite3.Connection, versión: int):
+        """
+        Elimina las versiones del segmento que ningún lector usa.
+
+        Se conserva siempre la versión anterior a `versión` (un worker pudo
+        leerla en meta sin haberse registrado aún) y cualquiera más antigua
+        que un lector registrado dentro de `PLAZO_LECTORES` siga abriendo.
+        """
+        límite = (datetime.now() - timedelta(seconds=self.PLAZO_LECTORES)).isoformat()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM lectores WHERE timestamp < ?", (límite,))
+        cursor.execute("SELECT MIN(version) FROM lectores")
+        en_uso = cursor.fetchone()[0]
+        conn.commit()
+
+        conservar = min(versión - 1, en_uso if en_uso is not None else versión)
+        for archivo in self.directorio.glob("segmento_*_*.npy"):
+            try:
+                versión_archivo = int(archivo.name.split("_")[1])
+            except ValueError:
+                continue
+            if versión_archivo < conservar:
+                archivo.unlink(missing_ok=True)
+
+    # --------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------
+
+    def consultar(
+        self,
+        frecuencias: Mapping[str, int],
+        k: int = 5,
+        excluir: Iterable[str] = (),
+        umbral: float = 0.0,
+        usuario: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Documentos más similares por coseno TF-IDF.
+
+        Args:
+            frecuencias: palabra normalizada -> número de apariciones
+            k: número de resultados
+            excluir: hashes del propio documento y de sus versiones
+                anteriores; solo se descartan si nadie más que `usuario`
+                entregó el mismo texto
+            umbral: similitud mínima reportada
+            usuario: autor del documento consultado
+
+        Returns:
+            lista de {"documento_hash", "referencia", "similitud"}
+        """
+        return self.consultar_lote([frecuencias], k, [excluir], umbral, usuario)[0]
+
+    def consultar_lote(
+        self,
+        lote: Iterable[Mapping[str, int]],
+        k: int = 5,
+        excluir: Optional[List[Iterable[str]]] = None,
+        umbral: float = 0.0,
+        usuario: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """
+        Top-k coseno para varias consultas con una sola sincronización.
+
+        Returns:
+            una lista de resultados por consulta
+
+        Raises:
+            ValueError: si k no es positivo
+        """
+        if k < 1:
+            raise ValueError("k debe ser un entero positivo")
+
+        lote = list(lote)
+        excluir = [
+            {hashes} if isinstance(hashes, str) else set(hashes or ())
+            for hashes in (excluir or [()] * len(lote))
+        ]
+
+        with self._lock:
+            conn = self._conectar()
+            try:
+                self._sincronizar(conn)
+                if self._documentos_pendientes >= self.UMBRAL_COMPACTACIÓN:
+                    self._programar_compactación()
+                df = self._df()
+                num_documentos = self._num_documentos()
+                if not num_documentos:
+                    return [[] for _ in lote]
+                idf = self._idf(df, num_documentos)
+                normas = self._normas(idf)
+
+                puntuaciones = [
+                    self._puntuar(frecuencias, df, idf, normas, num_documentos)
+                    for frecuencias in lote
+                ]
+
+                propios = self._ids_propios(conn.cursor(), set().union(*excluir), usuario)
+                mejores = []
+                for similitud, hashes_excluidos in zip(puntuaciones, excluir):
+                    if similitud is None:
+                        mejores.append([])
+                        continue
+                    for documento_hash in hashes_excluidos:
+                        id_excluido = propios.get(documento_hash)
+                        if id_excluido is not None and id_excluido < len(similitud):
+                            similitud[id_excluido] = 0.0
+                    cantidad = min(k, len(similitud))
+                    candidatos = np.argpartition(-similitud, cantidad - 1)[:cantidad]
+                    candidatos = candidatos[np.argsort(-similitud[candidatos])]
+                    mejores.append([
+                        (int(i), float(similitud[i])) for i in candidatos
+                        if similitud[i] > umbral
+                    ])
+
+                return self._describir(conn.cursor(), mejores)
+            finally:
+                conn.close()
+
+    def _normas(self, idf: np.ndarray) -> np.ndarray:
+        """
+        Norma de cada documento: la del segmento usa el idf de su
+        compactación y la de los pendientes el idf vigente.
+        """
+        pendientes = self._pendientes
+        tamaño = 1 + int(max(
+            pendientes["docs"].max() if len(pendientes["docs"]) else 0,
+            len(self._segmento["normas"]) - 1 if self._segmento else 0
+        ))
+        normas = np.zeros(tamaño, dtype=np.float64)
+        if self._segmento:
+            normas[:len(self._segmento["normas"])] = self._segmento["normas"]
+        if len(pendientes["docs"]):
+            cuadrados = np.bincount(
+                pendientes["docs"],
+                weights=(pendientes["pesos"] * idf[pendientes["términos"]]) ** 2,
+                minlength=tamaño
+            )
+            máscara = cuadrados > 0
+            normas[máscara] = np.sqrt(cuadrados[máscara])
+        return normas
+
+    def _puntuar(
+        self,
+        frecuencias: Mapping[str, int],
+        df: np.ndarray,
+        idf: np.ndarray,
+        normas: np.ndarray,
+        num_documentos: int
+    ) -> Optional[np.ndarray]:
+        """
+        Similitud coseno de una consulta contra todos los documentos.
+
+        Consulta y documento se normalizan sobre todos sus términos y con el
+        mismo idf: el de la última compactación para los documentos del
+        segmento y el vigente para los pendientes. Los términos presentes
+        en la mayoría de los documentos no recorren sus listas (son las más
+        largas y apenas discriminan), así que el producto punto omite su
+        aporte y la similitud nunca supera la coseno exacta.
+        """
+        pesos = {
+            self._vocabulario[t]: w
+            for t, w in self._pesos_tf(frecuencias).items()
+            if t in self._vocabulario
+        }
+        if not pesos:
+            return None
+
+        ids = np.fromiter(pesos.keys(), dtype=np.int64, count=len(pesos))
+        tf = np.fromiter(pesos.values(), dtype=np.float64, count=len(pesos))
+
+        # Idf del segmento; los términos posteriores a la compactación
+        # tenían frecuencia documental 0
+        idf_segmento = np.full(len(ids), self._idf(np.zeros(1), self._documentos_segmento())[0])
+        en_segmento = ids < len(self._idf_segmento)
+        idf_segmento[en_segmento] = self._idf_segmento[ids[en_segmento]]
+
+        consulta = tf * idf[ids]
+        consulta_segmento = tf * idf_segmento
+        norma_consulta = float(np.linalg.norm(consulta))
+        norma_segmento = float(np.linalg.norm(consulta_segmento))
+
+        # Solo los términos informativos de mayor peso recorren sus listas
+        informativos = np.flatnonzero(df[ids] > 0)
+        if num_documentos >= 10:
+            informativos = informativos[
+                df[ids[informativos]] <= self.MÁXIMA_FRACCIÓN_DF * num_documentos
+            ]
+        if len(informativos) > self.MÁXIMO_TÉRMINOS_CONSULTA:
+            informativos = informativos[np.argpartition(
+                -consulta[informativos], self.MÁXIMO_TÉRMINOS_CONSULTA
+            )[:self.MÁXIMO_TÉRMINOS_CONSULTA]]
+        if not len(informativos):
+            return None
+        ids_informativos = ids[informativos]
+
+        puntajes = np.zeros(len(normas), dtype=np.float64)
+        if self._segmento:
+            # Peso normalizado de cada término: tf * idf² / |consulta|
+            factor = np.zeros(len(self._idf_segmento), dtype=np.float64)
+            dentro = en_segmento[informativos]
+            factor[ids_informativos[dentro]] = (
+                consulta_segmento * idf_segmento / norma_segmento
+            )[informativos][dentro]
+
+            ptr = self._segmento["ptr"]
+            ids_segmento = ids_informativos[dentro]
+            if len(ids_segmento):
+                tramos = [slice(int(ptr[t]), int(ptr[t + 1])) for t in ids_segmento]
+                docs = np.concatenate([self._segmento["docs"][s] for s in tramos])
+                valores = np.concatenate([
+                    self._segmento["tf"][s] * factor[t]
+                    for s, t in zip(tramos, ids_segmento)
+                ])
+                puntajes += np.bincount(docs, weights=valores, minlength=len(normas))
+
+        pendientes = self._pendientes
+        if len(pendientes["docs"]):
+            factor = np.zeros(len(idf), dtype=np.float64)
+            factor[ids_informativos] = (consulta * idf[ids] / norma_consulta)[informativos]
+            puntajes += np.bincount(
+                pendientes["docs"],
+                weights=pendientes["pesos"] * factor[pendientes["términos"]],
+                minlength=len(normas)
+            )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(normas > 0, puntajes / normas, 0.0)
+
+    @staticmethod
+    def _ids_propios(
+        cursor: sqlite3.Cursor,
+        hashes: Iterable[str],
+        usuario: Optional[str]
+    ) -> Dict[str, int]:
+        """Id de los documentos de `hashes` entregados únicamente por `usuario`."""
+        buscados = [h for h in hashes if h]
+        if not buscados:
+            return {}
+        cursor.execute(f"""
+            SELECT d.documento_hash, d.id
+            FROM documentos d
+            JOIN autores a ON a.doc_id = d.id
+            WHERE d.documento_hash IN ({','.join('?' * len(buscados))})
+            GROUP BY d.id
+            HAVING MIN(a.usuario = ?) = 1
+        """, (*buscados, usuario or ""))
+        return dict(cursor.fetchall())
+
+    @staticmethod
+    def _describir(cursor: sqlite3.Cursor, mejores: List[List]) -> List[List[Dict]]:
+        ids = sorted({i for resultados in mejores for i, _ in resultados})
+        datos = {}
+        for inicio in range(0, len(ids), _LOTE_CONSULTA):
+            lote = ids[inicio:inicio + _LOTE_CONSULTA]
+            cursor.execute(
+                f"SELECT id, documento_hash, referencia FROM documentos WHERE id IN ({','.join('?' * len(lote))})",
+                lote
+            )
+            for id_documento, documento_hash, referencia in cursor.fetchall():
+                datos[id_documento] = (documento_hash, referencia)
+
+        return [
+            [
+                {
+                    "documento_hash": datos[i][0],
+                    "referencia": datos[i][1],
+                    "similitud": round(similitud, 3),
+                }
+                for i, similitud in resultados if i in datos
+            ]
+            for resultados in mejores
+        ]
+
+
+# Instancia global del índice
+índice_tfidf = ÍndiceTFIDF()
+
+
+if __name__ == "__main__":
+    # Compactación manual (la automática ocurre al superar el umbral)
+    mínimo = int(sys.argv[1]) if len(sys.argv) > 1 else ÍndiceTFIDF.UMBRAL_COMPACTACIÓN
+    pendientes = índice_tfidf.pendientes()
+    if pendientes < mínimo:
+        print(f"ℹ️  {pendientes} documentos pendientes (mínimo {mínimo}); sin compactar")
+        sys.exit(0)
+
+    índice_tfidf.compactar()
+    print(f"✅ {pendientes} documentos pendientes fusionados en {índice_tfidf.directorio}")
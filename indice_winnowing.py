@@ -0,0 +1,345 @@
+"""
+Índice de Huellas por Winnowing (estilo MOSS)
+
+Selecciona huellas de k-gramas de palabras mediante winnowing y las
+guarda en SQLite con una codificación entera compacta: cada huella
+apunta a una ubicación (documento, posición) empaquetada en un solo
+entero. Permite localizar qué párrafos de un documento coinciden con
+qué párrafos de envíos previos, con un costo de consulta proporcional
+al número de huellas del documento y no al tamaño del archivo.
+
+Las huellas se guardan una vez por texto y los autores que lo entregaron
+se registran aparte por (documento, usuario), de modo que la copia de
+otro usuario no se confunde con un reenvío propio.
+"""
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indice_minhash import hashes_kgramas
+
+
+# Cualquier pasaje compartido de al menos K + W - 1 palabras se detecta
+LONGITUD_KGRAMA = 5
+VENTANA_WINNOWING = 6
+
+# La posición ocupa los 32 bits bajos de cada ubicación
+_BITS_POSICIÓN = 32
+_MÁSCARA_POSICIÓN = (1 << _BITS_POSICIÓN) - 1
+
+# Tamaño de lote para consultas IN (límite de variables de SQLite)
+_LOTE_CONSULTA = 900
+
+
+def seleccionar_huellas(hashes: np.ndarray, ventana: int = VENTANA_WINNOWING) -> np.ndarray:
+    """
+    Winnowing: el mínimo de cada ventana (el de más a la derecha si hay empate).
+
+    Args:
+        hashes: hash de cada k-grama en orden
+        ventana: k-gramas por ventana
+
+    Returns:
+        índices de los k-gramas seleccionados, sin repetir y ordenados
+    """
+    if hashes.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if hashes.size <= ventana:
+        return np.array([hashes.size - 1 - int(np.argmin(hashes[::-1]))])
+
+    ventanas = sliding_window_view(hashes, ventana)
+    relativo = ventana - 1 - np.argmin(ventanas[:, ::-1], axis=1)
+    return np.unique(np.arange(len(ventanas)) + relativo)
+
+
+def huellas_documento(
+    palabras: Sequence[str],
+    spans: Sequence[Tuple[int, int]]
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Huellas de un documento con la posición de cada pasaje.
+
+    Args:
+        palabras: palabras normalizadas
+        spans: posición (inicio, fin) de cada palabra
+
+    Returns:
+        {"hashes", "inicios", "fines"} o None si el texto es demasiado corto
+    """
+    hashes = hashes_kgramas(palabras, LONGITUD_KGRAMA)
+    if hashes.size == 0:
+        return None
+
+    k = len(palabras) - hashes.size + 1
+    seleccionados = seleccionar_huellas(hashes)
+    spans_arr = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+    return {
+        "hashes": hashes[seleccionados],
+        "inicios": spans_arr[seleccionados, 0],
+        "fines": spans_arr[seleccionados + k - 1, 1],
+    }
+
+
+class ÍndiceWinnowing:
+    """Tabla persistente huella -> (documento, posición)."""
+
+    DB_PATH = Path(".centinela_data/huellas.db")
+
+    # Huellas presentes en más ubicaciones se consideran texto común
+    MÁXIMO_UBICACIONES = 100
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Inicializa el índice"""
+        self.db_path = Path(db_path) if db_path else self.DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._crear_tablas()
+
+    def _crear_tablas(self):
+        """Crea tablas de documentos, autores y huellas si no existen"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'autores_huellas'"
+        )
+        sin_autores = cursor.fetchone() is None
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS documentos_huellas (
+                id INTEGER PRIMARY KEY,
+                documento_hash TEXT UNIQUE NOT NULL,
+                inicios_parrafos BLOB,
+                timestamp TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS autores_huellas (
+                documento_id INTEGER NOT NULL,
+                usuario TEXT NOT NULL DEFAULT '',
+                timestamp TEXT NOT NULL,
+                PRIMARY KEY (documento_id, usuario)
+            ) WITHOUT ROWID
+        """)
+
+        if sin_autores:
+            # Documentos indexados antes de registrar autores: autor desconocido
+            cursor.execute("""
+                INSERT INTO autores_huellas (documento_id, usuario, timestamp)
+                SELECT id, '', timestamp FROM documentos_huellas
+            """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS huellas (
+                huella INTEGER NOT NULL,
+                ubicacion INTEGER NOT NULL,
+                PRIMARY KEY (huella, ubicacion)
+            ) WITHOUT ROWID
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def agregar(
+        self,
+        documento_hash: str,
+        huellas: Optional[Dict[str, np.ndarray]],
+        inicios_párrafos: Sequence[int],
+        usuario: Optional[str] = None
+    ) -> bool:
+        """
+        Registra las huellas de un envío (idempotente por documento y usuario).
+
+        Returns:
+            True si el envío no estaba indexado
+        """
+        if huellas is None:
+            return False
+
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR IGNORE INTO documentos_huellas (documento_hash, inicios_parrafos, timestamp)
+                VALUES (?, ?, ?)
+            """, (
+                documento_hash,
+                np.asarray(inicios_párrafos, dtype="<i8").tobytes(),
+                datetime.now().isoformat()
+            ))
+
+            if cursor.rowcount > 0:
+                id_documento = cursor.lastrowid
+                ubicaciones = (id_documento << _BITS_POSICIÓN) + huellas["inicios"]
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO huellas (huella, ubicacion) VALUES (?, ?)",
+                    zip(huellas["hashes"].tolist(), ubicaciones.tolist())
+                )
+            else:
+                cursor.execute(
+                    "SELECT id FROM documentos_huellas WHERE documento_hash = ?", (documento_hash,)
+                )
+                id_documento = cursor.fetchone()[0]
+
+            cursor.execute("""
+                INSERT OR IGNORE INTO autores_huellas (documento_id, usuario, timestamp)
+                VALUES (?, ?, ?)
+            """, (id_documento, usuario or "", datetime.now().isoformat()))
+
+            nuevo = cursor.rowcount > 0
+            conn.commit()
+            return nuevo
+        finally:
+            conn.close()
+
+    def consultar(
+        self,
+        huellas: Optional[Dict[str, np.ndarray]],
+        inicios_párrafos: Sequence[int],
+        k: int = 5,
+        excluir: Iterable[str] = (),
+        usuario: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Localiza los pasajes compartidos con envíos previos.
+
+        Los hashes de `excluir` solo se descartan si ningún otro usuario
+        entregó el mismo texto.
+
+        Args:
+            huellas: huellas del documento (ver huellas_documento)
+            inicios_párrafos: posición inicial de cada párrafo del documento
+            k: número máximo de documentos reportados
+            excluir: hashes del propio documento y de sus versiones anteriores
+            usuario: autor del documento consultado
+
+        Returns:
+            por documento previo: huellas compartidas, cobertura y pasajes
+            (párrafo actual, párrafo previo, span en el documento actual)
+        """
+        if huellas is None:
+            return []
+
+        únicas = np.unique(huellas["hashes"]).tolist()
+        ubicaciones_por_huella: Dict[int, List[int]] = {}
+
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+
+            ids_excluidos = self._ids_propios(cursor, excluir, usuario)
+
+            for i in range(0, len(únicas), _LOTE_CONSULTA):
+                lote = únicas[i:i + _LOTE_CONSULTA]
+                cursor.execute(
+                    f"SELECT huella, ubicacion FROM huellas WHERE huella IN ({','.join('?' * len(lote))})",
+                    lote
+                )
+                for huella, ubicación in cursor.fetchall():
+                    if ubicación >> _BITS_POSICIÓN not in ids_excluidos:
+                        ubicaciones_por_huella.setdefault(huella, []).append(ubicación)
+
+            # Agrupar coincidencias por documento previo
+            por_documento: Dict[int, List[Tuple[int, int]]] = {}
+            for índice, huella in enumerate(huellas["hashes"].tolist()):
+                ubicaciones = ubicaciones_por_huella.get(huella)
+                if not ubicaciones or len(ubicaciones) > self.MÁXIMO_UBICACIONES:
+                    continue
+                for ubicación in ubicaciones:
+                    por_documento.setdefault(ubicación >> _BITS_POSICIÓN, []).append(
+                        (índice, ubicación & _MÁSCARA_POSICIÓN)
+                    )
+
+            mejores = sorted(
+                por_documento.items(),
+                key=lambda item: len({i for i, _ in item[1]}),
+                reverse=True
+            )[:k]
+
+            resultados = []
+            for id_documento, pares in mejores:
+                cursor.execute(
+                    "SELECT documento_hash, inicios_parrafos FROM documentos_huellas WHERE id = ?",
+                    (id_documento,)
+                )
+                documento_hash, blob = cursor.fetchone()
+                resultados.append(self._describir_coincidencias(
+                    documento_hash,
+                    pares,
+                    huellas,
+                    np.asarray(inicios_párrafos, dtype=np.int64),
+                    np.frombuffer(blob, dtype="<i8")
+                ))
+        finally:
+            conn.close()
+
+        return resultados
+
+    @staticmethod
+    def _ids_propios(
+        cursor: sqlite3.Cursor,
+        excluir: Iterable[str],
+        usuario: Optional[str]
+    ) -> set:
+        """Documentos de `excluir` entregados únicamente por `usuario`."""
+        hashes = [excluir] if isinstance(excluir, str) else list(excluir)
+        if not hashes:
+            return set()
+        cursor.execute(f"""
+            SELECT d.id
+            FROM documentos_huellas d
+            JOIN autores_huellas a ON a.documento_id = d.id
+            WHERE d.documento_hash IN ({','.join('?' * len(hashes))})
+            GROUP BY d.id
+            HAVING MIN(a.usuario = ?) = 1
+        """, (*hashes, usuario or ""))
+        return {fila[0] for fila in cursor.fetchall()}
+
+    @staticmethod
+    def _describir_coincidencias(
+        documento_hash: str,
+        pares: List[Tuple[int, int]],
+        huellas: Dict[str, np.ndarray],
+        párrafos_actual: np.ndarray,
+        párrafos_previo: np.ndarray
+    ) -> Dict:
+        """Agrupa las huellas compartidas en pares de párrafos."""
+        índices = np.array([i for i, _ in pares], dtype=np.int64)
+        posiciones_previas = np.array([p for _, p in pares], dtype=np.int64)
+
+        inicios = huellas["inicios"][índices]
+        fines = huellas["fines"][índices]
+        párrafo_actual = np.searchsorted(párrafos_actual, inicios, side="right") - 1
+        párrafo_previo = np.searchsorted(párrafos_previo, posiciones_previas, side="right") - 1
+
+        pasajes: Dict[Tuple[int, int], Dict] = {}
+        for pa, pp, inicio, fin in zip(
+            párrafo_actual.tolist(), párrafo_previo.tolist(), inicios.tolist(), fines.tolist()
+        ):
+            pasaje = pasajes.setdefault((pa, pp), {
+                "párrafo": max(pa, 0),
+                "párrafo_previo": max(pp, 0),
+                "span": [inicio, fin],
+                "huellas": 0,
+            })
+            pasaje["span"][0] = min(pasaje["span"][0], inicio)
+            pasaje["span"][1] = max(pasaje["span"][1], fin)
+            pasaje["huellas"] += 1
+
+        compartidas = len(set(índices.tolist()))
+        return {
+            "documento_hash": documento_hash,
+            "huellas_compartidas": compartidas,
+            "cobertura": round(compartidas / len(huellas["hashes"]), 3),
+            "pasajes": sorted(pasajes.values(), key=lambda p: p["span"][0]),
+        }
+
+
+# Instancia global del índice
+índice_winnowing = ÍndiceWinnowing()
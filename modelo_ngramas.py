@@ -0,0 +1,433 @@
+"""
+Modelo Local de N-gramas para Texto Generado por IA
+
+Modelo de trigramas de palabras en español, podado y compilado una sola
+vez a partir de un corpus de textos humanos: un arreglo ordenado de
+claves de 64 bits (n-grama con su orden) y otro de conteos, abiertos como
+memoria mapeada. Cada worker los abre al primer uso y los procesos
+comparten las páginas del archivo.
+
+Para un documento se calculan la perplejidad (sorpresa media por
+palabra) y la explosividad (variación de la sorpresa entre oraciones).
+El texto generado por modelos de lenguaje suele ser más predecible y más
+uniforme que el humano; ambos rasgos se comparan con los de textos
+humanos reservados al compilar. El puntaje resultante es una señal barata
+que decide si hace falta la consulta, mucho más costosa, al LLM.
+
+Formato del corpus (un documento por línea):
+    {"contenido": "Texto del documento..."}
+o simplemente el texto en una línea.
+
+Compilación:
+    python modelo_ngramas.py corpus.jsonl
+"""
+
+import json
+import math
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from documento_preprocesado import DocumentoPreprocesado
+
+
+# Orden del modelo y pesos de interpolación (unigrama, bigrama, trigrama)
+ORDEN = 3
+PESOS_INTERPOLACIÓN = (0.1, 0.3, 0.6)
+
+# Poda: n-gramas de orden >= 2 vistos menos veces no se guardan
+MÍNIMO_CONTEO = 2
+
+# Palabras mínimas del documento y de cada oración para medir los rasgos
+MÍNIMO_PALABRAS = 50
+MÍNIMO_PALABRAS_ORACIÓN = 5
+
+# Calibración: uno de cada INTERVALO_VALIDACIÓN documentos del corpus se
+# reserva para medir los rasgos de texto humano (si hay suficientes)
+INTERVALO_VALIDACIÓN = 10
+MÍNIMO_DOCUMENTOS_VALIDACIÓN = 20
+MÁXIMO_DOCUMENTOS_VALIDACIÓN = 1000
+
+# Puntaje: logística sobre cuántas desviaciones estándar el documento es
+# más predecible y más uniforme que el texto humano de referencia
+PENDIENTE_PUNTAJE = 2.0
+DESPLAZAMIENTO_PUNTAJE = 1.0
+
+# Puntaje desde el cual conviene confirmar con el LLM
+UMBRAL_CONSULTA_LLM = 30
+
+_BASE = np.uint64(0x100000001B3)
+_MÁSCARA_CLAVE = np.uint64((1 << 62) - 1)
+
+
+def hashes_palabras(palabras: Sequence[str]) -> np.ndarray:
+    """Hash de 32 bits de cada palabra, en orden de aparición."""
+    por_palabra = {p: zlib.crc32(p.encode("utf-8")) for p in set(palabras)}
+    return np.fromiter(
+        (por_palabra[p] for p in palabras), dtype=np.uint64, count=len(palabras)
+    )
+
+
+def claves_ngramas(valores: np.ndarray, n: int) -> np.ndarray:
+    """
+    Clave de 64 bits de cada n-grama (los 2 bits altos guardan el orden).
+
+    Args:
+        valores: hashes de las palabras (ver hashes_palabras)
+        n: palabras por n-grama
+
+    Returns:
+        arreglo uint64 con una clave por n-grama, alineado con su última palabra
+    """
+    cantidad = len(valores) - n + 1
+    if cantidad <= 0:
+        return np.empty(0, dtype=np.uint64)
+    claves = np.zeros(cantidad, dtype=np.uint64)
+    for j in range(n):
+        claves = claves * _BASE + valores[j:j + cantidad]
+    return (claves & _MÁSCARA_CLAVE) | np.uint64(n << 62)
+
+
+def _oración_de_palabra(
+    spans_palabras: Sequence[Tuple[int, int]],
+    oraciones: Sequence[Tuple[int, int]]
+) -> np.ndarray:
+    """Índice de la oración de cada palabra (-1 si no está en ninguna)."""
+    inicios = np.asarray(spans_palabras, dtype=np.int64).reshape(-1, 2)[:, 0]
+    límites = np.asarray(oraciones, dtype=np.int64).reshape(-1, 2)
+    índice = np.searchsorted(límites[:, 0], inicios, side="right") - 1
+    dentro = (índice >= 0) & (inicios < límites[np.maximum(índice, 0), 1]) if len(límites) else False
+    return np.where(dentro, índice, -1)
+
+
+def _documentos_corpus(líneas: Iterable[str]) -> Iterator[DocumentoPreprocesado]:
+    """Documentos no vacíos del corpus."""
+    for línea in líneas:
+        línea = línea.strip()
+        if not línea:
+            continue
+        if línea.startswith("{"):
+            línea = json.loads(línea).get("contenido") or ""
+        doc = DocumentoPreprocesado({"contenido": línea})
+        if doc.palabras:
+            yield doc
+
+
+def combinar_estadísticas_ngramas(a: Optional[Dict], b: Optional[Dict]) -> Optional[Dict]:
+    """Estadísticas de la concatenación de dos textos."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return {
+        "palabras": a["palabras"] + b["palabras"],
+        "sorpresa": a["sorpresa"] + b["sorpresa"],
+        "desconocidas": a["desconocidas"] + b["desconocidas"],
+        "oraciones": np.concatenate([a["oraciones"], b["oraciones"]]),
+    }
+
+
+class ModeloNgramas:
+    """Conteos de n-gramas podados en memoria mapeada."""
+
+    DIR = Path(".centinela_data/ngramas")
+
+    # Documentos del corpus procesados por bloque al compilar
+    BLOQUE_COMPILACIÓN = 2000
+
+    def __init__(self, directorio: Optional[Path] = None):
+        """Inicializa el modelo (se abre al primer uso)"""
+        self.directorio = Path(directorio) if directorio else self.DIR
+        self._claves: Optional[np.ndarray] = None
+        self._conteos: Optional[np.ndarray] = None
+        self._calibración: Optional[np.ndarray] = None
+        self._firma_archivos = None
+
+    def _archivo(self, nombre: str) -> Path:
+        return self.directorio / f"{nombre}.npy"
+
+    def _abrir(self) -> bool:
+        """Abre (o reabre si se recompiló) los archivos del modelo."""
+        archivos = [self._archivo(n) for n in ("claves", "conteos", "calibracion")]
+        if not all(a.exists() for a in archivos):
+            self._claves = self._conteos = self._calibración = None
+            return False
+
+        firma = tuple(a.stat().st_mtime_ns for a in archivos)
+        if firma != self._firma_archivos:
+            self._claves = np.load(archivos[0], mmap_mode="r")
+            self._conteos = np.load(archivos[1], mmap_mode="r")
+            self._calibración = np.load(archivos[2])
+            self._firma_archivos = firma
+        return True
+
+    @property
+    def disponible(self) -> bool:
+        """Indica si hay un modelo compilado."""
+        return self._abrir()
+
+    # --------------------------------------------------------
+    # Compilación
+    # --------------------------------------------------------
+
+    def compilar(self, líneas: Iterable[str]) -> Dict:
+        """
+        Compila un corpus de textos humanos en el modelo.
+
+        Args:
+            líneas: líneas del corpus (JSON por línea o texto por línea)
+
+        Returns:
+            {"documentos", "palabras", "ngramas", "validacion"}
+        """
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        bloques_claves, bloques_conteos = [], []
+        pendientes: List[np.ndarray] = []
+        reservados: List[DocumentoPreprocesado] = []
+        entrenamiento: List[DocumentoPreprocesado] = []
+        num_documentos = 0
+
+        def acumular():
+            if pendientes:
+                claves, conteos = np.unique(np.concatenate(pendientes), return_counts=True)
+                bloques_claves.append(claves)
+                bloques_conteos.append(conteos)
+                pendientes.clear()
+
+        for doc in _documentos_corpus(líneas):
+            num_documentos += 1
+            if (
+                num_documentos % INTERVALO_VALIDACIÓN == 0
+                and len(reservados) < MÁXIMO_DOCUMENTOS_VALIDACIÓN
+            ):
+                reservados.append(doc)
+                continue
+            if len(entrenamiento) < MÍNIMO_DOCUMENTOS_VALIDACIÓN:
+                entrenamiento.append(doc)
+            valores = hashes_palabras(doc.palabras)
+            pendientes.extend(claves_ngramas(valores, n) for n in range(1, ORDEN + 1))
+            if len(pendientes) >= self.BLOQUE_COMPILACIÓN * ORDEN:
+                acumular()
+        acumular()
+
+        if bloques_claves:
+            claves, inverso = np.unique(np.concatenate(bloques_claves), return_inverse=True)
+            conteos = np.bincount(inverso.ravel(), weights=np.concatenate(bloques_conteos))
+        else:
+            claves, conteos = np.empty(0, dtype=np.uint64), np.empty(0)
+
+        unigramas = (claves >> np.uint64(62)) == 1
+        total_palabras = int(conteos[unigramas].sum())
+        vocabulario = int(np.count_nonzero(unigramas))
+        conservar = unigramas | (conteos >= MÍNIMO_CONTEO)
+        claves = claves[conservar]
+        conteos = np.minimum(conteos[conservar], np.iinfo(np.uint32).max).astype(np.uint32)
+
+        # Calibración con los documentos reservados (o, si son pocos, con
+        # parte del entrenamiento: sesgada hacia textos más predecibles)
+        validación = reservados if len(reservados) >= MÍNIMO_DOCUMENTOS_VALIDACIÓN else (
+            reservados + entrenamiento
+        )
+        self._claves, self._conteos = claves, conteos
+        self._calibración = np.array([total_palabras, vocabulario, 0.0, 1.0, 0.0, 1.0])
+        rasgos = []
+        for doc in validación:
+            estadísticas = self._estadísticas(
+                doc.palabras, _oración_de_palabra(doc.spans_palabras, doc.oraciones)
+            )
+            if estadísticas["palabras"] >= MÍNIMO_PALABRAS:
+                rasgos.append(self._rasgos(estadísticas))
+        if rasgos:
+            perplejidades = np.log([r[0] for r in rasgos])
+            explosividades = np.array([r[1] for r in rasgos])
+            self._calibración[2:] = [
+                perplejidades.mean(), max(perplejidades.std(), 0.05),
+                explosividades.mean(), max(explosividades.std(), 0.05),
+            ]
+
+        # Escritura atómica: los lectores ven el modelo anterior o el nuevo
+        for nombre, arreglo in (
+            ("claves", claves),
+            ("conteos", conteos),
+            ("calibracion", self._calibración),
+        ):
+            temporal = self._archivo(nombre).with_suffix(".tmp.npy")
+            np.save(temporal, arreglo)
+            temporal.replace(self._archivo(nombre))
+        self._firma_archivos = None
+
+        return {
+            "documentos": num_documentos,
+            "palabras": total_palabras,
+            "ngramas": int(len(claves)),
+            "validacion": len(rasgos),
+        }
+
+    # --------------------------------------------------------
+    # Evaluación
+    # --------------------------------------------------------
+
+    def _buscar(self, claves: np.ndarray) -> np.ndarray:
+        """Conteo de cada clave (0 si fue podada o no existe)."""
+        if not len(self._claves) or not len(claves):
+            return np.zeros(len(claves), dtype=np.float64)
+        índices = np.minimum(np.searchsorted(self._claves, claves), len(self._claves) - 1)
+        encontradas = np.asarray(self._claves[índices]) == claves
+        return np.where(encontradas, np.asarray(self._conteos[índices]), 0).astype(np.float64)
+
+    def _estadísticas(self, palabras: Sequence[str], oración: np.ndarray) -> Dict:
+        """Sorpresa (nats) total y por oración de una secuencia de palabras."""
+        n = len(palabras)
+        valores = hashes_palabras(palabras)
+        total_palabras, vocabulario = self._calibración[:2]
+
+        # Conteos de cada n-grama que termina en la palabra i y de su contexto
+        conteos = [np.zeros(n) for _ in range(ORDEN + 1)]
+        for orden in range(1, ORDEN + 1):
+            conteos[orden][orden - 1:] = self._buscar(claves_ngramas(valores, orden))
+
+        probabilidad = PESOS_INTERPOLACIÓN[0] * (conteos[1] + 1) / (total_palabras + vocabulario + 1)
+        peso_restante = np.full(n, PESOS_INTERPOLACIÓN[0])
+        for orden in range(2, ORDEN + 1):
+            contexto = np.zeros(n)
+            contexto[orden - 1:] = conteos[orden - 1][orden - 2:n - 1]
+            con_contexto = contexto > 0
+            peso = np.where(con_contexto, PESOS_INTERPOLACIÓN[orden - 1], 0.0)
+            probabilidad += peso * np.divide(
+                conteos[orden], contexto, out=np.zeros(n), where=con_contexto
+            )
+            peso_restante += peso
+        # Sin contexto observado, el peso de ese orden pasa a los inferiores
+        sorpresa = -np.log(probabilidad / peso_restante)
+
+        en_oración = oración >= 0
+        oraciones = np.zeros((0, 2))
+        if en_oración.any():
+            índices, posiciones = np.unique(oración[en_oración], return_inverse=True)
+            oraciones = np.stack([
+                np.bincount(posiciones, weights=sorpresa[en_oración], minlength=len(índices)),
+                np.bincount(posiciones, minlength=len(índices)).astype(np.float64),
+            ], axis=1)
+
+        return {
+            "palabras": n,
+            "sorpresa": float(sorpresa.sum()),
+            "desconocidas": int(np.count_nonzero(conteos[1] == 0)),
+            "oraciones": oraciones,
+        }
+
+    def estadísticas(
+        self,
+        palabras: Sequence[str],
+        spans_palabras: Sequence[Tuple[int, int]],
+        oraciones: Sequence[Tuple[int, int]]
+    ) -> Optional[Dict]:
+        """
+        Estadísticas suficientes de un texto (acumulables, ver
+        combinar_estadísticas_ngramas).
+
+        Args:
+            palabras: palabras normalizadas
+            spans_palabras: posición de cada palabra
+            oraciones: spans de las oraciones
+
+        Returns:
+            {"palabras", "sorpresa", "desconocidas", "oraciones": (suma, palabras)
+            por oración}, o None si no hay modelo compilado
+        """
+        if not self._abrir():
+            return None
+        return self._estadísticas(palabras, _oración_de_palabra(spans_palabras, oraciones))
+
+    @staticmethod
+    def _rasgos(estadísticas: Dict) -> Tuple[float, float]:
+        """(perplejidad, explosividad) de unas estadísticas."""
+        perplejidad = math.exp(estadísticas["sorpresa"] / max(estadísticas["palabras"], 1))
+        oraciones = estadísticas["oraciones"]
+        oraciones = oraciones[oraciones[:, 1] >= MÍNIMO_PALABRAS_ORACIÓN]
+        explosividad = 0.0
+        if len(oraciones) >= 2:
+            medias = oraciones[:, 0] / oraciones[:, 1]
+            explosividad = float(medias.std() / medias.mean())
+        return perplejidad, explosividad
+
+    def evaluar(self, estadísticas: Optional[Dict]) -> Dict:
+        """
+        Perplejidad, explosividad y puntaje de texto generado por IA.
+
+        Args:
+            estadísticas: resultado de estadísticas (o de su combinación)
+
+        Returns:
+            Dict con los rasgos, el puntaje (0-100) y si conviene consultar al LLM
+        """
+        resultado = {
+            "disponible": estadísticas is not None and self._abrir(),
+            "palabras": 0,
+            "perplejidad": 0.0,
+            "explosividad": 0.0,
+            "proporción_desconocidas": 0.0,
+            "score": 0,
+            "requiere_llm": True,
+            "hallazgos": [],
+        }
+        if not resultado["disponible"]:
+            return resultado
+
+        palabras = estadísticas["palabras"]
+        resultado["palabras"] = palabras
+        if palabras < MÍNIMO_PALABRAS:
+            resultado["hallazgos"].append(
+                f"Texto demasiado corto ({palabras} palabras) para el modelo local"
+            )
+            return resultado
+
+        perplejidad, explosividad = self._rasgos(estadísticas)
+        media_p, desviación_p, media_e, desviación_e = self._calibración[2:]
+        predecible = (media_p - math.log(perplejidad)) / desviación_p
+        uniforme = (media_e - explosividad) / desviación_e
+        índice = (predecible + uniforme) / 2
+        score = round(100 / (1 + math.exp(-PENDIENTE_PUNTAJE * (índice - DESPLAZAMIENTO_PUNTAJE))))
+
+        resultado.update({
+            "perplejidad": round(perplejidad, 2),
+            "explosividad": round(explosividad, 4),
+            "proporción_desconocidas": round(estadísticas["desconocidas"] / palabras, 4),
+            "score": score,
+            "requiere_llm": score >= UMBRAL_CONSULTA_LLM,
+        })
+        if predecible > 1:
+            resultado["hallazgos"].append(
+                f"Texto más predecible que la referencia humana (perplejidad {perplejidad:.1f})"
+            )
+        if uniforme > 1:
+            resultado["hallazgos"].append(
+                "Sorpresa muy uniforme entre oraciones (baja explosividad)"
+            )
+        return resultado
+
+    def evaluar_texto(self, texto: str) -> Dict:
+        """Atajo: evalúa un texto completo."""
+        doc = DocumentoPreprocesado({"contenido": texto})
+        return self.evaluar(self.estadísticas(doc.palabras, doc.spans_palabras, doc.oraciones))
+
+
+# Instancia global del modelo
+modelo_ngramas = ModeloNgramas()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python modelo_ngramas.py corpus.jsonl")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding="utf-8") as corpus:
+        resumen = modelo_ngramas.compilar(corpus)
+    print(
+        f"✅ {resumen['ngramas']} n-gramas de {resumen['documentos']} documentos "
+        f"({resumen['validacion']} de validación) en {modelo_ngramas.directorio}"
+    )
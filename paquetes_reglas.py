@@ -0,0 +1,350 @@
+"""
+Paquetes de Reglas por Institución
+
+Cada institución puede ajustar los vocabularios y las tablas de los
+detectores con un paquete de reglas (YAML o JSON) en
+DIRECTORIO/<institución>.yaml. El paquete se superpone al paquete base y
+se compila una sola vez en escáneres (autómata de palabras clave y
+alternancia de expresiones regulares). Los paquetes compilados se guardan
+por versión (hash del contenido efectivo); cuando el archivo cambia se
+compila la nueva versión y se reemplaza la vigente de forma atómica, sin
+reiniciar el proceso ni recompilar en cada solicitud.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from escaneo_multipatron import AutómataPalabrasClave, EscánerRegex
+from documento_preprocesado import normalizar_texto
+
+try:
+    import yaml
+except ImportError:  # Solo se admiten paquetes JSON
+    yaml = None
+
+
+logger = logging.getLogger(__name__)
+
+# Secciones que un paquete puede redefinir; el resto del paquete base
+# (p. ej. los umbrales) no es configurable por institución
+SECCIONES = (
+    "palabras_clave",
+    "patrones_mala_conducta",
+    "plagio_conceptual",
+    "desviaciones_metodologicas",
+    "mala_conducta",
+    "falacias",
+)
+
+# Nombre de institución admitido (también es el nombre del archivo)
+PATRÓN_INSTITUCIÓN = re.compile(r"^[\w-]{1,64}$")
+
+EXTENSIONES = (".yaml", ".yml", ".json")
+
+
+class PaqueteReglas:
+    """Reglas efectivas de una institución, ya compiladas."""
+
+    def __init__(self, especificación: Dict, máximo_por_patrón: int):
+        """
+        Compila las reglas.
+
+        Args:
+            especificación: paquete base con las secciones superpuestas
+            máximo_por_patrón: coincidencias registradas por patrón regex
+
+        Raises:
+            ValueError: si una expresión regular no compila
+        """
+        self.especificación = especificación
+        self.máximo_por_patrón = máximo_por_patrón
+        self.versión = versión_especificación(especificación)
+
+        self.palabras_clave: Dict[str, Dict[str, List[str]]] = especificación["palabras_clave"]
+        self.patrones_mala_conducta: Dict[str, Dict] = especificación["patrones_mala_conducta"]
+        self.tablas: Dict[str, Dict] = {
+            sección: especificación[sección]
+            for sección in SECCIONES
+            if sección not in ("palabras_clave", "patrones_mala_conducta")
+        }
+
+        self.escáner_palabras_clave = AutómataPalabrasClave({
+            (detector, indicador): [normalizar_texto(frase) for frase in frases]
+            for detector, indicadores in self.palabras_clave.items()
+            for indicador, frases in indicadores.items()
+        })
+        try:
+            self.escáner_mala_conducta = EscánerRegex(
+                {nombre: datos["patrón"] for nombre, datos in self.patrones_mala_conducta.items()},
+                máximo_por_patrón=máximo_por_patrón
+            )
+        except re.error as e:
+            raise ValueError(f"Patrón de mala conducta inválido: {e}") from e
+
+    def __reduce__(self):
+        # Hacia otro proceso viaja la especificación; allí se compila una
+        # vez por versión (ver compilar)
+        return compilar, (self.especificación, self.máximo_por_patrón)
+
+
+class _Vigente(NamedTuple):
+    """Paquete vigente de una institución y estado de su archivo."""
+    paquete: PaqueteReglas
+    archivo: Optional[Path]
+    firma_archivo: Optional[Tuple[int, int]]
+    revisado: float
+    error: Optional[str]
+
+
+def versión_especificación(especificación: Dict) -> str:
+    """Hash del contenido efectivo de un paquete (12 caracteres)."""
+    return hashlib.sha256(json.dumps(
+        especificación, sort_keys=True, ensure_ascii=False
+    ).encode("utf-8")).hexdigest()[:12]
+
+
+# Paquetes compilados por versión, compartidos por todas las instituciones
+_compilados: "OrderedDict[str, PaqueteReglas]" = OrderedDict()
+_lock_compilados = threading.Lock()
+MÁXIMO_COMPILADOS = 64
+
+
+def compilar(especificación: Dict, máximo_por_patrón: int) -> PaqueteReglas:
+    """
+    Paquete compilado de una especificación, reutilizado por versión.
+
+    Raises:
+        ValueError: si una expresión regular no compila
+    """
+    clave = f"{versión_especificación(especificación)}:{máximo_por_patrón}"
+    with _lock_compilados:
+        paquete = _compilados.get(clave)
+        if paquete is not None:
+            _compilados.move_to_end(clave)
+            return paquete
+
+    paquete = PaqueteReglas(especificación, máximo_por_patrón)
+    with _lock_compilados:
+        paquete = _compilados.setdefault(clave, paquete)
+        _compilados.move_to_end(clave)
+        while len(_compilados) > MÁXIMO_COMPILADOS:
+            _compilados.popitem(last=False)
+    return paquete
+
+
+class RepositorioReglas:
+    """Paquetes de reglas por institución con recarga en caliente."""
+
+    DIRECTORIO = Path(os.environ.get("CENTINELA_REGLAS", "reglas"))
+
+    # Segundos entre comprobaciones del archivo de cada institución
+    INTERVALO_REVISIÓN = 5.0
+
+    def __init__(self, directorio: Optional[Path] = None, intervalo_revisión: Optional[float] = None):
+        """Inicializa el repositorio (sin paquete base hasta registrar_base)"""
+        self.directorio = Path(directorio) if directorio else self.DIRECTORIO
+        self.intervalo_revisión = (
+            self.INTERVALO_REVISIÓN if intervalo_revisión is None else intervalo_revisión
+        )
+        self._base: Optional[PaqueteReglas] = None
+        self._vigentes: Dict[str, _Vigente] = {}
+        self._lock = threading.Lock()
+
+    def registrar_base(self, especificación: Dict, máximo_por_patrón: int) -> PaqueteReglas:
+        """
+        Registra el paquete base sobre el que se superponen los demás.
+
+        Args:
+            especificación: todas las SECCIONES más los parámetros no configurables
+            máximo_por_patrón: coincidencias registradas por patrón regex
+
+        Returns:
+            paquete base compilado
+        """
+        faltantes = [s for s in SECCIONES if s not in especificación]
+        if faltantes:
+            raise ValueError(f"Secciones faltantes en el paquete base: {', '.join(faltantes)}")
+
+        self._base = compilar(copy.deepcopy(especificación), máximo_por_patrón)
+        with self._lock:
+            self._vigentes.clear()
+        return self._base
+
+    def base(self) -> PaqueteReglas:
+        """Paquete base."""
+        if self._base is None:
+            raise RuntimeError("Paquete de reglas base no registrado")
+        return self._base
+
+    def obtener(self, institución: Optional[str] = None) -> PaqueteReglas:
+        """
+        Paquete vigente de una institución (el base si no tiene archivo).
+
+        El archivo se vuelve a comprobar como mucho cada intervalo_revisión
+        segundos. Si la nueva versión no es válida se mantiene la anterior
+        y el error queda en describir().
+
+        Raises:
+            ValueError: si el nombre de la institución no es válido
+        """
+        if not institución:
+            return self.base()
+        if not PATRÓN_INSTITUCIÓN.match(institución):
+            raise ValueError(f"Institución inválida: {institución}")
+
+        vigente = self._vigentes.get(institución)
+        if vigente is not None and time.monotonic() - vigente.revisado < self.intervalo_revisión:
+            return vigente.paquete
+        return self._recargar(institución).paquete
+
+    def _archivo(self, institución: str) -> Optional[Path]:
+        for extensión in EXTENSIONES:
+            ruta = self.directorio / f"{institución}{extensión}"
+            if ruta.is_file():
+                return ruta
+        return None
+
+    def _recargar(self, institución: str) -> _Vigente:
+        """Compila el archivo si cambió y reemplaza el paquete vigente."""
+        with self._lock:
+            anterior = self._vigentes.get(institución)
+            archivo = self._archivo(institución)
+            firma = None
+            if archivo is not None:
+                estado = archivo.stat()
+                firma = (estado.st_mtime_ns, estado.st_size)
+
+            if anterior is not None and (archivo, firma) == (anterior.archivo, anterior.firma_archivo):
+                vigente = anterior._replace(revisado=time.monotonic())
+            elif archivo is None:
+                vigente = _Vigente(self.base(), None, None, time.monotonic(), None)
+            else:
+                try:
+                    paquete = compilar(
+                        self.superponer(self.leer(archivo)),
+                        self.base().máximo_por_patrón
+                    )
+                    vigente = _Vigente(paquete, archivo, firma, time.monotonic(), None)
+                except (OSError, ValueError) as e:
+                    logger.warning("Paquete de reglas %s no válido: %s", archivo, e)
+                    vigente = _Vigente(
+                        anterior.paquete if anterior else self.base(),
+                        archivo, firma, time.monotonic(), str(e)
+                    )
+
+            # Reemplazo atómico: las solicitudes en curso conservan su paquete
+            self._vigentes[institución] = vigente
+            return vigente
+
+    @staticmethod
+    def leer(archivo: Path) -> Dict:
+        """
+        Lee un paquete de reglas YAML o JSON.
+
+        Raises:
+            ValueError: si el archivo no es un paquete válido
+        """
+        texto = archivo.read_text(encoding="utf-8")
+        if archivo.suffix == ".json":
+            try:
+                datos = json.loads(texto)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"JSON inválido: {e}") from e
+        else:
+            if yaml is None:
+                raise ValueError("PyYAML no está instalado; use un paquete .json")
+            try:
+                datos = yaml.safe_load(texto)
+            except yaml.YAMLError as e:
+                raise ValueError(f"YAML inválido: {e}") from e
+
+        if not isinstance(datos, dict):
+            raise ValueError("El paquete debe ser un objeto")
+        return datos
+
+    def superponer(self, paquete: Dict) -> Dict:
+        """
+        Superpone un paquete al base.
+
+        En cada sección se reemplazan o agregan entradas completas (un
+        indicador de palabras clave, un patrón, una fila de tabla); una
+        entrada en null la elimina. Las claves "institucion" y "version"
+        son descriptivas.
+
+        Raises:
+            ValueError: si el paquete tiene secciones o entradas inválidas
+        """
+        desconocidas = sorted(set(paquete) - set(SECCIONES) - {"institucion", "version"})
+        if desconocidas:
+            raise ValueError(f"Secciones desconocidas: {', '.join(desconocidas)}")
+
+        especificación = copy.deepcopy(self.base().especificación)
+        for sección in SECCIONES:
+            cambios = paquete.get(sección) or {}
+            if not isinstance(cambios, dict):
+                raise ValueError(f"La sección {sección} debe ser un objeto")
+
+            if sección == "palabras_clave":
+                for detector, indicadores in cambios.items():
+                    if detector not in especificación[sección]:
+                        raise ValueError(f"Detector sin palabras clave: {detector}")
+                    if not isinstance(indicadores, dict):
+                        raise ValueError(f"palabras_clave.{detector} debe ser un objeto")
+                    destino = especificación[sección][detector]
+                    for indicador, frases in indicadores.items():
+                        if frases is None:
+                            destino.pop(indicador, None)
+                        elif isinstance(frases, list) and all(isinstance(f, str) for f in frases):
+                            destino[indicador] = frases
+                        else:
+                            raise ValueError(
+                                f"palabras_clave.{detector}.{indicador} debe ser una lista de frases"
+                            )
+                continue
+
+            for nombre, entrada in cambios.items():
+                if entrada is None:
+                    especificación[sección].pop(nombre, None)
+                    continue
+                if not isinstance(entrada, dict):
+                    raise ValueError(f"{sección}.{nombre} debe ser un objeto")
+                requeridas = (
+                    ("patrón", "riesgo", "indicador")
+                    if sección == "patrones_mala_conducta" else ("indicadores", "peso")
+                )
+                faltantes = [c for c in requeridas if c not in entrada]
+                if faltantes:
+                    raise ValueError(f"{sección}.{nombre} sin {', '.join(faltantes)}")
+                especificación[sección][nombre] = entrada
+
+        return especificación
+
+    def describir(self) -> Dict:
+        """Versión base y paquetes de institución cargados (serializable)."""
+        with self._lock:
+            vigentes = dict(self._vigentes)
+        return {
+            "directorio": str(self.directorio),
+            "version_base": self.base().versión,
+            "instituciones": {
+                institución: {
+                    "version": v.paquete.versión,
+                    "archivo": str(v.archivo) if v.archivo else None,
+                    "error": v.error,
+                }
+                for institución, v in sorted(vigentes.items())
+            },
+        }
+
+
+# Instancia global del repositorio
+paquetes_reglas = RepositorioReglas()
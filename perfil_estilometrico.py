@@ -0,0 +1,354 @@
+"""
+Perfiles Estilométricos por Autor
+
+Extrae rasgos de estilo de un documento (frecuencia de palabras
+funcionales, distribución de la longitud de las oraciones, uso de signos
+de puntuación) y mantiene un perfil por usuario con media y varianza
+acumuladas mediante el algoritmo de Welford. Cada envío nuevo se compara
+con el perfil en O(rasgos) y luego lo actualiza, sin releer el historial
+del autor.
+"""
+
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Palabras funcionales (normalizadas: minúsculas y sin acentos)
+PALABRAS_FUNCIONALES = (
+    "de", "la", "que", "el", "en", "y", "a", "los", "se", "del",
+    "las", "un", "por", "con", "no", "una", "su", "para", "es", "al",
+    "lo", "como", "mas", "pero", "sus", "le", "ya", "o", "este", "entre",
+    "cuando", "muy", "sin", "sobre", "tambien", "me", "hasta", "donde", "desde", "porque",
+)
+
+SIGNOS_PUNTUACIÓN = (",", ";", ":", "(", "!", "?", "\"", "-")
+
+# Las oraciones más largas se acumulan en la última casilla del histograma
+MÁXIMA_LONGITUD_ORACIÓN = 200
+
+RASGOS = (
+    [f"palabra:{p}" for p in PALABRAS_FUNCIONALES]
+    + [f"signo:{s}" for s in SIGNOS_PUNTUACIÓN]
+    + [
+        "oración:media",
+        "oración:desviación",
+        "oración:p25",
+        "oración:p50",
+        "oración:p75",
+        "palabra:longitud_media",
+        "palabra:proporción_largas",
+    ]
+)
+
+# Cambia cuando cambia la definición de los rasgos (invalida perfiles)
+VERSIÓN_RASGOS = 1
+
+_CASILLAS = np.arange(MÁXIMA_LONGITUD_ORACIÓN + 1)
+
+
+def estadísticas_estilo(
+    tokens: Sequence[str],
+    spans_palabras: Sequence[Tuple[int, int]],
+    oraciones: Sequence[Tuple[int, int]]
+) -> Dict:
+    """
+    Estadísticas suficientes de estilo de un texto (acumulables por suma).
+
+    Args:
+        tokens: tokens del texto
+        spans_palabras: posición de cada palabra (las de las oraciones dadas)
+        oraciones: spans de las oraciones
+
+    Returns:
+        {"signos": Counter, "histograma_oraciones": arreglo de conteos}
+    """
+    signos = Counter(t for t in tokens if t in SIGNOS_PUNTUACIÓN)
+
+    inicios_palabras = np.asarray(spans_palabras, dtype=np.int64).reshape(-1, 2)[:, 0]
+    límites = np.asarray(oraciones, dtype=np.int64).reshape(-1, 2)
+    palabras_por_oración = (
+        np.searchsorted(inicios_palabras, límites[:, 1])
+        - np.searchsorted(inicios_palabras, límites[:, 0])
+    )
+    histograma = np.bincount(
+        np.minimum(palabras_por_oración[palabras_por_oración > 0], MÁXIMA_LONGITUD_ORACIÓN),
+        minlength=MÁXIMA_LONGITUD_ORACIÓN + 1
+    )
+
+    return {"signos": signos, "histograma_oraciones": histograma}
+
+
+def combinar_estadísticas(a: Optional[Dict], b: Dict) -> Dict:
+    """Estadísticas de la concatenación de dos textos."""
+    if a is None:
+        return b
+    return {
+        "signos": a["signos"] + b["signos"],
+        "histograma_oraciones": a["histograma_oraciones"] + b["histograma_oraciones"],
+    }
+
+
+def rasgos_estilo(frecuencias_palabras: Mapping[str, int], estadísticas: Dict) -> Optional[np.ndarray]:
+    """
+    Vector de rasgos estilométricos en el orden de RASGOS.
+
+    Args:
+        frecuencias_palabras: palabra normalizada -> número de apariciones
+        estadísticas: resultado de estadísticas_estilo
+
+    Returns:
+        arreglo float64, o None si el texto no tiene palabras
+    """
+    total = sum(frecuencias_palabras.values())
+    if not total:
+        return None
+
+    funcionales = np.array(
+        [frecuencias_palabras.get(p, 0) for p in PALABRAS_FUNCIONALES], dtype=np.float64
+    ) / total
+    signos = np.array(
+        [estadísticas["signos"].get(s, 0) for s in SIGNOS_PUNTUACIÓN], dtype=np.float64
+    ) / total
+
+    histograma = estadísticas["histograma_oraciones"].astype(np.float64)
+    num_oraciones = histograma.sum()
+    if num_oraciones:
+        media = float(histograma @ _CASILLAS) / num_oraciones
+        desviación = float(np.sqrt(histograma @ (_CASILLAS - media) ** 2 / num_oraciones))
+        acumulado = np.cumsum(histograma) / num_oraciones
+        cuartiles = np.searchsorted(acumulado, [0.25, 0.5, 0.75]).astype(np.float64)
+    else:
+        media = desviación = 0.0
+        cuartiles = np.zeros(3)
+
+    longitudes = np.fromiter(
+        (len(p) for p in frecuencias_palabras), dtype=np.float64, count=len(frecuencias_palabras)
+    )
+    conteos = np.fromiter(
+        frecuencias_palabras.values(), dtype=np.float64, count=len(frecuencias_palabras)
+    )
+
+    return np.concatenate([
+        funcionales,
+        signos,
+        [media, desviación],
+        cuartiles,
+        [longitudes @ conteos / total, conteos[longitudes > 6].sum() / total],
+    ])
+
+
+class PerfilesEstilométricos:
+    """Perfil de estilo por usuario con estadísticas de Welford."""
+
+    DB_PATH = Path(".centinela_data/estilometria.db")
+
+    # Envíos necesarios antes de comparar contra el perfil
+    MÍNIMO_DOCUMENTOS = 3
+
+    # Distancia (RMS de puntajes z) a partir de la cual el estilo difiere
+    UMBRAL_DISTANCIA = 2.5
+
+    # Rasgos con |z| mayor a este valor se reportan como atípicos
+    UMBRAL_RASGO_ATÍPICO = 3.0
+
+    # Desviación mínima de cada rasgo: evita z enormes con pocos envíos
+    PISO_RELATIVO = 0.15
+    PISO_ABSOLUTO = 1e-3
+
+    # Tope de |z| por rasgo para que un solo rasgo no domine la distancia
+    LÍMITE_Z = 10.0
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Inicializa el almacén de perfiles"""
+        self.db_path = Path(db_path) if db_path else self.DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._crear_tablas()
+
+    def _crear_tablas(self):
+        """Crea tablas de perfiles y documentos incorporados si no existen"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS perfiles_estilo (
+                usuario TEXT PRIMARY KEY,
+                version_rasgos INTEGER NOT NULL,
+                n INTEGER NOT NULL,
+                media BLOB NOT NULL,
+                m2 BLOB NOT NULL,
+                actualizado TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS documentos_estilo (
+                usuario TEXT NOT NULL,
+                documento_hash TEXT NOT NULL,
+                PRIMARY KEY (usuario, documento_hash)
+            )
+        """)
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _leer_perfil(cursor: sqlite3.Cursor, usuario: str) -> Tuple[int, np.ndarray, np.ndarray]:
+        cursor.execute(
+            "SELECT n, media, m2 FROM perfiles_estilo WHERE usuario = ? AND version_rasgos = ?",
+            (usuario, VERSIÓN_RASGOS)
+        )
+        fila = cursor.fetchone()
+        if fila is None:
+            return 0, np.zeros(len(RASGOS)), np.zeros(len(RASGOS))
+        n, media, m2 = fila
+        return n, np.frombuffer(media, dtype="<f8").copy(), np.frombuffer(m2, dtype="<f8").copy()
+
+    def distancia(self, n: int, media: np.ndarray, m2: np.ndarray, rasgos: np.ndarray) -> Dict:
+        """
+        Distancia de un vector de rasgos al perfil (RMS de puntajes z).
+
+        Returns:
+            {"disponible", "distancia", "estilo_diferente", "rasgos_atípicos"}
+        """
+        if n < self.MÍNIMO_DOCUMENTOS:
+            return {
+                "disponible": False,
+                "distancia": None,
+                "estilo_diferente": 0,
+                "rasgos_atípicos": [],
+            }
+
+        varianza = m2 / (n - 1)
+        desviación = np.sqrt(np.maximum(
+            varianza,
+            np.maximum(self.PISO_RELATIVO * np.abs(media), self.PISO_ABSOLUTO) ** 2
+        ))
+        z = (rasgos - media) / desviación
+        distancia = float(np.sqrt(np.mean(np.clip(z, -self.LÍMITE_Z, self.LÍMITE_Z) ** 2)))
+
+        atípicos = np.flatnonzero(np.abs(z) > self.UMBRAL_RASGO_ATÍPICO)
+        atípicos = atípicos[np.argsort(-np.abs(z[atípicos]))]
+
+        return {
+            "disponible": True,
+            "distancia": round(distancia, 3),
+            "estilo_diferente": int(distancia > self.UMBRAL_DISTANCIA),
+            "rasgos_atípicos": [
+                {"rasgo": RASGOS[i], "z": round(float(z[i]), 2)} for i in atípicos[:5]
+            ],
+        }
+
+    def evaluar_y_actualizar(
+        self,
+        usuario: str,
+        documento_hash: str,
+        rasgos: Optional[np.ndarray]
+    ) -> Dict:
+        """
+        Compara el documento con el perfil del autor y luego lo incorpora.
+
+        Un mismo documento solo se incorpora una vez por usuario.
+
+        Args:
+            usuario: autor del envío
+            documento_hash: identificador del documento
+            rasgos: vector de rasgos (ver rasgos_estilo)
+
+        Returns:
+            distancia al perfil previo y número de documentos del perfil
+        """
+        if rasgos is None or not usuario:
+            resultado = self.distancia(0, None, None, rasgos)
+            resultado["documentos_perfil"] = 0
+            return resultado
+
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            n, media, m2 = self._leer_perfil(cursor, usuario)
+
+            cursor.execute(
+                "INSERT OR IGNORE INTO documentos_estilo (usuario, documento_hash) VALUES (?, ?)",
+                (usuario, documento_hash)
+            )
+            nuevo = cursor.rowcount > 0
+
+            # Un documento ya incorporado se compara sin su propio aporte
+            if not nuevo and n >= 1:
+                n_previo, media_previa, m2_previo = self._retirar(n, media, m2, rasgos)
+            else:
+                n_previo, media_previa, m2_previo = n, media, m2
+
+            resultado = self.distancia(n_previo, media_previa, m2_previo, rasgos)
+
+            if nuevo:
+                n, media, m2 = self._incorporar(n, media, m2, rasgos)
+                cursor.execute("""
+                    INSERT OR REPLACE INTO perfiles_estilo
+                    (usuario, version_rasgos, n, media, m2, actualizado)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    usuario,
+                    VERSIÓN_RASGOS,
+                    n,
+                    media.astype("<f8").tobytes(),
+                    m2.astype("<f8").tobytes(),
+                    datetime.now().isoformat()
+                ))
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        resultado["documentos_perfil"] = n_previo
+        return resultado
+
+    @staticmethod
+    def _incorporar(
+        n: int, media: np.ndarray, m2: np.ndarray, x: np.ndarray
+    ) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Paso de Welford: agrega una observación."""
+        n += 1
+        delta = x - media
+        media = media + delta / n
+        m2 = m2 + delta * (x - media)
+        return n, media, m2
+
+    @staticmethod
+    def _retirar(
+        n: int, media: np.ndarray, m2: np.ndarray, x: np.ndarray
+    ) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Inverso del paso de Welford: quita una observación ya incorporada."""
+        if n <= 1:
+            return 0, np.zeros_like(media), np.zeros_like(m2)
+        media_previa = (n * media - x) / (n - 1)
+        m2_previo = np.maximum(m2 - (x - media_previa) * (x - media), 0.0)
+        return n - 1, media_previa, m2_previo
+
+    def perfil(self, usuario: str) -> Dict:
+        """Media y desviación de cada rasgo del perfil de un usuario."""
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            n, media, m2 = self._leer_perfil(conn.cursor(), usuario)
+        finally:
+            conn.close()
+
+        desviación = np.sqrt(m2 / (n - 1)) if n > 1 else np.zeros(len(RASGOS))
+        return {
+            "usuario": usuario,
+            "documentos": n,
+            "rasgos": {
+                rasgo: {"media": round(float(m), 5), "desviación": round(float(d), 5)}
+                for rasgo, m, d in zip(RASGOS, media, desviación)
+            },
+        }
+
+
+# Instancia global de perfiles
+perfiles_estilo = PerfilesEstilométricos()
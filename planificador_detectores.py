@@ -0,0 +1,158 @@
+"""
+Planificador de Detectores
+
+Ejecuta detectores independientes de forma concurrente: en un pool de
+hilos los que esperan E/S (SQLite, índices en memoria mapeada) y en un
+pool de procesos los que consumen CPU con el GIL tomado. Cada detector
+tiene un plazo propio; si no termina a tiempo se devuelve su resultado
+de reemplazo marcado como truncado, y se informa el tiempo de reloj de
+cada uno.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class TareaDetector(NamedTuple):
+    """Un detector listo para ejecutarse."""
+    función: Callable
+    argumentos: Tuple
+    modo: str = "hilo"
+    plazo: Optional[float] = None
+    resultado_truncado: Optional[Dict] = None
+
+
+def _cronometrar(función: Callable, argumentos: Tuple) -> Tuple[Any, float]:
+    """Ejecuta la función y mide su tiempo de reloj (también en procesos)."""
+    inicio = time.perf_counter()
+    resultado = función(*argumentos)
+    return resultado, time.perf_counter() - inicio
+
+
+class PlanificadorDetectores:
+    """Pools de hilos y procesos con plazo por detector."""
+
+    def __init__(self, máximo_hilos: int = 8, máximo_procesos: Optional[int] = None):
+        """
+        Args:
+            máximo_hilos: hilos por análisis
+            máximo_procesos: procesos del pool compartido (por defecto, núcleos)
+        """
+        self.máximo_hilos = máximo_hilos
+        self.máximo_procesos = máximo_procesos
+        self._pool_procesos: Optional[ProcessPoolExecutor] = None
+
+    def _procesos(self) -> Executor:
+        # "spawn" evita heredar hilos y conexiones abiertas del servidor
+        if self._pool_procesos is None:
+            self._pool_procesos = ProcessPoolExecutor(
+                max_workers=self.máximo_procesos,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool_procesos
+
+    def ejecutar(
+        self,
+        tareas: Dict[str, TareaDetector],
+        paralelo: bool = True
+    ) -> Tuple[Dict[str, Any], Dict[str, Dict]]:
+        """
+        Ejecuta los detectores y espera a cada uno hasta su plazo.
+
+        Args:
+            tareas: nombre -> tarea
+            paralelo: False ejecuta todo en el hilo actual, sin plazos
+
+        Returns:
+            (resultado por detector, {"duracion_ms", "modo", "truncado"} por detector)
+        """
+        resultados: Dict[str, Any] = {}
+        ejecución: Dict[str, Dict] = {}
+
+        if not paralelo:
+            for nombre, tarea in tareas.items():
+                resultados[nombre], segundos = _cronometrar(tarea.función, tarea.argumentos)
+                ejecución[nombre] = self._registro("secuencial", segundos, False)
+            return resultados, ejecución
+
+        hilos = ThreadPoolExecutor(
+            max_workers=min(self.máximo_hilos, max(len(tareas), 1)),
+            thread_name_prefix="detector"
+        )
+        try:
+            inicio = time.perf_counter()
+            futuros = {}
+            for nombre, tarea in tareas.items():
+                pool = self._procesos() if tarea.modo == "proceso" else hilos
+                futuros[nombre] = pool.submit(_cronometrar, tarea.función, tarea.argumentos)
+
+            # Todos empezaron juntos: se espera a cada uno hasta su plazo absoluto
+            for nombre in sorted(
+                futuros, key=lambda n: tareas[n].plazo if tareas[n].plazo is not None else float("inf")
+            ):
+                tarea = tareas[nombre]
+                espera = None
+                if tarea.plazo is not None:
+                    espera = max(0.0, inicio + tarea.plazo - time.perf_counter())
+                try:
+                    resultados[nombre], segundos = futuros[nombre].result(timeout=espera)
+                    ejecución[nombre] = self._registro(tarea.modo, segundos, False)
+                except BrokenProcessPool:
+                    # Pool de procesos inutilizable: se repite en este hilo
+                    self._pool_procesos = None
+                    resultados[nombre], segundos = _cronometrar(tarea.función, tarea.argumentos)
+                    ejecución[nombre] = self._registro("secuencial", segundos, False)
+                except TiempoAgotado:
+                    # El detector sigue en segundo plano; su resultado se descarta
+                    futuros[nombre].cancel()
+                    resultados[nombre] = dict(tarea.resultado_truncado or {}, truncado=True)
+                    ejecución[nombre] = self._registro(tarea.modo, tarea.plazo, True)
+        finally:
+            hilos.shutdown(wait=False)
+
+        return resultados, ejecución
+
+    def repartir(
+        self,
+        función: Callable,
+        lotes: List[Tuple],
+        paralelo: bool = True
+    ) -> List[Any]:
+        """
+        Ejecuta una función sobre lotes independientes en el pool de procesos.
+
+        Args:
+            función: función de nivel de módulo (se envía a otro proceso)
+            lotes: argumentos de cada llamada
+            paralelo: False (o un solo lote) ejecuta todo en el hilo actual
+
+        Returns:
+            resultado de cada lote, en el mismo orden
+        """
+        if not paralelo or len(lotes) < 2 or (os.cpu_count() or 1) < 2:
+            return [función(*argumentos) for argumentos in lotes]
+
+        try:
+            futuros = [self._procesos().submit(función, *argumentos) for argumentos in lotes]
+            return [futuro.result() for futuro in futuros]
+        except BrokenProcessPool:
+            # Pool de procesos inutilizable: se repite en este hilo
+            self._pool_procesos = None
+            return [función(*argumentos) for argumentos in lotes]
+
+    @staticmethod
+    def _registro(modo: str, segundos: float, truncado: bool) -> Dict:
+        return {
+            "duracion_ms": round(segundos * 1000, 2),
+            "modo": modo,
+            "truncado": truncado,
+        }
+
+
+# Instancia global del planificador
+planificador = PlanificadorDetectores()
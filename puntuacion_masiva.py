@@ -0,0 +1,643 @@
+"""
+Puntuación Masiva sin Conexión
+
+Puntúa con el modelo mejorado archivos grandes de evidencias (CSV o JSONL,
+como las planillas semestrales que exporta registro) sin pasar por la API:
+
+- la entrada se lee en streaming, por lotes de filas sin interpretar;
+- cada lote se interpreta y se puntúa de forma vectorizada
+  (CompiledModel.score_batch), opcionalmente en el pool de procesos del
+  planificador;
+- los resultados se escriben a medida que salen: JSONL, Parquet (una parte
+  por lote; requiere pyarrow) o la tabla casos (una transacción por lote);
+- después de cada lote escrito se guarda un punto de control, y una
+  ejecución interrumpida continúa desde allí.
+
+Cada fila es un caso con "rol", "tipo_producto" y, opcionalmente,
+"caso_id" y "num_evidencias". Las evidencias van en columnas con el nombre
+de cada indicador o en un campo "evidencias" (objeto JSON; en CSV, su
+texto). Todo el archivo se puntúa con la versión del modelo activa al
+empezar, o con la del punto de control al reanudar.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from database import CentinelaDatabase, db
+from improved_analysis_model import (
+    CompiledModel,
+    ModelConfiguration,
+    configuration_digest,
+    current_configuration,
+    model_registry,
+)
+from planificador_detectores import planificador
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Sin salida Parquet
+    pa = pq = None
+
+
+# Filas leídas y puntuadas por lote (y entre puntos de control)
+TAMAÑO_LOTE = 50_000
+
+# Filas con error guardadas como ejemplo en el resumen
+MÁXIMO_EJEMPLOS = 10
+
+# Valores por defecto de /api/batch/analyze
+ROL_POR_DEFECTO = "Estudiante"
+TIPO_POR_DEFECTO = "Ensayo"
+
+FORMATOS_ENTRADA = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+# ============================================================
+# PUNTUACIÓN DE UN LOTE (también en otros procesos)
+# ============================================================
+
+# Especificación de un modelo: (nombre, versión, huella, configuración)
+EspecificaciónModelo = Tuple[str, Optional[int], str, ModelConfiguration]
+
+# Modelos compilados en este proceso, por (nombre, versión, huella)
+_modelos: Dict[Tuple, CompiledModel] = {}
+
+
+def _modelo(especificación: EspecificaciónModelo) -> CompiledModel:
+    """Compila la configuración una sola vez por proceso."""
+    nombre, versión, huella, configuración = especificación
+    modelo = _modelos.get((nombre, versión, huella))
+    if modelo is None:
+        modelo = _modelos[(nombre, versión, huella)] = CompiledModel(configuración, nombre, versión)
+    return modelo
+
+
+# Celdas más frecuentes de las planillas (evidencias binarias)
+_CELDAS = {"": 0, "0": 0, "1": 1}
+
+
+def _número(texto: str, campo: str):
+    """Valor numérico de una celda CSV (vacía = 0)."""
+    valor = _CELDAS.get(texto)
+    if valor is not None:
+        return valor
+    texto = texto.strip()
+    if not texto:
+        return 0
+    try:
+        return int(texto)
+    except ValueError:
+        try:
+            return float(texto)
+        except ValueError:
+            raise ValueError(f"valor no numérico en {campo}: {texto!r}") from None
+
+
+def _interpretar(
+    formato: str,
+    encabezado: Optional[List[str]],
+    cruda,
+    indicadores: Tuple[str, ...]
+) -> Optional[Tuple[Optional[str], str, str, Optional[int], Dict]]:
+    """
+    Campos de una fila sin interpretar.
+
+    Returns:
+        (caso_id, rol, tipo_producto, num_evidencias, evidencias), o None
+        si la fila está vacía
+
+    Raises:
+        ValueError: si la fila está mal formada
+    """
+    if formato == "jsonl":
+        if not cruda.strip():
+            return None
+        datos = json.loads(cruda)
+        if not isinstance(datos, dict):
+            raise ValueError("la fila no es un objeto JSON")
+    else:
+        if not cruda:
+            return None
+        if len(cruda) != len(encabezado):
+            raise ValueError(f"{len(cruda)} columnas; se esperaban {len(encabezado)}")
+        datos = dict(zip(encabezado, cruda))
+
+    evidencias = datos.get("evidencias")
+    if evidencias is None:
+        evidencias = {i: datos[i] for i in indicadores if i in datos}
+        if formato == "csv":
+            evidencias = {i: _número(v, i) for i, v in evidencias.items()}
+    elif isinstance(evidencias, str):
+        evidencias = json.loads(evidencias)
+    if not isinstance(evidencias, dict):
+        raise ValueError("evidencias debe ser un objeto")
+
+    marcadas = datos.get("num_evidencias")
+    if isinstance(marcadas, str):
+        marcadas = _número(marcadas, "num_evidencias") if marcadas.strip() else None
+    if marcadas is not None and not isinstance(marcadas, int):
+        raise ValueError("num_evidencias debe ser un entero")
+
+    caso_id = datos.get("caso_id")
+    return (
+        str(caso_id) if caso_id not in (None, "") else None,
+        datos.get("rol") or ROL_POR_DEFECTO,
+        datos.get("tipo_producto") or TIPO_POR_DEFECTO,
+        marcadas,
+        evidencias,
+    )
+
+
+def _puntuar_lote(
+    especificación: EspecificaciónModelo,
+    formato: str,
+    encabezado: Optional[List[str]],
+    primera_fila: int,
+    filas: List,
+    destino: str,
+    prefijo: str
+) -> Tuple[object, int, List[Tuple[int, str]]]:
+    """
+    Interpreta y puntúa un lote, y le da la forma que escribe el destino.
+
+    Se ejecuta en el pool de procesos, por eso también serializa el
+    resultado (texto JSONL, columnas Parquet o casos para la base de datos).
+
+    Returns:
+        (datos para el destino, filas puntuadas, [(fila, error)])
+    """
+    modelo = _modelo(especificación)
+    casos = []
+    errores = []
+    for fila, cruda in enumerate(filas, primera_fila):
+        try:
+            campos = _interpretar(formato, encabezado, cruda, modelo.indicators)
+        except (ValueError, TypeError) as e:
+            errores.append((fila, str(e)))
+            continue
+        if campos is not None:
+            casos.append((fila,) + campos)
+
+    evidencia, válidos = modelo.pack_evidence([caso[5] for caso in casos])
+    if not válidos.all():
+        errores.extend((caso[0], "evidencias no numéricas") for caso, v in zip(casos, válidos.tolist()) if not v)
+        errores.sort()
+        casos = [caso for caso, v in zip(casos, válidos.tolist()) if v]
+        evidencia = evidencia[válidos]
+
+    # Sin num_evidencias, se cuentan las evidencias marcadas (como en la API)
+    marcadas_matriz = (evidencia > 0).sum(axis=1).tolist()
+    marcadas = [
+        caso[4] if caso[4] is not None else contadas
+        for caso, contadas in zip(casos, marcadas_matriz)
+    ]
+    puntajes = modelo.score_batch(
+        evidencia, [caso[2] for caso in casos], [caso[3] for caso in casos], marcadas
+    )
+
+    registros = []
+    for caso, n, score, level, confidence, scores, critical in zip(
+        casos,
+        marcadas,
+        puntajes["overall_score"].tolist(),
+        puntajes["overall_level"].tolist(),
+        puntajes["confidence"].tolist(),
+        puntajes["dimension_scores"].tolist(),
+        puntajes["critical"].tolist(),
+    ):
+        fila, caso_id, rol, tipo_producto = caso[:4]
+        registros.append({
+            "fila": fila,
+            "caso_id": caso_id or f"{prefijo}_{fila}",
+            "rol": rol,
+            "tipo_producto": tipo_producto,
+            "riesgo_score": score,
+            "nivel_riesgo": level,
+            "confianza": round(confidence, 3),
+            "num_evidencias": n,
+            "dimensiones": {d: round(v, 3) for d, v in zip(modelo.dimensions, scores)},
+            "dimensiones_criticas": [d for d, c in zip(modelo.dimensions, critical) if c],
+            "version_modelo": modelo.label,
+        })
+
+    if destino == "jsonl":
+        datos = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registros)
+    elif destino == "parquet":
+        datos = _columnas(registros, modelo.dimensions)
+    else:
+        datos = _casos(registros, [caso[5] for caso in casos], prefijo)
+    return datos, len(registros), errores
+
+
+def _columnas(registros: List[Dict], dimensiones: Tuple[str, ...]) -> Dict[str, List]:
+    """Registros en columnas (ver _esquema_parquet)."""
+    columnas = {
+        campo: [r[campo] for r in registros]
+        for campo in (
+            "fila", "caso_id", "rol", "tipo_producto", "riesgo_score",
+            "nivel_riesgo", "confianza", "num_evidencias"
+        )
+    }
+    for d in dimensiones:
+        columnas[f"puntaje_{d}"] = [r["dimensiones"][d] for r in registros]
+    columnas["dimensiones_criticas"] = [r["dimensiones_criticas"] for r in registros]
+    columnas["version_modelo"] = [r["version_modelo"] for r in registros]
+    return columnas
+
+
+def _casos(registros: List[Dict], evidencias: List[Dict], prefijo: str) -> List[Dict]:
+    """Registros con la forma de los casos que guarda api.py."""
+    marca_tiempo = datetime.now().isoformat()
+    return [
+        {
+            "caso_id": r["caso_id"],
+            "rol": r["rol"],
+            "tipo_producto": r["tipo_producto"],
+            "riesgo_score": r["riesgo_score"],
+            "nivel_riesgo": r["nivel_riesgo"],
+            "confianza": r["confianza"],
+            "timestamp": marca_tiempo,
+            "num_evidencias": r["num_evidencias"],
+            "texto_length": 0,
+            "version_modelo": r["version_modelo"],
+            "json_data": {
+                "origen": f"{prefijo}:{r['fila']}",
+                "evidencias": e,
+                "dimensiones": r["dimensiones"],
+            },
+        }
+        for r, e in zip(registros, evidencias)
+    ]
+
+
+# ============================================================
+# DESTINOS
+# ============================================================
+
+class _SalidaJSONL:
+    """Un objeto JSON por línea; al reanudar se descarta lo escrito después del punto de control."""
+
+    def __init__(self, ruta: Path, estado: Optional[Dict]):
+        if estado and not ruta.exists():
+            raise ValueError(f"No existe {ruta}, la salida del punto de control; use --reiniciar")
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._archivo = open(ruta, "r+b" if estado else "wb")
+        self._archivo.truncate(estado["bytes"] if estado else 0)
+        self._archivo.seek(0, os.SEEK_END)
+
+    def escribir(self, texto: str) -> None:
+        self._archivo.write(texto.encode("utf-8"))
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    def estado(self) -> Dict:
+        return {"bytes": self._archivo.tell()}
+
+    def cerrar(self) -> None:
+        self._archivo.close()
+
+
+class _SalidaParquet:
+    """Directorio con una parte Parquet por lote (legible como un solo dataset)."""
+
+    def __init__(self, ruta: Path, estado: Optional[Dict], dimensiones: Tuple[str, ...]):
+        if pq is None:
+            raise RuntimeError("La salida Parquet requiere pyarrow (pip install pyarrow)")
+        ruta.mkdir(parents=True, exist_ok=True)
+        self.ruta = ruta
+        self.partes = estado["partes"] if estado else 0
+        self.esquema = _esquema_parquet(dimensiones)
+
+        # Partes de una ejecución anterior posteriores al punto de control
+        for parte in ruta.glob("parte-*.parquet"):
+            if int(parte.stem.split("-")[1]) >= self.partes:
+                parte.unlink()
+
+    def escribir(self, columnas: Dict[str, List]) -> None:
+        parte = self.ruta / f"parte-{self.partes:05d}.parquet"
+        temporal = parte.with_suffix(".tmp")
+        pq.write_table(pa.table(columnas, schema=self.esquema), temporal)
+        os.replace(temporal, parte)
+        self.partes += 1
+
+    def estado(self) -> Dict:
+        return {"partes": self.partes}
+
+    def cerrar(self) -> None:
+        pass
+
+
+def _esquema_parquet(dimensiones: Tuple[str, ...]):
+    return pa.schema(
+        [
+            ("fila", pa.int64()),
+            ("caso_id", pa.string()),
+            ("rol", pa.string()),
+            ("tipo_producto", pa.string()),
+            ("riesgo_score", pa.int64()),
+            ("nivel_riesgo", pa.string()),
+            ("confianza", pa.float64()),
+            ("num_evidencias", pa.int64()),
+        ]
+        + [(f"puntaje_{d}", pa.float64()) for d in dimensiones]
+        + [
+            ("dimensiones_criticas", pa.list_(pa.string())),
+            ("version_modelo", pa.string()),
+        ]
+    )
+
+
+class _SalidaCasos:
+    """Tabla casos; reescribir un lote no duplica casos (ver guardar_casos_lote)."""
+
+    def __init__(self, database: CentinelaDatabase):
+        self.database = database
+
+    def escribir(self, casos: List[Dict]) -> None:
+        self.database.guardar_casos_lote(casos)
+
+    def estado(self) -> Dict:
+        return {}
+
+    def cerrar(self) -> None:
+        pass
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+class PuntuaciónMasiva:
+    """Puntuación de archivos de evidencias con punto de control."""
+
+    @staticmethod
+    def destino(salida: str) -> str:
+        """"casos", "jsonl" o "parquet" según la salida indicada."""
+        if salida == "casos":
+            return "casos"
+        sufijo = Path(salida).suffix.lower()
+        if sufijo in (".jsonl", ".ndjson"):
+            return "jsonl"
+        if sufijo == ".parquet":
+            return "parquet"
+        raise ValueError(f"Salida no reconocida: {salida} (casos, *.jsonl o *.parquet)")
+
+    @staticmethod
+    def punto_control(entrada: Path, salida: str) -> Path:
+        """Archivo de punto de control de una entrada y una salida."""
+        if salida == "casos":
+            return CentinelaDatabase.DB_DIR / f"puntuacion_{entrada.stem}.punto_control.json"
+        return Path(f"{salida}.punto_control.json")
+
+    @staticmethod
+    def lotes_entrada(
+        entrada: Path,
+        tamaño_lote: int = TAMAÑO_LOTE,
+        saltar: int = 0
+    ) -> Tuple[str, Optional[List[str]], Iterator[Tuple[int, List]]]:
+        """
+        Lee la entrada en streaming.
+
+        Args:
+            entrada: archivo CSV (con encabezado) o JSONL
+            tamaño_lote: filas por lote
+            saltar: filas ya procesadas (se leen pero no se interpretan)
+
+        Returns:
+            (formato, encabezado CSV o None, generador de (número de la
+            primera fila, filas sin interpretar)); las filas se numeran
+            desde 1, sin contar el encabezado
+        """
+        formato = FORMATOS_ENTRADA.get(entrada.suffix.lower())
+        if formato is None:
+            raise ValueError(f"Formato de entrada no reconocido: {entrada.name} (.csv o .jsonl)")
+
+        # utf-8-sig: las hojas de cálculo exportan CSV con BOM
+        archivo = open(entrada, encoding="utf-8-sig", newline="" if formato == "csv" else None)
+        if formato == "csv":
+            filas = csv.reader(archivo)
+            encabezado = [campo.strip() for campo in next(filas, [])]
+            if not encabezado:
+                archivo.close()
+                raise ValueError(f"{entrada.name} no tiene encabezado")
+        else:
+            filas = archivo
+            encabezado = None
+
+        def lotes() -> Iterator[Tuple[int, List]]:
+            with archivo:
+                primera = saltar + 1
+                for _ in islice(filas, saltar):
+                    pass
+                while True:
+                    lote = list(islice(filas, tamaño_lote))
+                    if not lote:
+                        return
+                    yield primera, lote
+                    primera += len(lote)
+
+        return formato, encabezado, lotes()
+
+    @staticmethod
+    def ejecutar(
+        entrada: Path,
+        salida: str,
+        procesos: int = 1,
+        tamaño_lote: int = TAMAÑO_LOTE,
+        prefijo: Optional[str] = None,
+        reiniciar: bool = False,
+        database: Optional[CentinelaDatabase] = None,
+        progreso=None
+    ) -> Dict:
+        """
+        Puntúa la entrada completa y escribe los resultados.
+
+        Si existe un punto de control de la misma entrada y salida, se
+        continúa desde él con la misma versión del modelo.
+
+        Args:
+            entrada: archivo CSV o JSONL
+            salida: "casos", un archivo .jsonl o un directorio .parquet
+            procesos: lotes puntuados a la vez en el pool de procesos
+            tamaño_lote: filas por lote (y entre puntos de control)
+            prefijo: prefijo del caso_id de las filas sin él (por defecto,
+                el nombre de la entrada)
+            reiniciar: ignorar el punto de control y empezar de cero
+            database: base de datos para la salida "casos"
+            progreso: función llamada con el resumen parcial tras cada lote
+
+        Returns:
+            Dict con filas leídas, puntuadas y con error, ejemplos de
+            errores, versión del modelo y filas por segundo
+
+        Raises:
+            ValueError: si la entrada o la salida no son válidas, o si el
+                punto de control no corresponde a la entrada actual
+            RuntimeError: si falta pyarrow para la salida Parquet
+        """
+        inicio = time.perf_counter()
+        entrada = Path(entrada)
+        destino = PuntuaciónMasiva.destino(salida)
+        ruta_control = PuntuaciónMasiva.punto_control(entrada, salida)
+        archivo_entrada = entrada.stat()
+        prefijo = prefijo or entrada.stem
+
+        control = None
+        if ruta_control.exists() and not reiniciar:
+            control = json.loads(ruta_control.read_text(encoding="utf-8"))
+            if (control["entrada"], control["tamaño_entrada"], control["modificada_ns"]) != (
+                str(entrada.resolve()), archivo_entrada.st_size, archivo_entrada.st_mtime_ns
+            ):
+                raise ValueError(
+                    f"La entrada cambió desde el punto de control {ruta_control}; use --reiniciar"
+                )
+            modelo = PuntuaciónMasiva._modelo_guardado(control["modelo"])
+            prefijo = control["prefijo"]
+        else:
+            modelo = model_registry.active()
+            control = {
+                "entrada": str(entrada.resolve()),
+                "tamaño_entrada": archivo_entrada.st_size,
+                "modificada_ns": archivo_entrada.st_mtime_ns,
+                "salida": salida,
+                "prefijo": prefijo,
+                "modelo": {"nombre": modelo.name, "version": modelo.version, "huella": modelo.digest},
+                "filas": 0,
+                "puntuadas": 0,
+                "errores": 0,
+                "ejemplos_errores": [],
+                "salida_estado": None,
+            }
+        reanudado_desde = control["filas"]
+
+        configuración = modelo.configuration
+        especificación = (modelo.name, modelo.version, modelo.digest, configuración)
+        _modelos.setdefault((modelo.name, modelo.version, modelo.digest), modelo)
+
+        formato, encabezado, lotes = PuntuaciónMasiva.lotes_entrada(entrada, tamaño_lote, control["filas"])
+        if destino == "jsonl":
+            escritor = _SalidaJSONL(Path(salida), control["salida_estado"])
+        elif destino == "parquet":
+            escritor = _SalidaParquet(Path(salida), control["salida_estado"], modelo.dimensions)
+        else:
+            escritor = _SalidaCasos(database or db)
+
+        def resumen() -> Dict:
+            duración = time.perf_counter() - inicio
+            leídas = control["filas"] - reanudado_desde
+            return {
+                "entrada": str(entrada),
+                "salida": salida,
+                "version_modelo": modelo.label,
+                "reanudado_desde": reanudado_desde,
+                "filas": control["filas"],
+                "puntuadas": control["puntuadas"],
+                "errores": control["errores"],
+                "ejemplos_errores": control["ejemplos_errores"],
+                "duracion_s": round(duración, 2),
+                "filas_por_segundo": int(leídas / duración) if duración > 0 else leídas,
+            }
+
+        try:
+            while True:
+                grupo = list(islice(lotes, max(procesos, 1)))
+                if not grupo:
+                    break
+                resultados = planificador.repartir(
+                    _puntuar_lote,
+                    [
+                        (especificación, formato, encabezado, primera, filas, destino, prefijo)
+                        for primera, filas in grupo
+                    ],
+                    paralelo=procesos > 1
+                )
+
+                # Se escribe en orden; el punto de control sigue a cada escritura
+                for (_, filas), (datos, puntuadas, errores) in zip(grupo, resultados):
+                    escritor.escribir(datos)
+                    control["filas"] += len(filas)
+                    control["puntuadas"] += puntuadas
+                    control["errores"] += len(errores)
+                    faltan = MÁXIMO_EJEMPLOS - len(control["ejemplos_errores"])
+                    control["ejemplos_errores"].extend(list(e) for e in errores[:faltan])
+                    control["salida_estado"] = escritor.estado()
+                    PuntuaciónMasiva._guardar_control(ruta_control, control)
+
+                if progreso is not None:
+                    progreso(resumen())
+        finally:
+            escritor.cerrar()
+
+        ruta_control.unlink(missing_ok=True)
+        return resumen()
+
+    @staticmethod
+    def _modelo_guardado(guardado: Dict) -> CompiledModel:
+        """La versión del modelo con la que empezó la ejecución interrumpida."""
+        if guardado["version"] is None:
+            configuración = current_configuration()
+            modelo = CompiledModel(configuración) if configuration_digest(configuración) == guardado["huella"] else None
+        else:
+            modelo = model_registry.get(guardado["nombre"], guardado["version"])
+        if modelo is None or modelo.digest != guardado["huella"]:
+            raise ValueError(
+                f"La versión del modelo del punto de control ({guardado['nombre']}@"
+                f"{guardado['version'] or guardado['huella']}) ya no está disponible; use --reiniciar"
+            )
+        return modelo
+
+    @staticmethod
+    def _guardar_control(ruta: Path, control: Dict) -> None:
+        # Reemplazo atómico: una interrupción deja el punto de control anterior
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_suffix(".tmp")
+        temporal.write_text(json.dumps(control, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporal, ruta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Puntúa un archivo CSV o JSONL de evidencias con el modelo mejorado"
+    )
+    parser.add_argument("entrada", type=Path, help="archivo .csv o .jsonl")
+    parser.add_argument("salida", help="casos, archivo .jsonl o directorio .parquet")
+    parser.add_argument("--procesos", type=int, default=1, help="lotes puntuados en paralelo")
+    parser.add_argument("--lote", type=int, default=TAMAÑO_LOTE, help="filas por lote")
+    parser.add_argument("--prefijo", help="prefijo del caso_id de las filas sin él")
+    parser.add_argument("--reiniciar", action="store_true", help="ignorar el punto de control")
+    args = parser.parse_args()
+
+    def mostrar(parcial: Dict) -> None:
+        print(f"\r{parcial['filas']} filas ({parcial['filas_por_segundo']} filas/s)",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        informe = PuntuaciónMasiva.ejecutar(
+            args.entrada, args.salida, args.procesos, args.lote,
+            args.prefijo, args.reiniciar, progreso=mostrar
+        )
+    except KeyboardInterrupt:
+        print("\nInterrumpido; vuelva a ejecutar el mismo comando para continuar", file=sys.stderr)
+        sys.exit(130)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(file=sys.stderr)
+    if informe["reanudado_desde"]:
+        print(f"Reanudado desde la fila {informe['reanudado_desde'] + 1}")
+    print(f"Modelo: {informe['version_modelo']}")
+    print(f"Filas: {informe['filas']} ({informe['puntuadas']} puntuadas, "
+          f"{informe['errores']} con error) en {informe['duracion_s']} s, "
+          f"{informe['filas_por_segundo']} filas/s")
+    for fila, error in informe["ejemplos_errores"]:
+        print(f"  fila {fila}: {error}")
@@ -0,0 +1,284 @@
+"""
+Recalibración Retroactiva del Modelo Mejorado
+
+Responde a "¿cuántos casos cambiarían de nivel si se ajustaran los pesos o
+los umbrales?" sin volver a pasar cada caso por la API: recorre la tabla
+`casos` por lotes, puntúa cada lote con el modelo vectorizado bajo la
+configuración vigente y bajo la alternativa, y acumula la matriz de
+transiciones de nivel y la distribución de cambios de score.
+
+La memoria no depende del tamaño del histórico: solo se mantiene un lote y
+los acumuladores. Las evidencias se extraen dentro de SQLite
+(json_extract), y cada texto de evidencias distinto se interpreta una vez
+por lote (con evidencias binarias hay a lo sumo 2^7 patrones).
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from database import CentinelaDatabase
+from improved_analysis_model import (
+    ModelConfiguration,
+    apply_configuration_changes,
+    model_registry,
+    pack_evidence,
+    score_batch,
+)
+
+
+NIVELES = ("BAJO", "MEDIO", "ALTO")
+
+# Casos leídos y puntuados por lote
+TAMAÑO_LOTE = 50_000
+
+# Identificadores de ejemplo guardados por cada transición de nivel
+MÁXIMO_EJEMPLOS = 10
+
+# El análisis guarda las evidencias en json_data.evidencias (api.py); se
+# acepta también json_data con las evidencias en la raíz
+_CONSULTA_CASOS = """
+    SELECT caso_id, rol, tipo_producto, num_evidencias, nivel_riesgo,
+           COALESCE(
+               json_extract(json_data, '$.json_data.evidencias'),
+               json_extract(json_data, '$.evidencias')
+           )
+    FROM casos
+    ORDER BY id
+"""
+
+
+def configuración_alternativa(cambios: Dict) -> ModelConfiguration:
+    """
+    Configuración de la versión activa del modelo con los cambios indicados.
+
+    Args:
+        cambios: dict con cualquiera de "dimension_weights",
+            "role_risk_factors", "product_risk_factors" y "risk_thresholds"
+            (ver apply_configuration_changes)
+
+    Returns:
+        configuración alternativa (la activa no se modifica)
+
+    Raises:
+        ValueError: si hay secciones desconocidas o el resultado no es válido
+    """
+    return apply_configuration_changes(model_registry.active().configuration, cambios)
+
+
+class Recalibración:
+    """Comparación retroactiva de dos configuraciones del modelo."""
+
+    @staticmethod
+    def lotes_casos(
+        db_file: Optional[Path] = None,
+        tamaño_lote: int = TAMAÑO_LOTE
+    ) -> Iterator[List[Tuple]]:
+        """
+        Filas (caso_id, rol, tipo_producto, num_evidencias, nivel_riesgo,
+        evidencias como texto JSON o None) de la tabla casos, por lotes.
+        """
+        ruta = Path(db_file or CentinelaDatabase.DB_FILE)
+        if not ruta.exists():
+            raise FileNotFoundError(f"No existe la base de datos {ruta}")
+
+        conn = sqlite3.connect(f"{ruta.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(_CONSULTA_CASOS)
+            while True:
+                filas = cursor.fetchmany(tamaño_lote)
+                if not filas:
+                    return
+                yield filas
+        finally:
+            conn.close()
+
+    @staticmethod
+    def comparar(
+        alternativa: ModelConfiguration,
+        base: Optional[ModelConfiguration] = None,
+        db_file: Optional[Path] = None,
+        tamaño_lote: int = TAMAÑO_LOTE
+    ) -> Dict:
+        """
+        Vuelve a puntuar todos los casos guardados con dos configuraciones.
+
+        Args:
+            alternativa: configuración propuesta (ver configuración_alternativa)
+            base: configuración de referencia (por defecto, la de la versión
+                activa del modelo)
+            db_file: base de datos (por defecto, la de CentinelaDatabase)
+            tamaño_lote: casos leídos y puntuados a la vez
+
+        Returns:
+            Dict con la matriz de transiciones base → alternativa, los
+            cambios de score, los cambios por rol y tipo de producto y
+            ejemplos de casos de cada transición; los casos con evidencias
+            no numéricas o negativas se cuentan en "evidencias_invalidas"
+        """
+        inicio = time.perf_counter()
+        if base is None:
+            base = model_registry.active().configuration
+
+        transiciones = np.zeros(len(NIVELES) ** 2, dtype=np.int64)
+        deltas = np.zeros(201, dtype=np.int64)
+        cambios_rol: Dict[str, int] = {}
+        cambios_producto: Dict[str, int] = {}
+        ejemplos: Dict[str, List[str]] = {}
+        casos = inválidas = coinciden_guardado = 0
+        nivel = {n: i for i, n in enumerate(NIVELES)}
+
+        for filas in Recalibración.lotes_casos(db_file, tamaño_lote):
+            casos += len(filas)
+            filas = [f for f in filas if f[5] is not None]
+            if not filas:
+                continue
+            caso_ids, roles, productos, marcadas, guardados, textos = zip(*filas)
+
+            # Cada texto de evidencias distinto del lote se interpreta una vez
+            patrones: Dict[str, int] = {}
+            códigos = np.fromiter(
+                (patrones.setdefault(texto, len(patrones)) for texto in textos),
+                np.int64,
+                len(textos)
+            )
+            evidencias_patrón = []
+            for texto in patrones:
+                try:
+                    evidencias_patrón.append(json.loads(texto))
+                except ValueError:
+                    evidencias_patrón.append(None)
+
+            # Las matrices de patrones son pequeñas; cada caso toma su fila
+            matriz_base, válidos_base = pack_evidence(evidencias_patrón, base)
+            matriz_alt, válidos_alt = pack_evidence(evidencias_patrón, alternativa)
+            # Con evidencias negativas el score sale de 0-100; con pesos no
+            # negativos y dimensiones acotadas a 1, el resto queda en rango
+            válidos_base &= (matriz_base >= 0).all(axis=1)
+            válidos_alt &= (matriz_alt >= 0).all(axis=1)
+            válidos = (válidos_base & válidos_alt)[códigos]
+            inválidas += int((~válidos).sum())
+            if not válidos.any():
+                continue
+            índices = np.flatnonzero(válidos)
+            códigos = códigos[índices]
+            roles = [roles[i] for i in índices.tolist()]
+            productos = [productos[i] for i in índices.tolist()]
+
+            # Sin num_evidencias guardado, se cuentan las evidencias marcadas
+            marcadas_patrón = (matriz_base > 0).sum(axis=1)
+            marcadas = [
+                marcadas[i] if marcadas[i] is not None else int(marcadas_patrón[c])
+                for i, c in zip(índices.tolist(), códigos.tolist())
+            ]
+
+            antes = score_batch(matriz_base[códigos], roles, productos, marcadas, base)
+            después = score_batch(matriz_alt[códigos], roles, productos, marcadas, alternativa)
+
+            nivel_antes = np.fromiter((nivel[n] for n in antes["overall_level"]), np.int64, len(índices))
+            nivel_después = np.fromiter((nivel[n] for n in después["overall_level"]), np.int64, len(índices))
+            transiciones += np.bincount(
+                nivel_antes * len(NIVELES) + nivel_después, minlength=len(NIVELES) ** 2
+            )
+            deltas += np.bincount(
+                después["overall_score"] - antes["overall_score"] + 100, minlength=201
+            )
+            coinciden_guardado += sum(
+                1 for i, n in zip(índices.tolist(), antes["overall_level"]) if guardados[i] == n
+            )
+
+            for j in np.flatnonzero(nivel_antes != nivel_después).tolist():
+                cambios_rol[roles[j]] = cambios_rol.get(roles[j], 0) + 1
+                cambios_producto[productos[j]] = cambios_producto.get(productos[j], 0) + 1
+                clave = f"{NIVELES[nivel_antes[j]]}→{NIVELES[nivel_después[j]]}"
+                muestra = ejemplos.setdefault(clave, [])
+                if len(muestra) < MÁXIMO_EJEMPLOS:
+                    muestra.append(caso_ids[índices[j]])
+
+        matriz = transiciones.reshape(len(NIVELES), len(NIVELES))
+        evaluados = int(matriz.sum())
+        duración = time.perf_counter() - inicio
+        return {
+            "casos": casos,
+            "evaluados": evaluados,
+            "sin_evidencias": casos - evaluados - inválidas,
+            "evidencias_invalidas": inválidas,
+            "transiciones": {
+                antes: {después: int(matriz[i, j]) for j, después in enumerate(NIVELES)}
+                for i, antes in enumerate(NIVELES)
+            },
+            "cambian_de_nivel": evaluados - int(np.trace(matriz)),
+            "suben": int(np.triu(matriz, 1).sum()),
+            "bajan": int(np.tril(matriz, -1).sum()),
+            "delta_score": Recalibración._resumen_deltas(deltas),
+            "cambios_por_rol": cambios_rol,
+            "cambios_por_producto": cambios_producto,
+            "ejemplos": ejemplos,
+            "coinciden_con_guardado": coinciden_guardado,
+            "duracion_ms": round(duración * 1000, 1),
+            "casos_por_segundo": int(casos / duración) if duración > 0 else casos,
+        }
+
+    @staticmethod
+    def _resumen_deltas(histograma: np.ndarray) -> Dict:
+        """Estadísticos de los cambios de score a partir de su histograma."""
+        valores = np.arange(-100, 101)
+        total = int(histograma.sum())
+        if not total:
+            return {"media": 0.0, "media_absoluta": 0.0, "histograma": {}}
+
+        acumulado = np.cumsum(histograma)
+        presentes = valores[histograma > 0]
+        return {
+            "media": round(float((valores * histograma).sum() / total), 3),
+            "media_absoluta": round(float((np.abs(valores) * histograma).sum() / total), 3),
+            "mínimo": int(presentes[0]),
+            "máximo": int(presentes[-1]),
+            "percentiles": {
+                p: int(valores[np.searchsorted(acumulado, total * p / 100)])
+                for p in (5, 25, 50, 75, 95)
+            },
+            "histograma": {
+                int(v): int(c) for v, c in zip(valores, histograma) if c
+            },
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python recalibracion.py (cambios.json | nombre@versión) [informe.json]")
+        sys.exit(1)
+
+    # La alternativa es un archivo de cambios o una versión guardada del modelo
+    if Path(sys.argv[1]).is_file():
+        with open(sys.argv[1], encoding="utf-8") as archivo:
+            alternativa = configuración_alternativa(json.load(archivo))
+    else:
+        nombre, _, versión = sys.argv[1].partition("@")
+        guardada = model_registry.get(nombre, int(versión) if versión else None)
+        if guardada is None:
+            print(f"No existe la configuración {sys.argv[1]}")
+            sys.exit(1)
+        alternativa = guardada.configuration
+
+    informe = Recalibración.comparar(alternativa)
+
+    print(f"Casos: {informe['casos']} ({informe['evaluados']} con evidencias, "
+          f"{informe['casos_por_segundo']} casos/s)")
+    print(f"Transiciones (filas: {model_registry.active().label}, columnas: alternativa)")
+    print(" " * 7 + "".join(f"{nivel:>10}" for nivel in NIVELES))
+    for nivel, fila in informe["transiciones"].items():
+        print(f"{nivel:<7}" + "".join(f"{fila[n]:>10}" for n in NIVELES))
+    print(f"Cambian de nivel: {informe['cambian_de_nivel']} "
+          f"(suben {informe['suben']}, bajan {informe['bajan']})")
+    print(f"Delta de score: media {informe['delta_score']['media']}, "
+          f"media absoluta {informe['delta_score']['media_absoluta']}")
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "w", encoding="utf-8") as salida:
+            json.dump(informe, salida, ensure_ascii=False, indent=2)
@@ -0,0 +1,275 @@
+"""
+Registro de Detectores de Integridad
+
+Cada detector declara los artefactos de preprocesamiento que consume,
+su clase de costo, el esquema de su resultado y cómo se ejecuta (hilo o
+proceso, plazo). A partir de una selección de detectores, o de un perfil
+con nombre ("triaje", "completo"), el registro arma el plan de ejecución:
+qué artefactos conviene calcular antes de repartir el trabajo y qué
+tareas lanzar. También acumula histogramas de duración por detector.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from planificador_detectores import TareaDetector
+
+
+# Clases de costo, de menor a mayor
+COSTOS = ("bajo", "medio", "alto")
+
+# Límites superiores (ms) de las casillas de los histogramas de duración
+CASILLAS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Detector(NamedTuple):
+    """Declaración de un detector."""
+    nombre: str
+    función: Callable
+    artefactos: Tuple[str, ...] = ()
+    costo: str = "medio"
+    esquema: Dict[str, type] = {}
+    parámetros: Tuple[str, ...] = ()
+    agregación: Optional[str] = None
+    modo: str = "hilo"
+    plazo: Optional[float] = None
+    resultado_truncado: Dict = {}
+
+
+class PlanEjecución(NamedTuple):
+    """Detectores seleccionados y artefactos a calcular de antemano."""
+    detectores: Tuple[Detector, ...]
+    artefactos_previos: Tuple[str, ...]
+
+    @property
+    def nombres(self) -> List[str]:
+        """Nombres de los detectores del plan, en orden de registro."""
+        return [d.nombre for d in self.detectores]
+
+
+class RegistroDetectores:
+    """Detectores y constructores de artefactos registrados."""
+
+    def __init__(self):
+        """Inicializa un registro vacío"""
+        self._detectores: Dict[str, Detector] = {}
+        self._artefactos: Dict[str, Callable] = {}
+        self._perfiles: Dict[str, Optional[Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+        self._histogramas: Dict[str, Dict] = {}
+
+    def registrar_artefacto(self, nombre: str, constructor: Callable):
+        """
+        Registra cómo calcular un artefacto del documento.
+
+        Args:
+            nombre: clave del artefacto
+            constructor: función que recibe el documento preprocesado
+        """
+        self._artefactos[nombre] = constructor
+
+    def registrar(self, detector: Detector) -> Detector:
+        """
+        Registra (o reemplaza) un detector.
+
+        Raises:
+            ValueError: si la clase de costo o algún artefacto no existen
+        """
+        if detector.costo not in COSTOS:
+            raise ValueError(f"Clase de costo desconocida: {detector.costo}")
+        faltantes = [a for a in detector.artefactos if a not in self._artefactos]
+        if faltantes:
+            raise ValueError(f"Artefactos no registrados: {', '.join(faltantes)}")
+
+        self._detectores[detector.nombre] = detector
+        return detector
+
+    def registrar_perfil(self, nombre: str, detectores: Optional[Iterable[str]] = None):
+        """
+        Registra un perfil con nombre.
+
+        Args:
+            nombre: nombre del perfil
+            detectores: detectores del perfil (None = todos los registrados)
+        """
+        self._perfiles[nombre] = tuple(detectores) if detectores is not None else None
+
+    @property
+    def nombres(self) -> List[str]:
+        """Detectores registrados, en orden de registro."""
+        return list(self._detectores)
+
+    @property
+    def perfiles(self) -> List[str]:
+        """Nombres de los perfiles registrados."""
+        return list(self._perfiles)
+
+    def obtener(self, nombre: str) -> Detector:
+        """Declaración de un detector."""
+        return self._detectores[nombre]
+
+    def seleccionar(
+        self,
+        detectores: Optional[Iterable[str]] = None,
+        perfil: Optional[str] = None
+    ) -> List[str]:
+        """
+        Resuelve la selección explícita o el perfil a nombres de detectores.
+
+        Raises:
+            ValueError: si algún detector o el perfil no existen
+        """
+        if detectores is None:
+            if perfil is None:
+                return self.nombres
+            if perfil not in self._perfiles:
+                raise ValueError(f"Perfil desconocido: {perfil}")
+            detectores = self._perfiles[perfil]
+            if detectores is None:
+                return self.nombres
+
+        pedidos = set(detectores)
+        desconocidos = sorted(pedidos - set(self._detectores))
+        if desconocidos:
+            raise ValueError(f"Detectores desconocidos: {', '.join(desconocidos)}")
+        return [nombre for nombre in self._detectores if nombre in pedidos]
+
+    def plan(
+        self,
+        detectores: Optional[Iterable[str]] = None,
+        perfil: Optional[str] = None
+    ) -> PlanEjecución:
+        """
+        Arma el plan de ejecución de una selección de detectores.
+
+        Los artefactos que consumen dos o más detectores del plan se
+        calculan antes de lanzar las tareas, para que ningún hilo los
+        calcule dos veces.
+        """
+        seleccionados = tuple(self._detectores[n] for n in self.seleccionar(detectores, perfil))
+
+        usos: Dict[str, int] = {}
+        for detector in seleccionados:
+            for artefacto in detector.artefactos:
+                usos[artefacto] = usos.get(artefacto, 0) + 1
+
+        return PlanEjecución(
+            detectores=seleccionados,
+            artefactos_previos=tuple(a for a, n in usos.items() if n > 1)
+        )
+
+    def tareas(
+        self,
+        plan: PlanEjecución,
+        doc,
+        contexto: Dict[str, Any],
+        plazos: Dict[str, float],
+        resultado_truncado: Dict,
+        documento_para_proceso: Callable
+    ) -> Dict[str, TareaDetector]:
+        """
+        Calcula los artefactos previos y prepara una tarea por detector.
+
+        Args:
+            plan: plan de ejecución
+            doc: documento preprocesado
+            contexto: valores para los parámetros declarados (p. ej. usuario)
+            plazos: segundos por detector (reemplaza el plazo declarado)
+            resultado_truncado: campos comunes del resultado truncado
+            documento_para_proceso: (doc, artefactos) -> documento a enviar a
+                otro proceso, o None si debe ejecutarse en un hilo
+
+        Returns:
+            nombre -> tarea para el planificador
+        """
+        for artefacto in plan.artefactos_previos:
+            self.calcular_artefacto(doc, artefacto)
+
+        tareas = {}
+        for detector in plan.detectores:
+            modo = detector.modo
+            argumento = doc
+            if modo == "proceso":
+                argumento = documento_para_proceso(doc, detector.artefactos)
+                if argumento is None:
+                    modo, argumento = "hilo", doc
+
+            tareas[detector.nombre] = TareaDetector(
+                función=detector.función,
+                argumentos=(argumento, *(contexto.get(p) for p in detector.parámetros)),
+                modo=modo,
+                plazo=plazos.get(detector.nombre, detector.plazo),
+                resultado_truncado=dict(resultado_truncado, **detector.resultado_truncado)
+            )
+        return tareas
+
+    def calcular_artefacto(self, doc, nombre: str) -> Any:
+        """Calcula (o reutiliza) un artefacto registrado del documento."""
+        return self._artefactos[nombre](doc)
+
+    def registrar_tiempos(self, ejecución: Dict[str, Dict]):
+        """
+        Acumula las duraciones de una ejecución en los histogramas.
+
+        Args:
+            ejecución: {"duracion_ms", "modo", "truncado"} por detector
+        """
+        with self._lock:
+            for nombre, registro in ejecución.items():
+                histograma = self._histogramas.setdefault(nombre, {
+                    "conteos": [0] * (len(CASILLAS_MS) + 1),
+                    "ejecuciones": 0,
+                    "truncados": 0,
+                    "total_ms": 0.0,
+                    "maximo_ms": 0.0,
+                })
+                duración = registro["duracion_ms"]
+                casilla = next(
+                    (i for i, límite in enumerate(CASILLAS_MS) if duración <= límite),
+                    len(CASILLAS_MS)
+                )
+                histograma["conteos"][casilla] += 1
+                histograma["ejecuciones"] += 1
+                histograma["truncados"] += int(registro["truncado"])
+                histograma["total_ms"] += duración
+                histograma["maximo_ms"] = max(histograma["maximo_ms"], duración)
+
+    def histogramas(self) -> Dict[str, Dict]:
+        """Histogramas de duración por detector (de este proceso)."""
+        with self._lock:
+            return {
+                nombre: {
+                    "casillas_ms": list(CASILLAS_MS) + [None],
+                    "conteos": list(h["conteos"]),
+                    "ejecuciones": h["ejecuciones"],
+                    "truncados": h["truncados"],
+                    "promedio_ms": round(h["total_ms"] / h["ejecuciones"], 2),
+                    "maximo_ms": h["maximo_ms"],
+                }
+                for nombre, h in self._histogramas.items()
+            }
+
+    def describir(self) -> Dict:
+        """Detectores, perfiles y artefactos registrados (serializable)."""
+        return {
+            "detectores": [
+                {
+                    "nombre": d.nombre,
+                    "artefactos": list(d.artefactos),
+                    "costo": d.costo,
+                    "esquema": {campo: tipo.__name__ for campo, tipo in d.esquema.items()},
+                    "agregacion": d.agregación,
+                    "modo": d.modo,
+                    "plazo": d.plazo,
+                }
+                for d in self._detectores.values()
+            ],
+            "perfiles": {
+                nombre: self.seleccionar(perfil=nombre) for nombre in self._perfiles
+            },
+            "artefactos": list(self._artefactos),
+        }
+
+
+# Instancia global del registro
+registro_detectores = RegistroDetectores()
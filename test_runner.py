@@ -65,8 +65,104 @@ class CentinelaTestRunner:
         # Test 5: Generación de reportes
         self._test_institutional_reports()
         
+        # Test 6: Escaneo multipatrón de palabras clave
+        self._test_keyword_scanner()
+        
+        # Test 7: Escáner de expresiones regulares
+        self._test_regex_scanner()
+        
+        # Test 8: Validación de parámetros de la API
+        self._test_api_validation()
+        
+        # Test 9: Índice MinHash de envíos previos
+        self._test_minhash_index()
+        
+        # Test 10: Índice de huellas por winnowing
+        self._test_winnowing_index()
+        
+        # Test 11: Índice TF-IDF del archivo de casos
+        self._test_tfidf_index()
+        
+        # Test 12: Caché de resultados por usuario
+        self._test_result_cache()
+        
+        # Test 13: Explicación de reportes de integridad
+        self._test_report_explanation()
+        
+        # Test 14: Puntuación masiva con punto de control
+        self._test_bulk_scoring()
+        
+        # Test 15: Puntuación vectorizada en lote
+        self._test_vectorized_scoring()
+        
+        # Test 16: Tabla precalculada del modelo
+        self._test_lookup_table()
+        
+        # Test 17: Versiones de la configuración del modelo
+        self._test_model_registry()
+        
+        # Test 18: Recalibración retroactiva
+        self._test_recalibration()
+        
+        # Test 19: Preprocesamiento compartido
+        self._test_shared_preprocessing()
+        
+        # Test 20: Perfiles estilométricos
+        self._test_stylometry_profiles()
+        
+        # Test 21: Verificación de referencias
+        self._test_reference_index()
+        
+        # Test 22: Forense numérica
+        self._test_numeric_forensics()
+        
+        # Test 23: Planificador de detectores
+        self._test_detector_scheduler()
+        
+        # Test 24: Revisiones incrementales
+        self._test_incremental_revisions()
+        
+        # Test 25: Registro de detectores
+        self._test_detector_registry()
+        
+        # Test 26: Paquetes de reglas
+        self._test_rule_packs()
+        
+        # Test 27: Colusión en la cohorte
+        self._test_cohort_collusion()
+        
+        # Test 28: Índice de figuras
+        self._test_figure_index()
+        
+        # Test 29: Modelo local de n-gramas
+        self._test_ngram_model()
+        
+        # Test 30: Análisis por ventanas
+        self._test_streaming_windows()
+        
+        # Test 31: Respuestas compactas y catálogo
+        self._test_response_projection()
+        
         return self.results
     
+    def _check(self, name: str, ok: bool, detail: str = ""):
+        """Registra el resultado de una verificación."""
+        self.results["total_tests"] += 1
+        if ok:
+            print(f"✓ {name}")
+            self.results["passed"] += 1
+        else:
+            print(f"❌ {name}" + (f": {detail}" if detail else ""))
+            self.results["failed"] += 1
+            self.results["errors"].append(name)
+    
+    def _section_error(self, section: str, error: Exception):
+        """Registra una excepción inesperada dentro de una sección."""
+        print(f"❌ Error en {section}: {error}")
+        self.results["total_tests"] += 1
+        self.results["failed"] += 1
+        self.results["errors"].append(f"{section}: {error}")
+    
     def _test_case_structure(self):
         """Valida que los casos de prueba tengan la estructura correcta."""
         print("\n📋 Test 1: Estructura de casos de prueba")
@@ -305,6 +401,1601 @@ class CentinelaTestRunner:
             self.results["failed"] += 1
             self.results["errors"].append(f"Reports Error: {str(e)}")
     
+    def _test_keyword_scanner(self):
+        """Prueba el autómata Aho-Corasick de palabras clave."""
+        print("\n🔎 Test 6: Escaneo multipatrón de palabras clave")
+        print("-" * 70)
+        
+        try:
+            from escaneo_multipatron import AutómataPalabrasClave
+            
+            automata = AutómataPalabrasClave({
+                "datos": ["datos manipulados", "datos"],
+                "plagio": ["copiar y pegar", "pegar"],
+            })
+            texto = "no copiar y pegar datos manipulados; metadatos y pegarlo no cuentan"
+            encontradas = [(c.etiqueta, c.patrón, texto[c.inicio:c.fin]) for c in automata.buscar(texto)]
+            
+            self._check(
+                "Frases solapadas detectadas en una pasada",
+                encontradas == [
+                    ("plagio", "copiar y pegar", "copiar y pegar"),
+                    ("plagio", "pegar", "pegar"),
+                    ("datos", "datos", "datos"),
+                    ("datos", "datos manipulados", "datos manipulados"),
+                ],
+                str(encontradas)
+            )
+            self._check(
+                "Sin coincidencias dentro de otras palabras",
+                not automata.buscar("metadatos pegarlo"),
+            )
+            agrupadas = AutómataPalabrasClave.agrupar(automata.buscar(texto))
+            self._check(
+                "Agrupación por etiqueta",
+                {e: len(c) for e, c in agrupadas.items()} == {"plagio": 2, "datos": 2},
+            )
+        except Exception as e:
+            self._section_error("escaneo multipatrón", e)
+    
+    def _test_regex_scanner(self):
+        """Prueba el límite de coincidencias del escáner de expresiones regulares."""
+        print("\n🧮 Test 7: Escáner de expresiones regulares")
+        print("-" * 70)
+        
+        try:
+            from escaneo_multipatron import EscánerRegex
+            
+            escáner = EscánerRegex({"cifra": r"\d+", "signo": r"%"}, máximo_por_patrón=3)
+            
+            exacto = escáner.buscar("1 2 3 %")
+            self._check(
+                "Exactamente el límite no se marca truncado",
+                len(exacto["cifra"]["spans"]) == 3 and not exacto["cifra"]["truncado"],
+                str(exacto["cifra"])
+            )
+            excedido = escáner.buscar("1 2 3 4 %")
+            self._check(
+                "Una coincidencia más allá del límite marca truncado",
+                len(excedido["cifra"]["spans"]) == 3 and excedido["cifra"]["truncado"],
+                str(excedido["cifra"])
+            )
+            self._check(
+                "Los demás patrones siguen buscándose tras truncar",
+                excedido["signo"]["spans"] == [(8, 9)],
+                str(excedido["signo"])
+            )
+        except Exception as e:
+            self._section_error("escáner regex", e)
+    
+    def _cliente_api(self, usuario: str):
+        """Cliente de pruebas de la API v2 con un token firmado para `usuario`."""
+        import jwt
+        from api_v2_mejorado import app
+        
+        token = jwt.encode({"user_id": usuario}, app.config["SECRET_KEY"], algorithm="HS256")
+        return app.test_client(), {"Authorization": f"Bearer {token}"}
+    
+    def _test_api_validation(self):
+        """Prueba la validación de parámetros de la API."""
+        print("\n🛡️  Test 8: Validación de parámetros de la API")
+        print("-" * 70)
+        
+        try:
+            cliente, cabeceras = self._cliente_api("docente")
+            
+            for temperatura in ("alta", None, "nan"):
+                respuesta = cliente.post(
+                    "/api/analyze",
+                    json={"contenido": "Texto de prueba.", "temperatura": temperatura},
+                    headers=cabeceras
+                )
+                self._check(
+                    f"temperatura={temperatura!r} rechazada con 400",
+                    respuesta.status_code == 400,
+                    f"{respuesta.status_code}"
+                )
+        except Exception as e:
+            self._section_error("validación de la API", e)
+    
+    def _test_minhash_index(self):
+        """Prueba la recuperación de copias del índice MinHash/LSH."""
+        print("\n🧬 Test 9: Índice MinHash de envíos previos")
+        print("-" * 70)
+        
+        try:
+            import tempfile
+            from indice_minhash import ÍndiceMinHash, firma_minhash
+            
+            palabras = (
+                "la fotosíntesis convierte la energía luminosa en energía química "
+                "que las plantas almacenan en moléculas de glucosa durante el día"
+            ).split()
+            firma = firma_minhash(palabras)
+            firma_editada = firma_minhash(palabras[:-2] + ["cada", "mañana"])
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                índice = ÍndiceMinHash(Path(directorio) / "similitud.db")
+                índice.agregar("hash_a", firma, "alumno_a")
+                
+                propios = índice.consultar(firma, excluir={"hash_a"}, usuario="alumno_a")
+                self._check("El propio envío del autor no se reporta", propios == [], str(propios))
+                
+                copia = índice.consultar(firma, excluir={"hash_a"}, usuario="alumno_b")
+                self._check(
+                    "Copia idéntica de otro usuario reportada con similitud 1.0",
+                    copia == [{"documento_hash": "hash_a", "similitud": 1.0}],
+                    str(copia)
+                )
+                
+                editada = índice.consultar(firma_editada, excluir={"hash_b"}, usuario="alumno_b")
+                self._check(
+                    "Copia con cambios menores recuperada",
+                    [s["documento_hash"] for s in editada] == ["hash_a"],
+                    str(editada)
+                )
+                
+                índice.agregar("hash_a", firma, "alumno_b")
+                self._check(
+                    "El hash entregado por otro usuario sigue reportándose al autor",
+                    [s["documento_hash"] for s in índice.consultar(
+                        firma, excluir={"hash_a"}, usuario="alumno_a"
+                    )] == ["hash_a"],
+                )
+        except Exception as e:
+            self._section_error("índice MinHash", e)
+    
+    def _test_winnowing_index(self):
+        """Prueba la localización de pasajes copiados con winnowing."""
+        print("\n🧷 Test 10: Índice de huellas por winnowing")
+        print("-" * 70)
+        
+        try:
+            import tempfile
+            from documento_preprocesado import DocumentoPreprocesado
+            from indice_winnowing import ÍndiceWinnowing, huellas_documento
+            
+            def huellas_de(texto):
+                doc = DocumentoPreprocesado({"contenido": texto})
+                return huellas_documento(doc.palabras, doc.spans_palabras), [0]
+            
+            original = (
+                "los glaciares andinos retroceden cada año por el aumento sostenido "
+                "de la temperatura media y la reducción de las precipitaciones sólidas"
+            )
+            huellas, párrafos = huellas_de(original)
+            huellas_mezcla, párrafos_mezcla = huellas_de(
+                "introducción propia del estudiante sobre el clima regional. " + original
+            )
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                índice = ÍndiceWinnowing(Path(directorio) / "huellas.db")
+                índice.agregar("hash_a", huellas, párrafos, "alumno_a")
+                
+                propias = índice.consultar(huellas, párrafos, excluir={"hash_a"}, usuario="alumno_a")
+                self._check("El propio envío del autor no se reporta", propias == [], str(propias))
+                
+                copia = índice.consultar(huellas, párrafos, excluir={"hash_a"}, usuario="alumno_b")
+                self._check(
+                    "Copia idéntica de otro usuario con cobertura total",
+                    [(c["documento_hash"], c["cobertura"]) for c in copia] == [("hash_a", 1.0)],
+                    str(copia)
+                )
+                
+                mezcla = índice.consultar(huellas_mezcla, párrafos_mezcla, excluir={"hash_b"}, usuario="alumno_b")
+                self._check(
+                    "Pasaje copiado dentro de un texto mayor localizado",
+                    len(mezcla) == 1 and 0 < mezcla[0]["cobertura"] < 1 and mezcla[0]["pasajes"],
+                    str(mezcla)
+                )
+                
+                self._check(
+                    "Un segundo autor del mismo texto queda registrado",
+                    índice.agregar("hash_a", huellas, párrafos, "alumno_b")
+                    and not índice.agregar("hash_a", huellas, párrafos, "alumno_b"),
+                )
+                self._check(
+                    "El texto compartido con otro usuario se reporta al autor",
+                    len(índice.consultar(huellas, párrafos, excluir={"hash_a"}, usuario="alumno_a")) == 1,
+                )
+        except Exception as e:
+            self._section_error("índice de winnowing", e)
+    
+    def _test_tfidf_index(self):
+        """Prueba la búsqueda TF-IDF sobre el archivo de casos."""
+        print("\n📚 Test 11: Índice TF-IDF del archivo de casos")
+        print("-" * 70)
+        
+        try:
+            import random
+            import tempfile
+            from collections import Counter
+            from indice_tfidf import ÍndiceTFIDF
+            
+            generador = random.Random(7)
+            vocabulario = [f"término{i}" for i in range(300)]
+            documentos = [Counter(generador.choices(vocabulario, k=80)) for _ in range(30)]
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                índice = ÍndiceTFIDF(Path(directorio))
+                for i, frecuencias in enumerate(documentos[:20]):
+                    índice.agregar(f"hash_{i}", frecuencias, f"alumno_{i}")
+                índice.compactar()
+                for i, frecuencias in enumerate(documentos[20:], 20):
+                    índice.agregar(f"hash_{i}", frecuencias, f"alumno_{i}")
+                
+                self._check(
+                    "No se compacta por debajo del umbral",
+                    índice.pendientes() == 10,
+                    str(índice.pendientes())
+                )
+                
+                resultados = [índice.consultar(f, k=1)[0] for f in documentos]
+                self._check(
+                    "Copias recuperadas en el segmento y en los pendientes",
+                    [r["documento_hash"] for r in resultados]
+                    == [f"hash_{i}" for i in range(len(documentos))],
+                )
+                self._check(
+                    "Coseno de una copia exacta igual a 1 sin recortar",
+                    all(r["similitud"] == 1.0 for r in resultados),
+                    str([r["similitud"] for r in resultados])
+                )
+                
+                propios = índice.consultar(documentos[3], k=1, excluir={"hash_3"}, usuario="alumno_3")
+                self._check(
+                    "El propio envío del autor no se reporta",
+                    propios and propios[0]["documento_hash"] != "hash_3",
+                    str(propios)
+                )
+                copia = índice.consultar(documentos[3], k=1, excluir={"hash_3"}, usuario="alumno_x")
+                self._check(
+                    "Copia idéntica de otro usuario reportada",
+                    copia and copia[0]["documento_hash"] == "hash_3",
+                    str(copia)
+                )
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                directorio = Path(directorio)
+                índice = ÍndiceTFIDF(directorio)
+                índice.UMBRAL_COMPACTACIÓN = 5
+                lector = ÍndiceTFIDF(directorio)
+                
+                def versiones():
+                    return sorted({int(a.name.split("_")[1]) for a in directorio.glob("segmento_*.npy")})
+                
+                def agregar(inicio, fin):
+                    for i in range(inicio, fin):
+                        índice.agregar(f"hash_{i}", documentos[i], f"alumno_{i}")
+                    if índice._compactación is not None:
+                        índice._compactación.join(timeout=30)
+                
+                agregar(0, 5)
+                lector.consultar(documentos[0], k=1)
+                agregar(5, 10)
+                self._check(
+                    "Compactación automática al alcanzar el umbral",
+                    índice.pendientes() == 0 and versiones() == [1, 2],
+                    f"{índice.pendientes()} pendientes, versiones {versiones()}"
+                )
+                
+                agregar(10, 15)
+                self._check(
+                    "Un lector en la versión 1 la conserva tras dos compactaciones",
+                    versiones() == [1, 2, 3],
+                    str(versiones())
+                )
+                
+                lector.consultar(documentos[0], k=1)
+                índice.consultar(documentos[0], k=1)
+                agregar(15, 20)
+                self._check(
+                    "La versión 1 se elimina cuando ningún lector la usa",
+                    versiones() == [3, 4],
+                    str(versiones())
+                )
+                self._check(
+                    "El lector consulta la versión nueva",
+                    lector.consultar(documentos[17], k=1)[0]["documento_hash"] == "hash_17",
+                )
+                
+                with índice._bloqueo_compactación(True):
+                    self._check(
+                        "La compactación no espera si otro worker tiene el bloqueo",
+                        índice.compactar(esperar=False) is False,
+                    )
+            
+            cliente, cabeceras = self._cliente_api("docente")
+            respuesta = cliente.post(
+                "/api/similares", json={"contenido": "texto de prueba", "k": -1}, headers=cabeceras
+            )
+            self._check("k negativo en /api/similares rechazado con 400", respuesta.status_code == 400)
+        except Exception as e:
+            self._section_error("índice TF-IDF", e)
+    
+    def _test_result_cache(self):
+        """Prueba el aislamiento por usuario de la caché de resultados."""
+        print("\n🗃️  Test 12: Caché de resultados por usuario")
+        print("-" * 70)
+        
+        try:
+            import hashlib
+            import sqlite3
+            import uuid
+            from cache_resultados import CacheResultados
+            from indice_minhash import índice_minhash
+            
+            parámetros = ("hash", "Estudiante", "ensayo", "v1", "r1")
+            self._check(
+                "La clave de caché depende del usuario",
+                CacheResultados.clave(*parámetros, usuario="alumno_a")
+                != CacheResultados.clave(*parámetros, usuario="alumno_b"),
+            )
+            
+            texto = (
+                f"Ensayo {uuid.uuid4().hex} sobre la historia de la imprenta en Europa. "
+                "La imprenta de tipos móviles permitió difundir el conocimiento con rapidez. "
+                "Las universidades adoptaron los libros impresos durante el siglo dieciséis. "
+            ) * 4
+            documento_hash = hashlib.sha256(texto.encode()).hexdigest()
+            cuerpo = {"contenido": texto, "rol": "Estudiante"}
+            
+            def reportar(usuario):
+                cliente, cabeceras = self._cliente_api(usuario)
+                return cliente.post("/api/reporte-integridad", json=cuerpo, headers=cabeceras).get_json()
+            
+            primero = reportar("alumno_a")
+            repetido = reportar("alumno_a")
+            self._check(
+                "El mismo usuario reutiliza su análisis",
+                not primero["metadatos"]["cache"] and repetido["metadatos"]["cache"],
+            )
+            
+            otro = reportar("alumno_b")
+            similares = otro["análisis"]["plagio_conceptual"]["similares"]
+            self._check(
+                "Otro usuario no recibe el análisis en caché del primero",
+                not otro["metadatos"]["cache"]
+                and otro["metadatos"]["reporte_id"] != primero["metadatos"]["reporte_id"],
+            )
+            self._check(
+                "La copia de otro usuario se reporta con similitud 1.0",
+                similares[:1] == [{"documento_hash": documento_hash, "similitud": 1.0}],
+                str(similares)
+            )
+            
+            # Un acierto de caché vuelve a archivar el envío si falta en el índice
+            conn = sqlite3.connect(str(índice_minhash.db_path))
+            conn.execute(
+                "DELETE FROM firmas_minhash WHERE documento_hash = ? AND usuario = ?",
+                (documento_hash, "alumno_b")
+            )
+            conn.commit()
+            conn.close()
+            
+            acierto = reportar("alumno_b")
+            conn = sqlite3.connect(str(índice_minhash.db_path))
+            archivado = conn.execute(
+                "SELECT COUNT(*) FROM firmas_minhash WHERE documento_hash = ? AND usuario = ?",
+                (documento_hash, "alumno_b")
+            ).fetchone()[0]
+            conn.close()
+            self._check(
+                "Un acierto de caché archiva igual el envío",
+                acierto["metadatos"]["cache"] and archivado == 1,
+            )
+            
+            # Un detector fuera de plazo deja un análisis parcial que no se guarda
+            import time
+            from registro_detectores import registro_detectores
+            
+            falacias = registro_detectores.obtener("falacias")
+            lento = lambda doc: time.sleep(0.5) or falacias.función(doc)
+            cuerpo = dict(cuerpo, contenido=texto + f" Revisión {uuid.uuid4().hex}.")
+            registro_detectores.registrar(falacias._replace(función=lento, plazo=0.05))
+            try:
+                truncados = [reportar("alumno_a") for _ in range(2)]
+            finally:
+                registro_detectores.registrar(falacias)
+            completos = [reportar("alumno_a") for _ in range(2)]
+            self._check(
+                "Un análisis con detectores truncados no se guarda en caché",
+                all(r["análisis"]["falacias"].get("truncado") for r in truncados)
+                and [r["metadatos"]["cache"] for r in truncados + completos] == [False, False, False, True]
+                and not completos[0]["análisis"]["falacias"].get("truncado")
+                and truncados[0]["metadatos"]["explicacion"] is None,
+                str([r["metadatos"]["cache"] for r in truncados + completos])
+            )
+        except Exception as e:
+            self._section_error("caché de resultados", e)
+    
+    def _test_report_explanation(self):
+        """Prueba la explicación bajo demanda de un reporte de integridad."""
+        print("\n🔦 Test 13: Explicación de reportes de integridad")
+        print("-" * 70)
+        
+        try:
+            import uuid
+            
+            texto = (
+                f"Informe {uuid.uuid4().hex}. Los datos fueron ajustados para obtener el resultado esperado. "
+                "Siempre ocurre lo mismo en todos los casos. Por lo tanto la causa es evidente."
+            )
+            cliente, cabeceras = self._cliente_api("investigador_a")
+            reporte = cliente.post(
+                "/api/reporte-integridad", json={"contenido": texto}, headers=cabeceras
+            ).get_json()
+            ruta = reporte["metadatos"]["explicacion"]
+            
+            propia = cliente.get(ruta, headers=cabeceras)
+            explicación = propia.get_json()
+            self._check(
+                "El dueño obtiene la explicación del reporte",
+                propia.status_code == 200
+                and explicación["nivel_riesgo"] == reporte["análisis"]["nivel_riesgo"]
+                and "falacias" in explicación["detectores"],
+                str(propia.status_code)
+            )
+            
+            _, cabeceras_otro = self._cliente_api("investigador_b")
+            ajena = cliente.get(ruta, headers=cabeceras_otro)
+            self._check(
+                "Otro usuario no puede leer el texto del reporte",
+                ajena.status_code == 403 and "detectores" not in (ajena.get_json() or {}),
+                str(ajena.status_code)
+            )
+            
+            inexistente = cliente.get(
+                "/api/reporte-integridad/no-existe/explicacion", headers=cabeceras
+            )
+            self._check("Reporte inexistente devuelve 404", inexistente.status_code == 404)
+        except Exception as e:
+            self._section_error("explicación de reportes", e)
+    
+    def _test_bulk_scoring(self):
+        """Prueba la puntuación masiva y su reanudación desde el punto de control."""
+        print("\n📦 Test 14: Puntuación masiva con punto de control")
+        print("-" * 70)
+        
+        try:
+            import tempfile
+            from puntuacion_masiva import PuntuaciónMasiva
+            
+            filas = [
+                {
+                    "caso_id": f"caso_{i}",
+                    "rol": "Estudiante" if i % 2 else "Docente",
+                    "tipo_producto": "Ensayo",
+                    "evidencias": {"estilo_diferente": i % 3, "sin_borradores": i % 2},
+                }
+                for i in range(25)
+            ]
+            
+            class Interrupción(Exception):
+                pass
+            
+            def interrumpir(parcial):
+                raise Interrupción()
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                entrada = Path(directorio) / "evidencias.jsonl"
+                entrada.write_text("".join(json.dumps(f) + "\n" for f in filas), encoding="utf-8")
+                
+                completa = Path(directorio) / "completa.jsonl"
+                PuntuaciónMasiva.ejecutar(entrada, str(completa), tamaño_lote=10)
+                
+                reanudada = Path(directorio) / "reanudada.jsonl"
+                try:
+                    PuntuaciónMasiva.ejecutar(entrada, str(reanudada), tamaño_lote=10, progreso=interrumpir)
+                except Interrupción:
+                    pass
+                control = PuntuaciónMasiva.punto_control(entrada, str(reanudada))
+                self._check(
+                    "El punto de control registra el lote escrito",
+                    control.exists() and json.loads(control.read_text(encoding="utf-8"))["filas"] == 10,
+                )
+                
+                informe = PuntuaciónMasiva.ejecutar(entrada, str(reanudada), tamaño_lote=10)
+                self._check(
+                    "La reanudación continúa después del último lote",
+                    informe["reanudado_desde"] == 10 and informe["filas"] == 25 and not control.exists(),
+                    str(informe)
+                )
+                
+                def resultados(ruta):
+                    return [
+                        (r["caso_id"], r["riesgo_score"], r["dimensiones"])
+                        for r in map(json.loads, ruta.read_text(encoding="utf-8").splitlines())
+                    ]
+                self._check(
+                    "La salida reanudada es igual a la de una sola ejecución",
+                    resultados(reanudada) == resultados(completa)
+                    and len(resultados(completa)) == len(filas),
+                )
+        except Exception as e:
+            self._section_error("puntuación masiva", e)
+    
+    def _test_vectorized_scoring(self):
+        """Prueba que la puntuación vectorizada coincida con el análisis individual."""
+        print("\n🧮 Test 15: Puntuación vectorizada en lote")
+        print("-" * 70)
+        
+        try:
+            import random
+            from improved_analysis_model import _analyze_scalar, model_registry
+            
+            modelo = model_registry.active()
+            generador = random.Random(21)
+            roles = list(modelo.configuration.role_risk_factors) + ["Rol desconocido"]
+            productos = list(modelo.configuration.product_risk_factors) + ["Producto desconocido"]
+            
+            casos = [
+                (
+                    {i: generador.choice([0, 1, 2, 0.5]) for i in modelo.indicators},
+                    generador.choice(roles),
+                    generador.choice(productos),
+                    generador.choice([None, 0, 1, 3, 7]),
+                )
+                for _ in range(300)
+            ]
+            lote = modelo.analyze_batch(*(list(columna) for columna in zip(*casos)))
+            individuales = [
+                dict(_analyze_scalar(modelo.configuration, *caso), version_modelo=modelo.label)
+                for caso in casos
+            ]
+            self._check(
+                "Lote vectorizado idéntico al análisis individual",
+                lote == individuales,
+            )
+            
+            from api_v2 import app as app_v2
+            import jwt
+            
+            token = jwt.encode({"user_id": "docente"}, app_v2.config["SECRET_KEY"], algorithm="HS256")
+            evidencias = {"estilo_diferente": 1, "sin_borradores": 1}
+            respuesta = app_v2.test_client().post(
+                "/api/batch/analyze",
+                json={"casos": [
+                    {"rol": "Estudiante", "evidencias": evidencias},
+                    {"rol": 7, "tipo_producto": "Ensayo", "evidencias": evidencias},
+                    {"rol": ["Estudiante"], "evidencias": evidencias},
+                ]},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            resultados = respuesta.get_json()["resultados"]
+            escalar = modelo.analyze(
+                evidencias=dict(dict.fromkeys(modelo.indicators, 0), **evidencias),
+                rol=7,
+                tipo_producto="Ensayo",
+                num_evidencias_marked=2
+            )
+            self._check(
+                "rol no textual se analiza por caso sin abortar el lote",
+                respuesta.status_code == 200
+                and [r["status"] for r in resultados] == ["success", "success", "error"]
+                and (resultados[1]["score"], resultados[1]["level"])
+                == (escalar["overall_score"], escalar["overall_level"]),
+                str(resultados)
+            )
+        except Exception as e:
+            self._section_error("puntuación vectorizada", e)
+    
+    def _test_lookup_table(self):
+        """Prueba que la tabla precalculada coincida con el análisis paso a paso."""
+        print("\n📇 Test 16: Tabla precalculada del modelo")
+        print("-" * 70)
+        
+        try:
+            from improved_analysis_model import _analyze_scalar, model_registry
+            
+            modelo = model_registry.active()
+            indicadores = modelo.indicators
+            roles = list(modelo.configuration.role_risk_factors) + ["Rol desconocido"]
+            productos = list(modelo.configuration.product_risk_factors) + ["Producto desconocido"]
+            
+            diferencias = 0
+            for bits in range(2 ** len(indicadores)):
+                evidencias = {ind: (bits >> j) & 1 for j, ind in enumerate(indicadores)}
+                for rol in roles:
+                    for producto in productos:
+                        for marcadas in (None, 0, 2, 9):
+                            tabla = modelo.analyze(evidencias, rol, producto, marcadas)
+                            paso_a_paso = _analyze_scalar(
+                                modelo.configuration, evidencias, rol, producto, marcadas
+                            )
+                            if tabla != dict(paso_a_paso, version_modelo=modelo.label):
+                                diferencias += 1
+            self._check(
+                "Todas las entradas binarias coinciden con el análisis paso a paso",
+                diferencias == 0,
+                f"{diferencias} diferencias"
+            )
+        except Exception as e:
+            self._section_error("tabla precalculada", e)
+    
+    def _test_model_registry(self):
+        """Prueba las versiones guardadas de la configuración del modelo."""
+        print("\n🗂️  Test 17: Versiones de la configuración del modelo")
+        print("-" * 70)
+        
+        try:
+            from improved_analysis_model import (
+                ModelRegistry,
+                apply_configuration_changes,
+                current_configuration,
+                validate_configuration,
+            )
+            
+            base = current_configuration()
+            enorme = base._replace(role_risk_factors={f"rol_{i}": 1.0 for i in range(1000)})
+            try:
+                validate_configuration(enorme)
+                rechazada = False
+            except ValueError:
+                rechazada = True
+            self._check("Configuración con tabla demasiado grande rechazada", rechazada)
+            
+            registro = ModelRegistry(check_interval=0)
+            evidencias = {"estilo_diferente": 1, "sin_borradores": 1}
+            antes = registro.active().analyze(evidencias, "Estudiante", "Ensayo")
+            
+            estricta = apply_configuration_changes(
+                base, {"role_risk_factors": {"Estudiante": 1.5}}
+            )
+            try:
+                activa = registro.save("prueba_estricta", estricta, "test", activate=True)
+                después = registro.active().analyze(evidencias, "Estudiante", "Ensayo")
+                self._check(
+                    "La versión guardada se activa sin reiniciar",
+                    registro.active() is activa
+                    and después["version_modelo"] == activa.label
+                    and después["overall_score"] > antes["overall_score"],
+                    f"{antes['overall_score']} -> {después['overall_score']}"
+                )
+            finally:
+                registro.activate(None)
+            self._check(
+                "Desactivar vuelve a la configuración integrada",
+                registro.active().version is None
+                and registro.active().analyze(evidencias, "Estudiante", "Ensayo") == antes,
+            )
+            
+            # Cambiar los pesos integrados se aplica en el siguiente análisis,
+            # sin esperar al intervalo de revisión
+            import improved_analysis_model
+            
+            registro = ModelRegistry()
+            registro.active()
+            original = improved_analysis_model.DIMENSION_WEIGHTS["tiempo_y_ejecucion"]["sin_borradores"]
+            try:
+                improved_analysis_model.DIMENSION_WEIGHTS["tiempo_y_ejecucion"]["sin_borradores"] = 0.9
+                cambiado = registro.active().analyze(evidencias, "Estudiante", "Ensayo")
+                global_cambiado = improved_analysis_model.analyze_with_improved_model(
+                    evidencias, "Estudiante", "Ensayo"
+                )
+            finally:
+                improved_analysis_model.DIMENSION_WEIGHTS["tiempo_y_ejecucion"]["sin_borradores"] = original
+            restaurado = registro.active().analyze(evidencias, "Estudiante", "Ensayo")
+            self._check(
+                "Un cambio de pesos integrados se aplica de inmediato",
+                cambiado["overall_score"] > antes["overall_score"]
+                and global_cambiado["overall_score"] == cambiado["overall_score"]
+                and restaurado == antes,
+                f"{antes['overall_score']} -> {cambiado['overall_score']} -> {restaurado['overall_score']}"
+            )
+        except Exception as e:
+            self._section_error("versiones del modelo", e)
+    
+    def _test_recalibration(self):
+        """Prueba la recalibración retroactiva sobre casos guardados."""
+        print("\n⚖️  Test 18: Recalibración retroactiva")
+        print("-" * 70)
+        
+        try:
+            import sqlite3
+            import tempfile
+            from recalibracion import Recalibración, configuración_alternativa
+            
+            casos = [
+                ("normal", {"estilo_diferente": 1, "sin_borradores": 1}),
+                ("negativa", {"estilo_diferente": -50}),
+                ("ilegible", "no es json"),
+                ("sin_evidencias", None),
+            ]
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                ruta = Path(directorio) / "casos.db"
+                conn = sqlite3.connect(str(ruta))
+                conn.execute("""
+                    CREATE TABLE casos (
+                        id INTEGER PRIMARY KEY, caso_id TEXT, rol TEXT, tipo_producto TEXT,
+                        num_evidencias INTEGER, nivel_riesgo TEXT, json_data TEXT
+                    )
+                """)
+                conn.executemany(
+                    "INSERT INTO casos (caso_id, rol, tipo_producto, num_evidencias, nivel_riesgo, json_data) "
+                    "VALUES (?, 'Estudiante', 'Ensayo', NULL, 'BAJO', ?)",
+                    [
+                        (
+                            caso_id,
+                            None if evidencias is None else (
+                                '{"evidencias": "no es json"}' if isinstance(evidencias, str)
+                                else json.dumps({"evidencias": evidencias})
+                            )
+                        )
+                        for caso_id, evidencias in casos
+                    ]
+                )
+                conn.commit()
+                conn.close()
+                
+                informe = Recalibración.comparar(
+                    configuración_alternativa({"role_risk_factors": {"Estudiante": 3.0}}),
+                    db_file=ruta
+                )
+            
+            self._check(
+                "Casos fuera de rango contados como evidencias inválidas",
+                (informe["casos"], informe["evaluados"], informe["evidencias_invalidas"], informe["sin_evidencias"])
+                == (4, 1, 2, 1),
+                str({k: informe[k] for k in ("casos", "evaluados", "evidencias_invalidas", "sin_evidencias")})
+            )
+            self._check(
+                "El aumento del factor del rol sube el caso evaluado",
+                informe["suben"] == 1 and informe["delta_score"]["mínimo"] > 0,
+                str(informe["delta_score"])
+            )
+        except Exception as e:
+            self._section_error("recalibración", e)
+    
+    def _test_shared_preprocessing(self):
+        """Prueba el documento preprocesado compartido por los detectores."""
+        print("\n🧾 Test 19: Preprocesamiento compartido")
+        print("-" * 70)
+        
+        try:
+            from documento_preprocesado import DocumentoPreprocesado, normalizar_texto, ventanas_texto
+            
+            contenido = "Ánálisis ÉTICO, según Ñandú.\n\nSegundo párrafo. ¿Es válido?"
+            doc = DocumentoPreprocesado({"contenido": contenido})
+            self._check(
+                "La normalización pliega acentos y conserva las posiciones",
+                doc.texto_normalizado.startswith("analisis etico")
+                and len(doc.texto_normalizado) == len(doc.contenido)
+                and all(
+                    normalizar_texto(doc.contenido[inicio:fin]) == token
+                    for token, (inicio, fin) in zip(doc.tokens, doc.spans_tokens)
+                ),
+                doc.texto_normalizado
+            )
+            self._check(
+                "Palabras sin puntuación, oraciones y párrafos",
+                doc.palabras[:4] == ["analisis", "etico", "segun", "nandu"]
+                and len(doc.párrafos) == 2 and len(doc.oraciones) == 3,
+                f"{doc.palabras[:4]}, {doc.párrafos}, {doc.oraciones}"
+            )
+            
+            llamadas = []
+            for _ in range(3):
+                doc.artefacto("conteo", lambda d: llamadas.append(1) or len(d.palabras))
+            self._check(
+                "Los artefactos se calculan una sola vez",
+                llamadas == [1] and DocumentoPreprocesado.desde(doc) is doc,
+                f"{len(llamadas)} llamadas"
+            )
+            
+            texto = "".join(f"palabra{i} " for i in range(200))
+            ventanas = list(ventanas_texto((texto[i:i + 37] for i in range(0, len(texto), 37)), 100, 20))
+            reconstruido = ventanas[0][1] + "".join(v[20:] for _, v, _ in ventanas[1:])
+            self._check(
+                "Las ventanas solapadas reconstruyen el texto",
+                reconstruido == texto
+                and all(texto[p:p + len(v)] == v for p, v, _ in ventanas)
+                and [u for _, _, u in ventanas].count(True) == 1 and ventanas[-1][2],
+                f"{len(ventanas)} ventanas"
+            )
+            try:
+                list(ventanas_texto(["abc"], 10, 10))
+                rechazado = False
+            except ValueError:
+                rechazado = True
+            self._check("Solapamiento mayor o igual a la ventana rechazado", rechazado)
+        except Exception as e:
+            self._section_error("preprocesamiento compartido", e)
+    
+    def _test_stylometry_profiles(self):
+        """Prueba los perfiles estilométricos por autor."""
+        print("\n✒️  Test 20: Perfiles estilométricos")
+        print("-" * 70)
+        
+        try:
+            import tempfile
+            import numpy as np
+            from documento_preprocesado import DocumentoPreprocesado
+            from perfil_estilometrico import (
+                RASGOS, PerfilesEstilométricos, combinar_estadísticas, estadísticas_estilo
+            )
+            
+            def estadísticas(texto):
+                d = DocumentoPreprocesado({"contenido": texto})
+                return estadísticas_estilo(d.tokens, d.spans_palabras, d.oraciones)
+            
+            a = "La tesis, que es breve, trata de la ética. Los datos son propios."
+            b = "Sin embargo; el método no cambia: se repite (con cuidado)."
+            unidas = combinar_estadísticas(estadísticas(a), estadísticas(b))
+            completo = estadísticas(a + "\n\n" + b)
+            self._check(
+                "Las estadísticas de estilo se acumulan por suma",
+                unidas["signos"] == completo["signos"]
+                and np.array_equal(unidas["histograma_oraciones"], completo["histograma_oraciones"])
+            )
+            
+            rng = np.random.default_rng(7)
+            base = rng.uniform(0.01, 0.2, len(RASGOS))
+            vectores = [base * rng.uniform(0.95, 1.05, len(RASGOS)) for _ in range(5)]
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                perfiles = PerfilesEstilométricos(Path(directorio) / "estilo.db")
+                resultados = [
+                    perfiles.evaluar_y_actualizar("autor", f"doc{i}", v)
+                    for i, v in enumerate(vectores)
+                ]
+                repetido = perfiles.evaluar_y_actualizar("autor", "doc0", vectores[0])
+                atípico = perfiles.evaluar_y_actualizar("autor", "otro", base * 3)
+                perfil = perfiles.perfil("autor")
+            
+            self._check(
+                "Sin comparación hasta el mínimo de documentos",
+                [r["disponible"] for r in resultados] == [False] * 3 + [True] * 2,
+                str([r["documentos_perfil"] for r in resultados])
+            )
+            medias = np.array([perfil["rasgos"][r]["media"] for r in RASGOS])
+            desviaciones = np.array([perfil["rasgos"][r]["desviación"] for r in RASGOS])
+            esperado = np.vstack(vectores + [base * 3])
+            self._check(
+                "Welford coincide con la media y la desviación del historial",
+                perfil["documentos"] == 6
+                and np.allclose(medias, esperado.mean(axis=0), atol=1e-5)
+                and np.allclose(desviaciones, esperado.std(axis=0, ddof=1), atol=1e-5),
+                f"{perfil['documentos']} documentos"
+            )
+            self._check(
+                "Un documento repetido se compara sin su propio aporte",
+                repetido["documentos_perfil"] == 4 and not repetido["estilo_diferente"],
+                str(repetido)
+            )
+            self._check(
+                "Un estilo muy distinto se marca como diferente",
+                atípico["estilo_diferente"] == 1 and len(atípico["rasgos_atípicos"]) > 0,
+                str(atípico["distancia"])
+            )
+        except Exception as e:
+            self._section_error("perfiles estilométricos", e)
+    
+    def _test_reference_index(self):
+        """Prueba la extracción y verificación offline de referencias."""
+        print("\n📚 Test 21: Verificación de referencias")
+        print("-" * 70)
+        
+        try:
+            import tempfile
+            from indice_referencias import ÍndiceReferencias, clave_cita, clave_doi, extraer_referencias
+            
+            texto = (
+                "Según García et al. (2020), el efecto es robusto (véase López, 2019; "
+                "Núñez y Pérez, 2018). Datos en https://doi.org/10.1000/ABC123."
+            )
+            claves = [r["clave"] for r in extraer_referencias(texto)]
+            self._check(
+                "DOIs y citas narrativas y parentéticas extraídos",
+                claves == [
+                    clave_cita("García", 2020), clave_cita("López", 2019),
+                    clave_cita("Núñez", 2018), clave_doi("10.1000/abc123"),
+                ],
+                str(claves)
+            )
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                índice = ÍndiceReferencias(Path(directorio))
+                sin_volcado = índice.verificar(claves)
+                volcado = ['{"doi": "10.1000/abc123", "autor": "Garcia", "año": 2020}', "10.1000/otro", ""]
+                volcado += [f'{{"autor": "Autor{i}", "año": {1990 + i % 30}}}' for i in range(2000)]
+                indexadas = índice.compilar(volcado)
+                encontradas = índice.verificar(claves + [clave_doi("10.1000/otro"), clave_doi("10.9/falso")])
+                ausentes = índice.verificar([clave_cita(f"Inexistente{i}", 2000) for i in range(2000)])
+            
+            self._check("Sin volcado compilado no se verifica", sin_volcado is None)
+            self._check(
+                "Claves del volcado encontradas y las demás no",
+                indexadas == 2003
+                and encontradas.tolist() == [True, False, False, True, True, False],
+                str(encontradas.tolist())
+            )
+            self._check(
+                "Claves ausentes descartadas sin falsos positivos",
+                not ausentes.any(),
+                f"{int(ausentes.sum())} falsos positivos"
+            )
+        except Exception as e:
+            self._section_error("verificación de referencias", e)
+    
+    def _test_numeric_forensics(self):
+        """Prueba las pruebas vectorizadas de forense numérica."""
+        print("\n🔢 Test 22: Forense numérica")
+        print("-" * 70)
+        
+        try:
+            import numpy as np
+            from forense_numerica import analizar_números, concatenar_números, extraer_números
+            
+            números = extraer_números("En 2019 se midió M = 3,47 con n = 25 y luego -12.50 y 0.004 (p<0.05).")
+            self._check(
+                "Números, etiquetas y cifras extraídos en una pasada",
+                números["valores"].tolist() == [2019, 3.47, 25, -12.5, 0.004, 0.05]
+                and números["etiqueta"].tolist() == [0, 1, 2, 0, 0, 0]
+                and números["cifras"].tolist() == [4, 3, 2, 4, 1, 1],
+                f"{números['valores'].tolist()} {números['etiqueta'].tolist()}"
+            )
+            
+            grim = analizar_números(extraer_números(
+                "Grupo A: M = 3.48, n = 25. Grupo B: M = 3.47, n = 25. Grupo C: M = 3.5 (N = 40)."
+            ))["grim"]
+            self._check(
+                "GRIM marca solo la media imposible",
+                grim["evaluadas"] == 2 and [i["media"] for i in grim["inconsistentes"]] == [3.47],
+                str(grim)
+            )
+            
+            rng = np.random.default_rng(3)
+            benford = " ".join(f"{v:.2f}" for v in 10 ** rng.uniform(0, 5, 2000))
+            fabricados = " ".join(
+                str(int(d) * 10 ** int(k) + 5 * int(r))
+                for d, k, r in zip(rng.integers(1, 10, 2000), rng.integers(2, 5, 2000), rng.integers(0, 20, 2000))
+            )
+            natural = analizar_números(extraer_números(benford))
+            sospechoso = analizar_números(extraer_números(fabricados))
+            self._check(
+                "Datos logarítmicos conformes con Benford y dígito terminal uniforme",
+                natural["benford"]["conforme"] and natural["dígito_terminal"]["uniforme"],
+                f"{natural['benford'].get('mad')}, {natural['dígito_terminal'].get('valor_p')}"
+            )
+            self._check(
+                "Primeros dígitos uniformes y terminales en 0/5 detectados",
+                not sospechoso["benford"]["conforme"] and not sospechoso["dígito_terminal"]["uniforme"],
+                f"{sospechoso['benford'].get('mad')}, {sospechoso['dígito_terminal'].get('valor_p')}"
+            )
+            
+            corte = benford.index(" ", len(benford) // 2)
+            segunda = extraer_números(benford[corte:])
+            segunda["inicios"] += corte
+            partes = concatenar_números([extraer_números(benford[:corte]), segunda])
+            completo = extraer_números(benford)
+            self._check(
+                "Concatenar tramos equivale a extraer del texto completo",
+                all(np.array_equal(partes[c], completo[c]) for c in completo)
+            )
+        except Exception as e:
+            self._section_error("forense numérica", e)
+    
+    def _test_detector_scheduler(self):
+        """Prueba la ejecución concurrente de detectores con plazos."""
+        print("\n⏱️  Test 23: Planificador de detectores")
+        print("-" * 70)
+        
+        try:
+            import time
+            from planificador_detectores import PlanificadorDetectores, TareaDetector
+            
+            planificador = PlanificadorDetectores(máximo_hilos=4)
+            tareas = {
+                "rápido": TareaDetector(función=lambda x: {"score": x}, argumentos=(7,), plazo=2.0),
+                "lento": TareaDetector(
+                    función=lambda s: time.sleep(s) or {"score": 99},
+                    argumentos=(1.5,),
+                    plazo=0.2,
+                    resultado_truncado={"score": 0}
+                ),
+                "sin_plazo": TareaDetector(función=lambda: time.sleep(0.1) or {"score": 1}, argumentos=()),
+            }
+            
+            inicio = time.perf_counter()
+            resultados, ejecución = planificador.ejecutar(tareas)
+            transcurrido = time.perf_counter() - inicio
+            self._check(
+                "Detector fuera de plazo devuelve su resultado truncado",
+                resultados["lento"] == {"score": 0, "truncado": True}
+                and ejecución["lento"]["truncado"] and ejecución["lento"]["duracion_ms"] == 200.0,
+                str(resultados["lento"])
+            )
+            self._check(
+                "Los demás detectores terminan con su resultado",
+                resultados["rápido"] == {"score": 7} and resultados["sin_plazo"] == {"score": 1}
+                and not ejecución["rápido"]["truncado"],
+                str(resultados)
+            )
+            self._check(
+                "El análisis no espera al detector truncado",
+                transcurrido < 1.0,
+                f"{transcurrido:.2f}s"
+            )
+            
+            secuencial, ejecución = planificador.ejecutar(
+                {n: t for n, t in tareas.items() if n != "lento"}, paralelo=False
+            )
+            self._check(
+                "Modo secuencial sin plazos",
+                secuencial == {"rápido": {"score": 7}, "sin_plazo": {"score": 1}}
+                and {r["modo"] for r in ejecución.values()} == {"secuencial"}
+            )
+            self._check(
+                "Repartir conserva el orden de los lotes",
+                planificador.repartir(pow, [(2, 3), (3, 2), (5, 1)], paralelo=False) == [8, 9, 5]
+            )
+        except Exception as e:
+            self._section_error("planificador de detectores", e)
+    
+    def _test_incremental_revisions(self):
+        """Prueba el reanálisis incremental de revisiones por párrafo."""
+        print("\n📑 Test 24: Revisiones incrementales")
+        print("-" * 70)
+        
+        try:
+            import uuid
+            from advanced_integrity_analysis import AnálisisIntegridad
+            from historial_revisiones import historial_revisiones
+            
+            linaje = f"tesis-{uuid.uuid4().hex}"
+            párrafos = [
+                "El método siempre confirma la hipótesis, por lo tanto el efecto es causal.",
+                "Los valores asumidos reemplazaron a los simulados sin justificación.",
+                "La muestra fue de 40 casos; según expertos nunca falla.",
+            ]
+            v1 = "\n\n".join(párrafos)
+            v2 = "\n\n".join(párrafos[:2] + ["El resultado es robusto, pero todos los modelos fallan a veces."])
+            detectores = ["desviaciones_metodologicas", "mala_conducta", "falacias"]
+            metadatos = {"tipo_documento": "investigación"}
+            
+            primera = AnálisisIntegridad.preprocesar_revisión(dict(metadatos, contenido=v1), linaje)
+            segunda = AnálisisIntegridad.preprocesar_revisión(dict(metadatos, contenido=v2), linaje)
+            reenvío = AnálisisIntegridad.preprocesar_revisión(dict(metadatos, contenido=v2), linaje)
+            self._check(
+                "Solo se escanean los párrafos nuevos",
+                (primera.versión, primera.párrafos_reutilizados) == (1, 0)
+                and (segunda.versión, segunda.párrafos_reutilizados) == (2, 2)
+                and (reenvío.versión, reenvío.párrafos_reutilizados) == (2, 3),
+                f"{primera.resumen()} {segunda.resumen()}"
+            )
+            self._check(
+                "Reenviar la última versión no crea otra",
+                [v["version"] for v in historial_revisiones.versiones(linaje)] == [1, 2]
+                and segunda.get("versiones_previas") == [primera.documento_hash]
+            )
+            
+            for nombre, revisión, texto in (("v1", primera, v1), ("v2", segunda, v2)):
+                incremental = AnálisisIntegridad.analizar_integridad_completa(
+                    revisión, detectores=detectores, paralelo=False
+                )
+                completo = AnálisisIntegridad.analizar_integridad_completa(
+                    dict(metadatos, contenido=texto), detectores=detectores, paralelo=False
+                )
+                self._check(
+                    f"Resultado incremental igual al completo ({nombre})",
+                    all(
+                        incremental[d]["score"] == completo[d]["score"]
+                        and incremental[d]["hallazgos"] == completo[d]["hallazgos"]
+                        for d in detectores
+                    ),
+                    str({d: (incremental[d]["score"], completo[d]["score"]) for d in detectores})
+                )
+            
+            # Otro usuario con el mismo identificador de linaje no lo lee ni lo extiende
+            ajeno = f"ajeno-{uuid.uuid4().hex}"
+            cliente_a, cabeceras_a = self._cliente_api("autora_a")
+            cliente_b, cabeceras_b = self._cliente_api("autor_b")
+            for texto in (v1, v2):
+                cliente_a.post(
+                    "/api/analyze", json=dict(metadatos, contenido=texto, linaje=ajeno), headers=cabeceras_a
+                )
+            lectura_b = cliente_b.get(f"/api/revisiones/{ajeno}", headers=cabeceras_b)
+            cliente_b.post(
+                "/api/analyze", json=dict(metadatos, contenido=v2 + "\n\nAgregado.", linaje=ajeno),
+                headers=cabeceras_b
+            )
+            propias_b = historial_revisiones.versiones(ajeno, "autor_b")
+            lectura_a = cliente_a.get(f"/api/revisiones/{ajeno}", headers=cabeceras_a)
+            self._check(
+                "El linaje de otro usuario no se lee ni se extiende",
+                lectura_b.status_code == 404
+                and [(v["version"], v["parrafos_reutilizados"]) for v in propias_b] == [(1, 0)]
+                and lectura_a.status_code == 200
+                and [v["version"] for v in lectura_a.get_json()["versiones"]] == [1, 2],
+                f"{lectura_b.status_code} {propias_b} {lectura_a.status_code}"
+            )
+        except Exception as e:
+            self._section_error("revisiones incrementales", e)
+    
+    def _test_detector_registry(self):
+        """Prueba el registro de detectores y sus planes de ejecución."""
+        print("\n🗂️  Test 25: Registro de detectores")
+        print("-" * 70)
+        
+        try:
+            from advanced_integrity_analysis import AnálisisIntegridad
+            from documento_preprocesado import DocumentoPreprocesado
+            from registro_detectores import Detector, RegistroDetectores, registro_detectores
+            
+            llamadas = []
+            registro = RegistroDetectores()
+            registro.registrar_artefacto(
+                "palabras", lambda d: d.artefacto("palabras", lambda d: llamadas.append(1) or d.palabras)
+            )
+            registro.registrar_artefacto("longitud", lambda d: d.longitud)
+            registro.registrar(Detector("a", lambda d: len(registro.calcular_artefacto(d, "palabras")), ("palabras",)))
+            registro.registrar(Detector(
+                "b", lambda d, usuario: usuario, ("palabras", "longitud"), costo="alto", parámetros=("usuario",)
+            ))
+            registro.registrar(Detector("c", lambda d: d.longitud, ("longitud",), costo="bajo"))
+            registro.registrar_perfil("barato", ["c", "a"])
+            
+            try:
+                registro.registrar(Detector("x", len, ("inexistente",)))
+                rechazado = False
+            except ValueError:
+                rechazado = True
+            self._check("Artefacto no registrado rechazado", rechazado and "x" not in registro.nombres)
+            
+            plan = registro.plan()
+            self._check(
+                "Solo los artefactos compartidos se calculan de antemano",
+                plan.nombres == ["a", "b", "c"] and set(plan.artefactos_previos) == {"palabras", "longitud"}
+                and registro.plan(["a", "c"]).artefactos_previos == ()
+                and registro.plan(perfil="barato").nombres == ["a", "c"],
+                str(plan.artefactos_previos)
+            )
+            
+            doc = DocumentoPreprocesado({"contenido": "uno dos tres"})
+            tareas = registro.tareas(plan, doc, {"usuario": "ana"}, {"c": 0.5}, {"score": 0}, lambda d, a: None)
+            self._check(
+                "Tareas con parámetros de contexto, plazos y artefactos previos",
+                llamadas == [1] and tareas["b"].argumentos == (doc, "ana")
+                and tareas["c"].plazo == 0.5 and tareas["a"].función(doc) == 3 and llamadas == [1],
+                str({n: t.argumentos[1:] for n, t in tareas.items()})
+            )
+            
+            for nombre, desconocido in (("detector", {"detectores": ["no_existe"]}), ("perfil", {"perfil": "no_existe"})):
+                try:
+                    registro.plan(**desconocido)
+                    rechazado = False
+                except ValueError:
+                    rechazado = True
+                self._check(f"Selección con {nombre} desconocido rechazada", rechazado)
+            
+            registro.registrar_tiempos({"a": {"duracion_ms": 3.0, "truncado": False}})
+            registro.registrar_tiempos({"a": {"duracion_ms": 30000.0, "truncado": True}})
+            histograma = registro.histogramas()["a"]
+            self._check(
+                "Histogramas de duración por detector",
+                histograma["ejecuciones"] == 2 and histograma["truncados"] == 1
+                and histograma["conteos"][2] == 1 and histograma["conteos"][-1] == 1,
+                str(histograma)
+            )
+            
+            triaje = AnálisisIntegridad.analizar_integridad_completa(
+                {"contenido": "Un texto breve de prueba."}, perfil="triaje", paralelo=False
+            )
+            esperados = registro_detectores.seleccionar(perfil="triaje")
+            self._check(
+                "El perfil de triaje ejecuta solo sus detectores",
+                sorted(triaje["ejecucion_detectores"]) == sorted(esperados)
+                and all(registro_detectores.obtener(n).costo != "alto" for n in esperados)
+                and all(n in triaje for n in esperados),
+                str(esperados)
+            )
+            
+            cliente, cabeceras = self._cliente_api("docente")
+            
+            def lote(**extra):
+                return cliente.post(
+                    "/api/batch/analyze",
+                    json={"documentos": [{"contenido": "Un texto breve de prueba."}], **extra},
+                    headers=cabeceras
+                ).get_json()
+            
+            completo = lote()
+            self._check(
+                "El lote usa el perfil completo por defecto",
+                completo["metadatos"]["perfil"] == "completo"
+                and completo["metadatos"]["detectores_omitidos"] == []
+                and "plagio_conceptual" in completo["resultados"][0]["análisis"],
+                str(completo["metadatos"])
+            )
+            parcial = lote(perfil="triaje")
+            self._check(
+                "El lote en triaje informa los detectores omitidos",
+                parcial["metadatos"]["perfil"] == "triaje"
+                and "plagio_conceptual" in parcial["metadatos"]["detectores_omitidos"]
+                and "plagio_conceptual" not in parcial["resultados"][0]["análisis"],
+                str(parcial["metadatos"])
+            )
+        except Exception as e:
+            self._section_error("registro de detectores", e)
+    
+    def _test_rule_packs(self):
+        """Prueba los paquetes de reglas por institución con recarga en caliente."""
+        print("\n📦 Test 26: Paquetes de reglas")
+        print("-" * 70)
+        
+        try:
+            import tempfile
+            from advanced_integrity_analysis import AnálisisIntegridad  # registra el paquete base
+            from paquetes_reglas import RepositorioReglas, paquetes_reglas
+            
+            base = paquetes_reglas.base()
+            with tempfile.TemporaryDirectory() as directorio:
+                repositorio = RepositorioReglas(Path(directorio), intervalo_revisión=0)
+                repositorio.registrar_base(base.especificación, base.máximo_por_patrón)
+                archivo = Path(directorio) / "univ-a.json"
+                
+                def escribir(paquete):
+                    archivo.write_text(
+                        paquete if isinstance(paquete, str) else json.dumps(paquete), encoding="utf-8"
+                    )
+                
+                escribir({"palabras_clave": {"falacias": {
+                    "apelación_autoridad": ["como dijo el rector"],
+                    "generalización_excesiva": None,
+                }}})
+                paquete = repositorio.obtener("univ-a")
+                etiquetas = {c.etiqueta for c in paquete.escáner_palabras_clave.buscar("como dijo el rector, siempre")}
+                self._check(
+                    "El paquete de la institución reemplaza y elimina indicadores",
+                    paquete.versión != base.versión
+                    and etiquetas == {("falacias", "apelación_autoridad")}
+                    and repositorio.obtener() is repositorio.base()
+                    and repositorio.obtener("sin-archivo") is repositorio.base(),
+                    str(etiquetas)
+                )
+                self._check(
+                    "Sin cambios en el archivo se reutiliza el paquete compilado",
+                    repositorio.obtener("univ-a") is paquete
+                )
+                
+                escribir('{"falacias": ')
+                self._check(
+                    "Un paquete inválido conserva la versión anterior",
+                    repositorio.obtener("univ-a") is paquete
+                    and repositorio.describir()["instituciones"]["univ-a"]["error"] is not None
+                )
+                
+                escribir({"patrones_mala_conducta": {"sin_datos": {"patrón": "(", "riesgo": "ALTO", "indicador": "x"}}})
+                self._check(
+                    "Una expresión regular inválida no reemplaza el paquete",
+                    repositorio.obtener("univ-a") is paquete
+                )
+                
+                escribir({"version": "2", "falacias": {"ad_hominem": None}})
+                recargado = repositorio.obtener("univ-a")
+                self._check(
+                    "Un archivo modificado se recarga sin reiniciar",
+                    recargado is not paquete and "ad_hominem" not in recargado.tablas["falacias"]
+                    and repositorio.describir()["instituciones"]["univ-a"]["error"] is None
+                )
+                
+                for paquete_inválido in ({"secciones_extra": {}}, {"falacias": {"ad_hominem": {"peso": 1}}}):
+                    try:
+                        repositorio.superponer(paquete_inválido)
+                        rechazado = False
+                    except ValueError:
+                        rechazado = True
+                    self._check(f"Paquete rechazado: {list(paquete_inválido)[0]}", rechazado)
+                try:
+                    repositorio.obtener("../fuera")
+                    rechazado = False
+                except ValueError:
+                    rechazado = True
+                self._check("Nombre de institución inválido rechazado", rechazado)
+        except Exception as e:
+            self._section_error("paquetes de reglas", e)
+    
+    def _test_cohort_collusion(self):
+        """Prueba la detección de grupos de colusión en una cohorte."""
+        print("\n👥 Test 27: Colusión en la cohorte")
+        print("-" * 70)
+        
+        try:
+            import random
+            from deteccion_colusion import DetecciónColusión
+            
+            aleatorio = random.Random(11)
+            vocabulario = [f"termino{i}" for i in range(3000)]
+            
+            def texto(n):
+                return " ".join(aleatorio.choice(vocabulario) for _ in range(n))
+            
+            def editar(original, cambios):
+                palabras = original.split()
+                for i in aleatorio.sample(range(len(palabras)), cambios):
+                    palabras[i] = aleatorio.choice(vocabulario)
+                return " ".join(palabras)
+            
+            plantilla = "Responda las preguntas del enunciado citando la bibliografía obligatoria del curso " * 3
+            trabajos = [texto(300) for _ in range(30)]
+            trabajos[1] = editar(trabajos[0], 10)
+            trabajos[2] = editar(trabajos[0], 15)
+            trabajos[20] = editar(trabajos[10], 5)
+            trabajos[25] = ""
+            documentos = [
+                {"id": f"t{i}", "usuario": f"alumno{i}", "contenido": (plantilla + t) if t else ""}
+                for i, t in enumerate(trabajos)
+            ]
+            
+            resultado = DetecciónColusión.analizar_cohorte(documentos, plantilla=plantilla, paralelo=False)
+            grupos = [[m["id"] for m in g["miembros"]] for g in resultado["grupos"]]
+            self._check(
+                "Grupos de trabajos copiados detectados",
+                grupos == [["t0", "t1", "t2"], ["t10", "t20"]],
+                str(grupos)
+            )
+            self._check(
+                "La plantilla común no une a la cohorte",
+                resultado["pares_confirmados"] == 4 and resultado["candidatos"] < 30,
+                f"{resultado['candidatos']} candidatos, {resultado['pares_confirmados']} pares"
+            )
+            self._check("Trabajos sin texto informados", resultado["sin_texto"] == [25])
+            
+            sin_plantilla = DetecciónColusión.analizar_cohorte(documentos, paralelo=False)
+            self._check(
+                "El contenido presente en toda la cohorte se descarta sin plantilla",
+                [[m["id"] for m in g["miembros"]] for g in sin_plantilla["grupos"]] == grupos
+                and sin_plantilla["shingles_comunes"] > 0,
+                str(sin_plantilla["shingles_comunes"])
+            )
+        except Exception as e:
+            self._section_error("colusión en la cohorte", e)
+    
+    def _test_figure_index(self):
+        """Prueba los hashes perceptuales y el índice de figuras."""
+        print("\n🖼️  Test 28: Índice de figuras")
+        print("-" * 70)
+        
+        try:
+            import tempfile
+            import numpy as np
+            from indice_figuras import (
+                DISTANCIA_MÁXIMA, AnálisisFiguras, ÍndiceFiguras, distancias_hamming, hashes_perceptuales
+            )
+            
+            rng = np.random.default_rng(5)
+            y, x = np.mgrid[0:240, 0:320]
+            figura = 120 + 80 * np.sin(x / 23.0) * np.cos(y / 31.0) + 40 * ((x - 200) ** 2 + (y - 90) ** 2 < 40 ** 2)
+            retocada = np.clip(figura * 0.9 + 15 + rng.normal(0, 4, figura.shape), 0, 255)
+            otra = rng.uniform(0, 255, (200, 200))
+            hashes = hashes_perceptuales([figura, retocada, otra, np.fliplr(figura)])
+            distancias = distancias_hamming(hashes["phash"][0], hashes["phash"])
+            self._check(
+                "Una figura retocada conserva el pHash y otra figura no",
+                distancias[1] <= DISTANCIA_MÁXIMA and distancias[2] > DISTANCIA_MÁXIMA
+                and distancias[3] > DISTANCIA_MÁXIMA,
+                str(distancias.tolist())
+            )
+            
+            # Hashes sintéticos: variantes de una base a distancia 0-12
+            base = int(rng.integers(0, 2 ** 63)) * 2 + 1
+            variantes = []
+            for distancia in list(range(13)) * 10:
+                variante = base
+                for bit in rng.choice(64, distancia, replace=False).tolist():
+                    variante ^= 1 << bit
+                variantes.append(variante)
+            aleatorios = [int(v) for v in rng.integers(0, 2 ** 63, 200, dtype=np.int64)]
+            todos = np.array(variantes + aleatorios, dtype=np.uint64)
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                índice = ÍndiceFiguras(Path(directorio) / "figuras.db")
+                figuras = [{"pagina": 1, "ancho": 64, "alto": 64}] * len(todos)
+                lote = {"ahash": todos, "dhash": np.zeros(len(todos), dtype=np.uint64), "phash": todos}
+                nuevas = índice.agregar("previo", figuras, lote, usuario="ana")
+                repetidas = índice.agregar("previo", figuras, lote, usuario="ana")
+                encontradas = índice.consultar(base, 0, k=len(todos))
+                propias = índice.consultar(base, 0, excluir="previo")
+            
+            esperadas = sorted(
+                i for i, d in enumerate(distancias_hamming(todos, np.uint64(base)).tolist())
+                if d <= DISTANCIA_MÁXIMA
+            )
+            self._check("Archivar es idempotente", nuevas == len(todos) and repetidas == 0)
+            self._check(
+                "El índice multi-tabla encuentra todas las figuras a distancia <= 8",
+                sorted(e["posicion"] for e in encontradas) == esperadas
+                and [e["distancia"] for e in encontradas] == sorted(e["distancia"] for e in encontradas),
+                f"{len(encontradas)} de {len(esperadas)}"
+            )
+            self._check("El propio documento se excluye", propias == [])
+            self._check(
+                "Sin PyPDF2/Pillow el análisis de PDF no está disponible",
+                AnálisisFiguras.disponible() or not AnálisisFiguras.analizar_pdf(b"%PDF")["disponible"]
+            )
+        except Exception as e:
+            self._section_error("índice de figuras", e)
+    
+    def _test_ngram_model(self):
+        """Prueba el modelo local de n-gramas para texto generado."""
+        print("\n🤖 Test 29: Modelo local de n-gramas")
+        print("-" * 70)
+        
+        try:
+            import random
+            import tempfile
+            from modelo_ngramas import ModeloNgramas
+            
+            aleatorio = random.Random(13)
+            vocabulario = [f"voz{i}" for i in range(1500)]
+            pesos = [1 / (i + 1) for i in range(1500)]
+            
+            def oración(n=None):
+                return " ".join(aleatorio.choices(vocabulario, pesos, k=n or aleatorio.randint(4, 30))) + "."
+            
+            # Textos humanos: oraciones variadas más algunas frases hechas frecuentes
+            frases_hechas = [oración(12) for _ in range(15)]
+            
+            def humano():
+                partes = [oración() for _ in range(aleatorio.randint(6, 12))] + aleatorio.sample(frases_hechas, 2)
+                aleatorio.shuffle(partes)
+                return " ".join(partes)
+            
+            with tempfile.TemporaryDirectory() as directorio:
+                modelo = ModeloNgramas(Path(directorio))
+                sin_modelo = modelo.evaluar_texto(humano())
+                compilado = modelo.compilar([json.dumps({"contenido": humano()}) for _ in range(300)] + [""])
+                natural = modelo.evaluar_texto(humano())
+                predecible = modelo.evaluar_texto(" ".join(aleatorio.choice(frases_hechas) for _ in range(10)))
+                corto = modelo.evaluar_texto("voz1 voz2 voz3.")
+            
+            self._check(
+                "Sin modelo compilado se recurre al LLM",
+                not sin_modelo["disponible"] and sin_modelo["requiere_llm"]
+            )
+            self._check(
+                "Compilación con documentos reservados para calibrar",
+                compilado["documentos"] == 300 and compilado["validacion"] == 30,
+                str(compilado)
+            )
+            self._check(
+                "Texto humano nuevo puntúa bajo y no requiere LLM",
+                natural["score"] < 30 and not natural["requiere_llm"],
+                f"score {natural['score']}, perplejidad {natural['perplejidad']}"
+            )
+            self._check(
+                "Texto predecible y uniforme puntúa alto",
+                predecible["score"] >= 70 and predecible["requiere_llm"] and len(predecible["hallazgos"]) == 2
+                and predecible["perplejidad"] < natural["perplejidad"],
+                f"score {predecible['score']}, perplejidad {predecible['perplejidad']}"
+            )
+            self._check(
+                "Texto demasiado corto sin puntaje",
+                corto["score"] == 0 and corto["requiere_llm"] and corto["palabras"] == 3
+            )
+        except Exception as e:
+            self._section_error("modelo de n-gramas", e)
+    
+    def _test_streaming_windows(self):
+        """Prueba el análisis por ventanas de documentos muy grandes."""
+        print("\n🌊 Test 30: Análisis por ventanas")
+        print("-" * 70)
+        
+        try:
+            import hashlib
+            import io
+            from unittest.mock import patch
+            from advanced_integrity_analysis import AnálisisIntegridad
+            from api_v2_mejorado import leer_fragmentos
+            
+            oraciones = [
+                "El método siempre confirma la hipótesis, por lo tanto el efecto es causal.",
+                "Los valores asumidos reemplazaron a los simulados sin justificación.",
+                "Según expertos nunca falla y todos los resultados son 100% significativos.",
+                "Se describe un procedimiento cuidadoso y reproducible con datos abiertos.",
+            ]
+            texto = " ".join(oraciones[i % 7 % 4] for i in range(400))
+            metadatos = {"tipo_documento": "investigación"}
+            detectores = ["desviaciones_metodologicas", "mala_conducta", "falacias"]
+            
+            crudo = texto.encode("utf-8")
+            hasher = hashlib.sha256()
+            # Bloques de 7 bytes: los caracteres acentuados quedan partidos entre bloques
+            with patch("api_v2_mejorado.TAMAÑO_BLOQUE_LECTURA", 7):
+                fragmentos = list(leer_fragmentos(io.BytesIO(crudo), hasher))
+            self._check(
+                "Lectura por bloques decodifica y calcula el hash",
+                "".join(fragmentos) == texto and len(fragmentos) > 1
+                and hasher.hexdigest() == hashlib.sha256(crudo).hexdigest()
+            )
+            
+            por_ventanas = AnálisisIntegridad.preprocesar_por_ventanas(
+                (texto[i:i + 1000] for i in range(0, len(texto), 1000)),
+                metadatos, tamaño_ventana=4096, solapamiento=512
+            )
+            streaming = AnálisisIntegridad.analizar_integridad_completa(
+                por_ventanas, detectores=detectores, paralelo=False
+            )
+            completo = AnálisisIntegridad.analizar_integridad_completa(
+                dict(metadatos, contenido=texto), detectores=detectores, paralelo=False
+            )
+            self._check(
+                "Conteos globales del documento por ventanas",
+                por_ventanas.longitud == len(texto) and por_ventanas.num_ventanas > 5,
+                str(por_ventanas.resumen())
+            )
+            self._check(
+                "Mismo resultado por ventanas que con el texto completo",
+                all(
+                    streaming[d]["score"] == completo[d]["score"]
+                    and streaming[d]["hallazgos"] == completo[d]["hallazgos"]
+                    for d in detectores
+                ),
+                str({d: (streaming[d]["score"], completo[d]["score"]) for d in detectores})
+            )
+        except Exception as e:
+            self._section_error("análisis por ventanas", e)
+    
+    def _test_response_projection(self):
+        """Prueba las respuestas compactas, la proyección y el catálogo con ETag."""
+        print("\n✂️  Test 31: Respuestas compactas y catálogo")
+        print("-" * 70)
+        
+        try:
+            import uuid
+            from api_v2_mejorado import CAMPOS_COMPACTOS_DETECTOR
+            
+            cliente, cabeceras = self._cliente_api("proyeccion")
+            cuerpo = {"contenido": f"Ensayo {uuid.uuid4().hex} sobre la imprenta y su difusión. " * 5}
+            
+            completo = cliente.post("/api/analyze", json=cuerpo, headers=cabeceras).get_json()
+            compacto = cliente.post("/api/analyze?compact=1", json=cuerpo, headers=cabeceras).get_json()
+            detectores = [
+                clave for clave, valor in compacto["análisis"].items()
+                if isinstance(valor, dict) and "hallazgos" in valor
+            ]
+            self._check(
+                "Modo compacto: solo puntajes y hallazgos, sin tiempos",
+                "ejecucion_detectores" in completo["análisis"]
+                and "ejecucion_detectores" not in compacto["análisis"]
+                and len(detectores) > 0
+                and all(set(compacto["análisis"][d]) <= set(CAMPOS_COMPACTOS_DETECTOR) for d in detectores)
+                and compacto["análisis"]["score_general"] == completo["análisis"]["score_general"],
+                str(detectores)
+            )
+            
+            proyectado = cliente.post(
+                "/api/analyze?fields=análisis.score_general,metadatos.cache,no.existe",
+                json=cuerpo, headers=cabeceras
+            ).get_json()
+            repetido = cliente.post("/api/analyze", json=cuerpo, headers=cabeceras).get_json()
+            self._check(
+                "Proyección de rutas sin alterar el resultado en caché",
+                proyectado == {
+                    "análisis": {"score_general": completo["análisis"]["score_general"]},
+                    "metadatos": {"cache": True},
+                }
+                and "ejecucion_detectores" in repetido["análisis"],
+                str(proyectado)
+            )
+            
+            catálogo = cliente.get("/api/catalogo-patrones", headers=cabeceras)
+            etag = catálogo.headers.get("ETag")
+            revalidado = cliente.get(
+                "/api/catalogo-patrones", headers=dict(cabeceras, **{"If-None-Match": etag})
+            )
+            inválida = cliente.get("/api/catalogo-patrones?institucion=../x", headers=cabeceras)
+            self._check(
+                "Catálogo con ETag por versión y revalidación 304",
+                catálogo.status_code == 200 and etag == f'"{catálogo.get_json()["version"]}"'
+                and revalidado.status_code == 304 and inválida.status_code == 400,
+                f"{catálogo.status_code} {revalidado.status_code} {inválida.status_code}"
+            )
+        except Exception as e:
+            self._section_error("respuestas compactas", e)
+    
     def _save_test_case_to_db(self, caso_name: str, analysis: Dict, original_data: Dict):
         """Guarda resultado de test en BD."""
         try: